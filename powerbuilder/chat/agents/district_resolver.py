@@ -0,0 +1,178 @@
+# powerbuilder/chat/agents/district_resolver.py
+"""
+District resolver. Extracts the target geography (and the other scalar
+parameters the geo agents need) from the query ONCE per run, ahead of the
+first geographic agent.
+
+PrecinctsAgent, WinNumberAgent, the election analyst and the cost calculator
+used to each make their own gpt-4o extraction call against the same query.
+This node makes one call and appends a canonical record to structured_data:
+
+    {
+      "agent":          "district_resolver",
+      "state_fips":     "13",
+      "state_name":     "georgia",
+      "district_type":  "congressional",
+      "district_id":    "1307",
+      "target_year":    2026,
+      "victory_margin": 0.52,
+      "top_n":          20,
+      "budget":         50000.0,   # None when the query names no budget
+    }
+
+Downstream agents already prefer any structured_data entry carrying
+state_fips + district_type + district_id over their own extraction, so they
+pick the record up with no further LLM call. When the query names no
+resolvable district the record carries only the non-geographic fields
+(target_year, victory_margin, top_n, budget) and each geo agent falls back to
+its own extraction exactly as before.
+
+Output
+------
+structured_data : the resolver record appended (agent="district_resolver")
+errors          : non-fatal extraction failures appended; node never raises
+"""
+
+import logging
+import re
+from typing import Optional
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from .state import AgentState
+from ..utils.district_standardizer import GeographyStandardizer, normalize_district
+from ..utils.llm_config import get_completion_client
+
+logger = logging.getLogger(__name__)
+
+RESOLVER_AGENT = "district_resolver"
+
+_DEFAULT_TARGET_YEAR    = 2026
+_DEFAULT_VICTORY_MARGIN = 0.52
+_DEFAULT_TOP_N          = 20
+
+
+def get_district_record(structured_data: list | None) -> Optional[dict]:
+    """Return this run's resolver record, or None if the resolver has not run."""
+    return next(
+        (d for d in (structured_data or []) if d.get("agent") == RESOLVER_AGENT),
+        None,
+    )
+
+
+def _parse_lines(raw: str) -> dict:
+    params: dict = {}
+    for line in raw.splitlines():
+        if ":" in line:
+            key, _, val = line.partition(":")
+            params[key.strip().upper()] = val.strip().strip('"')
+    return params
+
+
+def _parse_budget(raw: str) -> Optional[float]:
+    if not raw or raw.strip().upper() == "NONE":
+        return None
+    digits = re.sub(r"[^\d.]", "", raw)
+    try:
+        return float(digits) or None
+    except ValueError:
+        return None
+
+
+def resolve_district_params(params: dict) -> dict:
+    """
+    Turn the raw extraction lines into the canonical record. Pure function so
+    it can be tested without an LLM. Geographic keys are only included when
+    the state and district both resolve to a valid GEOID.
+    """
+    try:
+        target_year = int(params.get("TARGET_YEAR", _DEFAULT_TARGET_YEAR))
+    except ValueError:
+        target_year = _DEFAULT_TARGET_YEAR
+    try:
+        victory_margin = float(params.get("VICTORY_MARGIN", _DEFAULT_VICTORY_MARGIN))
+    except ValueError:
+        victory_margin = _DEFAULT_VICTORY_MARGIN
+    try:
+        top_n = int(params.get("TOP_N", _DEFAULT_TOP_N))
+    except ValueError:
+        top_n = _DEFAULT_TOP_N
+
+    record: dict = {
+        "agent":          RESOLVER_AGENT,
+        "target_year":    target_year,
+        "victory_margin": victory_margin,
+        "top_n":          top_n,
+        "budget":         _parse_budget(params.get("BUDGET", "")),
+    }
+
+    state_name = params.get("STATE", "").strip()
+    state_fips = GeographyStandardizer.STATE_FIPS.get(state_name.lower())
+    if not state_fips:
+        return record
+
+    district_type = params.get("DISTRICT_TYPE", "congressional").lower()
+    if district_type == "senate":
+        district_id = "statewide"
+    else:
+        try:
+            dist_num = normalize_district(params.get("DISTRICT_NUM", "0"))
+        except ValueError:
+            return record
+        geoid = GeographyStandardizer.convert_to_geoid(state_name, dist_num, district_type)
+        if isinstance(geoid, dict):
+            return record
+        district_id = geoid
+
+    record.update({
+        "state_fips":    state_fips,
+        "state_name":    state_name.lower(),
+        "district_type": district_type,
+        "district_id":   district_id,
+    })
+    return record
+
+
+def district_resolver_node(state: AgentState) -> dict:
+    """
+    LangGraph node. One LLM extraction for every geo agent in the run.
+    Always appends a record (possibly without geography) so the router
+    knows the resolver has run and never schedules it twice.
+    """
+    query = (state.get("query") or "").strip()
+    if not query:
+        return {"structured_data": [resolve_district_params({})]}
+
+    llm = get_completion_client(temperature=0, provider="openai")
+    extraction_prompt = f"""
+Extract electoral district information from this query. Return ONLY these seven lines, no extra text.
+
+Query: "{query}"
+
+STATE: [full state name or abbreviation, e.g. "Virginia" or "VA", or NONE]
+DISTRICT_TYPE: [congressional | state_senate | state_house | senate]
+DISTRICT_NUM: [integer district number, or 0 for at-large, or "statewide" for senate]
+TARGET_YEAR: [4-digit election year, default 2026]
+VICTORY_MARGIN: [decimal win threshold e.g. 0.52, default 0.52]
+TOP_N: [integer number of precincts to return, default 20]
+BUDGET: [campaign budget or available funds as a plain number (e.g. 50000), or NONE]
+"""
+    try:
+        raw = llm.invoke(extraction_prompt).content.strip()
+    except Exception as e:
+        logger.warning(f"DistrictResolver: LLM extraction failed — {e}")
+        return {
+            "structured_data": [resolve_district_params({})],
+            "errors":          [f"DistrictResolver: LLM extraction failed — {e}"],
+        }
+
+    record = resolve_district_params(_parse_lines(raw))
+    if record.get("district_id"):
+        logger.info(
+            f"DistrictResolver: {record['district_type']} {record['district_id']} "
+            f"(state {record['state_fips']})"
+        )
+    else:
+        logger.info("DistrictResolver: no district resolved from query; agents will fall back.")
+    return {"structured_data": [record]}
@@ -13,7 +13,10 @@ Data sources
 Primary  — state master CSVs at data/election_results/{fips}_master.csv
            (written by election_ingestor.py; turnout + cycle metadata)
 Secondary — raw MEDSL constituency-returns CSVs (fetched from GitHub, cached
-           locally in data/medsl_cache/) for candidate-level D/R vote shares
+           locally in data/medsl_cache/) for candidate-level D/R vote shares.
+           The cached CSV is split into one Parquet file per state so a
+           district lookup reads a single small partition (see
+           _load_medsl_state).
 Cook (optional) — CookPoliticalClient with 24-hour local cache and static seed
            fallback; gracefully absent when COOK_EMAIL/COOK_PASSWORD unset
 
@@ -27,20 +30,22 @@ errors           : non-fatal errors appended; agent never raises
 
 import logging
 import os
+import threading
 import time
+from collections import OrderedDict
 from typing import Optional
 
 from dotenv import load_dotenv
 load_dotenv()
 
 import pandas as pd
-from langchain_openai import ChatOpenAI
 
 from .state import AgentState
 from .win_number import get_climate_years
 from ..utils.cook_client import CookPoliticalClient
 from ..utils.district_standardizer import GeographyStandardizer, normalize_district
 from ..utils.election_ingestor import ElectionDataUtility
+from ..utils.llm_config import get_completion_client
 from ..utils.storage import read_dataframe, write_dataframe
 
 logger = logging.getLogger(__name__)
@@ -56,6 +61,14 @@ MEDSL_CACHE_TTL_DAYS = 30  # MEDSL historical data is stable; refresh monthly
 # MEDSL raw source URLs (same as election_ingestor.py — imported to avoid duplication)
 MEDSL_URLS = ElectionDataUtility.MEDSL_URLS
 
+# Columns _extract_party_margins reads. The per-state Parquet partitions are
+# written with only these, and read back with the same projection.
+MEDSL_COLUMNS = ["year", "state_fips", "district", "stage", "party", "candidatevotes", "totalvotes"]
+
+# Hot state partitions kept in memory, keyed by (office_type, state_fips,
+# partition build time) so a monthly rebuild never serves the old frame.
+MEDSL_PARTITION_LRU_SIZE = int(os.getenv("MEDSL_PARTITION_LRU_SIZE", "16"))
+
 # Competitiveness thresholds (two-party D margin, e.g. +0.05 = D+5)
 # Applied to the average margin across all available cycles.
 _COMP_THRESHOLDS = [
@@ -114,6 +127,100 @@ def _load_medsl_raw(office_type: str) -> Optional[pd.DataFrame]:
         return None
 
 
+def _medsl_partition_dir(office_type: str) -> str:
+    """Directory holding the per-state Parquet partitions for house or senate."""
+    return os.path.join(MEDSL_CACHE, f"{office_type}_by_state")
+
+
+def _medsl_partition_path(office_type: str, fips_int: int) -> str:
+    return os.path.join(_medsl_partition_dir(office_type), f"state_fips={fips_int:02d}.parquet")
+
+
+def _medsl_partition_marker(office_type: str) -> str:
+    """Written last by _materialize_medsl_partitions; its mtime is the build time."""
+    return os.path.join(_medsl_partition_dir(office_type), "_SUCCESS")
+
+
+def _materialize_medsl_partitions(office_type: str, raw: pd.DataFrame) -> None:
+    """
+    Split the raw MEDSL frame into one Parquet file per state, keeping only
+    MEDSL_COLUMNS. The marker is written after every partition so a crash
+    mid-build leaves the store stale (rebuilt next time), never half-read.
+    """
+    part_dir = _medsl_partition_dir(office_type)
+    os.makedirs(part_dir, exist_ok=True)
+    marker = _medsl_partition_marker(office_type)
+    if os.path.exists(marker):
+        os.remove(marker)
+
+    projected = raw[[c for c in MEDSL_COLUMNS if c in raw.columns]]
+    for fips_val, part in projected.groupby("state_fips", sort=False):
+        part.reset_index(drop=True).to_parquet(
+            _medsl_partition_path(office_type, int(fips_val)), index=False,
+        )
+    with open(marker, "w") as f:
+        f.write(f"{len(projected)} rows\n")
+    logger.info(f"ElectionAnalyst: materialized MEDSL {office_type} into per-state Parquet partitions.")
+
+
+_medsl_partition_lru: "OrderedDict[tuple, pd.DataFrame]" = OrderedDict()
+_medsl_partition_lock = threading.Lock()
+
+
+def _remember_partition(key: tuple, part: pd.DataFrame) -> pd.DataFrame:
+    with _medsl_partition_lock:
+        _medsl_partition_lru[key] = part
+        _medsl_partition_lru.move_to_end(key)
+        while len(_medsl_partition_lru) > MEDSL_PARTITION_LRU_SIZE:
+            _medsl_partition_lru.popitem(last=False)
+    return part
+
+
+def _load_medsl_state(office_type: str, state_fips: str) -> Optional[pd.DataFrame]:
+    """
+    Return MEDSL rows (MEDSL_COLUMNS only) for one state, or None on failure.
+
+    Order of lookup:
+      1. In-memory LRU of hot partitions.
+      2. The state's Parquet partition, when the store is fresh.
+      3. The full raw CSV (_load_medsl_raw), which is then materialized into
+         partitions for every later lookup. If writing Parquet fails the
+         state is filtered from the in-memory frame instead.
+    """
+    fips_int = int(state_fips)
+    marker   = _medsl_partition_marker(office_type)
+
+    if _medsl_cache_is_fresh(marker):
+        key = (office_type, fips_int, os.path.getmtime(marker))
+        with _medsl_partition_lock:
+            cached = _medsl_partition_lru.get(key)
+            if cached is not None:
+                _medsl_partition_lru.move_to_end(key)
+                return cached
+
+        path = _medsl_partition_path(office_type, fips_int)
+        if not os.path.exists(path):
+            # The state has no rows for this office.
+            return _remember_partition(key, pd.DataFrame(columns=MEDSL_COLUMNS))
+        try:
+            return _remember_partition(key, pd.read_parquet(path, columns=MEDSL_COLUMNS))
+        except Exception as e:
+            logger.warning(f"ElectionAnalyst: MEDSL partition read error ({office_type}, {fips_int:02d}) — {e}")
+
+    raw = _load_medsl_raw(office_type)
+    if raw is None:
+        return None
+
+    part = raw.loc[raw["state_fips"] == fips_int, [c for c in MEDSL_COLUMNS if c in raw.columns]]
+    part = part.reset_index(drop=True)
+    try:
+        _materialize_medsl_partitions(office_type, raw)
+    except Exception as e:
+        logger.warning(f"ElectionAnalyst: MEDSL partition write failed ({office_type}) — {e}")
+        return part
+    return _remember_partition((office_type, fips_int, os.path.getmtime(marker)), part)
+
+
 def _extract_party_margins(
     office_type: str,
     state_fips: str,
@@ -128,14 +235,12 @@ def _extract_party_margins(
     Returns None if MEDSL data is unavailable or the district is not found.
     """
     medsl_type = "house" if office_type == "congressional" else "senate"
-    raw = _load_medsl_raw(medsl_type)
-    if raw is None:
+    state_rows = _load_medsl_state(medsl_type, state_fips)
+    if state_rows is None:
         return None
 
-    fips_int = int(state_fips)
-
-    # Filter to this state + general elections
-    df = raw[(raw["state_fips"] == fips_int) & (raw["stage"].str.lower() == "gen")].copy()
+    # Filter to general elections (the partition is already one state)
+    df = state_rows[state_rows["stage"].str.lower() == "gen"].copy()
 
     if df.empty:
         return None
@@ -274,11 +379,7 @@ def _resolve_params(state: AgentState) -> Optional[dict]:
         logger.error("ElectionAnalyst: state['query'] is missing or empty — cannot extract district parameters.")
         return None
 
-    llm = ChatOpenAI(
-        model="gpt-4o",
-        temperature=0,
-        openai_api_key=os.environ["OPENAI_API_KEY"],
-    )
+    llm = get_completion_client(temperature=0, provider="openai")
     extraction_prompt = f"""
 Extract electoral district information from this query. Return ONLY these four lines, no extra text.
 
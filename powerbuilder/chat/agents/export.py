@@ -40,6 +40,8 @@ from dotenv import load_dotenv
 load_dotenv()
 
 from .. import progress as _progress
+from ..utils import template_registry
+from ..utils.context_packer import context_budget, pack_context
 from ..utils.llm_config import get_completion_client
 
 from .state import AgentState
@@ -268,7 +270,7 @@ def _district_label(structured_data: list) -> str:
     """
     from .opposition_research import _FIPS_TO_STATE_ABBR  # lazy to avoid circular
 
-    for agent in ("precincts", "win_number", "election_results"):
+    for agent in ("precincts", "win_number", "election_results", "district_resolver"):
         entry = _get_entry(structured_data, agent)
         if not (entry and entry.get("district_type") and entry.get("district_id")):
             continue
@@ -788,7 +790,9 @@ def _format_structured_for_prompt(structured_data: list) -> str:
 
     # Pass through any unrecognised agent entries as flat key-value pairs so nothing
     # is silently dropped when new agents are added.
-    known = {"win_number", "finance", "election_results", "precincts", "power_type", "voter_file"}
+    # district_resolver is omitted from the prompt: its fields already appear
+    # in every geo agent's block above.
+    known = {"win_number", "finance", "election_results", "precincts", "power_type", "voter_file", "district_resolver"}
     for entry in structured_data:
         agent = entry.get("agent", "")
         if agent not in known:
@@ -818,9 +822,11 @@ def _build_prompt(
     district_label: str,
     power_type: str = "through",
     has_script_pack: bool = False,
+    structured_context: Optional[str] = None,
 ) -> str:
 
-    structured_context = _format_structured_for_prompt(structured_data)
+    if structured_context is None:
+        structured_context = _format_structured_for_prompt(structured_data)
 
     error_block = ""
     if errors:
@@ -1349,7 +1355,22 @@ def _synthesize(state: AgentState, is_plan: bool, run_id: str | None = None) ->
     active_agents    = state.get("active_agents", [])
     errors           = state.get("errors", [])
 
-    research_ctx = "\n\n".join(research_results) or "No research collected."
+    # Fit the memos and structured blocks to the synthesis token budget.
+    # Messaging outputs are pinned: the plan reproduces them verbatim.
+    packed = pack_context(
+        research_results,
+        [_format_structured_for_prompt(structured_data)],
+        budget=context_budget("synthesis"),
+        query=state.get("query", ""),
+        pinned=lambda memo: memo.startswith("--- MESSAGING OUTPUT:"),
+    )
+    if packed.trimmed:
+        _progress.emit(run_id, "trace", agent="synthesizer",
+                       label=f"Trimmed {packed.dropped_tokens:,} tokens of context to fit the budget",
+                       dropped_tokens=packed.dropped_tokens,
+                       dropped_memos=packed.dropped_memos)
+
+    research_ctx = packed.research or "No research collected."
     district_lbl = _district_label(structured_data)
 
     power_type      = _infer_power_type(state.get("query", ""), active_agents)
@@ -1365,6 +1386,7 @@ def _synthesize(state: AgentState, is_plan: bool, run_id: str | None = None) ->
         district_label=district_lbl,
         power_type=power_type,
         has_script_pack=has_script_pack,
+        structured_context=packed.blocks[0] or "No structured data collected.",
     )
 
     system_prompt = (
@@ -1669,7 +1691,7 @@ def _write_docx(synthesis: str, state: AgentState, district_label: str) -> dict:
     Build a Word document. Prose from LLM synthesis, tables from structured_data.
     """
     try:
-        from docx import Document
+        import docx  # noqa: F401  (availability check)
     except ImportError:
         return {
             "final_answer": synthesis,
@@ -1683,17 +1705,10 @@ def _write_docx(synthesis: str, state: AgentState, district_label: str) -> dict:
     vf_entry        = _get_entry(structured_data, "voter_file")
     precincts       = (precinct_entry or {}).get("precincts", [])
 
-    # Open the branded template if it exists; fall back to a blank document.
-    if os.path.exists(TEMPLATE_PATH):
-        doc = Document(TEMPLATE_PATH)
-        # Clear body content (placeholder text) while preserving styles and footer.
-        from docx.oxml.ns import qn
-        body = doc.element.body
-        for child in list(body):
-            if child.tag != qn("w:sectPr"):
-                body.remove(child)
-    else:
-        doc = Document()
+    # Start from the branded template (body cleared, styles and footer kept)
+    # if it exists, cloned from the registry's in-memory copy; otherwise a
+    # blank document.
+    doc = template_registry.blank_document(TEMPLATE_PATH)
     doc.add_heading(f"{district_label} — Political Program Plan", 0)
 
     # If the finance entry contains a structured paid_media plan, the styled
@@ -1970,19 +1985,11 @@ def _write_script_pack_docx(script_pack: dict, district_label: str) -> dict:
     Contains all eight messaging formats as separate H2 sections.
     """
     try:
-        from docx import Document
+        import docx  # noqa: F401  (availability check)
     except ImportError:
         return {"errors": ["ExportAgent: python-docx not installed — cannot write script pack."]}
 
-    if os.path.exists(TEMPLATE_PATH):
-        doc = Document(TEMPLATE_PATH)
-        from docx.oxml.ns import qn as _qn
-        body = doc.element.body
-        for child in list(body):
-            if child.tag != _qn("w:sectPr"):
-                body.remove(child)
-    else:
-        doc = Document()
+    doc = template_registry.blank_document(TEMPLATE_PATH)
 
     doc.add_heading(f"{district_label} — Script Pack", 0)
 
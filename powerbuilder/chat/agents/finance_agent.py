@@ -33,10 +33,10 @@ from typing import Optional
 from dotenv import load_dotenv
 load_dotenv()
 
-from langchain_openai import ChatOpenAI
-
-from ..utils.data_fetcher import DataFetcher
+from ..utils import fec_client, template_registry
 from ..utils.district_standardizer import GeographyStandardizer
+from ..utils.llm_config import get_completion_client
+from .district_resolver import get_district_record
 from .state import AgentState
 from .paid_media import (
     estimate_paid_media,
@@ -130,34 +130,40 @@ _FIPS_TO_ABBR: dict = {
 }
 
 
+def _parse_unit_costs(path: str) -> dict:
+    """Map the nested costs.json structure to the flat rate table."""
+    with open(path) as f:
+        raw = json.load(f)
+    return {
+        "door_knock":      raw.get("canvassing", {}).get("cost_per_door",      DEFAULT_UNIT_COSTS["door_knock"]),
+        "doors_per_hour":  raw.get("canvassing", {}).get("doors_per_hour",     DEFAULT_UNIT_COSTS["doors_per_hour"]),
+        "phone_call":      raw.get("phones",     {}).get("cost_per_contact",   DEFAULT_UNIT_COSTS["phone_call"]),
+        "text_message":    raw.get("text",       {}).get("cost_per_text",      DEFAULT_UNIT_COSTS["text_message"]),
+        "mail_piece":      raw.get("mail",       {}).get("cost_per_piece",     DEFAULT_UNIT_COSTS["mail_piece"]),
+        "mail_design_fee": raw.get("mail",       {}).get("design_fee_flat",    DEFAULT_UNIT_COSTS["mail_design_fee"]),
+        "digital_cpm":     raw.get("digital",    {}).get("cost_per_impression",DEFAULT_UNIT_COSTS["digital_cpm"]),
+        "digital_minimum": raw.get("digital",    {}).get("minimum_spend",      DEFAULT_UNIT_COSTS["digital_minimum"]),
+    }
+
+
 def _load_unit_costs() -> dict:
     """
     Load per-contact rates from tool_templates/costs.json, mapping the nested
     JSON structure to the flat dict used internally. Falls back to DEFAULT_UNIT_COSTS
-    key-by-key so partial files are safe.
+    key-by-key so partial files are safe. The mapped table is cached
+    process-wide and rebuilt only when costs.json changes on disk; callers get
+    their own copy because it travels on in structured_data.
     """
     path = os.path.join(TEMPLATES_DIR, "costs.json")
     try:
-        with open(path) as f:
-            raw = json.load(f)
-        costs = {
-            "door_knock":      raw.get("canvassing", {}).get("cost_per_door",      DEFAULT_UNIT_COSTS["door_knock"]),
-            "doors_per_hour":  raw.get("canvassing", {}).get("doors_per_hour",     DEFAULT_UNIT_COSTS["doors_per_hour"]),
-            "phone_call":      raw.get("phones",     {}).get("cost_per_contact",   DEFAULT_UNIT_COSTS["phone_call"]),
-            "text_message":    raw.get("text",       {}).get("cost_per_text",      DEFAULT_UNIT_COSTS["text_message"]),
-            "mail_piece":      raw.get("mail",       {}).get("cost_per_piece",     DEFAULT_UNIT_COSTS["mail_piece"]),
-            "mail_design_fee": raw.get("mail",       {}).get("design_fee_flat",    DEFAULT_UNIT_COSTS["mail_design_fee"]),
-            "digital_cpm":     raw.get("digital",    {}).get("cost_per_impression",DEFAULT_UNIT_COSTS["digital_cpm"]),
-            "digital_minimum": raw.get("digital",    {}).get("minimum_spend",      DEFAULT_UNIT_COSTS["digital_minimum"]),
-        }
-        logger.debug(f"Loaded unit costs from costs.json")
-        return costs
-    except FileNotFoundError:
-        logger.debug("costs.json not found; using DEFAULT_UNIT_COSTS.")
-        return DEFAULT_UNIT_COSTS
+        costs = template_registry.get(path, _parse_unit_costs)
     except Exception as e:
         logger.warning(f"Could not parse costs.json — {e}. Using defaults.")
         return DEFAULT_UNIT_COSTS
+    if costs is None:
+        logger.debug("costs.json not found; using DEFAULT_UNIT_COSTS.")
+        return DEFAULT_UNIT_COSTS
+    return dict(costs)
 
 
 def _parse_dollar(formatted: str) -> float:
@@ -215,52 +221,40 @@ def _fetch_fec_average(
         # district_num is passed in already stripped (just the numeric suffix)
         dist_param = district_num
 
-    for cycle in cycles:
-        try:
-            results = DataFetcher.get_district_finances(
-                state=state_abbr,
-                district_number=dist_param,
-                office_type=office,
-                cycle=cycle,
-            )
-            if isinstance(results, dict) and "error" in results:
-                errors.append(f"Cycle {cycle}: {results['error']}")
-                continue
-            if not results:
-                continue
-
-            for candidate in results:
-                val = _parse_dollar(candidate.get("total_disbursements", "0"))
-                if val > 0:
-                    all_disbursements.append(val)
-                    if cycle not in cycles_found:
-                        cycles_found.append(cycle)
-        except Exception as e:
-            errors.append(f"Cycle {cycle}: {e}")
-
-    # If district-level pull returned nothing, try statewide as a fallback.
+    # Fetch every cycle, plus the statewide House fallback, in one concurrent
+    # batch. The fallback rows are only used if the district has no data;
+    # fetching them up front (they are disk-cached) saves a second round trip.
+    races = [(state_abbr, dist_param, office, cycle) for cycle in cycles]
+    with_fallback = office == "H" and dist_param != "00"
+    if with_fallback:
+        races += [(state_abbr, "00", office, cycle) for cycle in cycles]
+    fetched = fec_client.race_totals_many(races)
+    district_results, statewide_results = fetched[:len(cycles)], fetched[len(cycles):]
+
+    def _collect(cycle, results):
+        for candidate in results:
+            val = _parse_dollar(candidate.get("total_disbursements", "0"))
+            if val > 0:
+                all_disbursements.append(val)
+                if cycle not in cycles_found:
+                    cycles_found.append(cycle)
+
+    for cycle, results in zip(cycles, district_results):
+        if isinstance(results, dict) and "error" in results:
+            errors.append(f"Cycle {cycle}: {results['error']}")
+            continue
+        if results:
+            _collect(cycle, results)
+
+    # If district-level pull returned nothing, fall back to the statewide rows.
     if not all_disbursements and office == "H":
         logger.warning(
             f"No district-level FEC data for {state_abbr}-{dist_param}; "
             "trying statewide House average."
         )
-        for cycle in cycles:
-            try:
-                results = DataFetcher.get_district_finances(
-                    state=state_abbr,
-                    district_number="00",
-                    office_type=office,
-                    cycle=cycle,
-                )
-                if isinstance(results, list):
-                    for candidate in results:
-                        val = _parse_dollar(candidate.get("total_disbursements", "0"))
-                        if val > 0:
-                            all_disbursements.append(val)
-                            if cycle not in cycles_found:
-                                cycles_found.append(cycle)
-            except Exception:
-                pass
+        for cycle, results in zip(cycles, statewide_results):
+            if isinstance(results, list):
+                _collect(cycle, results)
 
     if not all_disbursements:
         return {
@@ -655,6 +649,7 @@ def finance_node(state: AgentState) -> dict:
       - errors:           FEC API failures (non-fatal)
     """
     errors_out = []
+    resolver = get_district_record(state.get("structured_data", []))
 
     # -----------------------------------------------------------------------
     # 1. Resolve geographic context from the whiteboard
@@ -701,13 +696,15 @@ def finance_node(state: AgentState) -> dict:
 
             vf_budget = _build_voter_file_budget(universe_size, unit_costs_vf)
 
-            # Extract budget from query if the user specified one
+            # Extract budget from query if the user specified one. The district
+            # resolver already read it when it ran this turn.
             budget_available_vf: Optional[float] = None
             _bq = state.get("query", "").strip()
-            if _bq:
+            if resolver is not None and "budget" in resolver:
+                budget_available_vf = resolver["budget"]
+            elif _bq:
                 try:
-                    _llm_vf = ChatOpenAI(model="gpt-4o", temperature=0,
-                                         openai_api_key=os.environ["OPENAI_API_KEY"])
+                    _llm_vf = get_completion_client(temperature=0, provider="openai")
                     _br = _llm_vf.invoke(
                         f'Does this query mention a specific budget? If yes return the number only. '
                         f'If no, return NONE.\nQuery: "{_bq}"\nBUDGET:'
@@ -798,11 +795,7 @@ def finance_node(state: AgentState) -> dict:
                 "errors":        ["FinanceAgent: no query or voter file context — returning unit cost rates only."],
             }
 
-        llm = ChatOpenAI(
-            model="gpt-4o",
-            temperature=0,
-            openai_api_key=os.environ["OPENAI_API_KEY"],
-        )
+        llm = get_completion_client(temperature=0, provider="openai")
         extraction_prompt = f"""
 Extract electoral district information from this query. Return ONLY these lines, no extra text.
 
@@ -874,19 +867,17 @@ TARGET_YEAR: [4-digit election year, default 2026]
             district_id = geoid
 
     # -----------------------------------------------------------------------
-    # 2. Extract budget from query (if provided)
+    # 2. Extract budget from query (if provided). Reuse the district
+    #    resolver's reading when it ran this turn.
     # -----------------------------------------------------------------------
-    llm = ChatOpenAI(
-        model="gpt-4o",
-        temperature=0,
-        openai_api_key=os.environ["OPENAI_API_KEY"],
-    )
-
     budget_available: Optional[float] = None
     _budget_query = state.get("query", "").strip()
-    if not _budget_query:
+    if resolver is not None and "budget" in resolver:
+        budget_available = resolver["budget"]
+    elif not _budget_query:
         logger.debug("FinanceAgent: query is empty — skipping budget extraction, defaulting to None.")
     else:
+        llm = get_completion_client(temperature=0, provider="openai")
         budget_prompt = f"""
 Does the following query mention a specific campaign budget or available funds?
 If yes, return the dollar amount as a plain number (e.g. 50000).
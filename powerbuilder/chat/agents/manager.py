@@ -1,3 +1,6 @@
+import os
+import re
+
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -5,6 +8,7 @@ from langgraph.graph import StateGraph, END
 from .state import AgentState
 from ..utils.llm_config import get_completion_client, provider_override
 from ..progress import emit as _emit_progress
+from .. import run_coalescer
 
 from .researcher import research_node
 from .ingestor import ingestor_node
@@ -16,6 +20,7 @@ from .export import export_node
 from .election_results import ElectionAnalystAgent
 from .voterfile_agent import VoterFileAgent
 from .opposition_research import OppositionResearchAgent
+from .district_resolver import district_resolver_node, get_district_record
 
 
 # ---------------------------------------------------------------------------
@@ -27,6 +32,7 @@ from .opposition_research import OppositionResearchAgent
 _AGENT_LABELS: dict[str, dict[str, str]] = {
     "researcher":          {"start": "Searching the corpus",        "done": "Sources gathered"},
     "ingestor":            {"start": "Reading uploaded file",       "done": "File parsed"},
+    "district_resolver":   {"start": "Locating the district",       "done": "District located"},
     "election_results":    {"start": "Pulling election history",    "done": "Election history loaded"},
     "opposition_research": {"start": "Loading opposition research", "done": "Opposition brief ready"},
     "win_number":          {"start": "Calculating the win number",  "done": "Win number set"},
@@ -234,6 +240,85 @@ def _has_district_reference(query: str) -> bool:
     return any(kw in q for kw in _DISTRICT_KEYWORDS)
 
 
+# ---------------------------------------------------------------------------
+# Deterministic plan executor
+# ---------------------------------------------------------------------------
+# A full political plan always runs the same specialists in the same order
+# (decision rule 1 in the router prompt). Once a query is classified as a plan
+# request, the router walks this sequence directly instead of paying for an
+# LLM routing call before every hop.
+PLAN_SEQUENCE: tuple[str, ...] = (
+    "researcher",
+    "election_results",
+    "opposition_research",
+    "win_number",
+    "precincts",
+    "messaging",
+    "cost_calculator",
+)
+
+# Phrases that unambiguously ask for a full plan. Anything fuzzier falls
+# through to the LLM router, which classifies the query once (PLAN: YES/NO).
+_PLAN_REQUEST_RE = re.compile(
+    r"\b(?:political|program|campaign|gotv|field|organizing|outreach|"
+    r"turnout|mobilization|persuasion|full|comprehensive)\s+plan\b"
+    r"|\bcampaign strategy\b",
+)
+
+
+def _is_plan_request(query: str) -> bool:
+    return bool(_PLAN_REQUEST_RE.search((query or "").lower()))
+
+
+def _next_plan_step(plan, active_agents) -> str:
+    """Return the first step of ``plan`` that has not run yet, else "finish"."""
+    already_run = set(active_agents or [])
+    return next((step for step in plan if step not in already_run), "finish")
+
+
+# Fan-out wave at the head of a plan. These specialists only read the query
+# (and, for opposition research, the incumbent that election_results found),
+# so each branch runs concurrently and LangGraph merges their outputs through
+# the operator.add reducers on AgentState. Wall-clock time for the wave is the
+# slowest branch instead of the sum of all four agents. Steps inside a branch
+# still run in order.
+FANOUT_BRANCHES: tuple[tuple[str, ...], ...] = (
+    ("researcher",),
+    ("election_results", "opposition_research"),
+    ("win_number",),
+)
+_FANOUT_AGENTS = frozenset(a for branch in FANOUT_BRANCHES for a in branch)
+
+
+def _fanout_enabled() -> bool:
+    """Whether plan runs fan out their first wave. Set PLAN_FANOUT=0 to serialize."""
+    flag = os.getenv("PLAN_FANOUT", "1").strip().lower()
+    return flag not in {"0", "false", "no", "off"}
+
+
+def _district_resolved(state: AgentState) -> bool:
+    """True once the resolver has run or an earlier agent recorded the geography."""
+    structured = state.get("structured_data") or []
+    if get_district_record(structured) is not None:
+        return True
+    return any(
+        d.get("state_fips") and d.get("district_type") and d.get("district_id")
+        for d in structured
+    )
+
+
+def _needs_district_resolution(state: AgentState) -> bool:
+    """
+    Whether the shared district resolver should run before the next agent.
+    It runs at most once per run and only for queries likely to reach a geo
+    agent: anything naming a district, and full plans.
+    """
+    if _district_resolved(state):
+        return False
+    query = state.get("query", "")
+    return _has_district_reference(query) or _is_plan_request(query)
+
+
 def voter_file_post_router(state: AgentState) -> str:
     """
     After voter_file runs: skip geographic agents when no district is mentioned.
@@ -320,6 +405,44 @@ def intent_router_node(state: AgentState):
             return {"router_decision": "cost_calculator",  "output_format": "markdown", "demographic_intent": demographic, "language_intent": language, "ab_test": ab_test, "plan_mode": plan_mode}
         return     {"router_decision": "finish",           "output_format": "markdown", "demographic_intent": demographic, "language_intent": language, "ab_test": ab_test, "plan_mode": plan_mode}
 
+    # Resolve the district once, before the first geo agent, so every geo
+    # agent downstream (and every branch of the plan fan-out) reads the same
+    # record instead of making its own extraction call.
+    if _needs_district_resolution(state):
+        return {
+            "router_decision":    "district_resolver",
+            "output_format":      "markdown",
+            "demographic_intent": _detect_demographic_intent(state["query"]),
+            "language_intent":    language,
+            "ab_test":            ab_test,
+            "plan_mode":          plan_mode,
+        }
+
+    # Plan executor: the query was classified as a full plan (by keyword here,
+    # or by the LLM on an earlier hop), so walk the canonical sequence with no
+    # further routing calls. Runs after the fast paths above so voter-file and
+    # opposition-research ordering still take precedence.
+    execution_plan = state.get("execution_plan")
+    if not execution_plan and _is_plan_request(state["query"]):
+        execution_plan = list(PLAN_SEQUENCE)
+    if execution_plan:
+        # Fan the independent head of the plan out in parallel, but only when
+        # none of it has run yet (a fast path above may already have run
+        # election_results, in which case the rest of the walk stays serial).
+        if _fanout_enabled() and not _FANOUT_AGENTS.intersection(active_agents):
+            decision = "plan_fanout"
+        else:
+            decision = _next_plan_step(execution_plan, active_agents)
+        return {
+            "router_decision":    decision,
+            "output_format":      "markdown",
+            "demographic_intent": _detect_demographic_intent(state["query"]),
+            "language_intent":    language,
+            "ab_test":            ab_test,
+            "plan_mode":          plan_mode,
+            "execution_plan":     execution_plan,
+        }
+
     llm = get_model()
 
     active_agents  = state.get("active_agents", [])
@@ -368,7 +491,8 @@ def intent_router_node(state: AgentState):
 
     IMPORTANT: Never return an agent that already appears in "Agents already completed."
 
-    Return ONLY this line: DECISION: [specialist name], FORMAT: [markdown|csv|text]
+    Return ONLY this line: DECISION: [specialist name], FORMAT: [markdown|csv|text], PLAN: [YES|NO]
+    (PLAN: YES only when rule 1 applies.)
     """
 
     response = llm.invoke(prompt).content.upper()
@@ -387,6 +511,17 @@ def intent_router_node(state: AgentState):
     ]
     decision = next((s for s in specialists if s in response), "FINISH")
 
+    # The LLM classified this as a full plan: pin the canonical sequence so
+    # every later hop is served by the plan executor above.
+    execution_plan = list(PLAN_SEQUENCE) if "PLAN: YES" in response else None
+    if execution_plan:
+        if not _district_resolved(state):
+            decision = "DISTRICT_RESOLVER"
+        elif _fanout_enabled() and not _FANOUT_AGENTS.intersection(active_agents):
+            decision = "PLAN_FANOUT"
+        else:
+            decision = _next_plan_step(execution_plan, active_agents).upper()
+
     # Safety guard: never route to voter_file without an uploaded file,
     # regardless of what the LLM returned.
     if decision == "VOTER_FILE" and not state.get("uploaded_file_path"):
@@ -409,22 +544,15 @@ def intent_router_node(state: AgentState):
     # advance to the first unrun step in the canonical sequence. For a
     # single-topic query where researcher was the only needed agent, finish.
     if decision == "RESEARCHER" and "researcher" in active_agents:
-        _PLAN_SEQ = [
-            "election_results", "opposition_research", "win_number",
-            "precincts", "messaging", "cost_calculator",
-        ]
-        already_run = set(active_agents)
-        if already_run & set(_PLAN_SEQ):
-            decision = next(
-                (s for s in _PLAN_SEQ if s not in already_run), "FINISH"
-            )
+        if set(active_agents) & set(PLAN_SEQUENCE[1:]):
+            decision = _next_plan_step(PLAN_SEQUENCE, active_agents).upper()
         else:
             decision = "FINISH"
 
     formats = ["CSV", "MARKDOWN", "TEXT"]
     fmt = next((f for f in formats if f in response), "TEXT").lower()
 
-    return {
+    result = {
         "router_decision":    decision.lower(),
         "output_format":      fmt,
         "demographic_intent": _detect_demographic_intent(state["query"]),
@@ -432,6 +560,9 @@ def intent_router_node(state: AgentState):
         "ab_test":            ab_test,
         "plan_mode":          plan_mode,
     }
+    if execution_plan:
+        result["execution_plan"] = execution_plan
+    return result
 
 # Constructing workflow for user request
 workflow = StateGraph(AgentState)
@@ -446,6 +577,7 @@ workflow.add_node("intent_router", intent_router_node)
 # (tests, CLI) get the original behavior unchanged.
 workflow.add_node("researcher",          _instrument("researcher",          research_node))
 workflow.add_node("ingestor",            _instrument("ingestor",            ingestor_node))
+workflow.add_node("district_resolver",   _instrument("district_resolver",   district_resolver_node))
 workflow.add_node("precincts",           _instrument("precincts",           PrecinctsAgent.run))
 workflow.add_node("win_number",          _instrument("win_number",          WinNumberAgent.run))
 workflow.add_node("messaging",           _instrument("messaging",           messaging_node))
@@ -456,6 +588,28 @@ workflow.add_node("voter_file",          _instrument("voter_file",          Vote
 
 workflow.add_node("synthesizer", _instrument("synthesizer", export_node))
 
+# Parallel plan wave. Each fan-out branch gets its own copies of the agent
+# nodes (prefixed "fanout_") because the serial nodes above have unconditional
+# edges back to intent_router, which would fire once per branch. Progress
+# events still carry the plain agent name so the trace strip is unchanged.
+_FANOUT_NODE_FUNCS = {
+    "researcher":          research_node,
+    "election_results":    ElectionAnalystAgent.run,
+    "opposition_research": OppositionResearchAgent.run,
+    "win_number":          WinNumberAgent.run,
+}
+workflow.add_node("plan_fanout", lambda state: {})
+workflow.add_node("fanout_join", lambda state: {})
+for _branch in FANOUT_BRANCHES:
+    _prev = "plan_fanout"
+    for _agent in _branch:
+        workflow.add_node(f"fanout_{_agent}", _instrument(_agent, _FANOUT_NODE_FUNCS[_agent]))
+        workflow.add_edge(_prev, f"fanout_{_agent}")
+        _prev = f"fanout_{_agent}"
+# A list of sources makes fanout_join wait until every branch has finished.
+workflow.add_edge([f"fanout_{branch[-1]}" for branch in FANOUT_BRANCHES], "fanout_join")
+workflow.add_edge("fanout_join", "intent_router")
+
 # workflow.add_node("export", export_node)
 
 # Set pathways and routing logic via edges
@@ -484,6 +638,8 @@ workflow.add_conditional_edges(
         "election_results":   "election_results",
         "opposition_research":"opposition_research",
         "voter_file":         "voter_file",
+        "plan_fanout":        "plan_fanout",
+        "district_resolver":  "district_resolver",
         "finish":           "synthesizer",
     }
 )
@@ -491,6 +647,7 @@ workflow.add_conditional_edges(
 
 # Every agent loops back to intent_router so the orchestrator can decide the next step
 workflow.add_edge("researcher",    "intent_router")
+workflow.add_edge("district_resolver", "intent_router")
 workflow.add_edge("precincts",     "intent_router")
 workflow.add_edge("win_number",    "intent_router")
 workflow.add_edge("messaging",        "intent_router")
@@ -524,6 +681,7 @@ def run_query(
     ab_test: bool = False,
     plan_mode: str | None = None,
     llm_provider: str | None = None,
+    session_key: str | None = None,
 ) -> dict:
     """
     Execute the Powerbuilder pipeline for a single user query.
@@ -539,6 +697,8 @@ def run_query(
         output_format:      One of 'markdown', 'text', 'docx', 'xlsx', 'csv'.
         uploaded_file_path: Local path to a file for the ingestor, if any.
         recursion_limit:    LangGraph recursion cap (default 50).
+        session_key:        Django session key of the caller; the voter-file
+                            analysis cache drops its entries on logout.
 
     Returns:
         The final AgentState dict with keys: final_answer, active_agents,
@@ -559,6 +719,8 @@ def run_query(
     }
     if uploaded_file_path:
         initial_state["uploaded_file_path"] = uploaded_file_path
+    if session_key:
+        initial_state["session_key"] = session_key
 
     # Milestone R: pin the chosen provider for the duration of this run.
     # No-op when llm_provider is None (existing behavior preserved).
@@ -590,6 +752,8 @@ def run_query_streaming(
     ab_test: bool = False,
     plan_mode: str | None = None,
     llm_provider: str | None = None,
+    session_key: str | None = None,
+    flight: "run_coalescer.Flight | None" = None,
 ) -> dict:
     """
     Streaming variant of ``run_query``. Identical execution path, but the
@@ -600,7 +764,26 @@ def run_query_streaming(
     Returns the same final state dict as ``run_query`` once the run
     completes. If the run raises, the wrapper has already emitted an
     ``agent_error`` event before the exception propagates.
+
+    Identical requests already in flight (same normalized query, namespace,
+    output format, upload and options) are not executed again: this call
+    follows the running one, mirroring its progress into ``run_id`` and
+    returning a copy of its result. See ``chat/run_coalescer.py``.
+
+    ``flight`` is for callers that already registered ``run_id`` as the
+    leader with ``run_coalescer.lead_or_follow`` (the streaming view does,
+    before the run is queued); this call then runs the pipeline and
+    completes that flight instead of registering again.
     """
+    if flight is None and run_coalescer.coalescing_enabled():
+        key = run_coalescer.make_key(
+            query, org_namespace, output_format, uploaded_file_path,
+            ab_test=ab_test, plan_mode=plan_mode, llm_provider=llm_provider,
+        )
+        flight, leader = run_coalescer.lead_or_follow(key, run_id)
+        if not leader:
+            return run_coalescer.follow(flight, run_id)
+
     initial_state: dict = {
         "query":         query,
         "org_namespace": org_namespace,
@@ -613,13 +796,22 @@ def run_query_streaming(
     }
     if uploaded_file_path:
         initial_state["uploaded_file_path"] = uploaded_file_path
-
-    # Milestone R: pin the chosen provider for the duration of this run.
-    with provider_override(llm_provider):
-        result = manager_app.invoke(
-            initial_state,
-            config={"recursion_limit": recursion_limit},
-        )
-    result["org_namespace"] = org_namespace
-    result["llm_provider"] = llm_provider
+    if session_key:
+        initial_state["session_key"] = session_key
+
+    try:
+        # Milestone R: pin the chosen provider for the duration of this run.
+        with provider_override(llm_provider):
+            result = manager_app.invoke(
+                initial_state,
+                config={"recursion_limit": recursion_limit},
+            )
+        result["org_namespace"] = org_namespace
+        result["llm_provider"] = llm_provider
+    except BaseException as exc:
+        if flight is not None:
+            run_coalescer.complete(flight, error=exc)
+        raise
+    if flight is not None:
+        run_coalescer.complete(flight, result=result)
     return result
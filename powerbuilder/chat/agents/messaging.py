@@ -15,12 +15,16 @@ import json
 import logging
 import os
 import re
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Optional
+from typing import Callable, Mapping, Optional
 
 from dotenv import load_dotenv
 load_dotenv()
 
+from .. import progress as _progress
+from ..utils import template_registry
+from ..utils.context_packer import context_budget, pack_context
 from ..utils.llm_config import get_completion_client
 
 from .state import AgentState
@@ -314,16 +318,17 @@ FORMAT_LABELS = {
 # Helpers
 # ---------------------------------------------------------------------------
 
-def _load_costs() -> dict:
+def _load_costs() -> Mapping:
     """
     Load per-contact cost rates from tool_templates/costs.json.
     Returns an empty dict if the file is missing so callers degrade gracefully.
+    The parsed file is shared process-wide (read-only) and reparsed only when
+    it changes on disk.
     """
     path = os.path.join(TEMPLATES_DIR, "costs.json")
     try:
-        with open(path) as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
+        return template_registry.load_json(path, default={})
+    except json.JSONDecodeError:
         return {}
 
 
@@ -361,14 +366,8 @@ def _load_template(format_name: str) -> Optional[str]:
     filename = TEMPLATE_FILES.get(format_name)
     if not filename:
         return None
-    path = os.path.join(TEMPLATES_DIR, filename)
-    try:
-        with open(path) as f:
-            content = f.read().strip()
-        logger.debug(f"Loaded template: {path}")
-        return content
-    except FileNotFoundError:
-        return None
+    content = template_registry.load_text(os.path.join(TEMPLATES_DIR, filename))
+    return content.strip() if content is not None else None
 
 
 def _get_format_instruction(format_name: str) -> str:
@@ -569,6 +568,141 @@ def _parse_sections(raw: str) -> dict:
     return result
 
 
+def _output_instructions(keys: list, instructions: dict, mode_cta_block: str) -> str:
+    """
+    The OUTPUT INSTRUCTIONS block asking for ``keys``, each under its section
+    marker. For all eight formats this is the original single-call wording.
+    """
+    if len(keys) == len(SECTION_MARKERS):
+        wanted = "all eight sections"
+    elif len(keys) == 1:
+        wanted = "the section"
+    else:
+        wanted = f"the {len(keys)} sections"
+    body = "\n\n".join(f"{SECTION_MARKERS[key]}\n{instructions[key]}" for key in keys)
+    return f"""━━━ OUTPUT INSTRUCTIONS ━━━
+Generate {wanted} below. Each section must:
+1. Be grounded exclusively in the research findings above.
+2. Be tailored to the demographic profile of the target precincts.
+
+You MUST include each section marker exactly as shown on its own line.
+Do not rename, reorder, or omit any marker.
+
+{mode_cta_block}{body}
+"""
+
+
+# ---------------------------------------------------------------------------
+# Parallel generation (MESSAGING_PARALLEL=1)
+#
+# The default path asks for all eight formats in one completion, so latency
+# is the time to write every section back to back and one section that loses
+# its marker is simply dropped. In parallel mode each group of related
+# formats is its own completion over the same prompt preamble (frame,
+# constraints, demographics, research), the groups run concurrently, each
+# section goes to the progress stream as soon as it parses, and a section
+# missing from its group's output is re-requested on its own.
+# ---------------------------------------------------------------------------
+
+FORMAT_GROUPS: list[tuple[str, ...]] = [
+    ("canvassing_script", "phone_script"),     # spoken voter contact, one voice
+    ("text_script", "mail_narrative"),
+    ("digital_copy", "meta_post"),
+    ("youtube_script", "tiktok_script"),
+]
+
+
+def _parallel_enabled() -> bool:
+    return os.getenv("MESSAGING_PARALLEL", "0") == "1"
+
+
+def _section_retries() -> int:
+    """Extra attempts for sections that fail to parse (MESSAGING_SECTION_RETRIES)."""
+    try:
+        return max(0, int(os.getenv("MESSAGING_SECTION_RETRIES", "1")))
+    except ValueError:
+        return 1
+
+
+def _parse_group(raw: str, keys) -> dict:
+    """
+    The non-empty sections for ``keys`` found under their markers in ``raw``.
+    Unlike _parse_sections there is no whole-response fallback: a section
+    that is not there is reported missing so it can be retried.
+    """
+    if not raw or not any(marker in raw for marker in SECTION_MARKERS.values()):
+        return {}
+    parsed = _parse_sections(raw)
+    return {key: parsed[key] for key in keys if parsed.get(key)}
+
+
+def _generate_group(
+    llm,
+    preamble: str,
+    keys: tuple,
+    instructions: dict,
+    mode_cta_block: str,
+    on_section: Callable[[str, str], None],
+) -> tuple[dict, Optional[Exception]]:
+    """
+    Generate one group of sections, re-asking only for the ones that come
+    back missing. Returns the sections produced and the last LLM error, if
+    any.
+    """
+    done: dict = {}
+    error: Optional[Exception] = None
+    for attempt in range(1 + _section_retries()):
+        pending = [key for key in keys if key not in done]
+        if not pending:
+            break
+        if attempt:
+            logger.info(f"MessagingAgent: retrying {pending} (attempt {attempt + 1})")
+        try:
+            raw = llm.invoke(preamble + _output_instructions(pending, instructions, mode_cta_block)).content
+        except Exception as e:
+            logger.warning(f"MessagingAgent: LLM call for {pending} failed — {e}")
+            error = e
+            continue
+        for key, content in _parse_group(raw, pending).items():
+            done[key] = content
+            on_section(key, content)
+    return done, error
+
+
+def _generate_parallel(
+    llm,
+    preamble: str,
+    instructions: dict,
+    mode_cta_block: str,
+    run_id: Optional[str],
+) -> tuple[dict, Optional[Exception]]:
+    """
+    Run every FORMAT_GROUPS completion concurrently. Returns the merged
+    sections and the last LLM error seen (None if every call succeeded).
+    """
+    def _emit(key: str, content: str) -> None:
+        _progress.emit(run_id, "section_ready", agent="messaging",
+                       label=f"Drafted {FORMAT_LABELS[key].lower()}",
+                       section=key, content=content)
+
+    sections: dict = {}
+    error: Optional[Exception] = None
+    with ThreadPoolExecutor(max_workers=len(FORMAT_GROUPS)) as pool:
+        futures = [
+            pool.submit(_generate_group, llm, preamble, keys, instructions, mode_cta_block, _emit)
+            for keys in FORMAT_GROUPS
+        ]
+        for future in futures:
+            done, group_error = future.result()
+            sections.update(done)
+            error = group_error or error
+
+    missing = [key for key in SECTION_MARKERS if key not in sections]
+    if missing:
+        logger.warning(f"MessagingAgent: no parseable output for {missing} after retries.")
+    return sections, error
+
+
 # ---------------------------------------------------------------------------
 # Node
 # ---------------------------------------------------------------------------
@@ -635,21 +769,30 @@ def messaging_node(state: AgentState) -> dict:
     # -----------------------------------------------------------------------
     demographic_summary   = _summarize_demographics(precincts)
     most_recent_date      = _extract_most_recent_date(research_results)
-    research_context      = "\n\n".join(research_results)
     costs_context         = _format_costs_context(_load_costs())
 
-    canvassing_instruction = _get_format_instruction("canvassing_script")
-    phone_instruction      = _get_format_instruction("phone_script")
-    text_instruction       = _get_format_instruction("text_script")
-    mail_instruction       = _get_format_instruction("mail_narrative")
-    digital_instruction    = _get_format_instruction("digital_copy")
-    # Milestone H: research-backed social platform variants
-    meta_instruction       = _get_format_instruction("meta_post")
-    youtube_instruction    = _get_format_instruction("youtube_script")
-    tiktok_instruction     = _get_format_instruction("tiktok_script")
+    # Fit research and the profile/cost blocks to the messaging token budget,
+    # keeping the memos most relevant to the request.
+    packed = pack_context(
+        research_results,
+        [demographic_summary, costs_context],
+        budget=context_budget("messaging"),
+        query=" ".join(filter(None, [state.get("query", ""), state.get("demographic_intent", "")])),
+    )
+    research_context = packed.research
+    demographic_summary, costs_context = packed.blocks
+    if packed.trimmed:
+        _progress.emit(state.get("run_id"), "trace", agent="messaging",
+                       label=f"Trimmed {packed.dropped_tokens:,} tokens of research to fit the budget",
+                       dropped_tokens=packed.dropped_tokens,
+                       dropped_memos=packed.dropped_memos)
+
+    # Milestone H adds the meta / youtube / tiktok social platform variants.
+    instructions = {key: _get_format_instruction(key) for key in SECTION_MARKERS}
 
     # -----------------------------------------------------------------------
-    # 3. Single LLM call — all five formats, separated by section markers
+    # 3. LLM call(s) — every format under its own section marker, either in
+    #    one completion or, with MESSAGING_PARALLEL=1, one per format group
     # -----------------------------------------------------------------------
     llm = get_completion_client(temperature=0.4)  # modest creativity for copywriting
 
@@ -685,7 +828,7 @@ def messaging_node(state: AgentState) -> dict:
     mode_directive = _build_mode_directive(plan_mode)
     mode_cta_block = _build_mode_cta_block(plan_mode)
 
-    prompt = f"""You are an expert field organizer and political messaging strategist.
+    preamble = f"""You are an expert field organizer and political messaging strategist.
 Generate targeted campaign messaging materials for the {district_label}.
 
 {language_directive}{ab_directive}{mode_directive}━━━ HARD CONSTRAINT — READ CAREFULLY ━━━
@@ -715,51 +858,31 @@ DEMOGRAPHIC PROFILE OF TARGET PRECINCTS:
 RESEARCH FINDINGS (your only permitted source of messaging content):
 {research_context}
 
-━━━ OUTPUT INSTRUCTIONS ━━━
-Generate all eight sections below. Each section must:
-1. Be grounded exclusively in the research findings above.
-2. Be tailored to the demographic profile of the target precincts.
-
-You MUST include each section marker exactly as shown on its own line.
-Do not rename, reorder, or omit any marker.
-
-{mode_cta_block}{SECTION_MARKERS["canvassing_script"]}
-{canvassing_instruction}
-
-{SECTION_MARKERS["phone_script"]}
-{phone_instruction}
-
-{SECTION_MARKERS["text_script"]}
-{text_instruction}
-
-{SECTION_MARKERS["mail_narrative"]}
-{mail_instruction}
-
-{SECTION_MARKERS["digital_copy"]}
-{digital_instruction}
-
-{SECTION_MARKERS["meta_post"]}
-{meta_instruction}
-
-{SECTION_MARKERS["youtube_script"]}
-{youtube_instruction}
-
-{SECTION_MARKERS["tiktok_script"]}
-{tiktok_instruction}
 """
 
-    try:
-        raw_response = llm.invoke(prompt).content
-    except Exception as e:
-        return {
-            "errors":        [f"MessagingAgent: LLM call failed — {e}"],
-            "active_agents": ["messaging"],
-        }
-
-    # -----------------------------------------------------------------------
-    # 4. Parse into five separate Markdown strings and append to whiteboard
-    # -----------------------------------------------------------------------
-    sections = _parse_sections(raw_response)
+    if _parallel_enabled():
+        sections, error = _generate_parallel(
+            llm, preamble, instructions, mode_cta_block, state.get("run_id"),
+        )
+        if not sections and error is not None:
+            return {
+                "errors":        [f"MessagingAgent: LLM call failed — {error}"],
+                "active_agents": ["messaging"],
+            }
+    else:
+        prompt = preamble + _output_instructions(list(SECTION_MARKERS), instructions, mode_cta_block)
+        try:
+            raw_response = llm.invoke(prompt).content
+        except Exception as e:
+            return {
+                "errors":        [f"MessagingAgent: LLM call failed — {e}"],
+                "active_agents": ["messaging"],
+            }
+
+        # -------------------------------------------------------------------
+        # 4. Parse into separate Markdown strings
+        # -------------------------------------------------------------------
+        sections = _parse_sections(raw_response)
 
     formatted_outputs = []
     # Surface the language in the header so the synthesizer (and any human
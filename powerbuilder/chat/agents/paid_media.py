@@ -21,6 +21,9 @@ Public surface:
   - estimate_paid_media(budget, query=None, language_intent=None,
                         district_label=None) -> dict | None
   - format_paid_media_section(estimate: dict) -> str
+  - sweep_paid_media(budgets, flight_weeks, target_universes,
+                     language_intent=None) -> dict of numpy arrays
+  - sweep_curve(sweep, flight_weeks=None, target_universe=None) -> list[dict]
   - PAID_MEDIA_KEYWORDS  (regex used by callers to gate the estimator)
 
 The c3-safe framing in file 07 is preserved: civic engagement context only,
@@ -408,6 +411,188 @@ def estimate_paid_media(
     }
 
 
+# ---------------------------------------------------------------------------
+# Spend-response sweep
+# ---------------------------------------------------------------------------
+#
+# Charting spend-response means evaluating the estimator over hundreds of
+# budgets per flight length and universe. The sweep runs the same model
+# (tier mix, CPM midpoints, frequency caps, universe cap, persuasion CPM)
+# over the whole grid as numpy arrays instead of calling
+# estimate_paid_media() once per point. Every grid point agrees with
+# estimate_paid_media() for the same inputs.
+
+# Digital channels that appear in any tier, in a fixed order.
+_SWEEP_CHANNELS = list(dict.fromkeys(ch for _, mix, _, _ in TIER_ALLOCATIONS for ch in mix))
+
+
+def sweep_paid_media(
+    budgets,
+    flight_weeks=(DEFAULT_FLIGHT_WEEKS,),
+    target_universes=(None,),
+    language_intent: Optional[str] = None,
+) -> dict:
+    """
+    Evaluate the paid-media model over a grid of budgets x flight lengths x
+    target universes in one vectorised pass.
+
+    Args:
+      budgets:           1-D sequence of total program budgets (USD), any
+                         order; non-positive budgets produce zero rows.
+      flight_weeks:      flight lengths (weeks) for the reach math.
+      target_universes:  persuadable universe sizes; None (or 0) means
+                         uncapped reach, as in estimate_paid_media().
+      language_intent:   ISO 639-1 code; applies the in-language CPM discount.
+
+    Returns:
+      dict of numpy arrays indexed [budget, weeks, universe] unless noted:
+        budgets, flight_weeks, target_universes   the grid axes
+        channels                                  channel keys for [..., channel]
+        spend          [budget, channel]          digital spend per channel
+        impressions    [budget, channel]          midpoint impressions
+        channel_reach  [budget, weeks, universe, channel]
+        reach          gross reach summed over channels (a person reached on
+                       two channels counts twice), each channel capped at
+                       the universe
+        frequency      digital impressions per reached person
+        saturated      True where any channel hit the universe cap
+        points_lift_low, points_lift_high   persuasion points (sum of
+                       channels; independent of weeks and universe)
+        marginal_reach reach gained per extra $1,000 since the previous
+                       budget (first budget: from zero)
+        knee_budget    [weeks, universe] budget where reach returns start
+                       to diminish (NaN when the curve has no knee)
+    """
+    import numpy as np
+
+    budgets  = np.asarray(budgets, dtype=float).reshape(-1)
+    weeks    = np.asarray(flight_weeks, dtype=float).reshape(-1)
+    universe = np.asarray([u or 0 for u in target_universes], dtype=float).reshape(-1)
+
+    # Tier per budget (budget <= upper picks the first tier that fits) and
+    # the allocation of each tier across the sweep channels.
+    uppers = np.array([t[0] for t in TIER_ALLOCATIONS])
+    tier = np.searchsorted(uppers, budgets, side="left")
+    alloc = np.array([[mix.get(ch, 0.0) for ch in _SWEEP_CHANNELS]
+                      for _, mix, _, _ in TIER_ALLOCATIONS])
+    positive = budgets > 0
+    spend = np.where(positive[:, None], budgets[:, None] * alloc[tier], 0.0)       # [B, C]
+
+    cpm = np.array([CPM_RANGES.get(ch, (0.0, 0.0)) for ch in _SWEEP_CHANNELS])    # [C, 2]
+    if language_intent and language_intent.lower() != "en":
+        cpm = cpm * (1.0 - IN_LANGUAGE_DISCOUNT)
+    cpm_ok = (cpm > 0).all(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        low  = spend / cpm[:, 1] * 1000.0
+        high = spend / cpm[:, 0] * 1000.0
+    impressions = np.where(cpm_ok & (spend > 0), np.floor((low + high) / 2.0), 0.0)  # [B, C]
+
+    # Average frequency per channel and flight length: min(per-flight cap,
+    # per-week cap x weeks); channels without a cap get no reach.
+    per_week   = np.array([FREQUENCY_CAPS.get(ch, {}).get("per_week", 0) for ch in _SWEEP_CHANNELS])
+    per_flight = np.array([FREQUENCY_CAPS.get(ch, {}).get("per_flight", 0) for ch in _SWEEP_CHANNELS])
+    avg_freq = np.minimum(per_flight[None, :], per_week[None, :] * weeks[:, None])  # [W, C]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        uncapped = np.where(avg_freq[None] > 0,
+                            np.floor(impressions[:, None, :] / avg_freq[None]), 0.0)  # [B, W, C]
+    uncapped = uncapped[:, :, None, :]                                                 # [B, W, 1, C]
+    cap = universe[None, None, :, None]
+    saturated_ch = (cap > 0) & (uncapped > cap)
+    channel_reach = np.where(saturated_ch, cap, uncapped)                              # [B, W, U, C]
+
+    grid = (len(budgets), len(weeks), len(universe))
+    reach = channel_reach.sum(axis=-1)
+    total_impressions = np.broadcast_to(impressions.sum(axis=1)[:, None, None], grid)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        frequency = np.where(reach > 0, total_impressions / reach, 0.0)
+
+    # Persuasion points: estimate_paid_media rounds each channel to cents of
+    # a point before summing. Python's round() is used (np.round differs on
+    # values like 0.155), which only costs budgets x channels calls.
+    persuasion = np.array([CHANNEL_TO_PERSUASION_CPM.get(ch, (np.inf, np.inf))
+                           for ch in _SWEEP_CHANNELS])
+    round2 = np.frompyfunc(lambda v: round(v, 2), 1, 1)
+    lift_low  = round2(round2(spend / persuasion[:, 1]).astype(float).sum(axis=1)).astype(float)
+    lift_high = round2(round2(spend / persuasion[:, 0]).astype(float).sum(axis=1)).astype(float)
+
+    # Marginal reach per $1,000 along the budget axis, in budget order.
+    order = np.argsort(budgets, kind="stable")
+    sorted_budgets = budgets[order]
+    sorted_reach = reach[order]
+    step_budget = np.diff(sorted_budgets, prepend=0.0)[:, None, None]
+    step_reach = np.diff(sorted_reach, axis=0, prepend=0.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        marginal_sorted = np.where(step_budget > 0, step_reach / step_budget * 1000.0, 0.0)
+    marginal = np.empty_like(marginal_sorted)
+    marginal[order] = marginal_sorted
+
+    return {
+        "budgets":          budgets,
+        "flight_weeks":     weeks,
+        "target_universes": universe,
+        "channels":         list(_SWEEP_CHANNELS),
+        "language_intent":  language_intent,
+        "spend":            spend,
+        "impressions":      impressions,
+        "channel_reach":    channel_reach,
+        "reach":            reach,
+        "frequency":        frequency,
+        "saturated":        saturated_ch.any(axis=-1),
+        "points_lift_low":  np.broadcast_to(lift_low[:, None, None], grid),
+        "points_lift_high": np.broadcast_to(lift_high[:, None, None], grid),
+        "marginal_reach":   marginal,
+        "knee_budget":      _knee(sorted_budgets, sorted_reach),
+    }
+
+
+def _knee(budgets, curve, min_bend: float = 0.05):
+    """
+    Knee of each increasing curve along axis 0 (Kneedle): the budget where
+    the normalised curve sits furthest above the straight line from the
+    first to the last point. NaN where it never rises ``min_bend`` above
+    that line, i.e. the returns do not noticeably diminish.
+    """
+    import numpy as np
+
+    out_shape = curve.shape[1:]
+    if len(budgets) < 3 or budgets[-1] <= budgets[0]:
+        return np.full(out_shape, np.nan)
+    x = (budgets - budgets[0]) / (budgets[-1] - budgets[0])
+    span = curve[-1] - curve[0]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        y = np.where(span > 0, (curve - curve[0]) / span, 0.0)
+    bend = y - x.reshape((-1,) + (1,) * len(out_shape))
+    best = bend.argmax(axis=0)
+    knee = budgets[best]
+    return np.where(bend.max(axis=0) >= min_bend, knee, np.nan)
+
+
+def sweep_curve(sweep: dict, flight_weeks: Optional[float] = None,
+                target_universe: Optional[int] = None) -> list[dict]:
+    """
+    One spend-response curve from a sweep_paid_media() result as plain rows
+    (budget order) for charts and export tables. Defaults to the first
+    flight length and universe on the grid.
+    """
+    import numpy as np
+
+    w = 0 if flight_weeks is None else int(np.flatnonzero(sweep["flight_weeks"] == flight_weeks)[0])
+    u = 0 if target_universe is None else int(
+        np.flatnonzero(sweep["target_universes"] == (target_universe or 0))[0])
+    rows = []
+    for b in np.argsort(sweep["budgets"], kind="stable"):
+        rows.append({
+            "budget":           float(sweep["budgets"][b]),
+            "reach":            int(sweep["reach"][b, w, u]),
+            "frequency":        round(float(sweep["frequency"][b, w, u]), 2),
+            "points_lift_low":  float(sweep["points_lift_low"][b, w, u]),
+            "points_lift_high": float(sweep["points_lift_high"][b, w, u]),
+            "marginal_reach":   round(float(sweep["marginal_reach"][b, w, u]), 1),
+            "saturated":        bool(sweep["saturated"][b, w, u]),
+        })
+    return rows
+
+
 # ---------------------------------------------------------------------------
 # Narrative formatter
 # ---------------------------------------------------------------------------
@@ -2,23 +2,32 @@
 import logging
 import os
 import re
-from typing import List
+import threading
+from collections import OrderedDict
+from typing import List, NamedTuple
 
 from dotenv import load_dotenv
 load_dotenv()
 
+import numpy as np
 import pandas as pd
-import requests
-from langchain_openai import ChatOpenAI
+from scipy import sparse
 
 from ..utils.census_vars import VOTER_DEMOGRAPHICS, MULTI_VAR_METRICS, TRACT_ONLY_METRICS
-from ..utils.data_fetcher import DataFetcher
+from ..utils.data_fetcher import DataFetcher, census_get_json
 from ..utils.district_standardizer import GeographyStandardizer, normalize_district
-from ..utils.storage import file_exists, read_dataframe
+from ..utils.llm_config import get_completion_client
+from ..utils.storage import file_exists, file_version, read_dataframe
+from .district_resolver import get_district_record
 from .state import AgentState
 
 logger = logging.getLogger(__name__)
 
+# District types with block-group → precinct crosswalks. A statewide record
+# (US Senate, governor) is not a precinct-level target, so precincts falls
+# back to its own extraction for those.
+_PRECINCT_DISTRICT_TYPES = ("congressional", "state_senate", "state_house")
+
 # ---------------------------------------------------------------------------
 # Demographic targeting configuration
 # ---------------------------------------------------------------------------
@@ -418,6 +427,129 @@ def _format_precinct_label(precinct_id: str) -> str:
     return f"County {county_fips[2:]} Precinct {precinct_num}"
 
 
+# ---------------------------------------------------------------------------
+# Crosswalk weight matrices
+# ---------------------------------------------------------------------------
+
+class _CrosswalkMatrix(NamedTuple):
+    """
+    One crosswalk CSV loaded as sparse precinct × block-group matrices.
+
+    Rows follow precinct_ids (sorted, the order groupby("precinct_geoid")
+    produced); columns follow bg_index. Reaggregating any set of block-group
+    columns is then a single product: weights @ X.
+    """
+    crosswalk:    pd.DataFrame       # official_boundary normalized to bool
+    bg_index:     pd.Index
+    precinct_ids: np.ndarray
+    weights:      sparse.csr_matrix  # dasymetric weight per (precinct, BG)
+    links:        sparse.csr_matrix  # crosswalk row count, so zero-weight links still count
+    unofficial:   sparse.csr_matrix  # rows with official_boundary False
+    name_map:     dict               # precinct_geoid → TopoJSON name, when present
+    native:       dict               # crosswalk-native column → weight × value matrix (lazy)
+    row_pos:      tuple              # (precinct row, BG column) per crosswalk row
+
+
+# Crosswalks are static between crosswalk_builder runs, so each file is
+# parsed once per process and keyed by (path, storage.file_version) so a
+# rebuild is picked up, locally or in S3.
+_CROSSWALK_CACHE_SIZE = int(os.getenv("CROSSWALK_CACHE_SIZE", "8"))
+_crosswalk_cache: "OrderedDict[tuple, _CrosswalkMatrix]" = OrderedDict()
+_crosswalk_lock = threading.Lock()
+
+
+def _build_crosswalk_matrix(crosswalk: pd.DataFrame) -> _CrosswalkMatrix:
+    crosswalk = crosswalk.dropna(subset=["precinct_geoid", "bg_geoid"]).reset_index(drop=True)
+
+    # Normalise official_boundary to bool (CSV reads it as string)
+    crosswalk["official_boundary"] = (
+        crosswalk["official_boundary"].astype(str).str.lower() == "true"
+    )
+
+    precinct_codes, precinct_ids = pd.factorize(crosswalk["precinct_geoid"], sort=True)
+    bg_codes, bg_index           = pd.factorize(crosswalk["bg_geoid"])
+    shape = (len(precinct_ids), len(bg_index))
+
+    def _csr(values) -> sparse.csr_matrix:
+        # COO → CSR sums duplicate (precinct, BG) rows, matching the old groupby sum.
+        return sparse.coo_matrix((values, (precinct_codes, bg_codes)), shape=shape).tocsr()
+
+    weight = pd.to_numeric(crosswalk["weight"], errors="coerce").fillna(0).to_numpy(dtype=float)
+
+    # Build a precinct_geoid → human-readable name lookup. Prefer a dedicated
+    # TopoJSON-derived column ('name' or 'precinct') when the crosswalk builder
+    # included one; fall back to parsing the embedded name from the
+    # concatenated precinct_geoid string (format: "{id} {name}",
+    # e.g. "01001-10 JONES COMM_ CTR_").
+    _topo_name_col = next(
+        (c for c in ("name", "precinct") if c in crosswalk.columns), None
+    )
+    if _topo_name_col:
+        name_map: dict = (
+            crosswalk[["precinct_geoid", _topo_name_col]]
+            .drop_duplicates("precinct_geoid")
+            .set_index("precinct_geoid")[_topo_name_col]
+            .to_dict()
+        )
+    else:
+        name_map = {}
+
+    return _CrosswalkMatrix(
+        crosswalk=crosswalk,
+        bg_index=pd.Index(bg_index),
+        precinct_ids=np.asarray(precinct_ids),
+        weights=_csr(weight),
+        links=_csr(np.ones(len(crosswalk))),
+        unofficial=_csr((~crosswalk["official_boundary"]).to_numpy(dtype=float)),
+        name_map=name_map,
+        native={},
+        row_pos=(precinct_codes, bg_codes),
+    )
+
+
+def _native_matrix(cw: _CrosswalkMatrix, column: str) -> sparse.csr_matrix:
+    """
+    Weighted matrix for a crosswalk-native column such as bg_vap, whose value
+    lives on each crosswalk row rather than in the Census block-group data.
+    Built on first use and kept with the cached crosswalk.
+    """
+    matrix = cw.native.get(column)
+    if matrix is None:
+        weight = pd.to_numeric(cw.crosswalk["weight"], errors="coerce").fillna(0).to_numpy(dtype=float)
+        value  = pd.to_numeric(cw.crosswalk[column], errors="coerce").fillna(0).to_numpy(dtype=float)
+        matrix = sparse.coo_matrix(
+            (weight * value, cw.row_pos),
+            shape=(len(cw.precinct_ids), len(cw.bg_index)),
+        ).tocsr()
+        cw.native[column] = matrix
+    return matrix
+
+
+def _load_crosswalk_matrix(crosswalk_path: str) -> _CrosswalkMatrix:
+    """
+    Return the cached matrices for a crosswalk file, parsing it on first use
+    or when it changes (S3 ETag, or local mtime). Raises FileNotFoundError
+    when absent.
+    """
+    key = (crosswalk_path, file_version(crosswalk_path))
+    with _crosswalk_lock:
+        cached = _crosswalk_cache.get(key)
+        if cached is not None:
+            _crosswalk_cache.move_to_end(key)
+            return cached
+
+    # Force bg_geoid to str: pandas auto-casts 12-digit GEOIDs to int64,
+    # which would break the match with bg_df where bg_geoid is always a string.
+    matrix = _build_crosswalk_matrix(read_dataframe(crosswalk_path, dtype={"bg_geoid": str}))
+    with _crosswalk_lock:
+        for stale in [k for k in _crosswalk_cache if k[0] == crosswalk_path]:
+            del _crosswalk_cache[stale]
+        _crosswalk_cache[key] = matrix
+        while len(_crosswalk_cache) > _CROSSWALK_CACHE_SIZE:
+            _crosswalk_cache.popitem(last=False)
+    return matrix
+
+
 class PrecinctsAgent:
     """
     The Spatial Architect: Maps Census demographics onto Voting Precincts
@@ -472,7 +604,7 @@ class PrecinctsAgent:
             return set()
 
         try:
-            response = requests.get(
+            data = census_get_json(
                 "https://api.census.gov/data/2022/acs/acs5",
                 params={
                     "get": "NAME",
@@ -482,8 +614,6 @@ class PrecinctsAgent:
                 },
                 timeout=30,
             )
-            response.raise_for_status()
-            data = response.json()
             headers = data[0]
             geoids = set()
             for row in data[1:]:
@@ -552,7 +682,7 @@ class PrecinctsAgent:
             return None
 
         try:
-            response = requests.get(
+            data = census_get_json(
                 "https://api.census.gov/data/2022/acs/acs5",
                 params={
                     "get": f"NAME,{','.join(census_codes)}",
@@ -562,8 +692,6 @@ class PrecinctsAgent:
                 },
                 timeout=45,
             )
-            response.raise_for_status()
-            data    = response.json()
             headers = data[0]
             tract_df = pd.DataFrame(data[1:], columns=headers)
             tract_df["tract_geoid"] = (
@@ -743,8 +871,7 @@ class PrecinctsAgent:
         # contain only BGs and precincts within the target district and give correct
         # results without relying on the Census API's unsupported BG-by-CD geography.
         # Fall back to the full-state crosswalk when no district-specific file exists.
-        # Force bg_geoid to str: pandas auto-casts 12-digit GEOIDs to int64,
-        # which would break the merge with bg_df where bg_geoid is always a string.
+        # The parsed file and its sparse weight matrices are cached per (path, version).
         district_crosswalk = f"data/crosswalks/{state_fips}_{district_id}_bg_to_precinct.csv"
         state_crosswalk    = f"data/crosswalks/{state_fips}_bg_to_precinct.csv"
         crosswalk_path     = district_crosswalk if file_exists(district_crosswalk) else state_crosswalk
@@ -753,80 +880,66 @@ class PrecinctsAgent:
         else:
             logger.info(f"  District crosswalk not found; using state-level: {crosswalk_path}")
         try:
-            crosswalk = read_dataframe(crosswalk_path, dtype={"bg_geoid": str})
+            cw = _load_crosswalk_matrix(crosswalk_path)
         except FileNotFoundError:
             return {"coverage_note": (
                 f"No crosswalk file found for state {state_fips} "
                 f"(tried {district_crosswalk} and {state_crosswalk}). "
                 "Run crosswalk_builder.build_crosswalk() to add coverage for this district."
             )}
-
-        # Normalise official_boundary to bool (CSV reads it as string)
-        crosswalk["official_boundary"] = (
-            crosswalk["official_boundary"].astype(str).str.lower() == "true"
-        )
-
-        # Build a precinct_geoid → human-readable name lookup before the groupby
-        # drops non-numeric columns. Prefer a dedicated TopoJSON-derived column
-        # ('name' or 'precinct') when the crosswalk builder included one; fall back
-        # to parsing the embedded name from the concatenated precinct_geoid string
-        # (format: "{id} {name}", e.g. "01001-10 JONES COMM_ CTR_").
-        _topo_name_col = next(
-            (c for c in ("name", "precinct") if c in crosswalk.columns), None
-        )
-        if _topo_name_col:
-            _precinct_name_map: dict = (
-                crosswalk[["precinct_geoid", _topo_name_col]]
-                .drop_duplicates("precinct_geoid")
-                .set_index("precinct_geoid")[_topo_name_col]
-                .to_dict()
-            )
-        else:
-            _precinct_name_map = {}
-
-        # 5. Merge block group Census data with crosswalk
-        # Core dasymetric logic — do not change
-        merged = bg_df.merge(crosswalk, on="bg_geoid")
-
-        if merged.empty:
+        crosswalk          = cw.crosswalk
+        _precinct_name_map = cw.name_map
+
+        # 5. Align block group Census data with the crosswalk's block-group axis.
+        # A precinct takes part only if at least one of its crosswalk rows joins
+        # a block group in bg_df — the same rows the old inner merge kept.
+        bg_pos  = cw.bg_index.get_indexer(bg_df["bg_geoid"])
+        matched = bg_pos >= 0
+        active  = np.zeros(len(cw.bg_index))
+        active[bg_pos[matched]] = 1.0
+        present = (cw.links @ active) > 0
+
+        if not present.any():
             return {"error": f"Crosswalk merge produced no rows for district {district_id}. "
                              "Verify that the crosswalk was built for this state."}
 
         # 6. Apply dasymetric weights per metric and reaggregate by precinct
         # weighted_value = block_group_value * (intersection_area / bg_total_area)
-        # Do not change this logic
+        # Every BG metric is reaggregated in one sparse product: weights @ X.
+        # Crosswalk-native columns (e.g. bg_vap) live on the crosswalk rows, so
+        # each has its own cached weight × value matrix applied to the active BGs.
         for friendly_name, census_code in metric_to_code.items():
-            if census_code in merged.columns:
-                merged[f"weighted_{friendly_name}"] = (
-                    pd.to_numeric(merged[census_code], errors="coerce").fillna(0)
-                    * merged["weight"]
-                )
-            else:
+            if census_code not in bg_df.columns and census_code not in crosswalk.columns:
                 logger.warning(f"Column '{census_code}' not found in Census data; skipping metric '{friendly_name}'.")
 
-        # Use bg_metrics (not full metrics) — edu metric weighted cols won't be in merged
-        weighted_cols = [f"weighted_{m}" for m in bg_metrics if f"weighted_{m}" in merged.columns]
-
-        # Aggregate weighted values by precinct.
-        # When only education metrics were requested, bg_metrics is empty so we scaffold
-        # an empty precinct index from the crosswalk to join education results onto.
-        if weighted_cols:
-            precinct_totals = merged.groupby("precinct_geoid")[weighted_cols].sum()
-        else:
-            precinct_totals = (
-                merged[["precinct_geoid"]].drop_duplicates().set_index("precinct_geoid")
-            )
+        # Use bg_metrics (not full metrics) — edu metrics come from the tract path
+        bg_cols     = [m for m in bg_metrics if metric_to_code.get(m) in bg_df.columns]
+        native_cols = [
+            m for m in bg_metrics
+            if m not in bg_cols and metric_to_code.get(m) in crosswalk.columns
+        ]
+
+        values = np.zeros((len(cw.bg_index), len(bg_cols)))
+        for j, m in enumerate(bg_cols):
+            col = pd.to_numeric(bg_df[metric_to_code[m]], errors="coerce").fillna(0).to_numpy(dtype=float)
+            values[bg_pos[matched], j] = col[matched]
+        totals = cw.weights @ values
+
+        reaggregated = {f"weighted_{m}": totals[present, j] for j, m in enumerate(bg_cols)}
+        for m in native_cols:
+            reaggregated[f"weighted_{m}"] = (_native_matrix(cw, metric_to_code[m]) @ active)[present]
+
+        # When only education metrics were requested, bg_metrics is empty and this
+        # is an empty precinct index for the education results to join onto.
+        weighted_cols   = [f"weighted_{m}" for m in bg_metrics if f"weighted_{m}" in reaggregated]
+        precinct_totals = pd.DataFrame(
+            {c: reaggregated[c] for c in weighted_cols},
+            index=pd.Index(cw.precinct_ids[present], name="precinct_geoid"),
+        )
 
         # Determine boundary quality per precinct:
         # approximate_boundary = True if ANY contributing BG has official_boundary=False
-        boundary_flags = (
-            merged.groupby("precinct_geoid")["official_boundary"]
-            .all()
-            .rename("all_official")
-        )
-        precinct_totals = precinct_totals.join(boundary_flags)
-        precinct_totals["approximate_boundary"] = ~precinct_totals["all_official"].fillna(False)
-        precinct_totals = precinct_totals.drop(columns=["all_official"])
+        precinct_totals["approximate_boundary"] = (cw.unofficial @ active)[present] > 0
 
         # 6b. Tract-level education metrics (B15003 — not available at block group in ACS5).
         # Fetches tract data, derives tract→precinct weights from the crosswalk, and joins
@@ -872,18 +985,25 @@ class PrecinctsAgent:
         else:
             sort_col = None
 
-        if sort_col:
-            precinct_totals = precinct_totals.sort_values(sort_col, ascending=False)
-
         # Count total unique precincts in crosswalk before truncating to top_n.
         # Used for data quality check below.
         total_precinct_count = len(precinct_totals)
 
-        top_targets = precinct_totals.head(top_n).reset_index()
+        # Partial selection: only the top_n rows are ever ordered. nlargest
+        # skips NaN keys, which the old full sort kept at the end, so top up
+        # with NaN rows when there are not enough ranked ones.
+        if sort_col:
+            top_targets = precinct_totals.nlargest(top_n, sort_col)
+            if len(top_targets) < top_n:
+                unranked = precinct_totals[precinct_totals[sort_col].isna()]
+                top_targets = pd.concat([top_targets, unranked.head(top_n - len(top_targets))])
+        else:
+            top_targets = precinct_totals.head(top_n)
+        top_targets = top_targets.reset_index()
 
         # 8. Build standardised output schema
         results = []
-        for _, row in top_targets.iterrows():
+        for row in top_targets.to_dict("records"):
             raw_geoid = row["precinct_geoid"]
             precinct_id = raw_geoid.split(" ", 1)[0]
             _topo_name = _precinct_name_map.get(raw_geoid) or _precinct_name_map.get(precinct_id)
@@ -903,7 +1023,7 @@ class PrecinctsAgent:
                 if metric == "total_vap":
                     continue
                 wcol = f"weighted_{metric}"
-                if wcol in row.index:
+                if wcol in row:
                     record[metric] = round(float(row[wcol]), 2)
 
             # For combined targeting, guarantee each primary metric has an entry.
@@ -963,17 +1083,32 @@ class PrecinctsAgent:
     @staticmethod
     def run(state: AgentState) -> dict:
         """
-        LangGraph node wrapper. Extracts precinct targeting parameters from
-        the user's query via LLM, calls get_top_precincts(), and writes
-        results to AgentState.
+        LangGraph node wrapper. Resolves precinct targeting parameters in
+        priority order:
+          1. structured_data — the district resolver record (or any prior
+             agent's geographic context) for a precinct-level district type
+          2. LLM extraction from query — fallback when no prior context exists
+        Then calls get_top_precincts() and writes results to AgentState.
         """
-        llm = ChatOpenAI(
-            model="gpt-4o",
-            temperature=0,
-            openai_api_key=os.environ["OPENAI_API_KEY"],
+        prior = next(
+            (
+                d for d in state.get("structured_data", [])
+                if d.get("state_fips") and d.get("district_id")
+                and d.get("district_type") in _PRECINCT_DISTRICT_TYPES
+            ),
+            None,
         )
+        resolver = get_district_record(state.get("structured_data", []))
 
-        extraction_prompt = f"""
+        if prior:
+            state_fips    = prior["state_fips"]
+            district_type = prior["district_type"]
+            geoid         = prior["district_id"]
+            top_n         = int((resolver or prior).get("top_n") or 20)
+        else:
+            llm = get_completion_client(temperature=0, provider="openai")
+
+            extraction_prompt = f"""
 Extract precinct targeting parameters from this query. Return ONLY these lines, no extra text.
 
 Query: "{state['query']}"
@@ -984,30 +1119,45 @@ DISTRICT_NUM: [integer district number]
 METRICS: [comma-separated Census variable names from this list: total_cvap, total_population, black, hispanic, white, median_income, poverty_total, unemployed — choose what is relevant to the query]
 TOP_N: [integer number of precincts to return, default 20]
 """
-        try:
-            raw = llm.invoke(extraction_prompt).content.strip()
-        except Exception as e:
-            return {
-                "errors":        [f"PrecinctsAgent: LLM extraction failed — {e}"],
-                "active_agents": ["precincts"],
-            }
-
-        params = {}
-        for line in raw.splitlines():
-            if ":" in line:
-                key, _, val = line.partition(":")
-                params[key.strip().upper()] = val.strip().strip('"')
-
-        # Resolve state FIPS
-        state_name = params.get("STATE", "")
-        state_fips = GeographyStandardizer.STATE_FIPS.get(state_name.lower())
-        if not state_fips:
-            return {
-                "errors":        [f"PrecinctsAgent: Could not resolve state FIPS for '{state_name}'."],
-                "active_agents": ["precincts"],
-            }
-
-        district_type = params.get("DISTRICT_TYPE", "congressional").lower()
+            try:
+                raw = llm.invoke(extraction_prompt).content.strip()
+            except Exception as e:
+                return {
+                    "errors":        [f"PrecinctsAgent: LLM extraction failed — {e}"],
+                    "active_agents": ["precincts"],
+                }
+
+            params = {}
+            for line in raw.splitlines():
+                if ":" in line:
+                    key, _, val = line.partition(":")
+                    params[key.strip().upper()] = val.strip().strip('"')
+
+            # Resolve state FIPS
+            state_name = params.get("STATE", "")
+            state_fips = GeographyStandardizer.STATE_FIPS.get(state_name.lower())
+            if not state_fips:
+                return {
+                    "errors":        [f"PrecinctsAgent: Could not resolve state FIPS for '{state_name}'."],
+                    "active_agents": ["precincts"],
+                }
+
+            district_type = params.get("DISTRICT_TYPE", "congressional").lower()
+
+            try:
+                dist_num = normalize_district(params.get("DISTRICT_NUM", 0))
+                top_n    = int(params.get("TOP_N", 20))
+            except ValueError:
+                dist_num = 1  # default to at-large on unrecognizable input
+                top_n    = 20
+
+            # Build GEOID for the target district
+            geoid = GeographyStandardizer.convert_to_geoid(state_name, dist_num, district_type)
+            if isinstance(geoid, dict):
+                return {
+                    "errors":        [f"PrecinctsAgent: {geoid.get('error')}"],
+                    "active_agents": ["precincts"],
+                }
 
         # Demographic intent is set by intent_router_node in manager.py via a keyword
         # scan of the query — no extra LLM call required. It overrides whatever METRICS
@@ -1036,21 +1186,6 @@ TOP_N: [integer number of precincts to return, default 20]
             demographic_profile = _DEMOGRAPHIC_PROFILES.get(demographic_intent, _DEMOGRAPHIC_PROFILES["default"])
             combined_primary_metrics = None  # single intent: no synthetic combined column needed
 
-        try:
-            dist_num = normalize_district(params.get("DISTRICT_NUM", 0))
-            top_n    = int(params.get("TOP_N", 20))
-        except ValueError:
-            dist_num = 1  # default to at-large on unrecognizable input
-            top_n    = 20
-
-        # Build GEOID for the target district
-        geoid = GeographyStandardizer.convert_to_geoid(state_name, dist_num, district_type)
-        if isinstance(geoid, dict):
-            return {
-                "errors":        [f"PrecinctsAgent: {geoid.get('error')}"],
-                "active_agents": ["precincts"],
-            }
-
         output = PrecinctsAgent.get_top_precincts(
             state_fips, geoid, district_type, metrics, top_n,
             combined_primary_metrics=combined_primary_metrics,
@@ -1,9 +1,12 @@
 # powerbuilder/chat/agents/researcher.py
 import hashlib
+import heapq
 import json
 import logging
+import math
 import os
 import re
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 from typing import Optional
@@ -42,7 +45,7 @@ DEFAULT_K = 5
 
 # Path to the local corpus index file produced by scripts/seed_best_practices.py.
 # When Pinecone is unreachable, or USE_LOCAL_CORPUS=true, the researcher reads
-# from this file and does keyword scoring against it instead. This is what
+# from this file and BM25-scores it instead. This is what
 # makes the demo run on a laptop with no Pinecone account.
 LOCAL_CORPUS_PATH = (
     Path(__file__).resolve().parent.parent.parent
@@ -132,6 +135,7 @@ _STOPWORDS = frozenset({
 })
 
 _local_corpus_cache: Optional[list[dict]] = None
+_local_corpus_index: Optional["_LocalCorpusIndex"] = None
 
 
 def _load_local_corpus() -> list[dict]:
@@ -164,56 +168,108 @@ def _load_local_corpus() -> list[dict]:
     return _local_corpus_cache
 
 
+def _token_list(text: str) -> list[str]:
+    """Lowercase, alphanumeric tokens with stopwords removed, in order."""
+    return [
+        tok for tok in (t.lower() for t in _TOKEN_RE.findall(text))
+        if tok not in _STOPWORDS and len(tok) > 2
+    ]
+
+
 def _tokenize(text: str) -> set[str]:
     """Lowercase, alphanumeric tokens with stopwords removed."""
-    return {
-        tok.lower() for tok in _TOKEN_RE.findall(text)
-        if tok.lower() not in _STOPWORDS and len(tok) > 2
-    }
+    return set(_token_list(text))
 
 
-def _score_chunk(query_tokens: set[str], chunk: dict) -> float:
+class _LocalCorpusIndex:
     """
-    Score a corpus chunk against the query.
+    BM25 inverted index over the local corpus, built once per loaded corpus.
 
-    Three signals, weighted:
-    - Tag overlap (highest weight, 3x): tags are curator-applied semantic labels.
-    - Title overlap (2x): title is hand-written and high-signal.
-    - Body overlap (1x): substring presence per query token.
-    """
-    if not query_tokens:
-        return 0.0
+    Each chunk is scored as one weighted bag of terms, keeping the field
+    weights the keyword scorer always used:
+    - Tags (3x): curator-applied semantic labels, matched as whole tags.
+    - Title (2x): hand-written and high-signal.
+    - Body (1x).
 
-    score = 0.0
-    meta = chunk.get("metadata", {})
-
-    tags = meta.get("tags") or []
-    if isinstance(tags, list):
-        tag_set = {str(t).lower() for t in tags}
-        score += 3.0 * len(query_tokens & tag_set)
-
-    title_tokens = _tokenize(str(meta.get("title", "")))
-    score += 2.0 * len(query_tokens & title_tokens)
-
-    body_lower = chunk.get("text", "").lower()
-    score += sum(1 for tok in query_tokens if tok in body_lower)
+    Postings map term -> [(chunk index, weighted tf)], so a query only touches
+    the chunks that contain one of its terms.
+    """
 
-    return score
+    K1 = 1.2
+    B  = 0.75
+
+    TAG_WEIGHT   = 3.0
+    TITLE_WEIGHT = 2.0
+    BODY_WEIGHT  = 1.0
+
+    def __init__(self, chunks: list[dict]):
+        self.chunks = chunks
+        self.postings: dict[str, list[tuple[int, float]]] = {}
+        self.doc_lens: list[float] = []
+
+        for idx, chunk in enumerate(chunks):
+            meta = chunk.get("metadata", {})
+            tf: dict[str, float] = {}
+
+            tags = meta.get("tags") or []
+            if isinstance(tags, list):
+                for tag in {str(t).lower() for t in tags}:
+                    tf[tag] = tf.get(tag, 0.0) + self.TAG_WEIGHT
+            title_tokens = _token_list(str(meta.get("title", "")))
+            for tok in title_tokens:
+                tf[tok] = tf.get(tok, 0.0) + self.TITLE_WEIGHT
+            body_tokens = _token_list(chunk.get("text", ""))
+            for tok in body_tokens:
+                tf[tok] = tf.get(tok, 0.0) + self.BODY_WEIGHT
+
+            self.doc_lens.append(float(len(title_tokens) + len(body_tokens)) or 1.0)
+            for term, weight in tf.items():
+                self.postings.setdefault(term, []).append((idx, weight))
+
+        n = len(chunks)
+        self.avg_len = (sum(self.doc_lens) / n) if n else 1.0
+        self.idf: dict[str, float] = {
+            term: math.log(1.0 + (n - len(posts) + 0.5) / (len(posts) + 0.5))
+            for term, posts in self.postings.items()
+        }
+
+    def search(self, query_tokens: set[str], k: int) -> list[tuple[float, dict]]:
+        """Top-k (score, chunk) pairs with a positive BM25 score."""
+        scores: dict[int, float] = {}
+        for term in query_tokens:
+            posts = self.postings.get(term)
+            if not posts:
+                continue
+            idf = self.idf[term]
+            for idx, tf in posts:
+                norm = self.K1 * (1.0 - self.B + self.B * self.doc_lens[idx] / self.avg_len)
+                scores[idx] = scores.get(idx, 0.0) + idf * tf * (self.K1 + 1.0) / (tf + norm)
+
+        top = heapq.nlargest(k, scores.items(), key=lambda pair: (pair[1], -pair[0]))
+        return [(score, self.chunks[idx]) for idx, score in top if score > 0]
+
+
+def _get_local_corpus_index() -> Optional["_LocalCorpusIndex"]:
+    """The BM25 index for the currently loaded corpus, rebuilt if it reloads."""
+    global _local_corpus_index
+    corpus = _load_local_corpus()
+    if not corpus:
+        return None
+    if _local_corpus_index is None or _local_corpus_index.chunks is not corpus:
+        _local_corpus_index = _LocalCorpusIndex(corpus)
+    return _local_corpus_index
 
 
 def _local_corpus_search(query: str, k: int) -> list[dict]:
     """
-    Keyword-score the local corpus and return the top-k chunks shaped to look
+    BM25-score the local corpus and return the top-k chunks shaped to look
     like LangChain Document objects (page_content + metadata).
     """
-    corpus = _load_local_corpus()
-    if not corpus:
+    index = _get_local_corpus_index()
+    if index is None:
         return []
 
-    query_tokens = _tokenize(query)
-    scored = [(_score_chunk(query_tokens, c), c) for c in corpus]
-    scored = [(s, c) for s, c in scored if s > 0]
-    scored.sort(key=lambda pair: pair[0], reverse=True)
+    scored = index.search(_tokenize(query), k)
 
     # Wrap top-k chunks in objects with the same shape PineconeVectorStore returns.
     class _LocalDoc:
@@ -221,7 +277,7 @@ def _local_corpus_search(query: str, k: int) -> list[dict]:
             self.page_content = text
             self.metadata = metadata
 
-    return [_LocalDoc(c["text"], c.get("metadata", {})) for _, c in scored[:k]]
+    return [_LocalDoc(c["text"], c.get("metadata", {})) for _, c in scored]
 
 
 def _use_local_corpus() -> bool:
@@ -278,66 +334,130 @@ def _build_focused_query(state: AgentState) -> Optional[str]:
     return focused if focused != original_query else None
 
 
+# Candidate vectors for the two-pass re-rank normally come straight back from
+# Pinecone (include_values=True). Matches that arrive without values are
+# embedded once and kept here, keyed by (namespace, doc id, content hash) so
+# an edited document never reuses a stale vector. Bounded, oldest-first.
+_DOC_VECTOR_CACHE_MAX = 5000
+_doc_vector_cache: dict[tuple, list[float]] = {}
+
+
+def _cache_doc_vector(key: tuple, vector: list[float]) -> None:
+    if len(_doc_vector_cache) >= _DOC_VECTOR_CACHE_MAX:
+        _doc_vector_cache.pop(next(iter(_doc_vector_cache)))
+    _doc_vector_cache[key] = vector
+
+
+def _mmr(query_unit, cand_unit, k: int, lambda_mult: float = 0.5) -> list[int]:
+    """
+    Maximal marginal relevance over unit-normalized vectors. Returns row
+    indices into cand_unit, most relevant first, each later pick trading
+    relevance against its highest similarity to anything already picked.
+    """
+    import numpy as np
+
+    n = len(cand_unit)
+    if n == 0 or k <= 0:
+        return []
+    relevance = cand_unit @ query_unit
+    pairwise  = cand_unit @ cand_unit.T
+
+    selected = [int(np.argmax(relevance))]
+    max_sim  = pairwise[selected[0]].copy()
+    while len(selected) < min(k, n):
+        scores = lambda_mult * relevance - (1 - lambda_mult) * max_sim
+        scores[selected] = -np.inf
+        idx = int(np.argmax(scores))
+        selected.append(idx)
+        max_sim = np.maximum(max_sim, pairwise[idx])
+    return selected
+
+
 def _two_pass_search(
     store: "PineconeVectorStore",
     query: str,
     focused_query: str,
     embeddings,
     k: int = 10,
+    namespace: Optional[str] = None,
+    text_key: str = "text",
+    query_vector: Optional[list[float]] = None,
+    focused_vector: Optional[list[float]] = None,
 ) -> list:
     """
     Two-pass tiered retrieval for a single Pinecone namespace.
 
-    Pass 1 — Broad: similarity_search top 50 docs using the original query.
-    Pass 2 — Focused: re-rank those 50 docs by cosine similarity against the
+    Pass 1 — Broad: top 50 matches for the original query, fetched with their
+              stored vectors (include_values=True).
+    Pass 2 — Focused: re-rank those 50 by cosine similarity against the
               focused query embedding; keep top 20.
     Final   — MMR over the top 20 with lambda_mult=0.5; return k diverse docs.
 
+    The only embedding calls are the two queries (skipped when the caller
+    passes query_vector / focused_vector); candidate vectors come from the
+    index (or _doc_vector_cache), never from re-embedding the candidates.
+
     Raises on any failure so the caller can fall back to single-pass MMR.
     """
     import numpy as np
-    try:
-        from langchain_core.vectorstores.utils import maximal_marginal_relevance
-    except ImportError:
-        from langchain.vectorstores.utils import maximal_marginal_relevance
+    from langchain_core.documents import Document
+
+    def _unit(vec):
+        arr = np.asarray(vec, dtype=np.float32)
+        return arr / (np.linalg.norm(arr, axis=-1, keepdims=True) + 1e-10)
+
+    # Pass 1: broad similarity pool, queried by vector so the stored vectors
+    # come back alongside the matches.
+    query_emb = query_vector if query_vector is not None else embeddings.embed_query(query)
+    results = store.index.query(
+        vector=query_emb,
+        top_k=50,
+        include_values=True,
+        include_metadata=True,
+        namespace=namespace,
+    )
 
-    # Pass 1: broad similarity pool
-    pass1_with_scores = store.similarity_search_with_score(query, k=50)
-    pass1_docs = [doc for doc, _ in pass1_with_scores]
+    pass1_docs: list = []
+    vectors:    list = []
+    cache_keys: list[tuple] = []
+    for match in results["matches"]:
+        metadata = dict(match.get("metadata") or {})
+        text = metadata.pop(text_key, None)
+        if text is None:
+            continue
+        doc_id = match.get("id")
+        key = (namespace, doc_id, _content_hash(text))
+        pass1_docs.append(Document(id=doc_id, page_content=text, metadata=metadata))
+        vectors.append(match.get("values") or _doc_vector_cache.get(key))
+        cache_keys.append(key)
 
     if not pass1_docs:
         return []
 
-    # Embed original query (for MMR relevance), focused query (for re-ranking),
-    # and all pass1 doc texts (for cosine scoring against focused query).
-    query_emb   = np.array(embeddings.embed_query(query))
-    focused_emb = np.array(embeddings.embed_query(focused_query))
-    doc_emb_mat = np.array(
-        embeddings.embed_documents([d.page_content for d in pass1_docs])
-    )  # shape: (len(pass1_docs), embedding_dim)
+    missing = [i for i, vec in enumerate(vectors) if not vec]
+    if missing:
+        embedded = embeddings.embed_documents([pass1_docs[i].page_content for i in missing])
+        for i, vec in zip(missing, embedded):
+            vectors[i] = vec
+            _cache_doc_vector(cache_keys[i], vec)
+
+    doc_unit     = _unit(vectors)  # shape: (len(pass1_docs), embedding_dim)
+    query_unit   = _unit(query_emb)
+    focused_unit = _unit(
+        focused_vector if focused_vector is not None else embeddings.embed_query(focused_query)
+    )
 
     # Pass 2: cosine similarity of each doc against the focused query
-    focused_norm = np.linalg.norm(focused_emb)
-    doc_norms    = np.linalg.norm(doc_emb_mat, axis=1)
-    focused_sims = (doc_emb_mat @ focused_emb) / (doc_norms * focused_norm + 1e-10)
-
-    # Top 20 by focused similarity
-    top20_idx  = np.argsort(focused_sims)[::-1][:20]
-    top20_docs = [pass1_docs[i] for i in top20_idx]
-    top20_embs = [doc_emb_mat[i].tolist() for i in top20_idx]
+    focused_sims = doc_unit @ focused_unit
+    top20_idx    = np.argsort(-focused_sims, kind="stable")[:20]
 
     # MMR over the 20 candidates — relevance scored against original query
-    mmr_idx = maximal_marginal_relevance(
-        query_emb,
-        top20_embs,
-        lambda_mult=0.5,
-        k=min(k, len(top20_docs)),
-    )
-    final_docs = [top20_docs[i] for i in mmr_idx]
+    mmr_idx = _mmr(query_unit, doc_unit[top20_idx], k=min(k, len(top20_idx)), lambda_mult=0.5)
+    final_docs = [pass1_docs[top20_idx[i]] for i in mmr_idx]
 
     logger.info(
-        "Researcher pass 1: %d docs, pass 2 focused query: '%s', final: %d docs",
-        len(pass1_docs), focused_query, len(final_docs),
+        "Researcher pass 1: %d docs (%d embedded locally), pass 2 focused query: '%s', final: %d docs",
+        len(pass1_docs), len(missing), focused_query, len(final_docs),
     )
     return final_docs
 
@@ -396,7 +516,10 @@ def research_node(state: AgentState, k: int = DEFAULT_K) -> dict:
 
         if focused_query:
             try:
-                general_docs = _two_pass_search(general_store, query, focused_query, embeddings, k=10)
+                general_docs = _two_pass_search(
+                    general_store, query, focused_query, embeddings,
+                    k=10, namespace="__default__",
+                )
             except Exception as tp_exc:
                 logger.warning(
                     "Two-pass retrieval failed for general namespace (%s); "
@@ -419,7 +542,10 @@ def research_node(state: AgentState, k: int = DEFAULT_K) -> dict:
 
             if focused_query:
                 try:
-                    org_docs = _two_pass_search(org_store, query, focused_query, embeddings, k=10)
+                    org_docs = _two_pass_search(
+                        org_store, query, focused_query, embeddings,
+                        k=10, namespace=org_namespace,
+                    )
                 except Exception as tp_exc:
                     logger.warning(
                         "Two-pass retrieval failed for org namespace '%s' (%s); "
@@ -441,6 +567,104 @@ def research_node(state: AgentState, k: int = DEFAULT_K) -> dict:
     return _format_results(general_docs, org_docs)
 
 
+# Upper bound on concurrent namespace searches in research_batch().
+RESEARCH_BATCH_WORKERS = int(os.getenv("RESEARCH_BATCH_WORKERS", "4"))
+
+
+def research_batch(state: AgentState, queries: list[str], k: int = DEFAULT_K) -> list[dict]:
+    """
+    research_node for several queries that share one state (e.g. one
+    messaging query per voter segment).
+
+    All queries, and their focused re-rank queries, are embedded in a single
+    embed_documents call; the per-(query, namespace) searches then run on a
+    bounded thread pool, so N queries cost about one retrieval round trip
+    instead of N. Returns one research_node-shaped dict per query, in order.
+    ``k`` is the number of results taken per (query, namespace), on both the
+    Pinecone and local-corpus paths.
+
+    Fallbacks mirror research_node: a failed two-pass search degrades to
+    single-pass MMR, and a query whose search fails outright (or a batch
+    that cannot reach the embedding provider) is served from the local
+    corpus.
+    """
+    if not queries:
+        return []
+
+    org_namespace = state.get("org_namespace", "general")
+
+    def _local(query: str) -> dict:
+        return _format_results(_local_corpus_search(query, k=k), [])
+
+    if _use_local_corpus() or not os.getenv("PINECONE_API_KEY"):
+        logger.info("Researcher batch using local corpus fallback (no Pinecone).")
+        return [_local(q) for q in queries]
+
+    namespaces = ["__default__"]
+    if org_namespace and org_namespace != "general":
+        namespaces.append(org_namespace)
+
+    try:
+        emb_cfg    = get_embedding_client(provider=LLM_PROVIDER if COMPARISON_MODE else None)
+        embeddings = emb_cfg.client
+        index_name = emb_cfg.index_name
+
+        focused = [
+            None if COMPARISON_MODE else _build_focused_query({**state, "query": q})
+            for q in queries
+        ]
+        vectors = embeddings.embed_documents(list(queries) + [f for f in focused if f])
+        query_vecs = vectors[:len(queries)]
+        extra = iter(vectors[len(queries):])
+        focused_vecs = [next(extra) if f else None for f in focused]
+
+        stores = {
+            ns: PineconeVectorStore(
+                index_name=index_name,
+                embedding=embeddings,
+                namespace=ns,
+                text_key="text",
+            )
+            for ns in namespaces
+        }
+    except Exception as exc:
+        logger.warning(f"Pinecone/embedding lookup failed ({exc}); using local corpus fallback.")
+        return [_local(q) for q in queries]
+
+    def _search(i: int, ns: str) -> list:
+        store = stores[ns]
+        if focused[i]:
+            try:
+                return _two_pass_search(
+                    store, queries[i], focused[i], embeddings,
+                    k=k, namespace=ns,
+                    query_vector=query_vecs[i], focused_vector=focused_vecs[i],
+                )
+            except Exception as tp_exc:
+                logger.warning(
+                    "Two-pass retrieval failed for namespace '%s' (%s); "
+                    "falling back to single-pass MMR.", ns, tp_exc,
+                )
+        return store.max_marginal_relevance_search_by_vector(query_vecs[i], k=k, fetch_k=100)
+
+    tasks = [(i, ns) for i in range(len(queries)) for ns in namespaces]
+    workers = max(1, min(RESEARCH_BATCH_WORKERS, len(tasks)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {task: pool.submit(_search, *task) for task in tasks}
+
+    results: list[dict] = []
+    for i, query in enumerate(queries):
+        try:
+            general_docs = futures[(i, "__default__")].result()
+            org_docs = futures[(i, namespaces[1])].result() if len(namespaces) > 1 else []
+        except Exception as exc:
+            logger.warning(f"Pinecone search failed for '{query}' ({exc}); using local corpus fallback.")
+            results.append(_local(query))
+            continue
+        results.append(_format_results(general_docs, org_docs))
+    return results
+
+
 def _format_results(general_docs: list, org_docs: list) -> dict:
     """
     Deduplicate, sort by recency, and format documents for the synthesizer.
@@ -21,6 +21,10 @@ class AgentState(TypedDict):
 
     # -- Routing and Logic --
     router_decision: str # this holds the intent
+    # Canonical agent sequence for a full plan, set once by intent_router when
+    # the query is classified as a plan request. While set, the router walks
+    # it deterministically instead of asking the LLM for every hop.
+    execution_plan: Optional[List[str]]
     output_format: Literal["markdown", "csv", "text", "docx", "xlsx"] # define target file type
     demographic_intent: Optional[str]  # set by intent_router via keyword scan; "a+b" for combined demographics
     language_intent: Optional[str]     # set by intent_router via keyword scan; ISO 639-1 code (e.g. "es", "en", "zh", "vi", "ko")
@@ -38,6 +42,7 @@ class AgentState(TypedDict):
 
     # -- File Handling --
     uploaded_file_path: Optional[str] # path to new file for ingesting
+    session_key: Optional[str]        # Django session that started the run; holds its cached voter-file analysis
 
     # -- Streaming progress --
     # When set, agent nodes emit progress events to chat.progress for the
@@ -16,13 +16,21 @@
 # The file is read from the temporary upload path and discarded after analysis.
 # gc.collect() is called after analysis to release memory promptly.
 
+import copy
 import gc
+import hashlib
 import logging
 import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, timedelta
+from typing import Iterator, Optional
 
+import numpy as np
 import pandas as pd
 
-from .researcher import research_node
+from .researcher import research_batch
 from .state import AgentState
 
 logger = logging.getLogger(__name__)
@@ -117,23 +125,24 @@ _MAX_MESSAGING_QUERIES = 6
 # Step 3 — Column standardization
 # ---------------------------------------------------------------------------
 
-def standardize_columns(df: pd.DataFrame) -> tuple[pd.DataFrame, str, dict]:
+def _resolve_schema(columns) -> tuple[dict, str, dict]:
     """
-    Rename vendor-specific columns to standard internal names.
+    Map a header onto FIELD_SCHEMA and fingerprint the vendor. Works from
+    column names alone, so the streaming reader resolves it once per file.
 
     Returns:
-        df              : DataFrame with standardized column names
-        vendor          : Detected vendor name or "Unknown"
+        rename_map        : {original column: standard name}
+        vendor            : Detected vendor name or "Unknown"
         field_availability: {standard_name: True/False} for all FIELD_SCHEMA keys
     """
-    df = df.copy()
+    columns = list(columns)
 
     # Normalize raw column names to lowercase_underscore for alias matching
-    raw_cols_lower = {c.lower().strip().replace(" ", "_"): c for c in df.columns}
+    raw_cols_lower = {str(c).lower().strip().replace(" ", "_"): c for c in columns}
 
     rename_map: dict[str, str] = {}
     for standard_name, aliases in FIELD_SCHEMA.items():
-        if standard_name in df.columns:
+        if standard_name in columns:
             continue  # already correct
         for alias in aliases:
             alias_lower = alias.lower().strip().replace(" ", "_")
@@ -143,8 +152,6 @@ def standardize_columns(df: pd.DataFrame) -> tuple[pd.DataFrame, str, dict]:
                     rename_map[original] = standard_name
                 break
 
-    df = df.rename(columns=rename_map)
-
     # Detect vendor from original column names (before rename)
     original_cols_lower = set(raw_cols_lower.keys())
     vendor = "Unknown"
@@ -154,9 +161,25 @@ def standardize_columns(df: pd.DataFrame) -> tuple[pd.DataFrame, str, dict]:
             break
 
     # Build field availability map
-    field_availability = {name: (name in df.columns) for name in FIELD_SCHEMA}
+    renamed = {rename_map.get(c, c) for c in columns}
+    field_availability = {name: (name in renamed) for name in FIELD_SCHEMA}
 
-    return df, vendor, field_availability
+    return rename_map, vendor, field_availability
+
+
+def standardize_columns(df: pd.DataFrame) -> tuple[pd.DataFrame, str, dict]:
+    """
+    Rename vendor-specific columns to standard internal names.
+
+    Returns:
+        df              : DataFrame with standardized column names
+        vendor          : Detected vendor name or "Unknown"
+        field_availability: {standard_name: True/False} for all FIELD_SCHEMA keys
+
+    The input frame is not modified; rename() returns a new one.
+    """
+    rename_map, vendor, field_availability = _resolve_schema(df.columns)
+    return df.rename(columns=rename_map), vendor, field_availability
 
 
 # ---------------------------------------------------------------------------
@@ -164,8 +187,7 @@ def standardize_columns(df: pd.DataFrame) -> tuple[pd.DataFrame, str, dict]:
 # ---------------------------------------------------------------------------
 
 def _coerce_columns(df: pd.DataFrame) -> pd.DataFrame:
-    """Coerce typed columns to correct dtypes after standardization."""
-    df = df.copy()
+    """Coerce typed columns to correct dtypes after standardization, in place."""
 
     # Vote history → bool
     for col in VOTE_HISTORY_COLS:
@@ -195,65 +217,41 @@ def _coerce_columns(df: pd.DataFrame) -> pd.DataFrame:
 # Step 5 — Derived segmentation columns
 # ---------------------------------------------------------------------------
 
-def _age_cohort(age) -> str:
-    try:
-        age = int(age)
-    except (ValueError, TypeError):
-        return "Unknown"
-    if 18 <= age <= 26:
-        return "Gen Z (18-26)"
-    if 27 <= age <= 42:
-        return "Millennial (27-42)"
-    if 43 <= age <= 58:
-        return "Gen X (43-58)"
-    if 59 <= age <= 77:
-        return "Boomer (59-77)"
-    if age >= 78:
-        return "Silent/Greatest (78+)"
-    return "Unknown"
-
-
-def _partisan_tier(score) -> str:
-    try:
-        s = float(score)
-    except (ValueError, TypeError):
-        return "New/Unscored"
-    if s >= 70:
-        return "Strong Dem (70-100)"
-    if s >= 55:
-        return "Persuadable Dem (55-69)"
-    if s >= 35:
-        return "True Persuadable (35-54)"
-    if s >= 31:
-        return "Persuadable Rep (31-34)"
-    return "Strong Rep (0-30)"
-
-
-def _turnout_tier(score) -> str:
-    try:
-        s = float(score)
-    except (ValueError, TypeError):
-        return "Unscored"
-    if s >= 80:
-        return "High (80-100)"
-    if s >= 60:
-        return "Med-High (60-79)"
-    if s >= 20:
-        return "Med-Low (20-59)"
-    return "Low (0-19)"
-
-
-def _vote_history_class(row: pd.Series) -> str:
-    present = [c for c in VOTE_HISTORY_COLS if c in row.index]
-    if not present:
-        return "Unknown"
-    voted = sum(1 for c in present if row[c])
-    total = len(present)
-    if voted >= 3:
-        return f"Consistent High ({voted}/{total} cycles)"
-    if voted >= 1:
-        return f"Occasional ({voted}/{total} cycles)"
-    return f"Non-Voter (0/{total} cycles)"
+# Every derived column is a pandas Categorical over a fixed label set, built
+# with pd.cut / np.select on whole columns rather than per-row .apply, so a
+# 1M-row export costs one byte per row per column instead of a Python string.
+# Category order follows the natural order of the tiers; unused categories
+# are kept, but SegmentCube only holds observed combinations so they never
+# surface as empty segments.
+
+AGE_COHORT_LABELS = [
+    "Gen Z (18-26)", "Millennial (27-42)", "Gen X (43-58)",
+    "Boomer (59-77)", "Silent/Greatest (78+)", "Unknown",
+]
+# Right-closed bins over whole years: (17, 26] -> 18..26, ...
+_AGE_BINS = [17, 26, 42, 58, 77, float("inf")]
+
+PARTISAN_TIER_LABELS = [
+    "Strong Dem (70-100)", "Persuadable Dem (55-69)", "True Persuadable (35-54)",
+    "Persuadable Rep (31-34)", "Strong Rep (0-30)", "New/Unscored",
+]
+_PARTISAN_CUTS = [70, 55, 35, 31]          # lower bound of each tier above Strong Rep
+
+TURNOUT_TIER_LABELS = [
+    "High (80-100)", "Med-High (60-79)", "Med-Low (20-59)", "Low (0-19)", "Unscored",
+]
+_TURNOUT_CUTS = [80, 60, 20]
+
+GENDER_LABELS = ["Female", "Male", "Gender Expansive", "Unknown"]
+RACE_LABELS = [
+    "Black/African American", "Hispanic/Latino", "Asian/AAPI",
+    "Native American/Indigenous", "White", "Other", "Unknown",
+]
+
+_UNKNOWN_TOKENS = ("NAN", "NONE", "", "UNKNOWN", "U")
+
+# New registrant lookback: 18 months.
+_NEW_REGISTRANT_DAYS = 548
 
 
 def _normalize_gender(val) -> str:
@@ -262,7 +260,7 @@ def _normalize_gender(val) -> str:
         return "Female"
     if v in ("M", "MALE", "MAN"):
         return "Male"
-    if v in ("NAN", "NONE", "", "UNKNOWN", "U"):
+    if v in _UNKNOWN_TOKENS:
         return "Unknown"
     return "Gender Expansive"
 
@@ -279,61 +277,102 @@ def _normalize_race(val) -> str:
         return "Native American/Indigenous"
     if any(k in v for k in ("WHITE", "CAUCASIAN")):
         return "White"
-    if v in ("NAN", "NONE", "", "UNKNOWN", "U"):
+    if v in _UNKNOWN_TOKENS:
         return "Unknown"
     return "Other"
 
 
-def _is_new_registrant(row: pd.Series, cutoff_date) -> bool:
-    """New if registered within 18 months OR both partisan+turnout scores are null."""
-    both_null = (
-        pd.isna(row.get("partisan_score")) and pd.isna(row.get("turnout_score"))
-    )
-    if both_null:
-        return True
-    reg = row.get("registration_date")
-    if pd.notna(reg) and cutoff_date is not None:
-        return reg >= cutoff_date
-    return False
+def _categorical(codes: np.ndarray, labels: list[str]) -> pd.Categorical:
+    return pd.Categorical.from_codes(codes.astype(np.int8), categories=labels)
 
 
-def _add_derived_columns(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
+def _map_distinct(series: pd.Series, fn, labels: list[str]) -> pd.Categorical:
+    """
+    Apply a scalar normalizer to each *distinct* raw value, then broadcast
+    through the factorized codes. Vendor gender / race columns have a handful
+    of spellings, so this is a few dozen Python calls regardless of row count.
+    """
+    codes, uniques = pd.factorize(series)
+    pos = {label: i for i, label in enumerate(labels)}
+    # Trailing entry catches the NA sentinel (-1) from factorize.
+    lut = np.array([pos[fn(u)] for u in uniques] + [pos[fn(None)]], dtype=np.int8)
+    return _categorical(lut[codes], labels)
+
+
+def _tier_codes(scores: pd.Series, cuts: list[float]) -> np.ndarray:
+    """Index into a tier label list: 0 for >= cuts[0], ..., len(cuts) below
+    the last cut, len(cuts) + 1 for a missing score."""
+    s = pd.to_numeric(scores, errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+    conditions = [np.isnan(s)] + [s >= c for c in cuts]
+    choices = [len(cuts) + 1] + list(range(len(cuts)))
+    return np.select(conditions, choices, default=len(cuts))
+
+
+def _age_cohorts(age: pd.Series) -> pd.Categorical:
+    # Truncate fractional ages to whole years before binning (26.9 is Gen Z).
+    years = np.trunc(pd.to_numeric(age, errors="coerce").to_numpy(dtype=float, na_value=np.nan))
+    codes = pd.cut(years, bins=_AGE_BINS, labels=False)
+    codes = np.where(np.isnan(codes), len(AGE_COHORT_LABELS) - 1, codes)
+    return _categorical(codes, AGE_COHORT_LABELS)
+
+
+def _vote_history_classes(history: pd.DataFrame) -> pd.Categorical:
+    total = history.shape[1]
+    labels = [
+        f"Consistent High ({v}/{total} cycles)" if v >= 3
+        else f"Occasional ({v}/{total} cycles)" if v >= 1
+        else f"Non-Voter (0/{total} cycles)"
+        for v in range(total + 1)
+    ]
+    voted = history.astype(bool).sum(axis=1).to_numpy()
+    return _categorical(voted, labels)
+
+
+def _new_registrant_flags(df: pd.DataFrame, cutoff: pd.Timestamp) -> np.ndarray:
+    """New if registered within 18 months OR both partisan+turnout scores are null
+    (a score column that is missing altogether counts as null)."""
+    flags = np.ones(len(df), dtype=bool)
+    for col in ("partisan_score", "turnout_score"):
+        if col in df.columns:
+            flags &= df[col].isna().to_numpy()
+    if "registration_date" in df.columns:
+        reg = pd.to_datetime(df["registration_date"], errors="coerce")
+        flags |= (reg >= cutoff).to_numpy()
+    return flags
+
 
+def _add_derived_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Add the _-prefixed segmentation columns to ``df`` in place and return it."""
     if "age" in df.columns:
-        df["_age_cohort"] = df["age"].apply(_age_cohort)
+        df["_age_cohort"] = _age_cohorts(df["age"])
 
     if "partisan_score" in df.columns:
-        df["_partisan_tier"] = df["partisan_score"].apply(_partisan_tier)
+        codes = _tier_codes(df["partisan_score"], _PARTISAN_CUTS)
     else:
-        df["_partisan_tier"] = "New/Unscored"
+        codes = np.full(len(df), PARTISAN_TIER_LABELS.index("New/Unscored"))
+    df["_partisan_tier"] = _categorical(codes, PARTISAN_TIER_LABELS)
 
     if "turnout_score" in df.columns:
-        df["_turnout_tier"] = df["turnout_score"].apply(_turnout_tier)
+        codes = _tier_codes(df["turnout_score"], _TURNOUT_CUTS)
     else:
-        df["_turnout_tier"] = "Unscored"
+        codes = np.full(len(df), TURNOUT_TIER_LABELS.index("Unscored"))
+    df["_turnout_tier"] = _categorical(codes, TURNOUT_TIER_LABELS)
 
     history_present = [c for c in VOTE_HISTORY_COLS if c in df.columns]
     if history_present:
-        df["_vote_history_class"] = df.apply(_vote_history_class, axis=1)
+        df["_vote_history_class"] = _vote_history_classes(df[history_present])
 
     if "gender" in df.columns:
-        df["_gender_norm"] = df["gender"].apply(_normalize_gender)
+        df["_gender_norm"] = _map_distinct(df["gender"], _normalize_gender, GENDER_LABELS)
 
     if "race" in df.columns:
-        df["_race_norm"] = df["race"].apply(_normalize_race)
+        df["_race_norm"] = _map_distinct(df["race"], _normalize_race, RACE_LABELS)
 
     # New registrant flag — 18-month lookback from today
-    try:
-        from datetime import date, timedelta
-        cutoff = pd.Timestamp(date.today() - timedelta(days=548))
-    except Exception:
-        cutoff = None
+    cutoff = pd.Timestamp(date.today() - timedelta(days=_NEW_REGISTRANT_DAYS))
 
     if "registration_date" in df.columns or "partisan_score" in df.columns or "turnout_score" in df.columns:
-        df["_new_registrant"] = df.apply(
-            lambda r: _is_new_registrant(r, cutoff), axis=1
-        )
+        df["_new_registrant"] = _new_registrant_flags(df, cutoff)
 
     return df
 
@@ -355,101 +394,838 @@ _SEGMENT_DIMENSIONS = [
 _SCORE_COLS = ["partisan_score", "turnout_score", "spanish_speaking_score"]
 
 
-def _build_segment_table(df: pd.DataFrame) -> list[dict]:
-    total = len(df)
-    segments: list[dict] = []
-
-    for dim_label, col in _SEGMENT_DIMENSIONS:
-        if col not in df.columns:
-            continue
-        for value, group in df.groupby(col, dropna=False):
-            value_str = str(value) if pd.notna(value) else "Unknown"
-            seg: dict = {
-                "dimension":   dim_label,
-                "segment":     value_str,
-                "description": f"{value_str} ({dim_label.lower()})",
-                "count":       len(group),
-                "pct_of_file": round(len(group) / total * 100, 1),
-            }
-            for score_col in _SCORE_COLS:
-                if score_col in group.columns and group[score_col].notna().any():
-                    seg[f"avg_{score_col}"] = round(float(group[score_col].mean()), 2)
-
-            if "_gender_norm" in group.columns and col != "_gender_norm":
-                seg["gender_breakdown"] = group["_gender_norm"].value_counts().to_dict()
-            if "party_registration" in group.columns and col != "party_registration":
-                seg["party_breakdown"] = group["party_registration"].value_counts().to_dict()
-
-            segments.append(seg)
-
-    # Step 6b — Cross-tab priority matrix: High Value, Secondary, New Registrants
-    if "_partisan_tier" in df.columns and "_turnout_tier" in df.columns:
-        high_value_mask = (
-            df["_partisan_tier"].isin(["Strong Dem (70-100)", "Persuadable Dem (55-69)"])
-            & df["_turnout_tier"].isin(["High (80-100)", "Med-High (60-79)"])
-        )
-        hv_count = int(high_value_mask.sum())
-        if hv_count > 0:
-            hv_group = df[high_value_mask]
-            hv_seg: dict = {
-                "dimension":   "Priority Cross-Tab",
-                "segment":     "High Value (Dem 55-100 + Turnout 60-100)",
-                "description": "High Value (Dem 55-100 + Turnout 60-100) (priority cross-tab)",
-                "count":       hv_count,
-                "pct_of_file": round(hv_count / total * 100, 1),
-                "priority":    "HIGH",
-            }
-            for score_col in _SCORE_COLS:
-                if score_col in hv_group.columns and hv_group[score_col].notna().any():
-                    hv_seg[f"avg_{score_col}"] = round(float(hv_group[score_col].mean()), 2)
-            segments.append(hv_seg)
-
-        sec_mask = (
-            df["_partisan_tier"].isin([
-                "True Persuadable (35-54)", "Persuadable Dem (55-69)",
-                "Persuadable Rep (31-34)"
-            ])
-        )
-        sec_count = int(sec_mask.sum())
-        if sec_count > 0:
-            segments.append({
-                "dimension":   "Priority Cross-Tab",
-                "segment":     "Secondary (Persuadable, any turnout)",
-                "description": "Secondary (Persuadable, any turnout) (priority cross-tab)",
-                "count":       sec_count,
-                "pct_of_file": round(sec_count / total * 100, 1),
-                "priority":    "SECONDARY",
+_HIGH_VALUE_PARTISAN = ["Strong Dem (70-100)", "Persuadable Dem (55-69)"]
+_HIGH_VALUE_TURNOUT  = ["High (80-100)", "Med-High (60-79)"]
+_SECONDARY_PARTISAN  = ["True Persuadable (35-54)", "Persuadable Dem (55-69)",
+                        "Persuadable Rep (31-34)"]
+
+_SUMMARY_BREAKDOWNS = [
+    ("party_registration",  "party_breakdown"),
+    ("_age_cohort",         "age_cohort_breakdown"),
+    ("_partisan_tier",      "partisan_tier_breakdown"),
+    ("_turnout_tier",       "turnout_tier_breakdown"),
+    ("_gender_norm",        "gender_breakdown"),
+    ("_race_norm",          "race_breakdown"),
+    ("_vote_history_class", "vote_history_breakdown"),
+]
+
+# Per-segment breakdowns: (column, segment key)
+_SEGMENT_BREAKDOWNS = [
+    ("_gender_norm",       "gender_breakdown"),
+    ("party_registration", "party_breakdown"),
+]
+
+
+# Cube dimensions: (drilldown name, column). Each cube cell is one observed
+# combination of these values; columns the file lacks are left out.
+CUBE_DIMENSIONS = [
+    ("age_cohort",     "_age_cohort"),
+    ("race",           "_race_norm"),
+    ("gender",         "_gender_norm"),
+    ("partisan_tier",  "_partisan_tier"),
+    ("turnout_tier",   "_turnout_tier"),
+    ("precinct",       "precinct"),
+]
+
+# Labels kept out of the cube grain, which would otherwise multiply its cell
+# count. They are tallied in the small side grains below, each crossed only
+# with what the segment table, the summary and party-by-precinct drilldowns
+# need.
+TALLY_DIMENSIONS = [
+    ("party",          "party_registration"),
+    ("vote_history",   "_vote_history_class"),
+    ("new_registrant", "_new_registrant"),
+]
+_TALLY_GRAINS = [
+    ("_age_cohort",    "party_registration"),
+    ("_race_norm",     "party_registration"),
+    ("_partisan_tier", "party_registration"),
+    ("_turnout_tier",  "party_registration"),
+    ("precinct",       "party_registration"),
+    ("_gender_norm",   "party_registration", "_vote_history_class", "_new_registrant"),
+]
+_CUBE_COLUMNS = dict(CUBE_DIMENSIONS + TALLY_DIMENSIONS)
+
+# Per-chunk partial cubes are collapsed into one once this many are pending.
+_CUBE_PENDING_MAX = 8
+
+# Roll-ups with at most this many possible key combinations are summed with
+# a dense bincount; larger ones sort the keys instead.
+_DENSE_ROLLUP_KEYS = 1 << 20
+
+
+def _by_count(counter) -> dict:
+    """Mapping -> dict ordered like value_counts (descending, ties stable)."""
+    return dict(sorted(counter.items(), key=lambda kv: -kv[1]))
+
+
+def _stack_codes(columns: list, n: int) -> np.ndarray:
+    return np.column_stack(columns) if columns else np.zeros((n, 0), dtype=np.int32)
+
+
+def _sum_by_key(keys: np.ndarray, counts: np.ndarray, sums: np.ndarray,
+                ns: np.ndarray, n_keys: int) -> tuple:
+    """Sum counts / score sums / score non-null counts over equal keys
+    (each in range(n_keys)); returns the distinct keys in ascending order
+    with their totals."""
+    if n_keys <= _DENSE_ROLLUP_KEYS:
+        bins, m = keys, n_keys
+    else:
+        uniq, bins = np.unique(keys, return_inverse=True)
+        bins, m = bins.ravel(), len(uniq)
+
+    def total(weights: np.ndarray) -> np.ndarray:
+        return np.bincount(bins, weights=weights, minlength=m)
+
+    width = range(sums.shape[1])
+    counts = total(counts)
+    sums = np.column_stack([total(sums[:, j]) for j in width])
+    ns = np.column_stack([total(ns[:, j]) for j in width])
+    if n_keys <= _DENSE_ROLLUP_KEYS:
+        uniq = np.flatnonzero(counts)
+        counts, sums, ns = counts[uniq], sums[uniq], ns[uniq]
+    return uniq, counts.astype(np.int64), sums, ns.astype(np.int64)
+
+
+class SegmentCube:
+    """
+    Voter counts and score tallies at the finest segmentation grain.
+
+    add() folds a derived chunk in with one grouping pass per grain. The
+    cube grain is every CUBE_DIMENSIONS column the file has: a cell is one
+    observed combination of age cohort × race × gender × partisan tier ×
+    turnout tier × precinct, holding its row count and, per score column,
+    the sum and non-null count, so averages roll up exactly. Party, vote
+    history and the new-registrant flag go into the _TALLY_GRAINS side
+    grains instead, a few hundred cells each (precinct × party one per pair).
+    The segment table, the summary breakdowns and any follow-up slice
+    (rollup()) are sums over the cells of the smallest grain holding the
+    columns asked for; none of them touch rows again. Labels are stored as
+    integer codes per column, so rolling up a grain is a mask and a bincount.
+
+    Nothing row-level is kept: memory is bounded by the number of distinct
+    label combinations. merge() combines cubes built from disjoint slices
+    of a file.
+    """
+
+    def __init__(self) -> None:
+        self.total = 0
+        self.columns: list[str] | None = None      # all dims, fixed by the first chunk
+        self.grains: list[tuple] = []              # cube grain first, then side grains
+        self.labels: dict[str, list] = {}          # column -> value per code (None = missing)
+        self.order: dict[str, list] = {}           # column -> category order
+        self._index: dict[str, dict] = {}          # column -> {value: code}
+        self._parts: list[list] = []               # per grain: [(codes, counts, sums, ns)]
+        self._postings: dict[tuple, list] = {}     # (grain, column) -> cell indices per code
+
+    # -- building -----------------------------------------------------------
+
+    def _set_columns(self, columns: list[str]) -> None:
+        if self.columns is None:
+            self.columns = list(columns)
+            for col in self.columns:
+                self.labels[col] = []
+                self._index[col] = {}
+            self.grains = [tuple(col for _, col in CUBE_DIMENSIONS if col in columns)]
+            for grain in _TALLY_GRAINS:
+                grain = tuple(col for col in grain if col in columns)
+                if not any(set(grain) <= set(g) for g in self.grains):
+                    self.grains.append(grain)
+            self._parts = [[] for _ in self.grains]
+
+    def _code(self, col: str, value) -> int:
+        key = None if pd.isna(value) else (value.item() if isinstance(value, np.generic) else value)
+        index = self._index[col]
+        if key not in index:
+            index[key] = len(self.labels[col])
+            self.labels[col].append(key)
+        return index[key]
+
+    def _encode(self, col: str, series: Optional[pd.Series], n: int) -> np.ndarray:
+        """Chunk-local codes (categorical or factorized) → cube codes."""
+        if series is None:
+            return np.full(n, self._code(col, None), dtype=np.int32)
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            local, uniques = series.cat.codes.to_numpy(), series.cat.categories
+        else:
+            local, uniques = pd.factorize(series)
+        lut = np.fromiter((self._code(col, v) for v in uniques), dtype=np.int32, count=len(uniques))
+        codes = np.append(lut, -1)[local]
+        missing = local < 0
+        if missing.any():
+            codes[missing] = self._code(col, None)
+        return codes
+
+    def _shape(self, columns: list[str]) -> tuple:
+        return tuple(max(len(self.labels[c]), 1) for c in columns)
+
+    def _collapse(self, g: int, codes: np.ndarray, counts: np.ndarray, sums: np.ndarray,
+                  ns: np.ndarray) -> tuple:
+        shape = self._shape(self.grains[g])
+        if not shape:
+            keys = np.zeros(len(counts), dtype=np.intp)
+        else:
+            keys = np.ravel_multi_index(tuple(codes.T), shape)
+        uniq, counts, sums, ns = _sum_by_key(keys, counts, sums, ns, int(np.prod(shape)))
+        # Column-major, so each dimension's codes are contiguous for roll-ups.
+        cells = (np.asfortranarray(np.column_stack(np.unravel_index(uniq, shape)), dtype=np.int32)
+                 if shape else np.zeros((len(uniq), 0), dtype=np.int32))
+        return cells, counts, sums, ns
+
+    def _cells(self, g: int = 0) -> tuple:
+        """The consolidated (codes, counts, sums, ns) arrays of grain ``g``."""
+        parts = self._parts[g] if self._parts else []
+        if len(parts) != 1:
+            if not parts:
+                width = len(self.grains[g]) if self.grains else 0
+                return (np.zeros((0, width), dtype=np.int32), np.zeros(0, dtype=np.int64),
+                        np.zeros((0, len(_SCORE_COLS))), np.zeros((0, len(_SCORE_COLS)), dtype=np.int64))
+            parts[:] = [self._collapse(g, *(np.concatenate(a) for a in zip(*parts)))]
+            self._postings = {k: v for k, v in self._postings.items() if k[0] != g}
+        return parts[0]
+
+    def _cells_with(self, g: int, col: str) -> list:
+        """Indices of the cells of grain ``g`` holding each code of ``col``;
+        built on first use and kept until the grain changes."""
+        codes = self._cells(g)[0]
+        if (g, col) not in self._postings:
+            column = codes[:, self.grains[g].index(col)]
+            order = np.argsort(column, kind="stable")
+            bounds = np.cumsum(np.bincount(column, minlength=len(self.labels[col])))
+            self._postings[(g, col)] = np.split(order, bounds[:-1])
+        return self._postings[(g, col)]
+
+    def _grain_for(self, columns) -> int:
+        """The grain with the fewest cells that holds every one of ``columns``."""
+        fits = [g for g, grain in enumerate(self.grains) if set(columns) <= set(grain)]
+        if not fits:
+            raise ValueError(f"SegmentCube: {sorted(columns)} are not tallied together")
+        return min(fits, key=lambda g: len(self._cells(g)[1]))
+
+    def add(self, df: pd.DataFrame) -> "SegmentCube":
+        n = len(df)
+        self.total += n
+        self._set_columns([col for _, col in CUBE_DIMENSIONS + TALLY_DIMENSIONS if col in df.columns])
+
+        # Derived label columns share one fixed category order; raw
+        # categoricals (party, precinct) are per-chunk encodings and sort by
+        # value.
+        for col in self.columns:
+            if col.startswith("_") and col in df.columns \
+                    and isinstance(df[col].dtype, pd.CategoricalDtype):
+                self.order.setdefault(col, list(df[col].cat.categories))
+        if not n:
+            return self
+
+        codes = {col: self._encode(col, df[col] if col in df.columns else None, n) for col in self.columns}
+        scores = np.column_stack([
+            df[c].to_numpy(dtype=float, na_value=np.nan) if c in df.columns else np.full(n, np.nan)
+            for c in _SCORE_COLS
+        ])
+        present = ~np.isnan(scores)
+        counts, sums, ns = np.ones(n, dtype=np.int64), np.where(present, scores, 0.0), present.astype(np.int64)
+        self._postings = {}
+        for g, grain in enumerate(self.grains):
+            self._parts[g].append(self._collapse(
+                g, _stack_codes([codes[col] for col in grain], n), counts, sums, ns))
+            if len(self._parts[g]) >= _CUBE_PENDING_MAX:
+                self._cells(g)
+        return self
+
+    def merge(self, other: "SegmentCube") -> "SegmentCube":
+        self.total += other.total
+        if other.columns is None:
+            return self
+        self._set_columns(other.columns)
+        for col, order in other.order.items():
+            self.order.setdefault(col, order)
+
+        self._postings = {}
+        for g, grain in enumerate(self.grains):
+            # Cells of other's matching grain; duplicates left by columns
+            # other lacks are summed away when the grain is consolidated.
+            o = other._grain_for([col for col in grain if col in other.columns])
+            codes, counts, sums, ns = other._cells(o)
+            n = len(counts)
+            recoded = []
+            for col in grain:
+                if col in other.grains[o]:
+                    lut = np.fromiter((self._code(col, v) for v in other.labels[col]),
+                                      dtype=np.int32, count=len(other.labels[col]))
+                    recoded.append(lut[codes[:, other.grains[o].index(col)]])
+                else:
+                    recoded.append(np.full(n, self._code(col, None), dtype=np.int32))
+            self._parts[g].append((_stack_codes(recoded, n), counts, sums, ns))
+            self._cells(g)
+        return self
+
+    # -- rolling up ---------------------------------------------------------
+
+    def _rollup(self, by: list[str], where: dict | None = None) -> dict:
+        """{value tuple: (count, score sums, score non-null counts)} for each
+        combination of the ``by`` columns among cells matching ``where``
+        (column -> allowed values), in code order, from the smallest grain
+        holding them all."""
+        g = self._grain_for([*by, *(where or {})])
+        grain = self.grains[g]
+        codes, counts, sums, ns = self._cells(g)
+        picked = [codes[:, grain.index(c)] for c in by]
+        if where:
+            # Start from the cells of the most selective filter, then narrow
+            # that (much shorter) list by the remaining filters.
+            filters = []
+            for col, values in where.items():
+                wanted = [self._index[col][v] for v in values if v in self._index[col]]
+                filters.append((sum(len(self._cells_with(g, col)[c]) for c in wanted), col, wanted))
+            filters.sort(key=lambda f: f[0])
+            _, col, wanted = filters[0]
+            rows = np.concatenate([self._cells_with(g, col)[c] for c in wanted] or [np.zeros(0, dtype=np.intp)])
+            for _, col, wanted in filters[1:]:
+                allowed = np.zeros(len(self.labels[col]) + 1, dtype=bool)
+                allowed[wanted] = True
+                rows = rows[allowed[codes[rows, grain.index(col)]]]
+            picked = [p[rows] for p in picked]
+            counts, sums, ns = counts[rows], sums[rows], ns[rows]
+        if not len(counts):
+            return {}
+
+        shape = self._shape(by)
+        keys = (np.ravel_multi_index(tuple(picked), shape) if by
+                else np.zeros(len(counts), dtype=np.intp))
+        uniq, counts, sums, ns = _sum_by_key(keys, counts, sums, ns, int(np.prod(shape)))
+        combos = np.unravel_index(uniq, shape) if by else ()
+        keys = zip(*([self.labels[c][code] for code in combos[j].tolist()] for j, c in enumerate(by))) \
+            if by else [()]
+        return dict(zip(keys, zip(counts.tolist(), sums.tolist(), ns.tolist())))
+
+    def _ordered(self, col: str, values) -> list:
+        """Segment order as groupby would give it: category order for
+        derived labels, sorted values otherwise, missing values last."""
+        present = [v for v in values if v is not None]
+        if col in self.order:
+            rank = {v: i for i, v in enumerate(self.order[col])}
+            present.sort(key=lambda v: rank.get(v, len(rank)))
+        else:
+            try:
+                present.sort()
+            except TypeError:
+                present.sort(key=str)
+        if None in values:
+            present.append(None)
+        return present
+
+    def _averages(self, sums: list, ns: list) -> dict:
+        return {
+            f"avg_{c}": round(sums[j] / ns[j], 2)
+            for j, c in enumerate(_SCORE_COLS) if ns[j]
+        }
+
+    def _count(self, where: dict) -> int:
+        return self._rollup([], where).get((), (0,))[0]
+
+    def _column(self, name: str) -> str:
+        col = _CUBE_COLUMNS.get(name)
+        if col is None or col not in (self.columns or []):
+            raise ValueError(f"SegmentCube: no '{name}' dimension in this file")
+        return col
+
+    def rollup(self, by=(), where: dict | None = None) -> list[dict]:
+        """
+        Voter counts and average scores for each combination of the ``by``
+        dimensions among voters matching ``where``, largest first.
+
+        Dimensions use the CUBE_DIMENSIONS names; ``where`` maps a dimension
+        to one value or a list of values (None selects missing). For example,
+        young Latina low-turnout Democrats by precinct:
+
+            cube.rollup(["precinct"], where={
+                "age_cohort": "Gen Z (18-26)", "race": "Hispanic/Latino",
+                "gender": "Female", "turnout_tier": ["Low (0-19)", "Med-Low (20-59)"],
+                "partisan_tier": "Strong Dem (70-100)",
             })
 
-    if "_new_registrant" in df.columns:
-        nr_count = int(df["_new_registrant"].sum())
-        if nr_count > 0:
+        The TALLY_DIMENSIONS names work only in the combinations one of the
+        _TALLY_GRAINS holds (party with any single cube dimension, say);
+        anything else raises ValueError.
+        """
+        by = list(by)
+        columns = [self._column(name) for name in by]
+        filters = {
+            self._column(name): list(v) if isinstance(v, (list, tuple, set)) else [v]
+            for name, v in (where or {}).items()
+        }
+        rows = []
+        for key, (count, sums, ns) in self._rollup(columns, filters).items():
+            row: dict = dict(zip(by, key))
+            row["count"] = count
+            row["pct_of_file"] = round(count / self.total * 100, 1)
+            row.update(self._averages(sums, ns))
+            rows.append(row)
+        rows.sort(key=lambda r: -r["count"])
+        return rows
+
+    # -- agent outputs ------------------------------------------------------
+
+    def segments(self) -> list[dict]:
+        total = self.total
+        columns = self.columns or []
+        segments: list[dict] = []
+
+        for dim_label, col in _SEGMENT_DIMENSIONS:
+            if col not in columns:
+                continue
+            cells = {key[0]: cell for key, cell in self._rollup([col]).items()}
+            breakdowns = []
+            for bcol, bkey in _SEGMENT_BREAKDOWNS:
+                if bcol not in columns or bcol == col:
+                    continue
+                nested: dict = {}
+                for (value, bvalue), (n, _, _) in self._rollup([col, bcol]).items():
+                    if bvalue is not None:
+                        nested.setdefault(value, {})[bvalue] = n
+                breakdowns.append((bcol, bkey, nested))
+
+            for value in self._ordered(col, list(cells)):
+                count, sums, ns = cells[value]
+                value_str = str(value) if value is not None else "Unknown"
+                seg: dict = {
+                    "dimension":   dim_label,
+                    "segment":     value_str,
+                    "description": f"{value_str} ({dim_label.lower()})",
+                    "count":       count,
+                    "pct_of_file": round(count / total * 100, 1),
+                }
+                seg.update(self._averages(sums, ns))
+                for bcol, bkey, nested in breakdowns:
+                    inner = nested.get(value, {})
+                    seg[bkey] = _by_count({b: inner[b] for b in self._ordered(bcol, list(inner))})
+                segments.append(seg)
+
+        # Step 6b — Cross-tab priority matrix: High Value, Secondary, New Registrants
+        if "_partisan_tier" in columns and "_turnout_tier" in columns:
+            hv = self._rollup([], {"_partisan_tier": _HIGH_VALUE_PARTISAN,
+                                   "_turnout_tier": _HIGH_VALUE_TURNOUT}).get(())
+            if hv is not None and hv[0] > 0:
+                hv_count, hv_sums, hv_ns = hv
+                hv_seg: dict = {
+                    "dimension":   "Priority Cross-Tab",
+                    "segment":     "High Value (Dem 55-100 + Turnout 60-100)",
+                    "description": "High Value (Dem 55-100 + Turnout 60-100) (priority cross-tab)",
+                    "count":       hv_count,
+                    "pct_of_file": round(hv_count / total * 100, 1),
+                    "priority":    "HIGH",
+                }
+                hv_seg.update(self._averages(hv_sums, hv_ns))
+                segments.append(hv_seg)
+
+            secondary = self._count({"_partisan_tier": _SECONDARY_PARTISAN})
+            if secondary > 0:
+                segments.append({
+                    "dimension":   "Priority Cross-Tab",
+                    "segment":     "Secondary (Persuadable, any turnout)",
+                    "description": "Secondary (Persuadable, any turnout) (priority cross-tab)",
+                    "count":       secondary,
+                    "pct_of_file": round(secondary / total * 100, 1),
+                    "priority":    "SECONDARY",
+                })
+
+        new_registrants = self._new_registrants()
+        if new_registrants:
             segments.append({
                 "dimension":   "Priority Cross-Tab",
                 "segment":     "New Registrants",
                 "description": "New Registrants (priority cross-tab)",
-                "count":       nr_count,
-                "pct_of_file": round(nr_count / total * 100, 1),
+                "count":       new_registrants,
+                "pct_of_file": round(new_registrants / total * 100, 1),
                 "priority":    "NEW_REGISTRANT",
             })
 
-    return segments
+        return segments
+
+    def _new_registrants(self) -> int | None:
+        if "_new_registrant" not in (self.columns or []):
+            return None
+        return self._count({"_new_registrant": [True]})
+
+    def summary(self) -> dict:
+        """Breakdowns, average scores and the new-registrant count for the
+        file-level summary."""
+        out: dict = {}
+        columns = self.columns or []
+        for col, label in _SUMMARY_BREAKDOWNS:
+            if col in columns:
+                counts = {key[0]: cell[0] for key, cell in self._rollup([col]).items()}
+                out[label] = _by_count({
+                    v: counts[v] for v in self._ordered(col, list(counts)) if v is not None
+                })
+        totals = self._rollup([]).get(())
+        if totals is not None:
+            out.update(self._averages(totals[1], totals[2]))
+        new_registrants = self._new_registrants()
+        if new_registrants is not None:
+            out["new_registrants"] = new_registrants
+        return out
+
+
+def _build_segment_table(df: pd.DataFrame) -> list[dict]:
+    return SegmentCube().add(df).segments()
+
+
+# ---------------------------------------------------------------------------
+# Step 7 — Schema-aware streaming loader
+# Statewide files run to millions of rows and vendor exports carry 200+
+# columns, of which the analysis reads about a dozen. The header is resolved
+# against FIELD_SCHEMA once; only the columns in _ANALYSIS_FIELDS are parsed,
+# with label columns dictionary-encoded (categorical) at parse time. Rows
+# arrive VOTERFILE_CHUNK_ROWS at a time and each chunk is folded into a
+# SegmentCube, so peak memory is one narrow chunk.
+#
+#   .csv   pyarrow streaming reader (multi-threaded); falls back to the pandas
+#          C parser from the failing row on if a block will not convert
+#          (e.g. "N/A" text in a score column)
+#   .xlsx  openpyxl read-only mode, row by row
+#   .xls   pandas.read_excel (legacy format has no streaming reader)
+# ---------------------------------------------------------------------------
+
+VOTERFILE_CHUNK_ROWS = int(os.getenv("VOTERFILE_CHUNK_ROWS", "250000"))
+
+# Bytes pyarrow reads per block; blocks are sliced to VOTERFILE_CHUNK_ROWS.
+_ARROW_BLOCK_BYTES = 16 << 20
+
+# Standard fields the segmentation actually reads.
+_ANALYSIS_FIELDS = [
+    "age", "gender", "race", "party_registration",
+    "partisan_score", "turnout_score", "spanish_speaking_score",
+    "registration_date", "precinct", *VOTE_HISTORY_COLS,
+]
+# Low-cardinality labels: parsed straight to categoricals.
+_CATEGORICAL_FIELDS = {"gender", "race", "party_registration", "precinct", *VOTE_HISTORY_COLS}
+# Parsed as float64; everything else that is not categorical is read as
+# text (registration_date is parsed by _coerce_columns).
+_NUMERIC_FIELDS = {"age", "partisan_score", "turnout_score", "spanish_speaking_score"}
+
+_EXCEL_EXTS = (".xlsx", ".xls")
+
+
+def _load_plan(header: list, rename_map: dict) -> dict:
+    """{original column: standard name} for the columns the analysis reads."""
+    wanted = set(_ANALYSIS_FIELDS)
+    plan = {
+        col: rename_map.get(col, col)
+        for col in header
+        if rename_map.get(col, col) in wanted
+    }
+    if not plan and header:
+        # Nothing to segment on, but the rows still need counting.
+        plan = {header[0]: rename_map.get(header[0], header[0])}
+    return plan
+
+
+def _read_header(file_path: str) -> list:
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext == ".xlsx":
+        from openpyxl import load_workbook
+        wb = load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            first = next(wb.active.iter_rows(max_row=1, values_only=True), ())
+        finally:
+            wb.close()
+        return [c for c in first if c is not None]
+    if ext == ".xls":
+        return list(pd.read_excel(file_path, nrows=0).columns)
+    return list(pd.read_csv(file_path, nrows=0).columns)
+
+
+def _iter_csv_arrow(file_path: str, plan: dict, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    import pyarrow as pa
+    from pyarrow import csv as pacsv
+
+    def _arrow_type(std: str):
+        if std in _CATEGORICAL_FIELDS:
+            return pa.dictionary(pa.int32(), pa.string())
+        if std in _NUMERIC_FIELDS:
+            return pa.float64()
+        return pa.string()
+
+    reader = pacsv.open_csv(
+        file_path,
+        read_options=pacsv.ReadOptions(block_size=_ARROW_BLOCK_BYTES),
+        convert_options=pacsv.ConvertOptions(
+            include_columns=list(plan),
+            column_types={col: _arrow_type(std) for col, std in plan.items()},
+            strings_can_be_null=True,
+        ),
+    )
+    for batch in reader:
+        for offset in range(0, batch.num_rows, chunk_rows):
+            yield batch.slice(offset, chunk_rows).to_pandas()
+
+
+def _iter_csv_pandas(file_path: str, plan: dict, chunk_rows: int, skip: int = 0) -> Iterator[pd.DataFrame]:
+    # Numeric columns are left to inference so stray text survives as object
+    # and is coerced to NaN by _coerce_columns instead of failing the read.
+    dtype = {
+        col: ("category" if std in _CATEGORICAL_FIELDS else str)
+        for col, std in plan.items()
+        if std not in _NUMERIC_FIELDS
+    }
+    yield from pd.read_csv(
+        file_path,
+        usecols=list(plan),
+        dtype=dtype,
+        chunksize=chunk_rows,
+        skiprows=(lambda i: 0 < i <= skip) if skip else None,
+    )
+
+
+def _iter_xlsx(file_path: str, plan: dict, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    from openpyxl import load_workbook
+
+    wb = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+        header = next(rows, None) or ()
+        picks = [(i, col) for i, col in enumerate(header) if col in plan]
+        columns = [col for _, col in picks]
+
+        def _frame(buf: list) -> pd.DataFrame:
+            df = pd.DataFrame(buf, columns=columns)
+            for col in columns:
+                if plan[col] in _CATEGORICAL_FIELDS:
+                    df[col] = df[col].astype("string").astype("category")
+            return df
+
+        buf: list = []
+        for row in rows:
+            if all(v is None for v in row):
+                continue
+            buf.append([row[i] if i < len(row) else None for i, _ in picks])
+            if len(buf) >= chunk_rows:
+                yield _frame(buf)
+                buf = []
+        if buf:
+            yield _frame(buf)
+    finally:
+        wb.close()
+
+
+def _iter_chunks(file_path: str, plan: dict) -> Iterator[pd.DataFrame]:
+    """Yield the upload as bounded chunks holding only the planned columns."""
+    chunk_rows = max(1, VOTERFILE_CHUNK_ROWS)
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext == ".xlsx":
+        yield from _iter_xlsx(file_path, plan, chunk_rows)
+        return
+    if ext == ".xls":
+        yield pd.read_excel(file_path, usecols=list(plan))
+        return
+
+    rows = 0
+    try:
+        import pyarrow as pa
+    except ImportError:
+        pa = None
+    if pa is not None:
+        try:
+            for chunk in _iter_csv_arrow(file_path, plan, chunk_rows):
+                rows += len(chunk)
+                yield chunk
+            return
+        except (pa.ArrowException, KeyError) as e:
+            logger.info(
+                f"VoterFileAgent: pyarrow could not convert {file_path} past row {rows} "
+                f"({e}); continuing with the pandas parser."
+            )
+    yield from _iter_csv_pandas(file_path, plan, chunk_rows, skip=rows)
+
+
+def _analyze_file(file_path: str) -> Optional[dict]:
+    """
+    Stream the upload through standardize → coerce → derive → aggregate and
+    return the column mapping, segment cube, segment table and file summary,
+    or None when the file has no data rows. Read errors propagate to the
+    caller.
+    """
+    # Resolve the schema from the header once, then work one bounded chunk
+    # at a time.
+    aggregate = SegmentCube()
+    try:
+        header = _read_header(file_path)
+        rename_map, vendor, field_availability = _resolve_schema(header)
+        for chunk in _iter_chunks(file_path, _load_plan(header, rename_map)):
+            chunk = chunk.rename(columns=rename_map)
+            _add_derived_columns(_coerce_columns(chunk))
+            aggregate.add(chunk)
+            del chunk
+    finally:
+        # Release chunk memory before Pinecone queries
+        gc.collect()
+
+    if aggregate.total == 0:
+        return None
+
+    # Build segment table (includes cross-tab priority rows)
+    segments = aggregate.segments()
+
+    # File-level summary
+    summary: dict = {
+        "total_voters":        aggregate.total,
+        "vendor_detected":     vendor,
+        "fields_available":    [k for k, v in field_availability.items() if v],
+        "fields_missing":      [k for k, v in field_availability.items() if not v],
+        "segments_identified": len(segments),
+    }
+    summary.update(aggregate.summary())
+
+    return {
+        "rename_map":         rename_map,
+        "vendor":             vendor,
+        "field_availability": field_availability,
+        "cube":               aggregate,
+        "segments":           segments,
+        "summary":            summary,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Step 8 — Analysis cache
+# Edit-and-rerun and follow-up questions re-send the same file. The result of
+# _analyze_file is kept under a SHA-256 of the file's bytes, so a repeat
+# (same path or a fresh upload of identical content) skips all pandas work.
+#
+# Held in process memory only, never on disk, in line with the
+# no-persistence notice at the top of this module. Entries hold aggregates
+# (counts, averages, column names), not voter rows, and expire after
+# VOTERFILE_CACHE_TTL_SECS (default 1800; 0 disables the cache). At most
+# VOTERFILE_CACHE_MAX_ENTRIES files are held, least recently used evicted.
+#
+# Each entry records the sessions (AgentState.session_key) that loaded it, so
+# two sessions sending the same file share one analysis. On logout
+# purge_analysis_cache(session_key) drops that session from every entry and
+# deletes the entries no other session holds. The cache is per process: with
+# several gunicorn workers each keeps its own, and entries another worker
+# holds for a logged-out session go when their TTL runs out.
+# ---------------------------------------------------------------------------
+
+VOTERFILE_CACHE_TTL_SECS    = float(os.getenv("VOTERFILE_CACHE_TTL_SECS", "1800"))
+VOTERFILE_CACHE_MAX_ENTRIES = int(os.getenv("VOTERFILE_CACHE_MAX_ENTRIES", "8"))
+
+# digest -> (stored_at, analysis, owning session keys)
+_analysis_cache: "OrderedDict[str, tuple[float, dict, set]]" = OrderedDict()
+_analysis_cache_lock = threading.Lock()
+
+
+def _file_digest(file_path: str) -> str:
+    h = hashlib.sha256()
+    with open(file_path, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            h.update(block)
+    # The extension picks the reader, so identical bytes under .csv and
+    # .xlsx names are different analyses.
+    h.update(os.path.splitext(file_path)[1].lower().encode())
+    return h.hexdigest()
+
+
+def _private_copy(analysis: dict) -> dict:
+    # The cube is never mutated after _analyze_file, so it is shared rather
+    # than copied; the dicts handed to the graph are the caller's to edit.
+    out = copy.deepcopy({k: v for k, v in analysis.items() if k != "cube"})
+    out["cube"] = analysis["cube"]
+    return out
+
+
+def purge_analysis_cache(session_key: Optional[str] = None) -> int:
+    """
+    Drop the analyses cached for ``session_key`` that no other session still
+    holds, or every entry when ``session_key`` is None. Returns the number of
+    entries removed.
+    """
+    with _analysis_cache_lock:
+        if session_key is None:
+            n = len(_analysis_cache)
+            _analysis_cache.clear()
+            return n
+        gone = []
+        for digest, (_, _, owners) in _analysis_cache.items():
+            if session_key in owners:
+                owners.discard(session_key)
+                if not owners:
+                    gone.append(digest)
+        for digest in gone:
+            del _analysis_cache[digest]
+    return len(gone)
+
+
+def _load_analysis(file_path: str, session_key: Optional[str] = None) -> Optional[dict]:
+    """
+    _analyze_file behind the content-hash cache, recording ``session_key``
+    as a holder of the entry. Returns a private copy.
+    """
+    if VOTERFILE_CACHE_TTL_SECS <= 0:
+        return _analyze_file(file_path)
+
+    digest = _file_digest(file_path)
+    now = time.monotonic()
+    with _analysis_cache_lock:
+        # Expired entries go first, wherever they sit in LRU order.
+        for key in [k for k, (t, _, _) in _analysis_cache.items() if now - t > VOTERFILE_CACHE_TTL_SECS]:
+            del _analysis_cache[key]
+        hit = _analysis_cache.get(digest)
+        if hit is not None:
+            _analysis_cache.move_to_end(digest)
+            if session_key:
+                hit[2].add(session_key)
+            logger.info(f"VoterFileAgent: analysis cache hit ({digest[:12]})")
+            return _private_copy(hit[1])
+
+    analysis = _analyze_file(file_path)
+    if analysis is None:
+        return None
+    with _analysis_cache_lock:
+        _analysis_cache[digest] = (now, analysis, {session_key} if session_key else set())
+        _analysis_cache.move_to_end(digest)
+        while len(_analysis_cache) > max(0, VOTERFILE_CACHE_MAX_ENTRIES):
+            _analysis_cache.popitem(last=False)
+    return _private_copy(analysis)
+
+
+def segment_drilldown(file_path: str, by=(), where: dict | None = None,
+                      session_key: Optional[str] = None) -> list[dict]:
+    """
+    Follow-up slice of an uploaded voter file (see SegmentCube.rollup), e.g.
+    segment_drilldown(path, ["precinct"], {"gender": "Female", "age_cohort": "Gen Z (18-26)"}).
+    Served from the cached cube, so once the file has been analysed no rows
+    are read again.
+    """
+    analysis = _load_analysis(file_path, session_key)
+    if analysis is None:
+        return []
+    return analysis["cube"].rollup(by, where)
 
 
 # ---------------------------------------------------------------------------
 # Pinecone messaging fetch
 # ---------------------------------------------------------------------------
 
-def _fetch_messaging(segment_description: str, state: AgentState) -> str:
-    query = f"messaging strategy and voter contact approach for {segment_description} voters"
-    proxy_state = {**state, "query": query}
+def _fetch_messaging(segment_descriptions: list[str], state: AgentState) -> list[str]:
+    """One research memo per segment, from a single batched research call."""
+    queries = [
+        f"messaging strategy and voter contact approach for {desc} voters"
+        for desc in segment_descriptions
+    ]
     try:
-        result = research_node(proxy_state)
-        findings = result.get("research_results", [])
-        return "\n\n".join(findings[:2]) if findings else "No matching research found."
+        # k=10 keeps the retrieval depth research_node searches at, so the
+        # recency sort picks the top two memos from the same pool as before.
+        results = research_batch(state, queries, k=10)
     except Exception as e:
-        logger.warning(f"VoterFileAgent: Pinecone query failed for '{segment_description}': {e}")
-        return "Research query failed — check Pinecone connection."
+        logger.warning(f"VoterFileAgent: Pinecone batch query failed for {len(queries)} segments: {e}")
+        return ["Research query failed — check Pinecone connection."] * len(queries)
+
+    memos: list[str] = []
+    for result in results:
+        findings = result.get("research_results", [])
+        memos.append("\n\n".join(findings[:2]) if findings else "No matching research found.")
+    return memos
 
 
 # ---------------------------------------------------------------------------
@@ -481,67 +1257,22 @@ class VoterFileAgent:
             }
 
         try:
-            ext = os.path.splitext(file_path)[1].lower()
-            if ext in (".xlsx", ".xls"):
-                df = pd.read_excel(file_path)
-            else:
-                df = pd.read_csv(file_path, low_memory=False)
+            analysis = _load_analysis(file_path, state.get("session_key"))
         except Exception as e:
             return {
                 "errors":        [f"VoterFileAgent: Could not read file — {e}"],
                 "active_agents": ["voter_file"],
             }
 
-        if df.empty:
+        if analysis is None:
             return {
                 "errors":        ["VoterFileAgent: Uploaded file contains no rows."],
                 "active_agents": ["voter_file"],
             }
 
-        # Standardize → coerce → derive
-        df, vendor, field_availability = standardize_columns(df)
-        df = _coerce_columns(df)
-        df = _add_derived_columns(df)
-        total_voters = len(df)
-
-        # Build segment table (includes cross-tab priority rows)
-        segments = _build_segment_table(df)
-
-        # File-level summary
-        summary: dict = {
-            "total_voters":        total_voters,
-            "vendor_detected":     vendor,
-            "fields_available":    [k for k, v in field_availability.items() if v],
-            "fields_missing":      [k for k, v in field_availability.items() if not v],
-            "segments_identified": len(segments),
-        }
-
-        for col, label in [
-            ("party_registration",  "party_breakdown"),
-            ("_age_cohort",         "age_cohort_breakdown"),
-            ("_partisan_tier",      "partisan_tier_breakdown"),
-            ("_turnout_tier",       "turnout_tier_breakdown"),
-            ("_gender_norm",        "gender_breakdown"),
-            ("_race_norm",          "race_breakdown"),
-            ("_vote_history_class", "vote_history_breakdown"),
-        ]:
-            if col in df.columns:
-                summary[label] = df[col].value_counts().to_dict()
-
-        for score_col, label in [
-            ("partisan_score",        "avg_partisan_score"),
-            ("turnout_score",         "avg_turnout_score"),
-            ("spanish_speaking_score","avg_spanish_speaking_score"),
-        ]:
-            if score_col in df.columns and df[score_col].notna().any():
-                summary[label] = round(float(df[score_col].mean()), 2)
-
-        if "_new_registrant" in df.columns:
-            summary["new_registrants"] = int(df["_new_registrant"].sum())
-
-        # Release DataFrame memory before Pinecone queries
-        del df
-        gc.collect()
+        vendor   = analysis["vendor"]
+        segments = analysis["segments"]
+        summary  = analysis["summary"]
 
         # Query Pinecone for top segments (>5% of file, max 6)
         top_segments = sorted(
@@ -555,11 +1286,11 @@ class VoterFileAgent:
             if ps not in top_segments:
                 top_segments.insert(0, ps)
 
+        selected = [seg for seg in top_segments[:_MAX_MESSAGING_QUERIES] if seg["count"] >= 5]
+        research_memos = _fetch_messaging([seg["description"] for seg in selected], state) if selected else []
+
         messaging_memos: list[str] = []
-        for seg in top_segments[:_MAX_MESSAGING_QUERIES]:
-            if seg["count"] < 5:
-                continue
-            research = _fetch_messaging(seg["description"], state)
+        for seg, research in zip(selected, research_memos):
             priority_badge = f" [{seg['priority']}]" if seg.get("priority") else ""
             header = (
                 f"## Messaging Guidance — {seg['description']}{priority_badge}\n"
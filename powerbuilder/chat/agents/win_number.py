@@ -1,12 +1,10 @@
 # powerbuilder/chat/agents/win_number.py
-import os
-
 from dotenv import load_dotenv
 load_dotenv()
 
 import pandas as pd
-from langchain_openai import ChatOpenAI
 from ..utils.data_fetcher import DataFetcher
+from ..utils.llm_config import get_completion_client
 from ..utils.district_standardizer import GeographyStandardizer, normalize_district
 from ..utils.census_vars import VOTER_DEMOGRAPHICS
 from ..utils.storage import read_dataframe
@@ -226,7 +224,8 @@ class WinNumberAgent:
     def run(state: AgentState) -> dict:
         """
         LangGraph node wrapper. Resolves district parameters in priority order:
-          1. structured_data — reads context written by a prior agent (e.g. precincts)
+          1. structured_data — the district resolver record, or context written
+             by a prior agent (e.g. precincts)
           2. LLM extraction from query — fallback when no prior context exists
 
         Appends result to structured_data, appends "win_number" to active_agents,
@@ -257,11 +256,7 @@ class WinNumberAgent:
             # ------------------------------------------------------------------
             # 2. Fallback: extract parameters from the query via LLM.
             # ------------------------------------------------------------------
-            llm = ChatOpenAI(
-                model="gpt-4o",
-                temperature=0,
-                openai_api_key=os.environ["OPENAI_API_KEY"],
-            )
+            llm = get_completion_client(temperature=0, provider="openai")
 
             extraction_prompt = f"""
 Extract electoral district information from this query. Return ONLY the five lines below, no extra text.
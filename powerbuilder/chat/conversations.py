@@ -0,0 +1,273 @@
+"""
+Database-backed conversation history for the chat sidebar.
+
+Why this exists
+---------------
+History used to live in ``request.session["conversations"]``: up to
+MAX_CONVERSATIONS threads, each carrying every rendered ``answer_html``
+bubble. Every request deserialized that blob and every turn rewrote it,
+so session rows (and request overhead) grew with each plan generated.
+
+Message bodies now live once in the Conversation/Message tables
+(chat/models.py). The session only keeps:
+
+    conversation_ids    list  — sidebar order, newest first; also the
+                                ownership check (a session can only read or
+                                change conversations it lists)
+    current_conv_id     str   — the active conversation
+
+Appending a turn to an existing conversation does not touch the session at
+all. The chat view loads the last CHAT_HISTORY_PAGE_SIZE messages of the
+active conversation; older turns are fetched a page at a time with
+``history(..., before=<message pk>)``.
+
+Sessions written before this change still hold the old ``conversations``
+list; it is imported into the database on first access and dropped.
+
+Lifetime
+--------
+Each conversation records its owning session key. Logout deletes the
+session's conversations (``delete_for_session``) before the session is
+flushed; conversations of sessions that simply expire are removed by
+``python manage.py prune_conversations`` (``prune_orphans``), which should
+run on a schedule alongside ``clearsessions``.
+"""
+from __future__ import annotations
+
+import datetime
+import logging
+import os
+import time
+import uuid
+from typing import Iterable, Optional
+
+from django.contrib.sessions.models import Session
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Conversation, Message
+from .render_helpers import auto_title
+
+logger = logging.getLogger(__name__)
+
+MAX_CONVERSATIONS = 20
+
+# Messages per history page. Turns are saved as user/assistant pairs, so an
+# even page size never splits a turn across pages.
+DEFAULT_PAGE_SIZE = 20
+
+SESSION_KEY = "conversation_ids"
+LEGACY_SESSION_KEY = "conversations"
+
+
+def page_size() -> int:
+    try:
+        return max(2, int(os.getenv("CHAT_HISTORY_PAGE_SIZE", DEFAULT_PAGE_SIZE)))
+    except ValueError:
+        return DEFAULT_PAGE_SIZE
+
+
+def _epoch_to_datetime(ts) -> datetime.datetime:
+    try:
+        return datetime.datetime.fromtimestamp(float(ts), tz=datetime.timezone.utc)
+    except (TypeError, ValueError, OverflowError, OSError):
+        return timezone.now()
+
+
+def _legacy_created_at(conv: dict) -> datetime.datetime:
+    """created_at (epoch) or the pre-Milestone-F '%Y-%m-%d %H:%M' timestamp."""
+    created = conv.get("created_at")
+    if isinstance(created, (int, float)):
+        return _epoch_to_datetime(created)
+    try:
+        return _epoch_to_datetime(time.mktime(time.strptime(conv.get("timestamp") or "", "%Y-%m-%d %H:%M")))
+    except (ValueError, TypeError):
+        return timezone.now()
+
+
+def _owner(session) -> str:
+    return session.session_key or ""
+
+
+def _message(conv: Conversation, msg: dict) -> Message:
+    fields = dict(msg)
+    return Message(
+        conversation = conv,
+        role         = fields.pop("role", "assistant"),
+        content      = fields.pop("content", "") or "",
+        msg_id       = fields.pop("msg_id", "") or "",
+        payload      = fields,
+    )
+
+
+def _import_legacy(session) -> None:
+    """Move a pre-database ``conversations`` session list into the tables."""
+    legacy = session.get(LEGACY_SESSION_KEY)
+    if legacy is None:
+        return
+    ids = list(session.get(SESSION_KEY) or [])
+    with transaction.atomic():
+        for conv in legacy[:MAX_CONVERSATIONS]:
+            conv_id = conv.get("id")
+            if not conv_id or conv_id in ids:
+                continue
+            row, _ = Conversation.objects.update_or_create(
+                id=conv_id,
+                defaults={"title": conv.get("title") or "", "created_at": _legacy_created_at(conv),
+                          "session_key": _owner(session)},
+            )
+            row.messages.all().delete()
+            Message.objects.bulk_create([_message(row, m) for m in conv.get("messages") or []])
+            ids.append(conv_id)
+    session[SESSION_KEY] = ids[:MAX_CONVERSATIONS]
+    del session[LEGACY_SESSION_KEY]
+    session.modified = True
+    logger.info(f"conversations: imported {len(ids)} session conversation(s) into the database")
+
+
+def conversation_ids(session) -> list[str]:
+    """The ids this session owns, in sidebar order."""
+    _import_legacy(session)
+    return list(session.get(SESSION_KEY) or [])
+
+
+def _set_ids(session, ids: list[str]) -> None:
+    session[SESSION_KEY] = ids
+    session.modified = True
+
+
+def sidebar(session) -> list[dict]:
+    """
+    [{id, title, timestamp, created_at}] for the sidebar, in session order,
+    with created_at as Unix epoch. Loads no message bodies. Ids whose row
+    has gone are pruned from the session.
+    """
+    ids = conversation_ids(session)
+    if not ids:
+        return []
+    rows = {c.id: c for c in Conversation.objects.filter(id__in=ids).only("id", "title", "created_at")}
+    live = [cid for cid in ids if cid in rows]
+    if live != ids:
+        _set_ids(session, live)
+    return [
+        {
+            "id":         cid,
+            "title":      rows[cid].title,
+            "timestamp":  timezone.localtime(rows[cid].created_at).strftime("%Y-%m-%d %H:%M"),
+            "created_at": int(rows[cid].created_at.timestamp()),
+        }
+        for cid in live
+    ]
+
+
+def get(session, conv_id: Optional[str]) -> Optional[Conversation]:
+    """The conversation if this session owns it, else None."""
+    if not conv_id or conv_id not in conversation_ids(session):
+        return None
+    return Conversation.objects.filter(id=conv_id).first()
+
+
+def history(conv: Conversation, before: Optional[int] = None,
+            limit: Optional[int] = None) -> tuple[list[dict], Optional[int]]:
+    """
+    One page of messages, oldest first, ending just before message pk
+    ``before`` (or at the latest message). Returns (messages, cursor) where
+    cursor is the ``before`` value for the next older page, or None when
+    this page reaches the start of the conversation.
+    """
+    limit = limit or page_size()
+    qs = conv.messages.order_by("-id")
+    if before is not None:
+        qs = qs.filter(id__lt=before)
+    rows = list(qs[:limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    rows.reverse()
+    return [m.as_dict() for m in rows], (rows[0].id if has_more else None)
+
+
+def append_turn(session, query: str, assistant: dict) -> Conversation:
+    """
+    Save a user query and its assistant message to the active conversation,
+    starting a new one (titled from the query) if there is none. Starting a
+    conversation pushes it to the top of the sidebar and drops the oldest
+    beyond MAX_CONVERSATIONS.
+    """
+    conv = get(session, session.get("current_conv_id"))
+    with transaction.atomic():
+        if conv is None:
+            conv = Conversation.objects.create(
+                id=str(uuid.uuid4()), title=auto_title(query), session_key=_owner(session),
+            )
+            ids = [conv.id] + conversation_ids(session)
+            Conversation.objects.filter(id__in=ids[MAX_CONVERSATIONS:]).delete()
+            _set_ids(session, ids[:MAX_CONVERSATIONS])
+            session["current_conv_id"] = conv.id
+        Message.objects.bulk_create([
+            _message(conv, {"role": "user", "content": query, "msg_id": uuid.uuid4().hex[:10]}),
+            _message(conv, {"role": "assistant", **assistant}),
+        ])
+    return conv
+
+
+def rename(session, conv_id: str, title: str) -> bool:
+    if conv_id not in conversation_ids(session):
+        return False
+    return Conversation.objects.filter(id=conv_id).update(title=title) > 0
+
+
+def delete(session, conv_id: str) -> bool:
+    ids = conversation_ids(session)
+    if conv_id not in ids:
+        return False
+    Conversation.objects.filter(id=conv_id).delete()
+    _set_ids(session, [cid for cid in ids if cid != conv_id])
+    return True
+
+
+def reorder(session, order: Iterable[str]) -> list[str]:
+    """
+    Arrange the session's conversations in ``order``; ids not listed keep
+    their relative order at the tail, unknown ids are ignored.
+    """
+    ids = conversation_ids(session)
+    owned = set(ids)
+    seen: set[str] = set()
+    new_ids: list[str] = []
+    for cid in order:
+        if cid in owned and cid not in seen:
+            new_ids.append(cid)
+            seen.add(cid)
+    new_ids += [cid for cid in ids if cid not in seen]
+    _set_ids(session, new_ids)
+    return new_ids
+
+
+def delete_for_session(session) -> int:
+    """
+    Delete every conversation this session owns (logout calls this before
+    flushing the session). Returns the number of conversations deleted.
+    """
+    owned = Q(id__in=session.get(SESSION_KEY) or [])
+    if session.session_key:
+        owned |= Q(session_key=session.session_key)
+    _, deleted = Conversation.objects.filter(owned).delete()
+    return deleted.get(Conversation._meta.label, 0)
+
+
+def prune_orphans(dry_run: bool = False) -> int:
+    """
+    Delete conversations whose owning session no longer exists or has
+    expired. Returns the number of conversations deleted (or that would be,
+    with ``dry_run``).
+    """
+    live = Session.objects.filter(expire_date__gt=timezone.now()).values("session_key")
+    orphans = Conversation.objects.exclude(session_key__in=live)
+    if dry_run:
+        return orphans.count()
+    _, deleted = orphans.delete()
+    n = deleted.get(Conversation._meta.label, 0)
+    if n:
+        logger.info(f"conversations: pruned {n} conversation(s) of expired sessions")
+    return n
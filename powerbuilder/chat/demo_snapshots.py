@@ -0,0 +1,334 @@
+"""
+Pre-baked result snapshots for the demo carousel tiles.
+
+Why this exists
+---------------
+Every tile in DEMO_TILES (chat/demo_tiles.py) is a fixed prompt, yet each
+click ran the whole multi-agent pipeline live: LLM, Census and Pinecone
+calls, 30-90 seconds, and a real chance of a provider hiccup in front of an
+audience. ``python manage.py bake_demo_tiles`` now runs each tile once and
+stores a snapshot; demo mode can then serve the snapshot instead of a live
+run.
+
+A snapshot (``data/demo_snapshots/<tile>.<lang>.json``, DEMO_SNAPSHOT_DIR)
+holds:
+
+* the final answer plus the result fields the chat bubble renders (agents,
+  errors, research memos for the source cards);
+* the progress-event timeline, with each event's offset in seconds from
+  the start of the run;
+* copies of the generated files (Word plan, CSV target list) under
+  ``<tile>.<lang>.files/``, restored into the exports directory on replay.
+
+Serving
+-------
+Only with DEMO_MODE on, and only when DEMO_SNAPSHOTS is set:
+
+* ``replay``: re-emit the timeline with its original pacing (gaps scaled by
+  DEMO_SNAPSHOT_SPEED, each capped at DEMO_SNAPSHOT_MAX_GAP_SECS), so the
+  live agent trace looks like a real run;
+* ``instant``: emit the timeline and return the answer immediately.
+
+A snapshot answers only the request it was baked for: the same tile prompt
+and options, the org namespace the bake ran under, and the same attached
+file (the demo voter file, compared by content hash). A user who uploads
+their own voter file, or works in another org, always gets a live run.
+
+Invalidation
+------------
+Each snapshot records a fingerprint of the tile's current prompt text (in
+the snapshot's language), the run options, and the content hashes of the
+data the demo runs read (demo voter file, Cook PVI seed, tool_templates/).
+A snapshot whose fingerprint no longer matches is ignored, and the query
+runs live, until the tiles are baked again.
+"""
+from __future__ import annotations
+
+import glob
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+from typing import Any, Mapping, Optional
+
+from django.conf import settings
+from django.utils import translation
+
+from . import progress
+from .demo_tiles import get_demo_tiles
+from .run_coalescer import file_digest, normalize_query
+from .utils import template_registry
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+DEFAULT_SNAPSHOT_DIR = os.path.join(BASE_DIR, "data", "demo_snapshots")
+
+# Same default as the export agent, which writes the files being restored.
+EXPORTS_DIR = os.getenv("EXPORTS_DIR", os.path.join(BASE_DIR, "exports"))
+
+# Files and directories whose contents a demo run depends on (relative to
+# the project dir). A change to any of them invalidates every snapshot.
+DATA_DEPENDENCIES = (
+    "data/demo/gwinnett_demo_voterfile.csv",
+    "data/cook_pvi_2025.json",
+    "tool_templates",
+)
+
+# The demo views auto-attach this file, so the bake does too.
+DEMO_VOTERFILE = "data/demo/gwinnett_demo_voterfile.csv"
+
+# Result fields kept in a snapshot: what _build_done_payload renders.
+RESULT_FIELDS = ("final_answer", "active_agents", "errors", "research_results")
+
+DEFAULT_SPEED = 1.0
+DEFAULT_MAX_GAP_SECS = 4.0
+
+_SKIPPED_EVENTS = ("queued",) + progress.TERMINAL_TYPES
+
+
+def snapshot_dir() -> str:
+    return os.getenv("DEMO_SNAPSHOT_DIR", DEFAULT_SNAPSHOT_DIR)
+
+
+def snapshot_mode() -> str:
+    """``off``, ``replay`` or ``instant``; always ``off`` outside DEMO_MODE."""
+    if not getattr(settings, "DEMO_MODE", False):
+        return "off"
+    mode = os.getenv("DEMO_SNAPSHOTS", "off").lower()
+    return mode if mode in ("replay", "instant") else "off"
+
+
+# ---------------------------------------------------------------------------
+# Fingerprints
+# ---------------------------------------------------------------------------
+
+def _options(ab_test: bool = False, plan_mode: Optional[str] = None,
+             llm_provider: Optional[str] = None) -> dict:
+    mode = (plan_mode or "").strip().lower()
+    return {
+        "ab_test": bool(ab_test),
+        "plan_mode": None if mode in ("", "auto") else mode,
+        "llm_provider": llm_provider or None,
+    }
+
+
+def data_fingerprint() -> str:
+    """Content hash over DATA_DEPENDENCIES (file hashes are memoized by mtime)."""
+    h = hashlib.sha256()
+    for rel in DATA_DEPENDENCIES:
+        path = os.path.join(BASE_DIR, rel)
+        if os.path.isdir(path):
+            files = sorted(
+                os.path.join(root, name)
+                for root, _, names in os.walk(path) for name in names
+            )
+        else:
+            files = [path]
+        for f in files:
+            h.update(os.path.relpath(f, BASE_DIR).encode("utf-8"))
+            h.update(file_digest(f).encode("utf-8"))
+    return h.hexdigest()
+
+
+def tile_prompt(tile_id: str, language: str) -> Optional[str]:
+    """The tile's current prompt text in ``language``, or None if the tile is gone."""
+    for tile in get_demo_tiles():
+        if tile["id"] == tile_id:
+            with translation.override(language):
+                return str(tile["prompt"])
+    return None
+
+
+def fingerprint(prompt: str, options: Mapping[str, Any]) -> str:
+    payload = {
+        "prompt": normalize_query(prompt),
+        "options": dict(options),
+        "data": data_fingerprint(),
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _paths(tile_id: str, language: str) -> tuple[str, str]:
+    stem = os.path.join(snapshot_dir(), f"{tile_id}.{language}")
+    return stem + ".json", stem + ".files"
+
+
+def is_current(snapshot: Mapping[str, Any]) -> bool:
+    """True if the tile text, options and data still match the snapshot."""
+    prompt = tile_prompt(snapshot.get("tile_id", ""), snapshot.get("language", "en"))
+    if prompt is None:
+        return False
+    return snapshot.get("fingerprint") == fingerprint(prompt, snapshot.get("options") or {})
+
+
+# ---------------------------------------------------------------------------
+# Baking
+# ---------------------------------------------------------------------------
+
+def load(tile_id: str, language: str) -> Optional[Mapping[str, Any]]:
+    path, _ = _paths(tile_id, language)
+    try:
+        return template_registry.load_json(path)
+    except ValueError:
+        logger.warning(f"demo_snapshots: {path} is not valid JSON; ignoring")
+        return None
+
+
+def bake(tile_id: str, language: str = "en", org_namespace: str = "general",
+         ab_test: bool = False, plan_mode: Optional[str] = None,
+         llm_provider: Optional[str] = None) -> dict:
+    """
+    Run one tile through the live pipeline and store its snapshot.
+    Returns the snapshot dict. Raises ValueError for an unknown tile.
+    """
+    prompt = tile_prompt(tile_id, language)
+    if prompt is None:
+        raise ValueError(f"unknown demo tile {tile_id!r}")
+    options = _options(ab_test, plan_mode, llm_provider)
+    voterfile = os.path.join(BASE_DIR, DEMO_VOTERFILE)
+    upload = voterfile if os.path.exists(voterfile) else None
+
+    from .agents.manager import run_query_streaming  # deferred import
+
+    run_id = progress.create(progress.new_run_id())
+    started = time.time()
+    try:
+        with translation.override(language):
+            result = run_query_streaming(
+                query              = prompt,
+                org_namespace      = org_namespace,
+                run_id             = run_id,
+                uploaded_file_path = upload,
+                **options,
+            )
+        events = [
+            {"t": round(evt.ts - started, 3), "type": evt.type, "agent": evt.agent,
+             "label": evt.label, "payload": evt.payload}
+            for evt in progress.read(run_id) if evt.type not in _SKIPPED_EVENTS
+        ]
+    finally:
+        progress.finish(run_id)
+
+    path, files_dir = _paths(tile_id, language)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    shutil.rmtree(files_dir, ignore_errors=True)
+    files = []
+    generated = result.get("generated_files") or [result.get("generated_file_path")]
+    for src in generated:
+        if src and os.path.isfile(src):
+            os.makedirs(files_dir, exist_ok=True)
+            shutil.copy2(src, os.path.join(files_dir, os.path.basename(src)))
+            files.append(os.path.basename(src))
+
+    snapshot = {
+        "tile_id": tile_id,
+        "language": language,
+        "query": normalize_query(prompt),
+        "options": options,
+        "org_namespace": org_namespace or "general",
+        "upload": file_digest(upload) if upload else None,
+        "fingerprint": fingerprint(prompt, options),
+        "baked_at": time.strftime("%Y-%m-%d %H:%M"),
+        "duration_secs": round(time.time() - started, 1),
+        "events": events,
+        "result": {k: result.get(k) for k in RESULT_FIELDS},
+        "files": files,
+    }
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(snapshot, f, ensure_ascii=False, indent=1, default=str)
+    os.replace(tmp, path)
+    return snapshot
+
+
+# ---------------------------------------------------------------------------
+# Serving
+# ---------------------------------------------------------------------------
+
+def find(query: str, ab_test: bool = False, plan_mode: Optional[str] = None,
+         llm_provider: Optional[str] = None, org_namespace: str = "general",
+         uploaded_file_path: Optional[str] = None) -> Optional[Mapping[str, Any]]:
+    """
+    The current snapshot matching this request, or None (snapshots off, no
+    tile prompt matches, the org or attached file differs from the bake, or
+    the snapshot is stale).
+    """
+    if snapshot_mode() == "off":
+        return None
+    normalized = normalize_query(query)
+    options = _options(ab_test, plan_mode, llm_provider)
+    org_namespace = org_namespace or "general"
+    upload, hashed = None, False   # hashed only once a prompt matches
+    for path in sorted(glob.glob(os.path.join(snapshot_dir(), "*.json"))):
+        try:
+            snap = template_registry.load_json(path)
+        except ValueError:
+            continue
+        if not snap or snap.get("query") != normalized or dict(snap.get("options") or {}) != options:
+            continue
+        if snap.get("org_namespace") != org_namespace:
+            continue
+        if not hashed:
+            upload = file_digest(uploaded_file_path) if uploaded_file_path else None
+            hashed = True
+        if snap.get("upload") != upload:
+            continue
+        if not is_current(snap):
+            logger.info(f"demo_snapshots: {os.path.basename(path)} is stale; running live")
+            return None
+        return snap
+    return None
+
+
+def replay(snapshot: Mapping[str, Any], run_id: Optional[str] = None,
+           instant: Optional[bool] = None) -> dict:
+    """
+    Emit the snapshot's progress timeline into ``run_id`` and return a
+    result dict shaped like run_query's. Paced like the original run unless
+    ``instant`` (default: DEMO_SNAPSHOTS=instant).
+    """
+    if instant is None:
+        instant = snapshot_mode() == "instant"
+    speed = float(os.getenv("DEMO_SNAPSHOT_SPEED", DEFAULT_SPEED))
+    max_gap = float(os.getenv("DEMO_SNAPSHOT_MAX_GAP_SECS", DEFAULT_MAX_GAP_SECS))
+    previous = 0.0
+    for evt in snapshot.get("events") or ():
+        if not instant and speed > 0:
+            gap = min((evt["t"] - previous) / speed, max_gap)
+            if gap > 0:
+                time.sleep(gap)
+            previous = evt["t"]
+        progress.emit(run_id, evt["type"], agent=evt.get("agent"), label=evt.get("label"),
+                      **_thaw(evt.get("payload") or {}))
+
+    # Restore the generated files where download_view serves them from.
+    _, files_dir = _paths(snapshot["tile_id"], snapshot["language"])
+    generated = []
+    for name in snapshot.get("files") or ():
+        src = os.path.join(files_dir, name)
+        if not os.path.isfile(src):
+            continue
+        os.makedirs(EXPORTS_DIR, exist_ok=True)
+        dest = os.path.join(EXPORTS_DIR, name)
+        if not os.path.isfile(dest):
+            shutil.copy2(src, dest)
+        generated.append(dest)
+
+    result = _thaw(snapshot.get("result") or {})
+    result["generated_files"] = generated
+    result["generated_file_path"] = generated[0] if generated else None
+    result["demo_snapshot"] = snapshot["tile_id"]
+    return result
+
+
+def _thaw(value: Any) -> Any:
+    """Plain dicts/lists from the registry's frozen JSON."""
+    if isinstance(value, Mapping):
+        return {k: _thaw(v) for k, v in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(v) for v in value]
+    return value
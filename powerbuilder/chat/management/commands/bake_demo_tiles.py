@@ -0,0 +1,75 @@
+"""
+Pre-bake result snapshots for the demo carousel tiles.
+
+Runs each tile prompt in DEMO_TILES through the live pipeline once and
+stores its final answer, progress timeline and generated files (see
+chat/demo_snapshots.py). With DEMO_MODE on and DEMO_SNAPSHOTS=replay or
+instant, clicking a tile then serves the snapshot instead of a live run.
+
+Usage:
+    python manage.py bake_demo_tiles                      # every tile, English
+    python manage.py bake_demo_tiles --language es --language vi
+    python manage.py bake_demo_tiles --tile win-number-ga07-midterm
+    python manage.py bake_demo_tiles --stale-only         # skip current snapshots
+    python manage.py bake_demo_tiles --check              # report, bake nothing
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from chat import demo_snapshots
+from chat.demo_tiles import get_demo_tiles
+
+
+class Command(BaseCommand):
+    help = "Precompute demo carousel snapshots (answer, progress timeline, generated files)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tile", action="append", dest="tiles", metavar="ID",
+                            help="Tile id to bake (repeatable). Default: all tiles.")
+        parser.add_argument("--language", action="append", dest="languages", metavar="CODE",
+                            help="Language to bake (repeatable). Default: en.")
+        parser.add_argument("--org", default="general",
+                            help="Org namespace to run the tiles under (default: general).")
+        parser.add_argument("--stale-only", action="store_true",
+                            help="Only bake tiles whose snapshot is missing or stale.")
+        parser.add_argument("--check", action="store_true",
+                            help="Report snapshot status without running anything.")
+
+    def handle(self, *args, **options):
+        tile_ids = [t["id"] for t in get_demo_tiles()]
+        selected = options["tiles"] or tile_ids
+        unknown = sorted(set(selected) - set(tile_ids))
+        if unknown:
+            raise CommandError(f"Unknown tile id(s): {', '.join(unknown)}")
+        valid_languages = {code for code, _ in settings.LANGUAGES}
+        languages = options["languages"] or ["en"]
+        bad = sorted(set(languages) - valid_languages)
+        if bad:
+            raise CommandError(f"Unsupported language(s): {', '.join(bad)}")
+
+        failed = 0
+        for tile_id in selected:
+            for language in languages:
+                label = f"{tile_id} [{language}]"
+                snapshot = demo_snapshots.load(tile_id, language)
+                current = snapshot is not None and demo_snapshots.is_current(snapshot)
+                if options["check"]:
+                    status = "current" if current else ("stale" if snapshot else "missing")
+                    self.stdout.write(f"{label}: {status}")
+                    continue
+                if options["stale_only"] and current:
+                    self.stdout.write(f"{label}: current, skipped")
+                    continue
+                self.stdout.write(f"{label}: baking...")
+                try:
+                    baked = demo_snapshots.bake(tile_id, language, org_namespace=options["org"])
+                except Exception as exc:
+                    failed += 1
+                    self.stderr.write(self.style.ERROR(f"{label}: failed — {exc}"))
+                    continue
+                self.stdout.write(self.style.SUCCESS(
+                    f"{label}: {len(baked['events'])} events, {len(baked['files'])} file(s), "
+                    f"{baked['duration_secs']}s"
+                ))
+        if failed:
+            raise CommandError(f"{failed} snapshot(s) failed to bake")
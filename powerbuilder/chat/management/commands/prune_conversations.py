@@ -0,0 +1,27 @@
+"""
+Delete saved conversations whose session has expired.
+
+Logout deletes a session's conversations itself; sessions that just time
+out leave theirs behind. Run this on a schedule, after ``clearsessions``
+(see chat/conversations.py).
+
+Usage:
+    python manage.py prune_conversations
+    python manage.py prune_conversations --dry-run    # count, delete nothing
+"""
+from django.core.management.base import BaseCommand
+
+from chat import conversations
+
+
+class Command(BaseCommand):
+    help = "Delete conversations that no live session owns."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true",
+                            help="Report how many conversations would be deleted.")
+
+    def handle(self, *args, **options):
+        n = conversations.prune_orphans(dry_run=options["dry_run"])
+        verb = "would delete" if options["dry_run"] else "deleted"
+        self.stdout.write(self.style.SUCCESS(f"prune_conversations: {verb} {n} conversation(s)"))
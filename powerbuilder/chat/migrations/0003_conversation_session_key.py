@@ -0,0 +1,32 @@
+# Generated by Django 6.0.1 on 2026-10-18 19:40
+
+import django.contrib.sessions.backends.db
+from django.db import migrations, models
+
+
+def claim_listed_conversations(apps, schema_editor):
+    """Give existing conversations the live session that lists them."""
+    Conversation = apps.get_model('chat', 'Conversation')
+    Session = apps.get_model('sessions', 'Session')
+    store = django.contrib.sessions.backends.db.SessionStore()
+    for session in Session.objects.iterator():
+        ids = store.decode(session.session_data).get('conversation_ids') or []
+        if ids:
+            Conversation.objects.filter(id__in=ids, session_key='').update(session_key=session.session_key)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0002_conversation_message'),
+        ('sessions', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='session_key',
+            field=models.CharField(blank=True, db_index=True, max_length=40),
+        ),
+        migrations.RunPython(claim_listed_conversations, migrations.RunPython.noop),
+    ]
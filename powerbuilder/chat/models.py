@@ -2,6 +2,7 @@ import re
 
 from django.contrib.auth.models import User
 from django.db import models
+from django.utils import timezone
 
 
 def _slugify_domain(domain: str) -> str:
@@ -101,3 +102,54 @@ class UserProfile(models.Model):
         if self.organization and self.organization.is_active:
             return self.organization.pinecone_namespace
         return "general"
+
+
+class Conversation(models.Model):
+    """
+    One chat thread from the sidebar history.
+
+    The demo session owns its conversations by listing their ids (see
+    chat/conversations.py), so the session cookie stays a few dozen bytes
+    no matter how long the history grows. ``session_key`` records that
+    session so its rows can be deleted on logout, and by
+    ``manage.py prune_conversations`` once the session has expired.
+    """
+
+    id          = models.CharField(max_length=36, primary_key=True)
+    title       = models.CharField(max_length=255)
+    created_at  = models.DateTimeField(default=timezone.now)
+    session_key = models.CharField(max_length=40, blank=True, db_index=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self) -> str:
+        return self.title
+
+
+class Message(models.Model):
+    """
+    One turn in a Conversation.
+
+    ``payload`` holds everything the assistant bubble renders besides the
+    raw answer text (answer_html, downloads, source cards, outline, ...),
+    stored once here instead of being re-serialized into every session
+    write.
+    """
+
+    conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, related_name="messages")
+    role         = models.CharField(max_length=16)
+    content      = models.TextField(blank=True)
+    msg_id       = models.CharField(max_length=16, blank=True)
+    payload      = models.JSONField(default=dict, blank=True)
+    created_at   = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ["id"]
+
+    def __str__(self) -> str:
+        return f"{self.role}: {self.content[:40]}"
+
+    def as_dict(self) -> dict:
+        """The message in the shape the history templates render."""
+        return {**self.payload, "role": self.role, "content": self.content, "msg_id": self.msg_id}
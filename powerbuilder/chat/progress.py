@@ -1,24 +1,37 @@
 """
-Per-run progress event queues for the streaming agent trace.
+Per-run progress event logs for the streaming agent trace.
 
 Why this exists
 ---------------
 The chat UI used to wait silently while the LangGraph pipeline ran. A real
 plan run touches 4-6 agents and takes 30-90 seconds, which left users staring
-at a 3-dot bubble. This module gives every active run a small in-process
-queue. Agent nodes push progress events ("researcher started", "researcher
-finished, 4 sources") and the streaming endpoint drains the queue into an
+at a 3-dot bubble. This module gives every active run a small event log.
+Agent nodes push progress events ("researcher started", "researcher
+finished, 4 sources") and the streaming endpoint drains the log into an
 SSE stream the browser consumes live.
 
 Design choices
 --------------
-* In-process dict, not Redis. The whole demo runs in one Gunicorn worker,
-  the SSE consumer and the agent worker live in the same process, and the
-  queue's lifetime is one run. A Redis dependency would buy us nothing.
-* Thread-safe. We protect the registry with a single lock; per-run
-  ``queue.SimpleQueue`` instances are already thread-safe internally.
-* Bounded blast radius. ``finish()`` removes the queue; if a caller leaks a
-  run id we log and move on rather than growing the dict forever.
+* Pluggable bus. Events go through a ``ProgressBus`` backend chosen by
+  PROGRESS_BACKEND:
+    - ``memory`` (default): in-process dict of run logs. Right for a single
+      worker, the dev server and the test scripts.
+    - ``sqlite``: one WAL-mode SQLite file (PROGRESS_DB_PATH) shared by every
+      worker process on the host. A run started by one gunicorn worker can
+      be streamed, or resumed, by a request that lands on another. No
+      external service; the file lives next to the app's other local caches.
+* Offsets, not a consumable queue. Each event gets a per-run sequence
+  number (1, 2, ...). Readers pass the last offset they saw and get what
+  came after, so several readers can follow one run and a reconnecting
+  client neither replays nor misses events. The streaming view sends
+  ``run_id:offset`` as the SSE event id; the browser echoes it back in
+  Last-Event-ID when it reconnects.
+* Thread- and process-safe. The memory backend guards each log with a
+  condition variable; the SQLite backend assigns offsets inside a
+  ``BEGIN IMMEDIATE`` transaction.
+* Bounded blast radius. ``finish()`` removes a run; runs nobody finished
+  (client went away mid-run) are swept once they are older than
+  RUN_RETENTION_SECS, on the next ``create()``.
 * Optional. Agents call ``emit(run_id, ...)`` only when ``run_id`` is set in
   AgentState; older non-streaming code paths (CLI tests, direct
   ``manager_app.invoke``) stay unaffected.
@@ -34,18 +47,20 @@ Usage from an agent node:
 
 Usage from the streaming view:
 
-    queue = create(run_id)
+    create(run_id)
     try:
         # spawn the run on a worker thread that calls emit() as it goes
-        for evt in drain(run_id, timeout=1.0):
+        for evt in drain(run_id, timeout=1.0, after=last_seen_offset):
             yield format_sse(evt)
     finally:
         finish(run_id)
 """
 from __future__ import annotations
 
+import json
 import logging
-import queue
+import os
+import sqlite3
 import threading
 import time
 import uuid
@@ -57,9 +72,18 @@ logger = logging.getLogger(__name__)
 # Hard ceiling on how long a single SSE consumer waits for the run to finish.
 # Plans cap around 90s; we add headroom for slow networks plus the model.
 DEFAULT_RUN_TIMEOUT_SECS = 240
-# How long the consumer blocks on each get() before checking liveness. Short
+# How long the consumer blocks on each read before checking liveness. Short
 # enough that a cancelled client tears down within a heartbeat.
 POLL_INTERVAL_SECS = 1.0
+# Runs not finished by a consumer are swept after this long. Covers the
+# run timeout plus time for a dropped client to reconnect and read the end.
+RUN_RETENTION_SECS = DEFAULT_RUN_TIMEOUT_SECS + 120
+
+DEFAULT_DB_PATH = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "../data/progress/progress.sqlite3")
+)
+
+TERMINAL_TYPES = ("done", "error")
 
 
 @dataclass
@@ -70,6 +94,7 @@ class ProgressEvent:
     label: Optional[str] = None     # short human-readable status
     payload: dict[str, Any] = field(default_factory=dict)  # type-specific extras
     ts: float = field(default_factory=time.time)
+    offset: Optional[int] = None    # position in the run's log; None for pings
 
     def to_dict(self) -> dict[str, Any]:
         d: dict[str, Any] = {"type": self.type, "ts": self.ts}
@@ -82,97 +107,351 @@ class ProgressEvent:
         return d
 
 
-class _Registry:
-    """Thread-safe map of run_id -> SimpleQueue[ProgressEvent]."""
+# ---------------------------------------------------------------------------
+# Backends
+# ---------------------------------------------------------------------------
+
+class ProgressBus:
+    """
+    Backend interface. Offsets are 1-based per run; ``read(run_id, after)``
+    returns events with offset > ``after``, waiting up to ``wait`` seconds
+    for the first one.
+    """
+
+    def create(self, run_id: str) -> None:
+        raise NotImplementedError
+
+    def is_active(self, run_id: str) -> bool:
+        raise NotImplementedError
+
+    def publish(self, run_id: str, event: ProgressEvent) -> Optional[int]:
+        """Append ``event``; returns its offset, or None if the run is unknown."""
+        raise NotImplementedError
+
+    def read(self, run_id: str, after: int = 0, wait: float = 0.0) -> Optional[list[ProgressEvent]]:
+        """Events after ``after``; None if the run is unknown."""
+        raise NotImplementedError
+
+    def finish(self, run_id: str) -> None:
+        raise NotImplementedError
+
+    def sweep(self, older_than: float) -> int:
+        """Drop runs created more than ``older_than`` seconds ago."""
+        raise NotImplementedError
+
+    def active_run_ids(self) -> list[str]:
+        raise NotImplementedError
+
+
+class _RunLog:
+    __slots__ = ("events", "cond", "created")
 
     def __init__(self) -> None:
-        self._queues: dict[str, "queue.SimpleQueue[ProgressEvent]"] = {}
+        self.events: list[ProgressEvent] = []
+        self.cond = threading.Condition()
+        self.created = time.time()
+
+
+class InProcessBus(ProgressBus):
+    """Run logs in a dict; readers wait on a per-run condition variable."""
+
+    def __init__(self) -> None:
+        self._runs: dict[str, _RunLog] = {}
         self._lock = threading.Lock()
 
-    def create(self, run_id: str) -> "queue.SimpleQueue[ProgressEvent]":
+    def create(self, run_id: str) -> None:
         with self._lock:
-            q = self._queues.get(run_id)
-            if q is None:
-                q = queue.SimpleQueue()
-                self._queues[run_id] = q
-            return q
+            self._runs.setdefault(run_id, _RunLog())
 
-    def get(self, run_id: str) -> Optional["queue.SimpleQueue[ProgressEvent]"]:
+    def is_active(self, run_id: str) -> bool:
         with self._lock:
-            return self._queues.get(run_id)
+            return run_id in self._runs
+
+    def publish(self, run_id: str, event: ProgressEvent) -> Optional[int]:
+        with self._lock:
+            log = self._runs.get(run_id)
+        if log is None:
+            return None
+        with log.cond:
+            log.events.append(event)
+            event.offset = len(log.events)
+            log.cond.notify_all()
+        return event.offset
+
+    def read(self, run_id: str, after: int = 0, wait: float = 0.0) -> Optional[list[ProgressEvent]]:
+        with self._lock:
+            log = self._runs.get(run_id)
+        if log is None:
+            return None
+        with log.cond:
+            if len(log.events) <= after and wait > 0:
+                log.cond.wait_for(lambda: len(log.events) > after, timeout=wait)
+            return log.events[after:]
 
     def finish(self, run_id: str) -> None:
         with self._lock:
-            self._queues.pop(run_id, None)
+            self._runs.pop(run_id, None)
+
+    def sweep(self, older_than: float) -> int:
+        cutoff = time.time() - older_than
+        with self._lock:
+            stale = [rid for rid, log in self._runs.items() if log.created < cutoff]
+            for rid in stale:
+                del self._runs[rid]
+        return len(stale)
+
+    def active_run_ids(self) -> list[str]:
+        with self._lock:
+            return list(self._runs)
+
+
+class SQLiteBus(ProgressBus):
+    """
+    Run logs in a WAL-mode SQLite file shared across worker processes.
 
+    One connection per thread (autocommit; publish opens its own
+    ``BEGIN IMMEDIATE`` so offsets are assigned atomically across
+    processes). Readers poll every PROGRESS_POLL_SECS while waiting.
+    """
 
-_registry = _Registry()
+    def __init__(self, path: str, poll_secs: float = 0.1) -> None:
+        self.path = path
+        self.poll_secs = poll_secs
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS progress_runs ("
+            " run_id TEXT PRIMARY KEY, created_at REAL NOT NULL)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS progress_events ("
+            " run_id TEXT NOT NULL, seq INTEGER NOT NULL, type TEXT NOT NULL,"
+            " agent TEXT, label TEXT, payload TEXT NOT NULL, ts REAL NOT NULL,"
+            " PRIMARY KEY (run_id, seq))"
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def create(self, run_id: str) -> None:
+        self._conn().execute(
+            "INSERT OR IGNORE INTO progress_runs (run_id, created_at) VALUES (?, ?)",
+            (run_id, time.time()),
+        )
+
+    def is_active(self, run_id: str) -> bool:
+        row = self._conn().execute(
+            "SELECT 1 FROM progress_runs WHERE run_id = ?", (run_id,)
+        ).fetchone()
+        return row is not None
+
+    def publish(self, run_id: str, event: ProgressEvent) -> Optional[int]:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if conn.execute("SELECT 1 FROM progress_runs WHERE run_id = ?", (run_id,)).fetchone() is None:
+                conn.execute("COMMIT")
+                return None
+            (seq,) = conn.execute(
+                "SELECT COALESCE(MAX(seq), 0) + 1 FROM progress_events WHERE run_id = ?",
+                (run_id,),
+            ).fetchone()
+            conn.execute(
+                "INSERT INTO progress_events (run_id, seq, type, agent, label, payload, ts)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (run_id, seq, event.type, event.agent, event.label,
+                 json.dumps(event.payload, default=str), event.ts),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        event.offset = seq
+        return seq
+
+    def read(self, run_id: str, after: int = 0, wait: float = 0.0) -> Optional[list[ProgressEvent]]:
+        conn = self._conn()
+        deadline = time.monotonic() + wait
+        while True:
+            rows = conn.execute(
+                "SELECT seq, type, agent, label, payload, ts FROM progress_events"
+                " WHERE run_id = ? AND seq > ? ORDER BY seq",
+                (run_id, after),
+            ).fetchall()
+            if rows:
+                return [
+                    ProgressEvent(type=t, agent=a, label=lb, payload=json.loads(p), ts=ts, offset=seq)
+                    for seq, t, a, lb, p, ts in rows
+                ]
+            if not self.is_active(run_id):
+                return None
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return []
+            time.sleep(min(self.poll_secs, remaining))
 
+    def finish(self, run_id: str) -> None:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("DELETE FROM progress_events WHERE run_id = ?", (run_id,))
+        conn.execute("DELETE FROM progress_runs WHERE run_id = ?", (run_id,))
+        conn.execute("COMMIT")
+
+    def sweep(self, older_than: float) -> int:
+        cutoff = time.time() - older_than
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        stale = [r for (r,) in conn.execute(
+            "SELECT run_id FROM progress_runs WHERE created_at < ?", (cutoff,))]
+        for rid in stale:
+            conn.execute("DELETE FROM progress_events WHERE run_id = ?", (rid,))
+            conn.execute("DELETE FROM progress_runs WHERE run_id = ?", (rid,))
+        conn.execute("COMMIT")
+        return len(stale)
+
+    def active_run_ids(self) -> list[str]:
+        return [r for (r,) in self._conn().execute("SELECT run_id FROM progress_runs")]
+
+
+_bus: Optional[ProgressBus] = None
+_bus_lock = threading.Lock()
+
+
+def _get_bus() -> ProgressBus:
+    """The process-wide bus, built from PROGRESS_BACKEND on first use."""
+    global _bus
+    with _bus_lock:
+        if _bus is None:
+            backend = os.getenv("PROGRESS_BACKEND", "memory").lower()
+            if backend == "sqlite":
+                _bus = SQLiteBus(
+                    os.getenv("PROGRESS_DB_PATH", DEFAULT_DB_PATH),
+                    poll_secs=float(os.getenv("PROGRESS_POLL_SECS", "0.1")),
+                )
+            else:
+                if backend != "memory":
+                    logger.warning(f"Unknown PROGRESS_BACKEND {backend!r}; using memory")
+                _bus = InProcessBus()
+        return _bus
+
+
+def set_bus(bus: Optional[ProgressBus]) -> None:
+    """Install a backend (tests, custom brokers); None re-reads the env on next use."""
+    global _bus
+    with _bus_lock:
+        _bus = bus
+
+
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
 
 def new_run_id() -> str:
     """Short opaque id for a single run. Callers pass this through AgentState."""
     return uuid.uuid4().hex[:16]
 
 
-def create(run_id: str) -> "queue.SimpleQueue[ProgressEvent]":
-    """Allocate a queue for a run. Idempotent: returns the existing queue if any."""
-    return _registry.create(run_id)
+def create(run_id: str) -> str:
+    """Open a log for a run (idempotent) and sweep abandoned ones. Returns run_id."""
+    bus = _get_bus()
+    swept = bus.sweep(RUN_RETENTION_SECS)
+    if swept:
+        logger.info(f"progress: swept {swept} abandoned run(s)")
+    bus.create(run_id)
+    return run_id
+
+
+def is_active(run_id: Optional[str]) -> bool:
+    """True while ``run_id`` has an open log (on any worker, for shared backends)."""
+    return bool(run_id) and _get_bus().is_active(run_id)
 
 
 def emit(run_id: Optional[str], type: str, **fields: Any) -> None:
     """
-    Push an event onto a run's queue, no-op if run_id is missing or unknown.
+    Append an event to a run's log, no-op if run_id is missing or unknown.
 
     Agent code calls this without caring whether streaming is enabled; the
     no-op behavior keeps non-streaming code paths (tests, CLI) clean.
     """
     if not run_id:
         return
-    q = _registry.get(run_id)
-    if q is None:
-        # Run was finished before the agent caught up; not worth raising.
-        return
     agent = fields.pop("agent", None)
     label = fields.pop("label", None)
-    q.put(ProgressEvent(type=type, agent=agent, label=label, payload=fields))
+    try:
+        # None means the run was finished before the agent caught up.
+        _get_bus().publish(run_id, ProgressEvent(type=type, agent=agent, label=label, payload=fields))
+    except Exception as e:
+        # Progress is best-effort; never fail an agent over it.
+        logger.warning(f"progress: emit {type} for {run_id} failed — {e}")
+
+
+def read(run_id: str, after: int = 0) -> list[ProgressEvent]:
+    """Events logged so far after offset ``after`` (non-blocking)."""
+    return _get_bus().read(run_id, after) or []
 
 
 def drain(
     run_id: str,
     timeout: float = DEFAULT_RUN_TIMEOUT_SECS,
     poll_interval: float = POLL_INTERVAL_SECS,
+    after: int = 0,
 ) -> Iterator[ProgressEvent]:
     """
-    Yield events from a run's queue until a terminal ``done`` or ``error``
-    event arrives, or until ``timeout`` seconds elapse without progress.
+    Yield events after offset ``after`` until a terminal ``done`` or
+    ``error`` event arrives, or until ``timeout`` seconds elapse. Yields a
+    ``ping`` after each ``poll_interval`` with no events. Each yielded event
+    carries its ``offset``; pass the last one back as ``after`` to resume.
 
-    Caller is responsible for invoking ``finish(run_id)`` to release the queue.
+    Caller is responsible for invoking ``finish(run_id)`` to release the log.
     """
-    q = _registry.get(run_id)
-    if q is None:
-        return
+    bus = _get_bus()
     deadline = time.time() + timeout
     while True:
-        if time.time() >= deadline:
+        remaining = deadline - time.time()
+        if remaining <= 0:
             yield ProgressEvent(type="error", label="Run timed out")
             return
-        try:
-            evt = q.get(timeout=poll_interval)
-        except queue.Empty:
+        events = bus.read(run_id, after, wait=min(poll_interval, remaining))
+        if events is None:
+            return
+        if not events:
             # Heartbeat — keeps the SSE connection alive across slow agents.
             yield ProgressEvent(type="ping")
             continue
-        yield evt
-        if evt.type in ("done", "error"):
-            return
+        for evt in events:
+            after = evt.offset
+            yield evt
+            if evt.type in TERMINAL_TYPES:
+                return
 
 
 def finish(run_id: str) -> None:
-    """Drop the queue for ``run_id``; safe to call multiple times."""
-    _registry.finish(run_id)
+    """Drop the log for ``run_id``; safe to call multiple times."""
+    _get_bus().finish(run_id)
+
+
+def resume_token(run_id: str, offset: int) -> str:
+    """SSE event id for an event: ``run_id:offset``."""
+    return f"{run_id}:{offset}"
+
+
+def parse_resume_token(token: Optional[str]) -> Optional[tuple[str, int]]:
+    """(run_id, offset) from a Last-Event-ID header, or None if malformed."""
+    if not token or ":" not in token:
+        return None
+    run_id, _, offset = token.strip().rpartition(":")
+    if not run_id or not offset.isdigit():
+        return None
+    return run_id, int(offset)
 
 
 def active_run_ids() -> list[str]:
     """For debugging/tests only."""
-    with _registry._lock:
-        return list(_registry._queues.keys())
+    return _get_bus().active_run_ids()
@@ -0,0 +1,207 @@
+"""
+In-flight deduplication of identical streaming pipeline runs.
+
+Why this exists
+---------------
+Demo audiences click the same tile prompt at the same moment, users
+double-click Send, and a reconnecting browser can re-submit a query that is
+still running. Each of those used to execute the whole LangGraph pipeline
+again: the same research, the same LLM calls, the same plan.
+
+Identical requests now share one run. The first request for a key is the
+leader and executes the pipeline; any request with the same key that
+arrives while the leader is running becomes a follower:
+
+* Progress. The follower replays the leader's progress events (from the
+  start of the run, then live) into its own run log, so its browser shows
+  the full agent trace.
+* Result. When the leader finishes, every follower gets a copy of the final
+  state dict, or the leader's exception re-raised. A follower waits at most
+  the progress run timeout, then gives up with FollowTimeout.
+
+The key covers everything that changes the output: the normalized query
+(case and whitespace folded), org namespace, output format, a content hash
+of the uploaded file, and the A/B, plan-mode and provider options. Only
+in-flight runs are shared; once the leader finishes, the next identical
+request runs fresh. Set QUERY_COALESCING_ENABLED=0 to disable.
+
+The streaming view registers with lead_or_follow() before it submits to the
+run scheduler, so only the leader takes a queue slot and a pool worker;
+followers relay on their own thread. A leader the scheduler turns away
+completes its flight with the QueueFull error.
+
+The table is per process, like the run scheduler's pool.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Optional
+
+from . import progress
+
+logger = logging.getLogger(__name__)
+
+# How often a follower copies new leader events into its own log.
+RELAY_INTERVAL_SECS = 0.25
+
+# Leader events that describe the leader's own connection, not the run.
+_NOT_RELAYED = ("queued",) + progress.TERMINAL_TYPES
+
+
+def coalescing_enabled() -> bool:
+    """Read at call time so tests and ops can flip it without a restart."""
+    return os.getenv("QUERY_COALESCING_ENABLED", "1").lower() not in ("0", "false", "no")
+
+
+# ---------------------------------------------------------------------------
+# Keys
+# ---------------------------------------------------------------------------
+
+_digest_lock = threading.Lock()
+_digests: dict[str, tuple[tuple, str]] = {}
+
+
+def file_digest(path: str) -> str:
+    """sha256 of a file's contents, memoized until its mtime or size changes."""
+    path = os.path.abspath(path)
+    try:
+        st = os.stat(path)
+    except OSError:
+        return "missing:" + path
+    sig = (st.st_mtime_ns, st.st_size)
+    with _digest_lock:
+        cached = _digests.get(path)
+        if cached is not None and cached[0] == sig:
+            return cached[1]
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    digest = h.hexdigest()
+    with _digest_lock:
+        _digests[path] = (sig, digest)
+    return digest
+
+
+def normalize_query(query: str) -> str:
+    """Fold case and whitespace so trivially different submissions match."""
+    return " ".join((query or "").casefold().split())
+
+
+def make_key(
+    query: str,
+    org_namespace: str,
+    output_format: str = "markdown",
+    uploaded_file_path: Optional[str] = None,
+    ab_test: bool = False,
+    plan_mode: Optional[str] = None,
+    llm_provider: Optional[str] = None,
+) -> str:
+    """Stable key for a run request; equal keys produce the same output."""
+    parts = {
+        "query": normalize_query(query),
+        "org": org_namespace or "general",
+        "format": output_format or "markdown",
+        "upload": file_digest(uploaded_file_path) if uploaded_file_path else None,
+        "ab_test": bool(ab_test),
+        "plan_mode": plan_mode or None,
+        "provider": llm_provider or None,
+    }
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+# ---------------------------------------------------------------------------
+# In-flight table
+# ---------------------------------------------------------------------------
+
+class FollowTimeout(TimeoutError):
+    """The leader a follower joined did not finish within the run timeout."""
+
+
+class Flight:
+    """One leader run and the outcome its followers wait for."""
+
+    def __init__(self, key: str, run_id: str) -> None:
+        self.key = key
+        self.run_id = run_id          # the leader's progress run
+        self.done = threading.Event()
+        self.result: Optional[dict] = None
+        self.error: Optional[BaseException] = None
+        self.followers = 0
+
+
+_lock = threading.Lock()
+_flights: dict[str, Flight] = {}
+_stats = {"led": 0, "followed": 0}
+
+
+def lead_or_follow(key: str, run_id: str) -> tuple[Flight, bool]:
+    """
+    Register ``run_id`` as the leader for ``key``, or return the existing
+    flight. The bool is True when the caller is the leader and must call
+    ``complete()`` when the run ends.
+    """
+    with _lock:
+        flight = _flights.get(key)
+        if flight is None:
+            flight = _flights[key] = Flight(key, run_id)
+            _stats["led"] += 1
+            return flight, True
+        flight.followers += 1
+        _stats["followed"] += 1
+        return flight, False
+
+
+def complete(flight: Flight, result: Optional[dict] = None, error: Optional[BaseException] = None) -> None:
+    """Publish the leader's outcome and close the flight to new followers."""
+    with _lock:
+        if _flights.get(flight.key) is flight:
+            del _flights[flight.key]
+    flight.result = result
+    flight.error = error
+    flight.done.set()
+    if flight.followers:
+        logger.info(f"run_coalescer: run {flight.run_id} served {flight.followers} follower(s)")
+
+
+def _relay(source: str, target: str, after: int) -> int:
+    """Copy ``source`` events after ``after`` into ``target``; returns the new offset."""
+    for evt in progress.read(source, after):
+        after = evt.offset
+        if evt.type not in _NOT_RELAYED:
+            progress.emit(target, evt.type, agent=evt.agent, label=evt.label, **evt.payload)
+    return after
+
+
+def follow(flight: Flight, run_id: str, timeout: Optional[float] = None) -> dict:
+    """
+    Mirror the leader's progress into ``run_id`` until it finishes, then
+    return a copy of its final state (or re-raise its exception). Raises
+    FollowTimeout if the leader is still running after ``timeout`` seconds
+    (default progress.DEFAULT_RUN_TIMEOUT_SECS), by which time the
+    follower's own stream has given up on it.
+    """
+    progress.emit(run_id, "agent_start", agent="manager",
+                  label="Joining an identical request already in progress")
+    deadline = time.monotonic() + (progress.DEFAULT_RUN_TIMEOUT_SECS if timeout is None else timeout)
+    after = 0
+    while not flight.done.wait(RELAY_INTERVAL_SECS):
+        after = _relay(flight.run_id, run_id, after)
+        if time.monotonic() >= deadline:
+            raise FollowTimeout(f"run {flight.run_id} did not finish in time")
+    _relay(flight.run_id, run_id, after)
+    if flight.error is not None:
+        raise flight.error
+    # Shallow copy: callers add per-request keys, nested values are read-only.
+    return dict(flight.result or {})
+
+
+def coalescer_stats() -> dict[str, Any]:
+    """Process-lifetime leaders and followers, and runs in flight now."""
+    with _lock:
+        return {**_stats, "in_flight": len(_flights)}
@@ -0,0 +1,284 @@
+"""
+Bounded scheduler for streaming pipeline runs.
+
+Why this exists
+---------------
+``stream_query_view`` used to start a fresh daemon thread per query. A plan
+run holds a LangGraph state, LLM clients and often a pandas voter file, so a
+burst of requests on a 512 MB instance ran them all at once until the
+process was OOM-killed. Runs now go through one process-wide scheduler:
+
+* Fixed pool. At most RUN_WORKERS pipelines execute at a time (default 2).
+* Bounded queue. At most RUN_QUEUE_MAX runs wait (default 6), and at most
+  RUN_QUEUE_PER_ORG_MAX of them from any one organization (default 3).
+  Past either limit ``submit()`` raises ``QueueFull`` straight away, with a
+  ``retry_after`` estimate, so the view can turn the user away before any
+  work or memory is committed.
+* Fair share. Waiting runs are kept per organization and dispatched
+  round-robin across organizations, so one tenant's batch of plans waits
+  behind its own runs, not in front of everyone else's.
+* Visible. While a run waits, its position is published on the progress
+  bus as a ``queued`` event and refreshed every time the queue moves.
+* Bounded wait. The client's stream gives up after the progress run
+  timeout (progress.DEFAULT_RUN_TIMEOUT_SECS), counted from submission, so
+  ``submit()`` also refuses a run whose estimated wait is longer than that.
+  A run whose progress log is gone by the time a worker reaches it (its
+  stream timed out or was finished) or that has waited past the timeout is
+  dropped instead of executed, and its ``on_skip`` callback runs.
+
+The limits are per process; with gunicorn's 2 workers the host runs at most
+2 x RUN_WORKERS pipelines.
+
+Usage from the streaming view:
+
+    try:
+        run_scheduler.get_scheduler().submit(org_namespace, run_id, work)
+    except run_scheduler.QueueFull as full:
+        ...tell the client to retry in full.retry_after seconds...
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+from . import progress
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 2
+DEFAULT_QUEUE_MAX = 6
+DEFAULT_QUEUE_PER_ORG_MAX = 3
+# Used for the retry hint until a few runs have completed in this process.
+DEFAULT_RUN_SECS = 60.0
+
+
+class QueueFull(Exception):
+    """The scheduler cannot accept another run; retry after ``retry_after`` seconds."""
+
+    def __init__(self, message: str, retry_after: int) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+@dataclass
+class _Job:
+    org: str
+    run_id: str
+    fn: Callable[[], None]
+    on_skip: Optional[Callable[[], None]] = None
+    # Whether the run had a progress log at submission; only those runs can
+    # be abandoned by their client.
+    tracked: bool = False
+    submitted: float = field(default_factory=time.monotonic)
+
+    def abandoned(self) -> bool:
+        """The client stopped waiting: its log is gone or its wait timed out."""
+        if not self.tracked:
+            return False
+        waited = time.monotonic() - self.submitted
+        return waited >= progress.DEFAULT_RUN_TIMEOUT_SECS or not progress.is_active(self.run_id)
+
+
+class RunScheduler:
+    """Fixed worker pool over per-organization FIFO queues, served round-robin."""
+
+    def __init__(
+        self,
+        workers: int = DEFAULT_WORKERS,
+        max_queued: int = DEFAULT_QUEUE_MAX,
+        max_queued_per_org: int = DEFAULT_QUEUE_PER_ORG_MAX,
+    ) -> None:
+        self.workers = max(1, workers)
+        self.max_queued = max(0, max_queued)
+        self.max_queued_per_org = max(1, max_queued_per_org)
+        self._cond = threading.Condition()
+        self._queues: dict[str, deque[_Job]] = {}
+        self._rotation: deque[str] = deque()   # orgs with waiting runs, next first
+        self._running = 0
+        self._durations: deque[float] = deque(maxlen=20)
+        self._threads: list[threading.Thread] = []
+        self._stopped = False
+
+    # -- admission ----------------------------------------------------------
+
+    def submit(self, org: str, run_id: str, fn: Callable[[], None],
+               on_skip: Optional[Callable[[], None]] = None) -> int:
+        """
+        Queue ``fn`` to run for ``org``. Returns the number of runs ahead of
+        it (0 when it starts immediately). Raises ``QueueFull`` when the
+        global or per-organization limit is reached, or when the wait would
+        outlast the progress run timeout. ``on_skip`` is called instead of
+        ``fn`` if the run is abandoned while it waits.
+        """
+        org = org or "general"
+        tracked = progress.is_active(run_id)
+        with self._cond:
+            self._ensure_workers()
+            queued = sum(len(q) for q in self._queues.values())
+            idle = self._running + queued < self.workers
+            if not idle:
+                # Submitted runs a free worker has not picked up yet do not wait.
+                waiting = queued - max(0, self.workers - self._running)
+                if waiting >= self.max_queued:
+                    raise QueueFull("All run slots are busy", self._retry_after(waiting))
+                if len(self._queues.get(org, ())) >= self.max_queued_per_org:
+                    raise QueueFull(
+                        "This organization already has the maximum number of queued runs",
+                        self._retry_after(len(self._queues[org])),
+                    )
+                retry_after = self._retry_after(waiting)
+                if retry_after > progress.DEFAULT_RUN_TIMEOUT_SECS:
+                    raise QueueFull("The wait would outlast the run timeout", retry_after)
+            if org not in self._queues:
+                self._queues[org] = deque()
+                self._rotation.append(org)
+            self._queues[org].append(_Job(org, run_id, fn, on_skip, tracked))
+            self._cond.notify()
+            order = self._waiting()
+        if idle:
+            return 0
+        self._announce(order)
+        return next((i for i, job in enumerate(order) if job.run_id == run_id), 0)
+
+    def _retry_after(self, waiting: int) -> int:
+        """Rough seconds until a slot frees up for a run behind ``waiting`` others."""
+        avg = sum(self._durations) / len(self._durations) if self._durations else DEFAULT_RUN_SECS
+        return max(5, int(avg * (waiting // self.workers + 1)))
+
+    # -- dispatch -----------------------------------------------------------
+
+    def _order(self) -> list[_Job]:
+        """Waiting jobs in the order they will be dispatched (caller holds the lock)."""
+        queues = {org: list(self._queues[org]) for org in self._rotation}
+        rotation = deque(self._rotation)
+        order: list[_Job] = []
+        while rotation:
+            org = rotation.popleft()
+            order.append(queues[org].pop(0))
+            if queues[org]:
+                rotation.append(org)
+        return order
+
+    def _waiting(self) -> list[_Job]:
+        """
+        Jobs that will actually wait, in dispatch order: the head of the
+        order is skipped when free workers are about to pick it up
+        (caller holds the lock).
+        """
+        return self._order()[max(0, self.workers - self._running):]
+
+    def _announce(self, order: list[_Job]) -> None:
+        """Publish every waiting run's position on the progress bus."""
+        for ahead, job in enumerate(order):
+            label = "Waiting for a free slot" if ahead == 0 else f"Queued — {ahead} ahead"
+            progress.emit(job.run_id, "queued", label=label, position=ahead + 1)
+
+    def _next_job(self) -> Optional[_Job]:
+        """Block until a job is available; round-robin across organizations."""
+        with self._cond:
+            while not self._rotation and not self._stopped:
+                self._cond.wait()
+            if self._stopped:
+                return None
+            org = self._rotation.popleft()
+            queue = self._queues[org]
+            job = queue.popleft()
+            if queue:
+                self._rotation.append(org)
+            else:
+                del self._queues[org]
+            self._running += 1
+            order = self._waiting()
+        self._announce(order)
+        return job
+
+    def _work(self) -> None:
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            if job.abandoned():
+                self._skip(job)
+                continue
+            started = time.monotonic()
+            try:
+                job.fn()
+            except Exception as e:
+                # The job owns its own error reporting; this only keeps the
+                # worker alive if it slips.
+                logger.exception(f"run_scheduler: run {job.run_id} raised — {e}")
+            finally:
+                with self._cond:
+                    self._running -= 1
+                    self._durations.append(time.monotonic() - started)
+
+    def _skip(self, job: _Job) -> None:
+        """Release the slot of a run nobody is waiting for any more."""
+        logger.info(f"run_scheduler: dropping run {job.run_id} for {job.org}; its client stopped waiting")
+        try:
+            if job.on_skip is not None:
+                job.on_skip()
+        except Exception as e:
+            logger.exception(f"run_scheduler: on_skip for {job.run_id} raised — {e}")
+        finally:
+            with self._cond:
+                self._running -= 1
+
+    def _ensure_workers(self) -> None:
+        """Start the pool on first use (caller holds the lock)."""
+        while len(self._threads) < self.workers:
+            t = threading.Thread(
+                target=self._work, name=f"run-worker-{len(self._threads)}", daemon=True
+            )
+            t.start()
+            self._threads.append(t)
+
+    # -- lifecycle ----------------------------------------------------------
+
+    def shutdown(self) -> None:
+        """Stop idle workers and drop waiting runs; running ones finish."""
+        with self._cond:
+            self._stopped = True
+            self._queues.clear()
+            self._rotation.clear()
+            self._cond.notify_all()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "workers": self.workers,
+                "running": self._running,
+                "queued": sum(len(q) for q in self._queues.values()),
+                "queued_by_org": {org: len(q) for org, q in self._queues.items()},
+            }
+
+
+_scheduler: Optional[RunScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> RunScheduler:
+    """The process-wide scheduler, sized from the environment on first use."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = RunScheduler(
+                workers=int(os.getenv("RUN_WORKERS", DEFAULT_WORKERS)),
+                max_queued=int(os.getenv("RUN_QUEUE_MAX", DEFAULT_QUEUE_MAX)),
+                max_queued_per_org=int(os.getenv("RUN_QUEUE_PER_ORG_MAX", DEFAULT_QUEUE_PER_ORG_MAX)),
+            )
+        return _scheduler
+
+
+def reset_scheduler() -> None:
+    """Shut down the current scheduler; the next call re-reads the env (tests)."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is not None:
+            _scheduler.shutdown()
+        _scheduler = None
@@ -34,4 +34,6 @@ urlpatterns = [
     path("api/conv/reorder/",          views.reorder_conv_view, name="conv_reorder"),
     path("api/conv/<str:conv_id>/rename/", views.rename_conv_view,  name="conv_rename"),
     path("api/conv/<str:conv_id>/delete/", views.delete_conv_view,  name="conv_delete"),
+    # Read-only pager for older messages (GET ?before=<message id>).
+    path("api/conv/<str:conv_id>/messages/", views.conv_messages_view, name="conv_messages"),
 ]
@@ -0,0 +1,274 @@
+"""
+chat/utils/census_cache.py
+
+Tiered response cache for Census API calls made through
+``data_fetcher.census_get_json()``.
+
+One research run asks for the same block-group tables several times: the
+demographics fetch, the Decennial VAP lookup, the district block-group list
+and the tract education weights all hit api.census.gov with identical
+requests, and the streaming view can run two or more of those in parallel
+threads. This module sits in front of the HTTP call with three layers:
+
+Memory tier
+-----------
+A process-local LRU of parsed JSON (CENSUS_CACHE_MEMORY_ENTRIES, default
+64). Values are shared between callers and must be treated as read-only.
+
+Disk tier
+---------
+One table in ``data/census_cache/census.sqlite3`` (CENSUS_CACHE_PATH), kept
+by the shared SQLiteResponseStore (response_store.py). Rows older than
+CENSUS_CACHE_TTL_HOURS (default 24) are misses and deleted on read; past
+CENSUS_CACHE_MAX_ENTRIES (default 500) the least recently used rows are
+evicted on write. SQLite errors degrade to a miss.
+
+Single-flight
+-------------
+Concurrent callers asking for the same key while a fetch is in progress
+wait for that fetch and share its result (or its exception) instead of
+issuing their own request.
+
+The cache key is sha256 over the URL and the sorted query parameters, minus
+the API key, so rotating CENSUS_API_KEY does not cold-start the cache.
+
+Set CENSUS_CACHE_ENABLED=0 to bypass all three layers.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+from .response_store import SQLiteResponseStore
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------------------------
+# Config
+# ---------------------------------------------------------------------------
+
+DEFAULT_CACHE_PATH = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "../../data/census_cache/census.sqlite3")
+)
+DEFAULT_TTL_HOURS      = 24
+DEFAULT_MAX_ENTRIES    = 500
+DEFAULT_MEMORY_ENTRIES = 64
+
+# Query parameters that identify the caller, not the data.
+_UNKEYED_PARAMS = {"key"}
+
+
+def cache_enabled() -> bool:
+    """Read at call time so tests and ops can flip it without a restart."""
+    return os.getenv("CENSUS_CACHE_ENABLED", "1").lower() not in ("0", "false", "no")
+
+
+def make_cache_key(url: str, params: Optional[dict]) -> str:
+    """SHA-256 of the URL + sorted params (API key excluded)."""
+    keyed = {k: v for k, v in (params or {}).items() if k not in _UNKEYED_PARAMS}
+    canonical = url + json.dumps(keyed, sort_keys=True, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+# ---------------------------------------------------------------------------
+# Memory tier
+# ---------------------------------------------------------------------------
+
+class _MemoryLRU:
+    """Thread-safe bounded LRU of key -> parsed JSON."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key: str, value: Any) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+# ---------------------------------------------------------------------------
+# Disk tier
+# ---------------------------------------------------------------------------
+
+class CensusResponseCache(SQLiteResponseStore):
+    """Census JSON text keyed by make_cache_key(); rows record the request URL."""
+
+    table = "census_cache"
+    label = "Census cache"
+
+    def __init__(
+        self,
+        path: str,
+        ttl_secs: float = DEFAULT_TTL_HOURS * 3600,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ):
+        super().__init__(path, ttl_secs, max_entries)
+
+
+# ---------------------------------------------------------------------------
+# Single-flight
+# ---------------------------------------------------------------------------
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self) -> None:
+        self.done   = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class _SingleFlight:
+    """Collapse concurrent calls for the same key into one execution."""
+
+    def __init__(self) -> None:
+        self._lock  = threading.Lock()
+        self._calls: dict[str, _Call] = {}
+
+    def do(self, key: str, fn: Callable[[], Any]) -> tuple[Any, bool]:
+        """Run ``fn`` once per in-flight key. Returns (result, shared)."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.result, False
+
+
+# ---------------------------------------------------------------------------
+# Tiered lookup
+# ---------------------------------------------------------------------------
+
+_stats_lock = threading.Lock()
+_stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "coalesced": 0}
+
+_memory: Optional[_MemoryLRU] = None
+_disk: Optional[CensusResponseCache] = None
+_flight = _SingleFlight()
+_init_lock = threading.Lock()
+
+
+def _count(name: str) -> None:
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def _tiers() -> tuple[_MemoryLRU, CensusResponseCache]:
+    """Process-wide tiers, configured from the environment on first use."""
+    global _memory, _disk
+    with _init_lock:
+        if _memory is None:
+            _memory = _MemoryLRU(
+                int(os.getenv("CENSUS_CACHE_MEMORY_ENTRIES", DEFAULT_MEMORY_ENTRIES))
+            )
+        if _disk is None:
+            _disk = CensusResponseCache(
+                path=os.getenv("CENSUS_CACHE_PATH", DEFAULT_CACHE_PATH),
+                ttl_secs=float(os.getenv("CENSUS_CACHE_TTL_HOURS", DEFAULT_TTL_HOURS)) * 3600,
+                max_entries=int(os.getenv("CENSUS_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+            )
+        return _memory, _disk
+
+
+def reset_cache() -> None:
+    """Drop the tiers and counters so the next call re-reads the environment."""
+    global _memory, _disk
+    with _init_lock:
+        _memory = None
+        _disk = None
+    with _stats_lock:
+        for name in _stats:
+            _stats[name] = 0
+
+
+def cache_stats() -> dict:
+    """Process-lifetime counters plus current tier sizes."""
+    memory, disk = _tiers()
+    with _stats_lock:
+        out = dict(_stats)
+    out["memory_entries"] = len(memory)
+    out["disk_entries"] = disk.entries()
+    return out
+
+
+def cached_fetch(url: str, params: Optional[dict], fetch: Callable[[], Any]) -> Any:
+    """
+    Return parsed JSON for (url, params): memory, then disk, then ``fetch()``.
+    Concurrent misses for the same key share one ``fetch()`` call. Errors
+    from ``fetch`` propagate to every waiting caller and are never cached.
+    """
+    if not cache_enabled():
+        return fetch()
+
+    memory, disk = _tiers()
+    key = make_cache_key(url, params)
+
+    data = memory.get(key)
+    if data is not None:
+        _count("memory_hits")
+        return data
+
+    def _load():
+        # Re-check inside the flight: another leader may have just finished.
+        data = memory.get(key)
+        if data is not None:
+            return data
+        body = disk.get(key)
+        if body is not None:
+            try:
+                data = json.loads(body)
+                _count("disk_hits")
+                memory.put(key, data)
+                return data
+            except ValueError:
+                logger.warning(f"Census cache entry {key[:12]} is not valid JSON; refetching")
+        data = fetch()
+        _count("misses")
+        memory.put(key, data)
+        disk.put(key, json.dumps(data), source=url)
+        return data
+
+    data, shared = _flight.do(key, _load)
+    if shared:
+        _count("coalesced")
+    return data
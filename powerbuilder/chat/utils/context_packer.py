@@ -0,0 +1,380 @@
+"""
+chat/utils/context_packer.py
+
+Fits the research memos and structured-data blocks of an LLM prompt to a
+token budget.
+
+The messaging and synthesis prompts used to concatenate every memo and
+every structured block the run produced, so prompt size (and cost, and time
+to first token) grew with each agent that ran. pack_context() measures the
+context in the active provider's tokens and trims it to the budget for that
+call, dropping the least useful material first.
+
+Token counts
+------------
+OpenAI prompts are counted with tiktoken (o200k_base, the gpt-4o encoding)
+when it is installed. Other providers do not ship a local tokenizer, so
+their counts use a per-provider characters-per-token ratio, rounded up; the
+ratios lean low so the estimate errs toward over-counting.
+
+Structured data
+---------------
+Structured blocks carry the calculated figures the prompt must cite, so
+they are packed before the unpinned memos. If they would take more than STRUCTURED_SHARE of the
+budget they are collapsed: alignment padding is squeezed out and indented
+sub-rows (breakdown tables, tier lists) are folded onto their header line.
+A block that still does not fit is truncated.
+
+Memos
+-----
+Memos are ranked by relevance to the query (term overlap weighted by how
+rare the term is across the memos) blended with recency (the DATE field of
+the researcher's memo header). Memos are taken in rank order while they
+fit; the first one that does not fit is truncated at a line break if enough
+room is left, and the rest are dropped. Kept memos go back into their
+original order.
+
+Pinned memos (e.g. messaging outputs that the synthesizer must reproduce
+word for word) are never truncated or dropped. Their tokens are reserved
+before anything else is packed: they use the memo part of the budget
+first, and any overflow shrinks the structured share. If the pinned memos
+alone exceed the budget they are still sent whole, so the packed context
+can go over budget in that case.
+
+Budgets
+-------
+context_budget(call) reads CONTEXT_BUDGET_<CALL> (e.g.
+CONTEXT_BUDGET_SYNTHESIS) at call time, falling back to DEFAULT_BUDGETS.
+A budget of 0 disables packing for that call. When everything fits, the
+context is returned unchanged.
+"""
+
+import logging
+import math
+import os
+import re
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Optional
+
+from .llm_config import get_active_provider
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------------------------
+# Config
+# ---------------------------------------------------------------------------
+
+DEFAULT_BUDGETS: dict[str, int] = {
+    "messaging": 8000,
+    "synthesis": 16000,
+}
+
+# Characters per token for providers without a local tokenizer.
+_CHARS_PER_TOKEN: dict[str, float] = {
+    "openai":    4.0,    # only used when tiktoken is unavailable
+    "anthropic": 3.5,
+    "gemini":    4.0,
+    "llama":     3.8,
+    "groq":      3.8,
+    "mistral":   3.5,
+    "cohere":    4.0,
+}
+_DEFAULT_CHARS_PER_TOKEN = 3.5
+
+# Most of the budget the structured blocks may use before they are collapsed.
+STRUCTURED_SHARE = 0.4
+
+# Weight of relevance vs recency in the memo ranking.
+RELEVANCE_WEIGHT = 0.7
+
+# Below this many tokens of room a memo is dropped rather than truncated.
+MIN_PARTIAL_TOKENS = 150
+
+_TRUNCATION_NOTE = "\n[… trimmed to fit the context budget]"
+
+_TERM_RE = re.compile(r"[a-z0-9]{3,}")
+_STOPWORDS = frozenset(
+    "the and for with that this from are was were has have not but you your our "
+    "their they them what which who how why when where will would can could should "
+    "into about than then there these those been being its also more most".split()
+)
+_DATE_RE = re.compile(r"\| DATE: ([^|\n]+?) ---")
+_DATE_FORMATS = ("%Y-%m-%d", "%Y/%m/%d", "%m/%d/%Y", "%B %Y", "%b %Y", "%B %d, %Y", "%Y")
+
+
+def context_budget(call: str) -> int:
+    """Token budget for ``call`` ("messaging", "synthesis"); 0 means unlimited."""
+    raw = os.getenv(f"CONTEXT_BUDGET_{call.upper()}")
+    try:
+        return max(0, int(raw)) if raw is not None else DEFAULT_BUDGETS.get(call, 0)
+    except ValueError:
+        return DEFAULT_BUDGETS.get(call, 0)
+
+
+# ---------------------------------------------------------------------------
+# Token counting
+# ---------------------------------------------------------------------------
+
+_encoding = None
+_encoding_loaded = False
+
+
+def _tiktoken_encoding():
+    """The gpt-4o encoding, or None if tiktoken is missing or cannot load it
+    (it downloads the BPE table on first use). Resolved once per process."""
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        _encoding_loaded = True
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("o200k_base")
+        except Exception as e:
+            logger.info(f"context_packer: tiktoken unavailable ({e}); estimating OpenAI tokens")
+            _encoding = None
+    return _encoding
+
+
+def count_tokens(text: str, provider: Optional[str] = None) -> int:
+    """Tokens ``text`` costs on ``provider`` (default: the active provider)."""
+    if not text:
+        return 0
+    provider = (provider or get_active_provider()).lower()
+    if provider == "openai":
+        encoding = _tiktoken_encoding()
+        if encoding is not None:
+            return len(encoding.encode(text, disallowed_special=()))
+    ratio = _CHARS_PER_TOKEN.get(provider, _DEFAULT_CHARS_PER_TOKEN)
+    return math.ceil(len(text) / ratio)
+
+
+def truncate_to_tokens(text: str, max_tokens: int, provider: Optional[str] = None) -> str:
+    """
+    Cut ``text`` to at most ``max_tokens`` (note included), at a line break
+    where there is one. Returns "" if not even the note fits.
+    """
+    if count_tokens(text, provider) <= max_tokens:
+        return text
+    room = max_tokens - count_tokens(_TRUNCATION_NOTE, provider)
+    if room <= 0:
+        return ""
+    cut = text
+    while cut:
+        # Shrink proportionally to the overshoot, then back off to a line.
+        over = count_tokens(cut, provider) / room
+        if over <= 1:
+            return cut.rstrip() + _TRUNCATION_NOTE
+        end = int(len(cut) / over * 0.95)
+        newline = cut.rfind("\n", 0, end)
+        cut = cut[:newline if newline > end // 2 else end]
+    return ""
+
+
+# ---------------------------------------------------------------------------
+# Structured blocks
+# ---------------------------------------------------------------------------
+
+_EMPTY_FIELD_RE = re.compile(r":\s*(N/A|None|—|-)?\s*$")
+
+
+def compact_block(text: str) -> str:
+    """
+    Collapse a labelled structured block: squeeze alignment padding, drop
+    fields with no value ("Persuadable universe: N/A") and fold indented
+    rows onto the line above them, so
+
+        WIN NUMBER DATA:
+          Win number:          12,000
+          Projected turnout:   50,000
+          Persuadable universe: N/A
+
+    becomes "WIN NUMBER DATA: Win number: 12,000; Projected turnout: 50,000".
+    Deeper levels are parenthesised: "Tiers: High: 10; Mid: (Urban: 4)".
+    """
+    root: list = []                       # [text, children] nodes
+    stack: list[tuple[int, list]] = [(-1, root)]
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        indent = len(line) - len(line.lstrip())
+        body = re.sub(r"\s{2,}", " ", line.strip())
+        if body.startswith("- "):
+            body = body[2:]
+        while stack[-1][0] >= indent:
+            stack.pop()
+        if indent and _EMPTY_FIELD_RE.search(body) and not body.endswith(":"):
+            continue
+        node = [body, []]
+        stack[-1][1].append(node)
+        stack.append((indent, node[1]))
+
+    def render(node, top: bool) -> str:
+        body, children = node
+        if not children:
+            return body
+        joined = "; ".join(render(c, False) for c in children)
+        return f"{body} {joined}" if top and body.endswith(":") else f"{body} ({joined})"
+
+    return "\n".join(render(n, True) for n in root)
+
+
+# ---------------------------------------------------------------------------
+# Memo ranking
+# ---------------------------------------------------------------------------
+
+def _terms(text: str) -> list[str]:
+    return [t for t in _TERM_RE.findall(text.lower()) if t not in _STOPWORDS]
+
+
+def memo_date(memo: str) -> Optional[datetime]:
+    """The DATE field of a researcher memo header, if it parses."""
+    match = _DATE_RE.search(memo)
+    if not match:
+        return None
+    raw = match.group(1).strip()
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(raw, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def rank_memos(memos: list[str], query: str, now: Optional[datetime] = None) -> list[float]:
+    """
+    Score each memo in [0, 1]: RELEVANCE_WEIGHT × query-term overlap
+    (idf-weighted, normalised to the best memo) plus the rest × recency
+    (1.0 for this year, halving every two years; undated memos get 0.25).
+    """
+    now = now or datetime.now()
+    query_terms = set(_terms(query))
+    memo_terms = [set(_terms(m)) for m in memos]
+    n = len(memos)
+
+    relevance = []
+    for terms in memo_terms:
+        score = 0.0
+        for term in query_terms & terms:
+            df = sum(1 for other in memo_terms if term in other)
+            score += math.log(1 + n / df)
+        relevance.append(score)
+    top = max(relevance, default=0.0) or 1.0
+
+    scores = []
+    for memo, rel in zip(memos, relevance):
+        dated = memo_date(memo)
+        if dated is None:
+            recency = 0.25
+        else:
+            years = max(0.0, (now - dated).days / 365.25)
+            recency = 0.5 ** (years / 2)
+        scores.append(RELEVANCE_WEIGHT * rel / top + (1 - RELEVANCE_WEIGHT) * recency)
+    return scores
+
+
+# ---------------------------------------------------------------------------
+# Packing
+# ---------------------------------------------------------------------------
+
+@dataclass
+class PackedContext:
+    research: str                     # kept memos, "\n\n"-joined, original order
+    blocks: list[str]                 # structured blocks, possibly collapsed
+    budget: int
+    tokens: int                       # tokens in research + blocks after packing
+    dropped_tokens: int               # tokens removed by packing
+    dropped_memos: int = 0            # memos left out entirely
+    truncated: list[int] = field(default_factory=list)  # indices of cut memos
+    compacted: bool = False           # structured blocks were collapsed
+
+    @property
+    def trimmed(self) -> bool:
+        return self.dropped_tokens > 0
+
+
+def pack_context(
+    memos: list[str],
+    blocks: list[str],
+    *,
+    budget: int,
+    query: str = "",
+    provider: Optional[str] = None,
+    pinned: Optional[Callable[[str], bool]] = None,
+) -> PackedContext:
+    """
+    Fit ``memos`` and structured ``blocks`` into ``budget`` tokens of
+    ``provider`` (default: active provider). See the module docstring for
+    the policy. A budget of 0 returns everything unchanged.
+    """
+    provider = (provider or get_active_provider()).lower()
+    memo_tokens = [count_tokens(m, provider) for m in memos]
+    block_tokens = [count_tokens(b, provider) for b in blocks]
+    total = sum(memo_tokens) + sum(block_tokens)
+
+    if budget <= 0 or total <= budget:
+        return PackedContext(
+            research="\n\n".join(memos), blocks=list(blocks),
+            budget=budget, tokens=total, dropped_tokens=0,
+        )
+
+    # 1. Pinned memos are kept whole and reserved first. They come out of the
+    #    memo part of the budget; whatever does not fit there comes out of
+    #    the structured share.
+    is_pinned = pinned or (lambda _m: False)
+    pinned_idx = [i for i, m in enumerate(memos) if is_pinned(m)]
+    pinned_tokens = sum(memo_tokens[i] for i in pinned_idx)
+    if pinned_tokens > budget:
+        logger.warning(
+            f"context_packer: pinned memos alone take {pinned_tokens} tokens "
+            f"(budget {budget}); sending them whole"
+        )
+
+    # 2. Structured blocks: as-is if they fit their share, else collapsed,
+    #    else truncated to the share.
+    share = max(0, min(int(budget * STRUCTURED_SHARE), budget - pinned_tokens))
+    compacted = False
+    if sum(block_tokens) > share:
+        blocks = [compact_block(b) for b in blocks]
+        block_tokens = [count_tokens(b, provider) for b in blocks]
+        compacted = True
+    if sum(block_tokens) > share:
+        each = share // max(1, len(blocks))
+        blocks = [truncate_to_tokens(b, each, provider) if t > each else b
+                  for b, t in zip(blocks, block_tokens)]
+        block_tokens = [count_tokens(b, provider) for b in blocks]
+
+    # 3. Other memos by rank into what is left.
+    kept: dict[int, str] = {i: memos[i] for i in pinned_idx}
+    remaining = budget - pinned_tokens - sum(block_tokens)
+    scores = rank_memos(memos, query)
+    order = sorted(
+        (i for i in range(len(memos)) if i not in kept),
+        key=lambda i: (-scores[i], i),
+    )
+
+    truncated: list[int] = []
+    for i in order:
+        if memo_tokens[i] <= remaining:
+            kept[i] = memos[i]
+            remaining -= memo_tokens[i]
+        elif remaining >= MIN_PARTIAL_TOKENS:
+            cut = truncate_to_tokens(memos[i], remaining, provider)
+            if cut:
+                kept[i] = cut
+                truncated.append(i)
+                remaining -= count_tokens(cut, provider)
+
+    research = "\n\n".join(kept[i] for i in sorted(kept))
+    tokens = sum(count_tokens(kept[i], provider) for i in kept) + sum(block_tokens)
+    packed = PackedContext(
+        research=research, blocks=blocks, budget=budget, tokens=tokens,
+        dropped_tokens=max(0, total - tokens),
+        dropped_memos=len(memos) - len(kept), truncated=sorted(truncated),
+        compacted=compacted,
+    )
+    logger.info(
+        f"context_packer: {total} → {tokens} tokens (budget {budget}, {provider}); "
+        f"dropped {packed.dropped_tokens} tokens, {packed.dropped_memos} memo(s), "
+        f"truncated {len(truncated)}, structured {'collapsed' if compacted else 'kept'}"
+    )
+    return packed
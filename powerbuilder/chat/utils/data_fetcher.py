@@ -1,13 +1,12 @@
 # powerbuilder/chat/utils/data_fetcher.py
 #
-# Cache configuration (add to .env to enable):
-#   CENSUS_CACHE_ENABLED=true
+# Census responses are cached by default (see census_cache.py); set
+#   CENSUS_CACHE_ENABLED=0
+# to always hit the API. FEC totals are cached the same way (fec_client.py,
+# FEC_CACHE_ENABLED=0 to bypass).
 #
-import hashlib
-import json
 import logging
 import os
-import time
 
 import requests
 from dotenv import load_dotenv
@@ -19,6 +18,7 @@ from tenacity import (
     wait_exponential,
 )
 
+from . import census_cache, fec_client
 from .census_vars import (
     VOTER_DEMOGRAPHICS,
     RACE_TABLES,
@@ -77,67 +77,21 @@ def _census_get(url: str, params: dict = None, timeout: int = 30) -> requests.Re
 # Census API response cache
 # ---------------------------------------------------------------------------
 
-_CACHE_DIR     = "data/census_cache"
-_CACHE_MAX_AGE = 86400  # 24 hours in seconds
-
-
-def _cache_enabled() -> bool:
-    return os.getenv("CENSUS_CACHE_ENABLED", "").lower() in ("1", "true", "yes")
-
-
-def _cache_key(url: str, params: dict) -> str:
-    """SHA-256 of the fully-qualified URL + sorted params → hex cache filename."""
-    canonical = url + json.dumps(params or {}, sort_keys=True)
-    return hashlib.sha256(canonical.encode()).hexdigest() + ".json"
-
-
-def _cache_read(key: str):
-    """Return cached data if the file exists and is under 24 h old, else None."""
-    path = os.path.join(_CACHE_DIR, key)
-    try:
-        if not os.path.exists(path):
-            return None
-        if time.time() - os.path.getmtime(path) > _CACHE_MAX_AGE:
-            return None
-        with open(path, encoding="utf-8") as f:
-            data = json.load(f)
-        logger.debug(f"Census cache hit: {key}")
-        return data
-    except Exception as e:
-        logger.warning(f"Census cache read failed ({key}): {e}")
-        return None
-
-
-def _cache_write(key: str, data) -> None:
-    """Write data to the cache directory, creating it if needed."""
-    try:
-        os.makedirs(_CACHE_DIR, exist_ok=True)
-        path = os.path.join(_CACHE_DIR, key)
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(data, f)
-        logger.debug(f"Census cache write: {key}")
-    except Exception as e:
-        logger.warning(f"Census cache write failed ({key}): {e}")
-
-
-def _census_get_json(url: str, params: dict = None, timeout: int = 30):
+def census_get_json(url: str, params: dict = None, timeout: int = 30):
     """
     Cache-aware Census fetch that returns parsed JSON.
-    On cache hit (CENSUS_CACHE_ENABLED=true, file < 24h old) returns cached data.
-    On cache miss: fetches via _census_get (with retry), raises HTTPError for
-    non-2xx responses, writes the result to cache, and returns the JSON data.
+    Served from the tiered cache in census_cache (memory LRU, then SQLite)
+    when possible; concurrent identical requests share one HTTP call. On a
+    miss: fetches via _census_get (with retry), raises HTTPError for non-2xx
+    responses, and caches the parsed result. The returned object may be
+    shared with other callers — do not mutate it.
     """
-    key = _cache_key(url, params) if _cache_enabled() else None
-    if key is not None:
-        cached = _cache_read(key)
-        if cached is not None:
-            return cached
-    response = _census_get(url, params=params, timeout=timeout)
-    response.raise_for_status()
-    data = response.json()
-    if key is not None:
-        _cache_write(key, data)
-    return data
+    def _fetch():
+        response = _census_get(url, params=params, timeout=timeout)
+        response.raise_for_status()
+        return response.json()
+
+    return census_cache.cached_fetch(url, params, _fetch)
 
 
 CENSUS_KEY = os.getenv("CENSUS_API_KEY")
@@ -152,7 +106,7 @@ class DataFetcher:
         """
         url = f"https://api.census.gov/data/{year}/{dataset}/variables.json"
         try:
-            data = _census_get_json(url)
+            data = census_get_json(url)
             variables = data.get("variables", {})
             matches = {
                 k: v['label'] for k, v in variables.items()
@@ -196,7 +150,7 @@ class DataFetcher:
             params["in"] = geo_config["in"]
 
         try:
-            data = _census_get_json(url, params=params)
+            data = census_get_json(url, params=params)
             headers = data[0]
             return [dict(zip(headers, row)) for row in data[1:]]
         except Exception as e:
@@ -297,7 +251,7 @@ class DataFetcher:
             "key": os.getenv("CENSUS_API_KEY"),
         }
         try:
-            data = _census_get_json(url, params=params, timeout=30)
+            data = census_get_json(url, params=params, timeout=30)
             headers = data[0]
             result = {}
             for row in data[1:]:
@@ -400,34 +354,10 @@ class DataFetcher:
         """
         Fetches spending and receipts for a specific race.
         Office types: 'H' (House), 'S' (Senate), 'P' (Presidential)
+        Goes through fec_client: pooled session, timeout, rate limit and a
+        disk cache keyed by (office, state, district, cycle).
         """
-        api_key = os.getenv("FEC_API_KEY")
-        base_url = "https://api.open.fec.gov/v1/candidates/totals/"
-        
-        params = {
-            "api_key": api_key,
-            "cycle": cycle,
-            "state": state,
-            "district": district_number,
-            "office": office_type,
-            "sort": "-receipts"
-        }
-        
-        response = requests.get(base_url, params=params)
-        if response.status_code == 200:
-            raw_data = response.json().get("results", [])
-            # NORMALIZATION: Simplify for the LLM
-            normalized = []
-            for candidate in raw_data:
-                normalized.append({
-                    "name": candidate.get("name"),
-                    "party": candidate.get("party_full"),
-                    "total_receipts": f"${float(candidate.get('receipts') or 0):,.2f}",
-                    "total_disbursements": f"${float(candidate.get('disbursements') or 0):,.2f}",
-                    "cash_on_hand": f"${float(candidate.get('cash_on_hand_end_period') or 0):,.2f}"
-                })
-            return normalized
-        return {"error": "FEC API unreachable"}
+        return fec_client.race_totals(state, district_number, office_type, cycle)
 
 
 
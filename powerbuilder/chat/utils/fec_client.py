@@ -0,0 +1,258 @@
+"""
+chat/utils/fec_client.py
+
+Pooled, rate-limited, cached client for the OpenFEC candidate totals
+endpoint used by DataFetcher.get_district_finances() and the finance
+agent's comparables lookup.
+
+The finance agent averages disbursements over three comparable cycles and,
+when the district has no data, repeats the lookup statewide: up to six
+serial ``requests.get`` calls with no timeout, each opening a fresh TLS
+connection. Past-cycle totals barely change, yet every plan paid for all of
+them again.
+
+Session
+-------
+One ``requests.Session`` per process with a connection pool sized to
+FEC_MAX_WORKERS, so concurrent lookups reuse keep-alive connections.
+Every request carries a (connect, read) timeout of FEC_TIMEOUT_SECS.
+
+Rate limit
+----------
+Requests are spaced at least 1 / FEC_MAX_RPS seconds apart process-wide
+(default 5 per second), well inside OpenFEC's hourly key quota while still
+letting a six-request fan-out finish in about a second.
+
+Cache
+-----
+Normalized results are stored in ``data/fec_cache/fec.sqlite3``
+(FEC_CACHE_PATH) keyed by (office, state, district, cycle), in the shared
+TTL / LRU SQLiteResponseStore (response_store.py). Entries expire after
+FEC_CACHE_TTL_HOURS (default 24). Only successful responses are cached;
+errors are retried on the next call. Concurrent lookups of the same race
+share one request. Set FEC_CACHE_ENABLED=0 to bypass the cache.
+
+Results keep DataFetcher's contract: a list of normalized candidate dicts
+on success, ``{"error": "..."}`` on failure.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .census_cache import _SingleFlight
+from .response_store import SQLiteResponseStore
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------------------------
+# Config
+# ---------------------------------------------------------------------------
+
+FEC_TOTALS_URL = "https://api.open.fec.gov/v1/candidates/totals/"
+
+DEFAULT_CACHE_PATH = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "../../data/fec_cache/fec.sqlite3")
+)
+DEFAULT_TTL_HOURS   = 24
+DEFAULT_MAX_ENTRIES = 2000
+DEFAULT_TIMEOUT     = 10.0
+DEFAULT_MAX_RPS     = 5.0
+DEFAULT_MAX_WORKERS = 6
+
+
+def cache_enabled() -> bool:
+    """Read at call time so tests and ops can flip it without a restart."""
+    return os.getenv("FEC_CACHE_ENABLED", "1").lower() not in ("0", "false", "no")
+
+
+def _timeout() -> float:
+    return float(os.getenv("FEC_TIMEOUT_SECS", DEFAULT_TIMEOUT))
+
+
+def _max_workers() -> int:
+    return max(1, int(os.getenv("FEC_MAX_WORKERS", DEFAULT_MAX_WORKERS)))
+
+
+# ---------------------------------------------------------------------------
+# Session and rate limiter
+# ---------------------------------------------------------------------------
+
+class _RateLimiter:
+    """Spaces calls at least ``1 / rate`` seconds apart across threads."""
+
+    def __init__(self, rate: float) -> None:
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def wait(self) -> None:
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class FECTotalsCache(SQLiteResponseStore):
+    """Normalized race totals as JSON text; rows record the endpoint URL."""
+
+    table = "fec_totals"
+    label = "FEC cache"
+
+
+_session: Optional[requests.Session] = None
+_limiter: Optional[_RateLimiter] = None
+_cache: Optional[FECTotalsCache] = None
+_flight = _SingleFlight()
+_init_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "errors": 0}
+
+
+def _count(name: str) -> None:
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def _client() -> tuple[requests.Session, _RateLimiter, FECTotalsCache]:
+    """Process-wide session, limiter and cache, configured on first use."""
+    global _session, _limiter, _cache
+    with _init_lock:
+        if _session is None:
+            pool = _max_workers()
+            _session = requests.Session()
+            _session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=pool))
+        if _limiter is None:
+            _limiter = _RateLimiter(float(os.getenv("FEC_MAX_RPS", DEFAULT_MAX_RPS)))
+        if _cache is None:
+            _cache = FECTotalsCache(
+                path=os.getenv("FEC_CACHE_PATH", DEFAULT_CACHE_PATH),
+                ttl_secs=float(os.getenv("FEC_CACHE_TTL_HOURS", DEFAULT_TTL_HOURS)) * 3600,
+                max_entries=int(os.getenv("FEC_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+            )
+        return _session, _limiter, _cache
+
+
+def reset_client() -> None:
+    """Drop the session, limiter, cache handle and counters (re-reads env)."""
+    global _session, _limiter, _cache
+    with _init_lock:
+        if _session is not None:
+            _session.close()
+        _session = _limiter = _cache = None
+    with _stats_lock:
+        for name in _stats:
+            _stats[name] = 0
+
+
+def client_stats() -> dict:
+    """Process-lifetime cache hits, misses (HTTP fetches) and errors."""
+    with _stats_lock:
+        return dict(_stats)
+
+
+# ---------------------------------------------------------------------------
+# Fetching
+# ---------------------------------------------------------------------------
+
+def _normalize(raw_data: list) -> list:
+    """Simplify OpenFEC totals rows for the LLM and the finance math."""
+    return [
+        {
+            "name": candidate.get("name"),
+            "party": candidate.get("party_full"),
+            "total_receipts": f"${float(candidate.get('receipts') or 0):,.2f}",
+            "total_disbursements": f"${float(candidate.get('disbursements') or 0):,.2f}",
+            "cash_on_hand": f"${float(candidate.get('cash_on_hand_end_period') or 0):,.2f}",
+        }
+        for candidate in raw_data
+    ]
+
+
+def _fetch(state: str, district: str, office: str, cycle: int):
+    session, limiter, _ = _client()
+    params = {
+        "api_key": os.getenv("FEC_API_KEY"),
+        "cycle": cycle,
+        "state": state,
+        "district": district,
+        "office": office,
+        "sort": "-receipts",
+    }
+    limiter.wait()
+    try:
+        response = session.get(FEC_TOTALS_URL, params=params, timeout=_timeout())
+    except requests.RequestException as e:
+        logger.warning(f"FEC request failed for {office} {state}-{district} {cycle}: {e}")
+        return {"error": "FEC API unreachable"}
+    if response.status_code != 200:
+        logger.warning(f"FEC returned HTTP {response.status_code} for {office} {state}-{district} {cycle}")
+        return {"error": "FEC API unreachable"}
+    try:
+        return _normalize(response.json().get("results", []))
+    except ValueError:
+        logger.warning(f"FEC returned a non-JSON body for {office} {state}-{district} {cycle}")
+        return {"error": "FEC API returned an unreadable response"}
+
+
+def race_totals(state: str, district: str, office: str, cycle: int):
+    """
+    Candidate totals for one race: a list of normalized candidate dicts, or
+    ``{"error": ...}``. Served from the disk cache when possible.
+    """
+    key = f"{office}|{state}|{district}|{cycle}"
+    if not cache_enabled():
+        return _fetch(state, district, office, cycle)
+
+    _, _, cache = _client()
+
+    def _load():
+        body = cache.get(key)
+        if body is not None:
+            try:
+                result = json.loads(body)
+                _count("hits")
+                return result
+            except ValueError:
+                logger.warning(f"FEC cache entry {key} is not valid JSON; refetching")
+        result = _fetch(state, district, office, cycle)
+        if isinstance(result, list):
+            _count("misses")
+            cache.put(key, json.dumps(result), source=FEC_TOTALS_URL)
+        else:
+            _count("errors")
+        return result
+
+    result, _ = _flight.do(key, _load)
+    return result
+
+
+def race_totals_many(races: list[tuple]) -> list:
+    """
+    ``race_totals`` for each (state, district, office, cycle) tuple,
+    fetched concurrently on up to FEC_MAX_WORKERS threads. Results come
+    back in input order; a failure is an ``{"error": ...}`` in its slot.
+    """
+    if not races:
+        return []
+
+    def _one(race):
+        try:
+            return race_totals(*race)
+        except Exception as e:
+            logger.warning(f"FEC lookup {race} failed: {e}")
+            return {"error": str(e)}
+
+    with ThreadPoolExecutor(max_workers=min(_max_workers(), len(races))) as pool:
+        return list(pool.map(_one, races))
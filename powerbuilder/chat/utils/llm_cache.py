@@ -0,0 +1,214 @@
+"""
+chat/utils/llm_cache.py
+
+Persistent response cache for the completion clients handed out by
+``llm_config.get_completion_client()``.
+
+Every run re-sends the same temperature-0 extraction prompts (district,
+budget, precinct parameters) for a query the user has already asked, or
+edited by a word and re-run. Those prompts are deterministic, so the reply
+can be served from a local SQLite file instead of paying for a second call.
+
+What is cached
+--------------
+Only deterministic calls: temperature 0 on a built-in provider. Copywriting
+and routing calls run at 0.3-0.4 and always go to the provider. Custom
+providers (register_custom_provider) are never cached because their
+parameters are opaque to us.
+
+Cache key
+---------
+sha256 over provider + model + parameters + the normalized message list.
+The provider is the *resolved* one, so a request-scoped provider_override
+never reads another provider's answer. Normalization dedents each message
+and strips trailing whitespace, so an f-string prompt re-indented in the
+source still hits.
+
+Storage
+-------
+One table in ``data/llm_cache/responses.sqlite3`` (LLM_CACHE_PATH), kept by
+the shared SQLiteResponseStore (response_store.py). Rows older than
+LLM_CACHE_TTL_HOURS (default 168) are treated as misses and deleted on
+read. When the table grows past LLM_CACHE_MAX_ENTRIES (default 5000) the
+least recently used rows are evicted on write. Any SQLite error degrades to
+a miss; the cache never fails a call.
+
+Counters
+--------
+cache_stats() returns process-lifetime hits / misses plus the current row
+count. Each row also carries its own hit count for offline inspection.
+
+Set LLM_CACHE_ENABLED=0 to bypass the cache entirely.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import textwrap
+import threading
+from typing import Any, Optional
+
+from .response_store import SQLiteResponseStore
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------------------------
+# Config
+# ---------------------------------------------------------------------------
+
+DEFAULT_CACHE_PATH = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "../../data/llm_cache/responses.sqlite3")
+)
+DEFAULT_TTL_HOURS   = 168
+DEFAULT_MAX_ENTRIES = 5000
+
+# Calls above this temperature are sampled, not deterministic; never cache them.
+CACHEABLE_MAX_TEMPERATURE = 0.0
+
+_ROLE_ALIASES = {"user": "human", "assistant": "ai"}
+
+
+def cache_enabled() -> bool:
+    """Read at call time so tests and ops can flip it without a restart."""
+    return os.getenv("LLM_CACHE_ENABLED", "1").lower() not in ("0", "false", "no")
+
+
+# ---------------------------------------------------------------------------
+# Key construction
+# ---------------------------------------------------------------------------
+
+def _normalize_text(text: str) -> str:
+    lines = textwrap.dedent(text).splitlines()
+    return "\n".join(line.rstrip() for line in lines).strip()
+
+
+def normalize_messages(prompt: Any) -> list[list[str]]:
+    """
+    Reduce anything ``.invoke()`` accepts (a string, a PromptValue, or a list
+    of messages / (role, content) tuples / dicts) to [[role, content], ...].
+    """
+    if isinstance(prompt, str):
+        items: list = [("human", prompt)]
+    elif hasattr(prompt, "to_messages"):
+        items = prompt.to_messages()
+    else:
+        items = list(prompt)
+
+    out: list[list[str]] = []
+    for msg in items:
+        if isinstance(msg, str):
+            role, content = "human", msg
+        elif isinstance(msg, (tuple, list)) and len(msg) == 2:
+            role, content = msg
+        elif isinstance(msg, dict):
+            role, content = msg.get("role", "human"), msg.get("content", "")
+        else:
+            role, content = getattr(msg, "type", "human"), getattr(msg, "content", "")
+        if not isinstance(content, str):
+            content = json.dumps(content, sort_keys=True, default=str)
+        role = str(role).lower()
+        out.append([_ROLE_ALIASES.get(role, role), _normalize_text(content)])
+    return out
+
+
+def make_cache_key(provider: str, model: str, params: dict, prompt: Any) -> str:
+    payload = json.dumps(
+        {
+            "provider": provider,
+            "model":    model,
+            "params":   params,
+            "messages": normalize_messages(prompt),
+        },
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# ---------------------------------------------------------------------------
+# SQLite store
+# ---------------------------------------------------------------------------
+
+class LLMResponseCache(SQLiteResponseStore):
+    """Completion replies keyed by make_cache_key(); rows record provider/model."""
+
+    table = "llm_cache"
+    label = "LLM cache"
+
+    def __init__(
+        self,
+        path: str,
+        ttl_secs: float = DEFAULT_TTL_HOURS * 3600,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ):
+        super().__init__(path, ttl_secs, max_entries)
+
+
+_cache: Optional[LLMResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> LLMResponseCache:
+    """Process-wide cache, configured from the environment on first use."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = LLMResponseCache(
+                path=os.getenv("LLM_CACHE_PATH", DEFAULT_CACHE_PATH),
+                ttl_secs=float(os.getenv("LLM_CACHE_TTL_HOURS", DEFAULT_TTL_HOURS)) * 3600,
+                max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+            )
+        return _cache
+
+
+def cache_stats() -> dict:
+    """Hit / miss counters for this process plus the current row count."""
+    return get_response_cache().stats()
+
+
+# ---------------------------------------------------------------------------
+# Client wrapper
+# ---------------------------------------------------------------------------
+
+class CachedCompletionClient:
+    """
+    Thin proxy around a LangChain chat model. ``invoke`` consults the cache
+    first; every other attribute is forwarded to the wrapped client.
+    """
+
+    def __init__(self, client: Any, provider: str, model: str, params: dict):
+        self._client   = client
+        self._provider = provider
+        self._model    = model
+        self._params   = params
+
+    def invoke(self, prompt: Any, *args, **kwargs):
+        # Extra invoke arguments (config, stop sequences, tool bindings) change
+        # the request in ways the key doesn't capture — go straight through.
+        if args or kwargs or not cache_enabled():
+            return self._client.invoke(prompt, *args, **kwargs)
+
+        cache = get_response_cache()
+        key = make_cache_key(self._provider, self._model, self._params, prompt)
+        cached = cache.get(key)
+        if cached is not None:
+            logger.debug(f"LLM cache hit ({self._provider}/{self._model})")
+            from langchain_core.messages import AIMessage
+            return AIMessage(content=cached)
+
+        response = self._client.invoke(prompt)
+        content = getattr(response, "content", None)
+        if isinstance(content, str) and content.strip():
+            cache.put(key, content, source=f"{self._provider}/{self._model}")
+        return response
+
+    def __getattr__(self, name: str):
+        return getattr(self._client, name)
+
+
+def wrap_with_cache(client: Any, provider: str, model: str, temperature: float):
+    """Return ``client`` wrapped in the response cache when the call is deterministic."""
+    if temperature > CACHEABLE_MAX_TEMPERATURE:
+        return client
+    return CachedCompletionClient(client, provider, model, {"temperature": temperature})
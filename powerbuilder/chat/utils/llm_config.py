@@ -48,6 +48,8 @@ from typing import Any, Callable, NamedTuple
 from dotenv import load_dotenv
 load_dotenv()
 
+from .llm_cache import wrap_with_cache
+
 # Milestone R: per-request provider override.
 #
 # The Django view sets this for the duration of one request via
@@ -225,6 +227,9 @@ def get_completion_client(
     """
     Return an initialised LangChain chat model for the active (or specified) provider.
 
+    Temperature-0 clients come back wrapped in the persistent response cache
+    (chat/utils/llm_cache.py); the wrapper forwards everything except invoke().
+
     Args:
         temperature: Sampling temperature.
         provider:    Override LLM_PROVIDER for this call.
@@ -240,8 +245,18 @@ def get_completion_client(
     active = (provider or _PROVIDER_OVERRIDE.get() or LLM_PROVIDER).lower().strip()
 
     if active in _custom_registry:
+        # Custom factories don't take our parameters, so their replies are
+        # never cached (see llm_cache.py).
         return _custom_registry[active]()
 
+    # Deterministic (temperature-0) calls are served from the local response
+    # cache. Keyed on the resolved provider, so provider_override is honored.
+    client = _build_completion_client(active, temperature)
+    return wrap_with_cache(client, active, _DEFAULT_MODELS[active], temperature)
+
+
+def _build_completion_client(active: str, temperature: float):
+    """Construct the bare LangChain chat model for a built-in provider."""
     if active == "openai":
         from langchain_openai import ChatOpenAI
         key = os.getenv("OPENAI_API_KEY")
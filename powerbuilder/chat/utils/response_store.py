@@ -0,0 +1,163 @@
+"""
+chat/utils/response_store.py
+
+SQLite key -> text store with TTL expiry and LRU eviction, shared by the
+persistent response caches:
+
+  llm_cache.LLMResponseCache        deterministic completion replies
+  census_cache.CensusResponseCache  Census API JSON (disk tier)
+  fec_client                        normalized FEC race totals
+
+Each cache keeps its own file and table; this module owns the schema and
+the expiry and eviction policy so the three cannot drift apart.
+
+Behaviour
+---------
+* Rows older than ``ttl_secs`` are misses and deleted on read.
+* Past ``max_entries`` the least recently accessed rows are evicted on write.
+* Any SQLite error degrades to a miss (reads) or a no-op (writes); a cache
+  never fails the call it sits in front of.
+* A fresh connection is opened per operation, so one instance is safe to
+  share across the worker threads the streaming view spawns; the lock
+  serializes writers inside one process and SQLite's own locking covers the
+  rest.
+
+Each row records a free-form ``source`` (provider/model, request URL) and its
+own hit count for offline inspection.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class SQLiteResponseStore:
+    """Key -> text store with TTL and LRU eviction. Subclasses set ``table``."""
+
+    table = "responses"
+    label = "Response cache"
+
+    def __init__(self, path: str, ttl_secs: float, max_entries: int):
+        self.path        = path
+        self.ttl_secs    = ttl_secs
+        self.max_entries = max_entries
+        self.hits        = 0
+        self.misses      = 0
+        self._lock       = threading.Lock()
+        self._ready      = False
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._ready:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=5)
+        if not self._ready:
+            conn.execute(
+                f"""
+                CREATE TABLE IF NOT EXISTS {self.table} (
+                    key         TEXT PRIMARY KEY,
+                    source      TEXT NOT NULL,
+                    body        TEXT NOT NULL,
+                    created_at  REAL NOT NULL,
+                    accessed_at REAL NOT NULL,
+                    hits        INTEGER NOT NULL DEFAULT 0
+                )
+                """
+            )
+            conn.execute(
+                f"CREATE INDEX IF NOT EXISTS {self.table}_accessed "
+                f"ON {self.table} (accessed_at)"
+            )
+            conn.commit()
+            self._ready = True
+        return conn
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached text, or None on miss / expiry / error."""
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connect()
+                try:
+                    row = conn.execute(
+                        f"SELECT body, created_at FROM {self.table} WHERE key = ?",
+                        (key,),
+                    ).fetchone()
+                    if row is not None and now - row[1] > self.ttl_secs:
+                        conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                        conn.commit()
+                        row = None
+                    if row is None:
+                        self.misses += 1
+                        return None
+                    conn.execute(
+                        f"UPDATE {self.table} SET accessed_at = ?, hits = hits + 1 WHERE key = ?",
+                        (now, key),
+                    )
+                    conn.commit()
+                    self.hits += 1
+                    return row[0]
+                finally:
+                    conn.close()
+        except sqlite3.Error as e:
+            logger.warning(f"{self.label} read failed ({self.path}) — {e}")
+            self.misses += 1
+            return None
+
+    def put(self, key: str, body: str, source: str = "") -> None:
+        """Store one entry and evict least-recently-used rows over the cap."""
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connect()
+                try:
+                    conn.execute(
+                        f"INSERT OR REPLACE INTO {self.table} "
+                        "(key, source, body, created_at, accessed_at, hits) "
+                        "VALUES (?, ?, ?, ?, ?, 0)",
+                        (key, source, body, now, now),
+                    )
+                    (count,) = conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()
+                    overflow = count - self.max_entries
+                    if overflow > 0:
+                        conn.execute(
+                            f"DELETE FROM {self.table} WHERE key IN ("
+                            f"SELECT key FROM {self.table} ORDER BY accessed_at ASC LIMIT ?)",
+                            (overflow,),
+                        )
+                    conn.commit()
+                finally:
+                    conn.close()
+        except sqlite3.Error as e:
+            logger.warning(f"{self.label} write failed ({self.path}) — {e}")
+
+    def clear(self) -> None:
+        with self._lock:
+            conn = self._connect()
+            try:
+                conn.execute(f"DELETE FROM {self.table}")
+                conn.commit()
+            finally:
+                conn.close()
+            self.hits = 0
+            self.misses = 0
+
+    def entries(self) -> Optional[int]:
+        """Current row count, or None if the file can't be read."""
+        try:
+            with self._lock:
+                conn = self._connect()
+                try:
+                    (count,) = conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()
+                    return count
+                finally:
+                    conn.close()
+        except sqlite3.Error:
+            return None
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "entries": self.entries()}
@@ -30,6 +30,7 @@ Public API
   read_file(path)              -> bytes
   write_file(path, contents)   -> None
   file_exists(path)            -> bool
+  file_version(path)           -> str             (S3 ETag or local mtime; for cache keys)
   read_dataframe(path, **kw)   -> pd.DataFrame   (kwargs forwarded to pd.read_csv/read_excel)
   write_dataframe(path, df)    -> None            (always index=False)
   read_geodataframe(path, **kw)-> gpd.GeoDataFrame  (uses sync_to_local internally)
@@ -191,6 +192,27 @@ def file_exists(path: str) -> bool:
     return os.path.exists(_to_local_path(path))
 
 
+def file_version(path: str) -> str:
+    """
+    Return a token that changes whenever the file's contents change, for
+    keying in-memory caches of parsed files.
+
+    In S3 mode, mapped paths use the object's ETag (one HEAD request, no
+    download). If the HEAD request fails (including a 404), falls back to the
+    local file's mtime, matching file_exists(). Raises FileNotFoundError when
+    the file exists in neither place.
+    """
+    if STORAGE_BACKEND == "s3":
+        key = _to_s3_key(path)
+        if key:
+            try:
+                head = _get_s3_client().head_object(Bucket=_S3_BUCKET_NAME, Key=key)
+                return f"s3:{head.get('ETag') or head.get('LastModified')}"
+            except Exception:
+                pass
+    return f"local:{os.path.getmtime(_to_local_path(path))}"
+
+
 # ---------------------------------------------------------------------------
 # DataFrame I/O
 # ---------------------------------------------------------------------------
@@ -0,0 +1,155 @@
+"""
+chat/utils/template_registry.py
+
+Process-wide cache of the files in tool_templates/: costs.json, the
+markdown script exemplars, and the branded Word template.
+
+The messaging, finance and export agents used to reopen and reparse these
+on every call: costs.json twice per plan, each exemplar once per messaging
+run, and the .docx template (a zip of XML parts) once per export. The files
+change only when someone edits them, so each one is now parsed once and
+served from memory until its modification time (or size) changes on disk.
+
+Entries
+-------
+get(path, parser) is the general form: ``parser(path)`` runs on the first
+call and again only when the file's stat signature changes. The cache is
+keyed on (path, parser), so two agents can read the same file into
+different shapes (messaging uses costs.json as-is; finance flattens it).
+A missing file returns ``default`` and drops any cached entry. Parser
+exceptions propagate and are not cached, so a half-written file is retried
+on the next call.
+
+Typed helpers:
+  load_json(path)       parsed JSON, frozen (dicts → read-only mappings,
+                        lists → tuples) so callers cannot corrupt the
+                        shared copy
+  load_text(path)       file contents as a str
+  blank_document(path)  a new python-docx Document cloned from an
+                        in-memory copy of the template with its body
+                        cleared (styles, margins and footer kept)
+
+clear() empties the registry; tests and the admin shell use it after
+rewriting a template in place within the filesystem's mtime resolution.
+"""
+
+import io
+import json
+import logging
+import os
+import threading
+from types import MappingProxyType
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+_entries: dict = {}          # (path, parser) → (signature, value)
+_lock = threading.Lock()
+_stats = {"hits": 0, "loads": 0}
+
+
+def _signature(path: str) -> Optional[tuple]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def get(path: str, parser: Callable[[str], Any], default: Any = None) -> Any:
+    """
+    Return ``parser(path)``, reparsing only when the file changed since the
+    last call. Returns ``default`` if the file does not exist.
+    """
+    path = os.path.abspath(path)
+    key = (path, parser)
+    sig = _signature(path)
+    with _lock:
+        if sig is None:
+            _entries.pop(key, None)
+            return default
+        cached = _entries.get(key)
+        if cached is not None and cached[0] == sig:
+            _stats["hits"] += 1
+            return cached[1]
+        value = parser(path)
+        _entries[key] = (sig, value)
+        _stats["loads"] += 1
+    logger.debug(f"template_registry: loaded {path} via {getattr(parser, '__name__', parser)}")
+    return value
+
+
+def clear() -> int:
+    """Drop every cached entry. Returns how many were dropped."""
+    with _lock:
+        n = len(_entries)
+        _entries.clear()
+    return n
+
+
+def registry_stats() -> dict:
+    """Process-lifetime hits and (re)loads, plus the number of entries held."""
+    with _lock:
+        return {**_stats, "entries": len(_entries)}
+
+
+# ---------------------------------------------------------------------------
+# Typed loaders
+# ---------------------------------------------------------------------------
+
+def _freeze(value: Any) -> Any:
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _parse_json(path: str) -> Any:
+    with open(path, encoding="utf-8") as f:
+        return _freeze(json.load(f))
+
+
+def _parse_text(path: str) -> str:
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+def _parse_docx_template(path: str) -> bytes:
+    """The template with its placeholder body removed, re-serialised to bytes."""
+    from docx import Document
+    from docx.oxml.ns import qn
+
+    doc = Document(path)
+    body = doc.element.body
+    for child in list(body):
+        if child.tag != qn("w:sectPr"):
+            body.remove(child)
+    buf = io.BytesIO()
+    doc.save(buf)
+    return buf.getvalue()
+
+
+def load_json(path: str, default: Any = None) -> Any:
+    """Parsed, frozen JSON from ``path``; raises json.JSONDecodeError on bad JSON."""
+    return get(path, _parse_json, default)
+
+
+def load_text(path: str, default: Optional[str] = None) -> Optional[str]:
+    """Contents of ``path``, or ``default`` if it does not exist."""
+    return get(path, _parse_text, default)
+
+
+def blank_document(path: str):
+    """
+    A fresh python-docx Document carrying the styles, margins and footer of
+    the template at ``path`` and an empty body, or a plain Document() if the
+    template does not exist. Each call returns an independent document.
+    Requires python-docx; callers check for it first.
+    """
+    from docx import Document
+
+    template = get(path, _parse_docx_template)
+    if template is None:
+        return Document()
+    return Document(io.BytesIO(template))
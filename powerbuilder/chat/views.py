@@ -9,7 +9,9 @@ Add to your .env file:
 Session keys
 ------------
     authenticated       bool  — set to True on successful login
-    conversations       list  — [{id, title, timestamp, messages: [...]}]
+    conversation_ids    list  — ids of this session's conversations, sidebar order
+                                (rows and messages live in the database; see
+                                chat/conversations.py)
     current_conv_id     str   — UUID of the active conversation
     org_namespace       str   — Pinecone namespace (default "general")
 """
@@ -29,15 +31,15 @@ from django.template.loader import render_to_string
 from django.utils.translation import gettext as _
 from django.views.decorators.http import require_POST
 from functools import wraps
+from typing import Optional
 
-from . import progress
+from . import conversations, demo_snapshots, progress, run_coalescer, run_scheduler
 from .render_helpers import (
     extract_sources,
     friendly_error,
     is_plan_run,
     c3_footer_text,
     agent_pill_label,
-    auto_title,
     enrich_downloads,
     plan_outline,
     prefix_heading_ids,
@@ -58,7 +60,6 @@ DEMO_PASSWORD       = os.environ.get("DEMO_PASSWORD", "")
 UPLOAD_DIR          = "data/uploads"
 EXPORTS_DIR         = "exports"
 RESEARCH_MEMOS_DIR  = "research_memos"
-MAX_CONVERSATIONS   = 20
 
 _ALLOWED_DOWNLOAD_EXTS = {".docx", ".csv", ".xlsx"}
 
@@ -119,6 +120,16 @@ def login_view(request):
 
 
 def logout_view(request):
+    from .agents.voterfile_agent import purge_analysis_cache  # deferred import (pandas)
+
+    # Drop the voter-file analyses this session cached. The cache is per
+    # process, so this only reaches the worker serving the logout; copies in
+    # other workers expire after VOTERFILE_CACHE_TTL_SECS.
+    session_key = request.session.session_key
+    if session_key:
+        purge_analysis_cache(session_key)
+    # Saved conversations go with the session rather than being orphaned.
+    conversations.delete_for_session(request.session)
     request.session.flush()
     return redirect("login")
 
@@ -166,32 +177,22 @@ def chat_view(request):
         request.session.modified = True
         return redirect("chat")
 
-    conversations  = request.session.get("conversations", [])
-    current_id     = request.session.get("current_conv_id")
+    current_id       = request.session.get("current_conv_id")
     current_messages: list = []
+    history_before   = None
 
-    if current_id:
-        conv = next((c for c in conversations if c["id"] == current_id), None)
-        if conv:
-            current_messages = conv.get("messages", [])
+    # Only the latest page of the active conversation is rendered; older
+    # turns load on demand through conv_messages_view.
+    conv = conversations.get(request.session, current_id)
+    if conv is not None:
+        current_messages, history_before = conversations.history(conv)
 
     # Milestone F: attach a relative-time label to each conv for the sidebar.
-    # Backfill created_at on older session entries (pre-Milestone-F) by
-    # parsing the legacy timestamp string, falling back to 'now' if it can't
-    # be parsed so we never crash on stale session shapes.
     now_ts = int(time.time())
     enriched: list[dict] = []
-    for c in conversations:
-        created = c.get("created_at")
-        if not isinstance(created, (int, float)):
-            created = _parse_legacy_timestamp(c.get("timestamp"), now_ts)
-            c["created_at"] = created  # persist the backfill
-        view_c = dict(c)
-        view_c["time_label"] = relative_time(created, now_ts)
-        enriched.append(view_c)
-    # Persist the backfill so subsequent requests skip it
-    request.session["conversations"] = conversations
-    request.session.modified = True
+    for c in conversations.sidebar(request.session):
+        c["time_label"] = relative_time(c["created_at"], now_ts)
+        enriched.append(c)
 
     # Milestone R: provider picker options. Built from SUPPORTED_PROVIDERS so
     # the dropdown automatically picks up any new providers Ben adds to the
@@ -207,6 +208,7 @@ def chat_view(request):
     return render(request, "chat.html", {
         "conversations":    enriched,
         "current_messages": current_messages,
+        "history_before":   history_before,
         "current_conv_id":  current_id,
         "demo_tiles":       get_demo_tiles(),  # Milestone G: configurable carousel
         # Milestone R: data for the input-bar provider picker.
@@ -215,16 +217,6 @@ def chat_view(request):
     })
 
 
-def _parse_legacy_timestamp(ts_str: str | None, fallback: int) -> int:
-    """Best-effort parse of the old '%Y-%m-%d %H:%M' timestamp into Unix epoch."""
-    if not ts_str:
-        return fallback
-    try:
-        return int(time.mktime(time.strptime(ts_str, "%Y-%m-%d %H:%M")))
-    except (ValueError, TypeError):
-        return fallback
-
-
 # ---------------------------------------------------------------------------
 # Send message (HTMX endpoint)
 # ---------------------------------------------------------------------------
@@ -290,16 +282,26 @@ def send_message_view(request):
 
     # ── Pipeline ─────────────────────────────────────────────────────────────
     try:
-        from .agents.manager import run_query  # deferred import to avoid circular
-
-        result = run_query(
-            query            = query,
-            org_namespace    = request.session.get("org_namespace", "general"),
+        # Demo carousel prompts can be served from a pre-baked snapshot.
+        snapshot = demo_snapshots.find(
+            query, ab_test, plan_mode, llm_provider,
+            org_namespace      = request.session.get("org_namespace", "general"),
             uploaded_file_path = uploaded_file_path,
-            ab_test          = ab_test,
-            plan_mode        = plan_mode,
-            llm_provider     = llm_provider,
         )
+        if snapshot is not None:
+            result = demo_snapshots.replay(snapshot, instant=True)
+        else:
+            from .agents.manager import run_query  # deferred import to avoid circular
+
+            result = run_query(
+                query            = query,
+                org_namespace    = request.session.get("org_namespace", "general"),
+                uploaded_file_path = uploaded_file_path,
+                ab_test          = ab_test,
+                plan_mode        = plan_mode,
+                llm_provider     = llm_provider,
+                session_key      = request.session.session_key,
+            )
     except Exception as exc:
         logger.exception("Pipeline error: %s", exc)
         return render(request, "partials/message.html", {"error": f"Pipeline error: {exc}"})
@@ -363,27 +365,8 @@ def send_message_view(request):
     if not downloads:
         generated_file_path = None
 
-    # ── Session history ───────────────────────────────────────────────────────
-    conversations = request.session.get("conversations", [])
-    current_id    = request.session.get("current_conv_id")
-
-    # Find the active conversation, or create a new one
-    conv = next((c for c in conversations if c["id"] == current_id), None) if current_id else None
-    if conv is None:
-        current_id = str(uuid.uuid4())
-        conv = {
-            "id":         current_id,
-            "title":      auto_title(query),
-            "timestamp":  time.strftime("%Y-%m-%d %H:%M"),
-            "created_at": int(time.time()),  # Milestone F: drives sidebar relative_time()
-            "messages":   [],
-        }
-        conversations.insert(0, conv)
-        conversations = conversations[:MAX_CONVERSATIONS]
-        request.session["current_conv_id"] = current_id
-
     # Enrich downloads with thumbnail metadata so both the live render and
-    # session-restored history can show typed badges without re-running this.
+    # restored history can show typed badges without re-running this.
     downloads = enrich_downloads(downloads)
 
     # Build the plan-panel outline (Milestone D). Cheap to compute, gated
@@ -391,13 +374,8 @@ def send_message_view(request):
     # and the template skips the side panel entirely.
     outline = plan_outline(final_answer, active_agents, source_cards, downloads)
 
-    conv["messages"].append({
-        "role":     "user",
-        "content":  query,
-        "msg_id":   uuid.uuid4().hex[:10],   # for edit-and-rerun targeting
-    })
-    conv["messages"].append({
-        "role":                "assistant",
+    # ── Conversation history ──────────────────────────────────────────────────
+    conversations.append_turn(request.session, query, {
         "content":             final_answer,
         "answer_html":         answer_html,
         "active_agents":       active_agents,
@@ -412,9 +390,6 @@ def send_message_view(request):
         "bubble_id":           bubble_id,
     })
 
-    request.session["conversations"] = conversations
-    request.session.modified = True
-
     from .utils.provider_choice import provider_label as _provider_label
     return render(request, "partials/message.html", {
         "answer_html":         answer_html,
@@ -438,19 +413,51 @@ def send_message_view(request):
 # ---------------------------------------------------------------------------
 #
 # The browser opens an EventSource against /stream/?query=... and watches the
-# pipeline run live. The agent worker runs on a background thread and pushes
-# progress events onto an in-process queue. The generator below drains that
-# queue, formats each event as SSE, and emits a final "done" event with the
-# rendered HTML once the worker finishes. No Redis, no extra deps.
+# pipeline run live. The agent worker runs on a pool thread of the run
+# scheduler (chat/run_scheduler.py), which bounds concurrency, and appends
+# progress events to the run's log on the progress bus (in-process by default,
+# shared SQLite with PROGRESS_BACKEND=sqlite). When the run ends the worker
+# renders the final answer and appends it as the terminal "done" event. The
+# generator below drains the log and formats each event as SSE.
 #
-# Why one connection (not two): a separate /send/ + /events/ pair would force
-# us to share the run's final state across requests, which without Redis means
-# global dicts that race. Streaming the result back on the same connection
-# keeps the lifetime of the run scoped to one HTTP request.
+# Every frame carries ``id: <run_id>:<offset>``. If the connection drops the
+# browser reconnects with that id in Last-Event-ID, and the view resumes the
+# same run from the next offset instead of starting a new one. With the shared
+# backend the reconnect can land on any gunicorn worker.
+
+def _format_sse(event_dict: dict, event_id: Optional[str] = None) -> str:
+    """Serialize a payload as a single SSE ``data:`` frame, optionally with an ``id:``."""
+    head = f"id: {event_id}\n" if event_id else ""
+    return f"{head}data: {json.dumps(event_dict, ensure_ascii=False)}\n\n"
+
 
-def _format_sse(event_dict: dict) -> str:
-    """Serialize a payload as a single SSE ``data:`` frame."""
-    return f"data: {json.dumps(event_dict, ensure_ascii=False)}\n\n"
+def _drain_sse(run_id: str, after: int = 0):
+    """
+    SSE frames for ``run_id`` from offset ``after`` until the terminal event.
+
+    Quiet stretches (agents working silently) produce an SSE comment every
+    15 seconds instead of a data frame: comments keep the TCP connection
+    alive through browsers and proxies without firing
+    EventSource.onmessage. The log is released only once a terminal frame
+    has been handed to the client; a dropped connection leaves it in place
+    so the browser can reconnect and resume.
+    """
+    delivered = False
+    try:
+        for evt in progress.drain(run_id, poll_interval=15, after=after):
+            if evt.type == "ping":
+                yield ": keepalive\n\n"
+                continue
+            event_id = progress.resume_token(run_id, evt.offset) if evt.offset else None
+            yield _format_sse(evt.to_dict(), event_id)
+            if evt.type in progress.TERMINAL_TYPES:
+                delivered = True
+                return
+        # The log vanished under us (finished elsewhere or swept).
+        yield _format_sse({"type": "error", "label": "This run is no longer available."})
+    finally:
+        if delivered:
+            progress.finish(run_id)
 
 
 @demo_login_required
@@ -464,6 +471,9 @@ def stream_query_view(request):
     Query parameters (GET):
         query — the user's prompt (required)
 
+    A request carrying a Last-Event-ID header from an earlier frame resumes
+    that run's stream instead of starting a new run.
+
     File uploads are not supported on this endpoint; the existing /send/
     HTMX path remains for upload flows. Demo mode auto-attaches the synthetic
     voterfile here too, mirroring /send/.
@@ -472,6 +482,12 @@ def stream_query_view(request):
     if not query:
         return HttpResponse("query parameter required", status=400)
 
+    resume = progress.parse_resume_token(request.headers.get("Last-Event-ID"))
+    if resume is not None:
+        # EventSource reconnect: never re-run the pipeline, only replay the
+        # tail of the existing run (or report that it is gone).
+        return _sse_response(_drain_sse(*resume))
+
     # Milestone K: optional A/B-test toggle from the input bar.
     ab_test_raw = (request.GET.get("ab_test") or "").strip().lower()
     ab_test = ab_test_raw in ("1", "true", "yes", "on")
@@ -502,81 +518,115 @@ def stream_query_view(request):
     run_id = progress.new_run_id()
     progress.create(run_id)
 
-    # Holders the worker writes into; the generator reads them after the run
-    # is signalled done. Using a dict keeps it picklable-free and obvious.
-    holder: dict = {"result": None, "error": None}
+    # Demo carousel prompts can be replayed from a pre-baked snapshot.
+    snapshot = demo_snapshots.find(
+        query, ab_test, plan_mode, llm_provider,
+        org_namespace=org_namespace, uploaded_file_path=uploaded_file_path,
+    )
+
+    # Identical requests share one run (double-clicks, demo tiles,
+    # re-submits). Registering before the scheduler means only the leader
+    # takes a queue slot; followers relay its events from their own thread,
+    # even while the leader is still queued.
+    flight, leader = None, True
+    if snapshot is None and run_coalescer.coalescing_enabled():
+        flight, leader = run_coalescer.lead_or_follow(run_coalescer.make_key(
+            query, org_namespace, uploaded_file_path=uploaded_file_path,
+            ab_test=ab_test, plan_mode=plan_mode, llm_provider=llm_provider,
+        ), run_id)
 
     def _worker():
+        # The worker, not the generator, publishes the terminal event so
+        # whichever connection (or worker process) is following the run
+        # can deliver it.
         try:
-            from .agents.manager import run_query_streaming  # deferred import
-            holder["result"] = run_query_streaming(
-                query              = query,
-                org_namespace      = org_namespace,
-                run_id             = run_id,
-                uploaded_file_path = uploaded_file_path,
-                ab_test            = ab_test,
-                plan_mode          = plan_mode,
-                llm_provider       = llm_provider,
-            )
+            if snapshot is not None:
+                result = demo_snapshots.replay(snapshot, run_id)
+            elif not leader:
+                result = run_coalescer.follow(flight, run_id)
+            else:
+                from .agents.manager import run_query_streaming  # deferred import
+                result = run_query_streaming(
+                    query              = query,
+                    org_namespace      = org_namespace,
+                    run_id             = run_id,
+                    uploaded_file_path = uploaded_file_path,
+                    ab_test            = ab_test,
+                    plan_mode          = plan_mode,
+                    llm_provider       = llm_provider,
+                    session_key        = request.session.session_key,
+                    flight             = flight,
+                )
+            payload = _build_done_payload(request, query, result or {}, llm_provider)
+        except run_scheduler.QueueFull as full:
+            # The identical run this request followed was turned away.
+            progress.emit(run_id, "error", label=_busy_label(full), retry_after=full.retry_after)
+            return
+        except run_coalescer.FollowTimeout:
+            # The identical run this request followed outlasted the timeout.
+            progress.emit(run_id, "error", label=_("Run timed out"))
+            return
         except Exception as exc:
             logger.exception("Streaming pipeline error: %s", exc)
-            holder["error"] = str(exc)
-        finally:
-            # Tell the consumer the run is done so the drain loop can exit.
-            progress.emit(run_id, "run_finished")
-
-    worker_thread = threading.Thread(target=_worker, daemon=True)
+            if leader and flight is not None and not flight.done.is_set():
+                # Failed before the pipeline could publish its outcome.
+                run_coalescer.complete(flight, error=exc)
+            # Milestone E: map raw exceptions (e.g. AuthenticationError
+            # from the LLM client) to a short, human label before it
+            # reaches the EventSource handler in chat.html.
+            progress.emit(run_id, "error", label=friendly_error(str(exc)))
+            return
+        payload = dict(payload)
+        progress.emit(run_id, payload.pop("type", "done"), **payload)
+
+    def _abandoned():
+        # The scheduler dropped the run unstarted: its stream timed out or
+        # the log is gone. Close the log for a client that may still resume,
+        # and release anyone following this run.
+        progress.emit(run_id, "error", label=_("Run timed out"))
+        if flight is not None:
+            run_coalescer.complete(flight, error=RuntimeError("Run timed out before it started"))
+
+    # Admission control: the run waits for a pool slot (reporting its queue
+    # position as "queued" events) or is turned away before any work starts.
+    # Snapshot replays and followers run no pipeline, so they skip the pool.
+    try:
+        if snapshot is not None or not leader:
+            threading.Thread(target=_worker, daemon=True).start()
+        else:
+            run_scheduler.get_scheduler().submit(org_namespace, run_id, _worker, on_skip=_abandoned)
+    except run_scheduler.QueueFull as full:
+        if flight is not None:
+            # Anyone who joined in the meantime is turned away too.
+            run_coalescer.complete(flight, error=full)
+        progress.finish(run_id)
+        logger.info(f"stream: rejected run for {org_namespace} — {full}")
+        response = _sse_response(iter([
+            f"retry: {full.retry_after * 1000}\n",
+            _format_sse({"type": "error", "label": _busy_label(full), "retry_after": full.retry_after}),
+        ]))
+        response["Retry-After"] = str(full.retry_after)
+        return response
 
     def _event_stream():
-        # Initial frame so the EventSource ``onopen`` settles before we run.
-        yield _format_sse({"type": "hello", "run_id": run_id})
-        worker_thread.start()
-        try:
-            # Keepalive drain: poll the queue directly with a 15-second
-            # timeout. When the queue is empty (agents are working silently)
-            # yield an SSE comment instead of a data frame. SSE comments keep
-            # the TCP connection alive without firing EventSource.onmessage,
-            # so the browser never sees spurious events. progress.drain()
-            # was yielding JSON ping frames every second but some browsers and
-            # proxies still timed out on long (3+ min) pipeline runs.
-            import queue as _queue_mod
-            _run_q = progress.create(run_id)   # idempotent — queue already allocated
-            _deadline = time.time() + progress.DEFAULT_RUN_TIMEOUT_SECS
-            while True:
-                if time.time() >= _deadline:
-                    yield _format_sse({"type": "error", "label": "Run timed out"})
-                    break
-                try:
-                    evt = _run_q.get(timeout=15)
-                except _queue_mod.Empty:
-                    yield ': keepalive\n\n'
-                    continue
-                if evt.type == "run_finished":
-                    break
-                yield _format_sse(evt.to_dict())
-
-            # Wait for the worker to finish (almost always already done by
-            # the time run_finished arrived; this is just paranoia for slow
-            # interpreters).
-            worker_thread.join(timeout=5.0)
-
-            if holder["error"]:
-                # Milestone E: map raw exceptions (e.g. AuthenticationError
-                # from the LLM client) to a short, human label before it
-                # reaches the EventSource handler in chat.html.
-                yield _format_sse({
-                    "type": "error",
-                    "label": friendly_error(holder["error"]),
-                })
-                return
+        # Initial frame so the EventSource ``onopen`` settles.
+        # Its id lets a connection dropped before the first event resume.
+        yield "retry: 2000\n" + _format_sse(
+            {"type": "hello", "run_id": run_id}, progress.resume_token(run_id, 0)
+        )
+        yield from _drain_sse(run_id)
+
+    return _sse_response(_event_stream())
+
+
+def _busy_label(full: run_scheduler.QueueFull) -> str:
+    return _("Powerbuilder is busy right now. Please try again in about %(secs)s seconds.") % {
+        "secs": full.retry_after,
+    }
 
-            result = holder["result"] or {}
-            payload = _build_done_payload(request, query, result, llm_provider)
-            yield _format_sse(payload)
-        finally:
-            progress.finish(run_id)
 
-    response = StreamingHttpResponse(_event_stream(), content_type="text/event-stream")
+def _sse_response(stream) -> StreamingHttpResponse:
+    response = StreamingHttpResponse(stream, content_type="text/event-stream")
     response["Cache-Control"]    = "no-cache"
     response["X-Accel-Buffering"] = "no"   # disable proxy buffering on Render/nginx
     return response
@@ -585,7 +635,7 @@ def stream_query_view(request):
 def _build_done_payload(request, query: str, result: dict, llm_provider=None) -> dict:
     """
     Render the final assistant bubble HTML from a completed pipeline result
-    and persist the message into the user's session, mirroring the
+    and save the turn to the conversation history, mirroring the
     side-effects of ``send_message_view`` so reloads show the same history.
     """
     final_answer        = result.get("final_answer", "")
@@ -656,30 +706,8 @@ def _build_done_payload(request, query: str, result: dict, llm_provider=None) ->
         "provider_label":      _provider_label(llm_provider),
     }, request=request)
 
-    # Persist into the session so refreshes show the same history.
-    conversations = request.session.get("conversations", [])
-    current_id    = request.session.get("current_conv_id")
-    conv = next((c for c in conversations if c["id"] == current_id), None) if current_id else None
-    if conv is None:
-        current_id = str(uuid.uuid4())
-        conv = {
-            "id":         current_id,
-            "title":      auto_title(query),
-            "timestamp":  time.strftime("%Y-%m-%d %H:%M"),
-            "created_at": int(time.time()),  # Milestone F: drives sidebar relative_time()
-            "messages":   [],
-        }
-        conversations.insert(0, conv)
-        conversations = conversations[:MAX_CONVERSATIONS]
-        request.session["current_conv_id"] = current_id
-
-    conv["messages"].append({
-        "role":     "user",
-        "content":  query,
-        "msg_id":   uuid.uuid4().hex[:10],
-    })
-    conv["messages"].append({
-        "role":                "assistant",
+    # Save the turn so refreshes show the same history.
+    conversations.append_turn(request.session, query, {
         "content":             final_answer,
         "answer_html":         answer_html,
         "active_agents":       active_agents,
@@ -693,16 +721,16 @@ def _build_done_payload(request, query: str, result: dict, llm_provider=None) ->
         "outline":             outline,
         "bubble_id":           bubble_id,
     })
-    request.session["conversations"] = conversations
-    request.session.modified = True
 
     # Streaming-response gotcha: SessionMiddleware.process_response runs BEFORE
     # the StreamingHttpResponse generator yields, so by the time we mutate the
     # session here it's too late to be auto-saved at the end of the request.
-    # Force an explicit save so SSE-completed turns persist into the sidebar
-    # history just like /send/ HTMX turns do.
+    # Force an explicit save so a conversation started by an SSE turn shows
+    # up in the sidebar just like /send/ HTMX turns do. Follow-up turns leave
+    # the session untouched and skip the write.
     try:
-        request.session.save()
+        if request.session.modified:
+            request.session.save()
     except Exception:
         # Never let a session-store hiccup crash the SSE done frame; the bubble
         # was already rendered to the client.
@@ -784,11 +812,12 @@ def research_download_view(_, filename: str):
 # Conversation management API (Milestone F)
 # ---------------------------------------------------------------------------
 #
-# Three small JSON endpoints power the sidebar history UI. They all use the
-# same request.session["conversations"] list as the rest of the app, so no
-# database migration is required. Each one:
+# Small JSON endpoints power the sidebar history UI. They go through
+# chat/conversations.py like the rest of the app, so a session can only see
+# or change the conversations listed in its own conversation_ids. Each one:
 #   - requires the demo session (auth decorator)
-#   - is POST-only (CSRF enforced by Django middleware)
+#   - is POST-only (CSRF enforced by Django middleware), except the
+#     read-only message pager
 #   - returns a JSON status payload, never an HTML page
 #   - is no-op-safe: missing IDs return 404 cleanly
 #
@@ -829,16 +858,11 @@ def rename_conv_view(request, conv_id: str):
     if len(title) > 80:
         title = title[:80].rstrip()
 
-    conversations = request.session.get("conversations", [])
-    for c in conversations:
-        if c.get("id") == conv_id:
-            c["title"] = title
-            request.session["conversations"] = conversations
-            request.session.modified = True
-            return HttpResponse(
-                json.dumps({"ok": True, "title": title}),
-                status=200, content_type="application/json",
-            )
+    if conversations.rename(request.session, conv_id, title):
+        return HttpResponse(
+            json.dumps({"ok": True, "title": title}),
+            status=200, content_type="application/json",
+        )
     return HttpResponse(
         json.dumps({"ok": False, "error": "Conversation not found"}),
         status=404, content_type="application/json",
@@ -854,14 +878,11 @@ def delete_conv_view(request, conv_id: str):
     the empty-state landing page instead of pointing at a dead reference.
     Returns: 200 {"ok": True} | 404 missing.
     """
-    conversations = request.session.get("conversations", [])
-    new_list = [c for c in conversations if c.get("id") != conv_id]
-    if len(new_list) == len(conversations):
+    if not conversations.delete(request.session, conv_id):
         return HttpResponse(
             json.dumps({"ok": False, "error": "Conversation not found"}),
             status=404, content_type="application/json",
         )
-    request.session["conversations"] = new_list
     if request.session.get("current_conv_id") == conv_id:
         request.session["current_conv_id"] = None
     request.session.modified = True
@@ -889,22 +910,39 @@ def reorder_conv_view(request):
             status=400, content_type="application/json",
         )
 
-    conversations = request.session.get("conversations", [])
-    by_id = {c.get("id"): c for c in conversations}
-    seen: set[str] = set()
-    new_list: list[dict] = []
-    for cid in order:
-        if cid in by_id and cid not in seen:
-            new_list.append(by_id[cid])
-            seen.add(cid)
-    # Tail: anything not mentioned, in original order
-    for c in conversations:
-        if c.get("id") not in seen:
-            new_list.append(c)
-
-    request.session["conversations"] = new_list
-    request.session.modified = True
+    new_ids = conversations.reorder(request.session, order)
+    return HttpResponse(
+        json.dumps({"ok": True, "order": new_ids}),
+        status=200, content_type="application/json",
+    )
+
+
+@demo_login_required
+def conv_messages_view(request, conv_id: str):
+    """
+    One page of older messages for the "Load earlier messages" button.
+    Query: ?before=<message pk> (the cursor from the previous page).
+    Returns: 200 {"ok": True, "html": "...", "before": <pk>|null} where
+    "before" is the cursor for the next page, null at the start of the
+    conversation | 400 bad cursor | 404 missing.
+    """
+    conv = conversations.get(request.session, conv_id)
+    if conv is None:
+        return HttpResponse(
+            json.dumps({"ok": False, "error": "Conversation not found"}),
+            status=404, content_type="application/json",
+        )
+    try:
+        before = int(request.GET["before"]) if request.GET.get("before") else None
+    except ValueError:
+        return HttpResponse(
+            json.dumps({"ok": False, "error": "before must be a message id"}),
+            status=400, content_type="application/json",
+        )
+    messages, next_before = conversations.history(conv, before=before)
+    html = render_to_string("partials/history_messages.html",
+                            {"history_messages": messages}, request=request)
     return HttpResponse(
-        json.dumps({"ok": True, "order": [c.get("id") for c in new_list]}),
+        json.dumps({"ok": True, "html": html, "before": next_before}),
         status=200, content_type="application/json",
     )
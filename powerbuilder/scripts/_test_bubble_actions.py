@@ -255,21 +255,30 @@ def test_chat_html_handler_and_history():
     )
     partial_src = open(partial_path).read()
 
-    # Session-history asst branch (in chat.html) AND the live partial both
-    # render the action row, so a restored conversation and a freshly
-    # streamed message look identical.
-    assert 'data-action="copy-answer"' in src, \
-        "session-history copy-answer button missing in chat.html"
-    assert 'data-action="regenerate"' in src, \
-        "session-history regenerate button missing in chat.html"
+    history_path = os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        "templates", "partials", "history_messages.html",
+    )
+    history_src = open(history_path).read()
+
+    # Session history (partials/history_messages.html, included by
+    # chat.html) AND the live partial both render the action row, so a
+    # restored conversation and a freshly streamed message look identical.
+    assert '{% include "partials/history_messages.html"' in src, \
+        "chat.html does not include the session-history partial"
+    assert 'data-action="copy-answer"' in history_src, \
+        "session-history copy-answer button missing in partials/history_messages.html"
+    assert 'data-action="regenerate"' in history_src, \
+        "session-history regenerate button missing in partials/history_messages.html"
     assert 'data-action="copy-answer"' in partial_src, \
         "copy-answer button missing in partials/message.html"
     assert 'data-action="regenerate"' in partial_src, \
         "regenerate button missing in partials/message.html"
-    assertions += 4
+    assertions += 5
 
     # Session history has err-chip-row for restored msg.errors
-    assert "msg.errors" in src and ".err-chip-row" in src, \
+    assert "msg.errors" in history_src and "err-chip-row" in history_src \
+        and ".err-chip-row" in src, \
         "session-history error rendering missing"
     assertions += 1
 
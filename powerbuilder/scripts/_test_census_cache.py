@@ -0,0 +1,186 @@
+"""
+Tests for the tiered Census response cache (chat/utils/census_cache.py) and
+its wiring into data_fetcher.census_get_json().
+
+Verifies:
+  1. A repeated request is served from the memory tier; the API key is not
+     part of the cache key.
+  2. After the memory tier is dropped, the SQLite tier serves the response
+     without an HTTP call.
+  3. Disk rows past the TTL miss, and the disk tier evicts the least
+     recently used row once over max_entries; the memory tier stays bounded.
+  4. Eight threads asking for the same uncached table share one HTTP call.
+  5. A failed fetch propagates to every waiting caller and is not cached.
+  6. CENSUS_CACHE_ENABLED=0 bypasses every tier.
+
+Usage:
+    python scripts/_test_census_cache.py
+"""
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+PROJECT_DIR = SCRIPT_DIR.parent
+sys.path.insert(0, str(PROJECT_DIR))
+
+_TMP = tempfile.mkdtemp(prefix="census_cache_test_")
+os.environ["CENSUS_CACHE_PATH"] = os.path.join(_TMP, "census.sqlite3")
+os.environ["CENSUS_CACHE_ENABLED"] = "1"
+os.environ["CENSUS_CACHE_MEMORY_ENTRIES"] = "4"
+
+import chat.utils.census_cache as cc  # noqa: E402
+import chat.utils.data_fetcher as df  # noqa: E402
+from chat.utils.census_cache import CensusResponseCache  # noqa: E402
+
+ACS = "https://api.census.gov/data/2022/acs/acs5"
+
+
+class _FakeResponse:
+    def __init__(self, payload):
+        self._payload = payload
+        self.status_code = 200
+
+    def raise_for_status(self) -> None:
+        pass
+
+    def json(self):
+        return self._payload
+
+
+class _FakeCensus:
+    """Stand-in for _census_get: counts calls, optionally slow or failing."""
+
+    def __init__(self, delay: float = 0.0, fail: bool = False) -> None:
+        self.calls = 0
+        self.delay = delay
+        self.fail = fail
+        self._lock = threading.Lock()
+
+    def __call__(self, url, params=None, timeout=30):
+        with self._lock:
+            self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+        if self.fail:
+            raise ConnectionError("census down")
+        return _FakeResponse([["NAME", "for"], [url, (params or {}).get("for", "")]])
+
+
+def _params(geo: str, key: str = "k1") -> dict:
+    return {"get": "NAME", "for": geo, "in": "state:13", "key": key}
+
+
+def main() -> int:
+    failures: list[str] = []
+
+    # 1. Memory tier; API key excluded from the key.
+    cc.reset_cache()
+    fake = _FakeCensus()
+    df._census_get = fake
+    first = df.census_get_json(ACS, params=_params("county:*"))
+    second = df.census_get_json(ACS, params=_params("county:*", key="rotated"))
+    if fake.calls != 1:
+        failures.append(f"repeat request made {fake.calls} HTTP calls, expected 1")
+    if second != first:
+        failures.append("cached response differs from the original")
+    if cc.cache_stats()["memory_hits"] != 1:
+        failures.append(f"expected one memory hit: {cc.cache_stats()}")
+
+    # 2. Disk tier survives a dropped memory tier (new process).
+    cc._memory = None
+    df.census_get_json(ACS, params=_params("county:*"))
+    if fake.calls != 1:
+        failures.append("disk tier did not serve the response after memory was dropped")
+    if cc.cache_stats()["disk_hits"] != 1:
+        failures.append(f"expected one disk hit: {cc.cache_stats()}")
+
+    # 3. TTL, eviction, bounded memory.
+    expired = CensusResponseCache(os.path.join(_TMP, "ttl.sqlite3"), ttl_secs=-1)
+    expired.put("k", "[]", source=ACS)
+    if expired.get("k") is not None or expired.entries() != 0:
+        failures.append("row past TTL should miss and be deleted")
+
+    store = CensusResponseCache(os.path.join(_TMP, "lru.sqlite3"), max_entries=2)
+    store.put("a", "1", source=ACS)
+    time.sleep(0.01)
+    store.put("b", "2", source=ACS)
+    time.sleep(0.01)
+    store.get("a")
+    time.sleep(0.01)
+    store.put("c", "3", source=ACS)
+    if store.get("b") is not None or store.get("a") != "1" or store.get("c") != "3":
+        failures.append("disk tier should evict the least recently used row (b)")
+
+    for i in range(10):
+        df.census_get_json(ACS, params=_params(f"tract:{i}"))
+    if len(cc._memory) > 4:
+        failures.append(f"memory tier grew to {len(cc._memory)} entries (cap 4)")
+
+    # 4. Single-flight across threads.
+    slow = _FakeCensus(delay=0.2)
+    df._census_get = slow
+    results: list = []
+    threads = [
+        threading.Thread(target=lambda: results.append(
+            df.census_get_json(ACS, params=_params("block group:*"))))
+        for _ in range(8)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    if slow.calls != 1:
+        failures.append(f"8 concurrent identical requests made {slow.calls} HTTP calls")
+    if len(results) != 8 or any(r != results[0] for r in results):
+        failures.append("concurrent callers did not all receive the shared result")
+    if cc.cache_stats()["coalesced"] < 1:
+        failures.append(f"coalesced counter not incremented: {cc.cache_stats()}")
+
+    # 5. Shared failure, not cached.
+    broken = _FakeCensus(delay=0.1, fail=True)
+    df._census_get = broken
+    errors: list = []
+
+    def _call():
+        try:
+            df.census_get_json(ACS, params=_params("place:*"))
+        except ConnectionError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=_call) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    if len(errors) != 4 or broken.calls != 1:
+        failures.append(f"failure not shared: {len(errors)} errors, {broken.calls} calls")
+    broken.fail = False
+    df.census_get_json(ACS, params=_params("place:*"))
+    if broken.calls != 2:
+        failures.append("a failed fetch should not be cached")
+
+    # 6. Opt-out.
+    os.environ["CENSUS_CACHE_ENABLED"] = "0"
+    df.census_get_json(ACS, params=_params("place:*"))
+    os.environ["CENSUS_CACHE_ENABLED"] = "1"
+    if broken.calls != 3:
+        failures.append("CENSUS_CACHE_ENABLED=0 should bypass the cache")
+
+    print("census cache test: 6 cases.")
+    if failures:
+        print(f"FAIL: {len(failures)} assertion(s) failed:")
+        for f in failures:
+            print(f"  - {f}")
+        return 1
+    print("PASS: all assertion groups OK.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
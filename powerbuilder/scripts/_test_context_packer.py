@@ -0,0 +1,220 @@
+"""
+Tests for the token-budgeted context packer (chat/utils/context_packer.py)
+and its use by the messaging and synthesis prompts.
+
+Verifies:
+  1. count_tokens uses a per-provider estimate and is monotonic in length.
+  2. Memos are ranked by relevance to the query and by recency; pinned memos
+     outrank both.
+  3. compact_block folds indented rows onto their header, squeezes padding
+     and drops empty fields without losing any figures.
+  4. pack_context keeps the context under budget, reports the tokens and
+     memos it dropped, truncates the boundary memo at a line break, returns
+     kept memos in their original order, and leaves context that already
+     fits untouched; budget 0 disables packing. Pinned memos are never
+     cut, and their overflow shrinks the structured share.
+  5. messaging_node and the synthesizer send packed prompts under a tight
+     budget, emit a trace event reporting the drop, and send the full
+     context when the budget is generous.
+
+Usage:
+    python scripts/_test_context_packer.py
+"""
+from __future__ import annotations
+
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+PROJECT_DIR = SCRIPT_DIR.parent
+sys.path.insert(0, str(PROJECT_DIR))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "powerbuilder_app.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from chat import progress  # noqa: E402
+from chat.agents import export as export_mod  # noqa: E402
+from chat.agents import messaging as msg_mod  # noqa: E402
+from chat.agents.messaging import SECTION_MARKERS  # noqa: E402
+from chat.utils import context_packer as cp  # noqa: E402
+
+
+def _memo(source: str, date: str, body: str, lines: int = 1) -> str:
+    return f"--- MEMO FROM SOURCE: {source} | DATE: {date} ---\n" + "\n".join([body] * lines)
+
+
+class _Reply:
+    def __init__(self, content: str) -> None:
+        self.content = content
+
+
+class _FakeLLM:
+    def __init__(self) -> None:
+        self.prompts: list[str] = []
+
+    def invoke(self, prompt) -> _Reply:
+        if isinstance(prompt, list):
+            prompt = prompt[-1]["content"]
+        self.prompts.append(prompt)
+        return _Reply("\n\n".join(f"{m}\nCopy." for m in SECTION_MARKERS.values()))
+
+
+def _drain(run_id: str) -> list:
+    events = progress.read(run_id)
+    progress.finish(run_id)
+    return events
+
+
+def main() -> int:
+    failures: list[str] = []
+
+    # 1. Counting.
+    text = "Young voters respond to peer-to-peer contact. " * 40
+    for provider in ("anthropic", "gemini", "mistral", "groq", "unknown"):
+        n = cp.count_tokens(text, provider)
+        if not len(text) / 6 < n < len(text) / 2:
+            failures.append(f"{provider}: {n} tokens for {len(text)} chars")
+        if cp.count_tokens(text + text, provider) <= n:
+            failures.append(f"{provider}: count not monotonic")
+    if cp.count_tokens("", "openai") != 0 or cp.count_tokens("hello world", "openai") <= 0:
+        failures.append("openai count")
+
+    # 2. Ranking.
+    now = datetime(2026, 1, 1)
+    memos = [
+        _memo("a", "2025-06-01", "Housing costs dominate renter concerns."),
+        _memo("b", "2025-06-01", "Latino youth turnout rose with bilingual canvassing."),
+        _memo("c", "2016-06-01", "Latino youth turnout rose with bilingual canvassing."),
+        _memo("d", "2025-06-01", "Seniors prefer mail."),
+    ]
+    scores = cp.rank_memos(memos, "latino youth turnout canvassing", now=now)
+    if not scores[1] > scores[2] > scores[0]:
+        failures.append(f"relevance/recency ranking: {scores}")
+    if cp.memo_date(memos[2]) != datetime(2016, 6, 1) or cp.memo_date("no header") is not None:
+        failures.append("memo_date parsing")
+
+    # 3. Compaction.
+    block = (
+        "WIN NUMBER DATA — cite all figures:\n"
+        "  Win number (votes needed to win): 12,000\n"
+        "  Projected turnout:                50,000\n"
+        "  Persuadable universe:             N/A\n"
+        "\n"
+        "PRECINCT DATA: 40 total precincts\n"
+        "  Top targets:\n"
+        "    - 0012: 3,104 voters\n"
+        "    - 0031: 2,870 voters\n"
+    )
+    compact = cp.compact_block(block)
+    for figure in ("12,000", "50,000", "3,104", "2,870", "0031"):
+        if figure not in compact:
+            failures.append(f"compaction lost {figure}: {compact!r}")
+    if "N/A" in compact or "  " in compact or compact.count("\n") != 1:
+        failures.append(f"compaction: {compact!r}")
+    if cp.count_tokens(compact, "anthropic") >= cp.count_tokens(block, "anthropic"):
+        failures.append("compaction did not save tokens")
+
+    # 4. Packing.
+    corpus = [
+        _memo("old", "2012-01-01", "Generic field program notes about volunteer shifts.", 30),
+        _memo("relevant", "2025-03-01", "Latino youth turnout rose with bilingual canvassing.", 30),
+        _memo("mail", "2024-01-01", "Seniors respond to mail about prescription costs.", 30),
+        _memo("msg", "2025-01-01", "Scripts.", 2).replace("MEMO FROM SOURCE", "MESSAGING OUTPUT"),
+    ]
+    sizes = [cp.count_tokens(m, "anthropic") for m in corpus]
+    budget = sizes[1] + sizes[3] + 260
+    packed = cp.pack_context(
+        corpus, [block], budget=budget, query="latino youth turnout", provider="anthropic",
+        pinned=lambda m: m.startswith("--- MESSAGING OUTPUT:"),
+    )
+    if packed.tokens > budget:
+        failures.append(f"packed {packed.tokens} tokens over budget {budget}")
+    if packed.dropped_tokens != sum(sizes) + cp.count_tokens(block, "anthropic") - packed.tokens:
+        failures.append(f"dropped_tokens {packed.dropped_tokens} inconsistent")
+    if "bilingual canvassing" not in packed.research or "MESSAGING OUTPUT" not in packed.research:
+        failures.append("relevant or pinned memo dropped")
+    if packed.dropped_memos < 1 or "volunteer shifts" in packed.research:
+        failures.append(f"least relevant memo kept (dropped {packed.dropped_memos})")
+    if packed.truncated and not packed.research.split("[…")[0].rstrip().endswith("costs."):
+        failures.append("truncated memo not cut at a line break")
+    if packed.research.index("bilingual") > packed.research.index("MESSAGING OUTPUT"):
+        failures.append("kept memos out of original order")
+    scripts = [_memo(f"msg{i}", "2020-01-01", f"Script line {i} read word for word.", 25)
+               .replace("MEMO FROM SOURCE", "MESSAGING OUTPUT") for i in range(2)]
+    pinned_tokens = sum(cp.count_tokens(m, "anthropic") for m in scripts)
+    budget = pinned_tokens + 100
+    crowded = cp.pack_context(
+        corpus[:3] + scripts, [block * 20], budget=budget, query="latino youth turnout",
+        provider="anthropic", pinned=lambda m: m.startswith("--- MESSAGING OUTPUT:"),
+    )
+    if any(m not in crowded.research for m in scripts) or {3, 4} & set(crowded.truncated):
+        failures.append("pinned memos were cut or dropped under a tight budget")
+    if crowded.tokens > budget or sum(cp.count_tokens(b, "anthropic") for b in crowded.blocks) > 100:
+        failures.append(f"pinned overflow not taken from the structured share: {crowded.tokens}/{budget}")
+    over = cp.pack_context(scripts, [block], budget=pinned_tokens // 2, provider="anthropic",
+                           pinned=lambda m: m.startswith("--- MESSAGING OUTPUT:"))
+    if over.research != "\n\n".join(scripts) or over.truncated:
+        failures.append("pinned memos over the whole budget should still be sent whole")
+    tight = cp.pack_context(corpus, [block * 20], budget=400, provider="anthropic")
+    if not tight.compacted or tight.tokens > 400:
+        failures.append(f"oversized structured block: compacted={tight.compacted} tokens={tight.tokens}")
+    roomy = cp.pack_context(corpus, [block], budget=10 ** 6, provider="anthropic")
+    if roomy.research != "\n\n".join(corpus) or roomy.blocks != [block] or roomy.trimmed:
+        failures.append("context under budget was changed")
+    off = cp.pack_context(corpus, [block], budget=0, provider="anthropic")
+    if off.research != "\n\n".join(corpus) or off.trimmed:
+        failures.append("budget 0 should disable packing")
+
+    # 5. Prompt integration.
+    research = [_memo(f"s{i}", "2025-01-01", f"Finding {i} about turnout in the district.", 60) for i in range(12)]
+    os.environ["CONTEXT_BUDGET_MESSAGING"] = "1500"
+    llm = _FakeLLM()
+    msg_mod.get_completion_client = lambda temperature=0.4: llm
+    run_id = progress.new_run_id()
+    progress.create(run_id)
+    msg_mod.messaging_node({"query": "turnout", "research_results": research,
+                            "structured_data": [], "run_id": run_id})
+    trimmed = [e for e in _drain(run_id) if e.type == "trace" and e.payload.get("dropped_tokens")]
+    prompt = llm.prompts[0] if llm.prompts else ""
+    kept = sum(f"Finding {i} " in prompt for i in range(12))
+    if not trimmed or trimmed[0].agent != "messaging" or not 0 < kept < 12:
+        failures.append(f"messaging: {kept} memos kept, trace events {len(trimmed)}")
+    os.environ["CONTEXT_BUDGET_MESSAGING"] = "0"
+    llm = _FakeLLM()
+    msg_mod.get_completion_client = lambda temperature=0.4: llm
+    msg_mod.messaging_node({"query": "turnout", "research_results": research, "structured_data": []})
+    if sum(f"Finding {i} " in llm.prompts[0] for i in range(12)) != 12:
+        failures.append("messaging with budget 0 dropped research")
+
+    os.environ["CONTEXT_BUDGET_SYNTHESIS"] = "1500"
+    llm = _FakeLLM()
+    export_mod.get_completion_client = lambda temperature=0.3: llm
+    run_id = progress.new_run_id()
+    progress.create(run_id)
+    state = {"query": "turnout plan", "research_results": research + corpus[3:],
+             "structured_data": [], "active_agents": ["researcher"], "errors": []}
+    export_mod._synthesize(state, is_plan=True, run_id=run_id)
+    trimmed = [e for e in _drain(run_id) if e.type == "trace" and e.payload.get("dropped_tokens")]
+    prompt = llm.prompts[0]
+    if not trimmed or "MESSAGING OUTPUT: msg" not in prompt or "No structured data collected." not in prompt:
+        failures.append(f"synthesis: trace events {len(trimmed)}, pinned memo kept "
+                        f"{'MESSAGING OUTPUT: msg' in prompt}")
+    if sum(f"Finding {i} " in prompt for i in range(12)) == 12:
+        failures.append("synthesis prompt was not packed")
+
+    print("context packer test: 5 cases.")
+    if failures:
+        print(f"FAIL: {len(failures)} assertion(s) failed:")
+        for f in failures:
+            print(f"  - {f}")
+        return 1
+    print("PASS: all assertion groups OK.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,207 @@
+"""
+Tests for database-backed conversation history (chat/conversations.py,
+the Conversation/Message models and the history views).
+
+Verifies:
+  1. append_turn() starts a conversation, stores both messages in the
+     database, and leaves only ids in the session; follow-up turns do not
+     modify the session at all.
+  2. The serialized session stays the same size as history grows.
+  3. history() pages backwards from the latest message with a cursor and
+     never splits a user/assistant turn.
+  4. Ownership: another session cannot read, rename or delete the
+     conversation; MAX_CONVERSATIONS trims the oldest rows.
+  5. A legacy session ``conversations`` list is imported once and dropped.
+  6. chat_view renders only the latest page plus the "Load earlier"
+     cursor; conv_messages_view returns the older page and 404s for
+     conversations the session does not own.
+  7. Conversations record their session: logout deletes that session's
+     conversations, and prune_conversations deletes those of expired
+     sessions while keeping live ones.
+
+Usage:
+    python scripts/_test_conversation_store.py
+"""
+from __future__ import annotations
+
+import datetime
+import json
+import os
+import sys
+from importlib import import_module
+from io import StringIO
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+PROJECT_DIR = SCRIPT_DIR.parent
+sys.path.insert(0, str(PROJECT_DIR))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "powerbuilder_app.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.sessions.backends.db import SessionStore as DBSessionStore  # noqa: E402
+from django.contrib.sessions.models import Session  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test import RequestFactory  # noqa: E402
+
+from chat import conversations  # noqa: E402
+from chat import views as chat_views  # noqa: E402
+from chat.models import Conversation, Message  # noqa: E402
+from chat.render_helpers import auto_title  # noqa: E402
+
+
+def _session():
+    engine = import_module("django.contrib.sessions.backends.signed_cookies")
+    session = engine.SessionStore()
+    session["authenticated"] = True
+    return session
+
+
+def _answer(n: int) -> dict:
+    html = f"<h1>Plan {n}</h1>" + "<p>" + "Knock doors in precinct 12. " * 200 + "</p>"
+    return {"content": f"Plan {n}", "answer_html": html, "bubble_id": f"b-{n:010d}",
+            "downloads": [{"filename": f"plan_{n}.docx", "label": "Download Word Doc"}]}
+
+
+def _session_size(session) -> int:
+    return len(json.dumps(dict(session.items()), default=str))
+
+
+def main() -> int:
+    failures: list[str] = []
+    connection.creation.create_test_db(verbosity=0)
+    os.environ["CHAT_HISTORY_PAGE_SIZE"] = "4"
+    rf = RequestFactory()
+
+    # 1. Append.
+    session = _session()
+    conv = conversations.append_turn(session, "Build a plan for GA-07", _answer(0))
+    if session.get("conversation_ids") != [conv.id] or session.get("current_conv_id") != conv.id:
+        failures.append(f"session after first turn: {dict(session.items())}")
+    if "conversations" in session or conv.title != auto_title("Build a plan for GA-07"):
+        failures.append(f"unexpected session shape or title {conv.title!r}")
+    stored = [m.as_dict() for m in conv.messages.all()]
+    if [m["role"] for m in stored] != ["user", "assistant"] or "<h1>Plan 0</h1>" not in stored[1]["answer_html"]:
+        failures.append(f"stored messages {[m['role'] for m in stored]}")
+    session.modified = False
+    conversations.append_turn(session, "Now add a mail program", _answer(1))
+    if session.modified:
+        failures.append("a follow-up turn should not modify the session")
+
+    # 2. Session size stays flat.
+    size = _session_size(session)
+    for n in range(2, 30):
+        conversations.append_turn(session, f"Revision {n}", _answer(n))
+    if _session_size(session) != size:
+        failures.append(f"session grew from {size} to {_session_size(session)} bytes over 28 turns")
+    if Message.objects.filter(conversation=conv).count() != 60:
+        failures.append("expected 60 stored messages")
+
+    # 3. Paging.
+    page, cursor = conversations.history(conv)
+    if [m["content"] for m in page] != ["Revision 28", "Plan 28", "Revision 29", "Plan 29"]:
+        failures.append(f"latest page {[m['content'] for m in page]}")
+    seen = list(page)
+    while cursor is not None:
+        page, cursor = conversations.history(conv, before=cursor)
+        if not page or page[0]["role"] != "user":
+            failures.append("a page should start with a user message")
+            break
+        seen = page + seen
+    if len(seen) != 60 or seen[0]["content"] != "Build a plan for GA-07":
+        failures.append(f"paging visited {len(seen)} messages")
+
+    # 4. Ownership and the conversation cap.
+    other = _session()
+    if conversations.get(other, conv.id) or conversations.rename(other, conv.id, "x") \
+            or conversations.delete(other, conv.id):
+        failures.append("another session must not reach this conversation")
+    for n in range(conversations.MAX_CONVERSATIONS + 2):
+        other["current_conv_id"] = None
+        conversations.append_turn(other, f"Question {n}", _answer(n))
+    ids = other["conversation_ids"]
+    if len(ids) != conversations.MAX_CONVERSATIONS:
+        failures.append(f"{len(ids)} conversations kept, cap is {conversations.MAX_CONVERSATIONS}")
+    if Conversation.objects.filter(title__in=["Question 0", "Question 1"]).exists():
+        failures.append("conversations trimmed past the cap should be deleted")
+    if [c["title"] for c in conversations.sidebar(other)][:2] != ["Question 21", "Question 20"]:
+        failures.append("sidebar should list the newest conversation first")
+
+    # 5. Legacy import.
+    legacy = _session()
+    legacy["conversations"] = [{
+        "id": "legacy-1", "title": "Old plan", "timestamp": "2026-04-28 09:00",
+        "messages": [{"role": "user", "content": "Old question", "msg_id": "abc"},
+                     {"role": "assistant", "content": "Old answer", "answer_html": "<p>Old answer</p>"}],
+    }]
+    legacy["current_conv_id"] = "legacy-1"
+    old = conversations.get(legacy, "legacy-1")
+    if "conversations" in legacy or legacy.get("conversation_ids") != ["legacy-1"] or old is None:
+        failures.append(f"legacy session not imported: {dict(legacy.items())}")
+    elif [m["content"] for m in conversations.history(old)[0]] != ["Old question", "Old answer"]:
+        failures.append("legacy messages not imported")
+
+    # 6. Views.
+    req = rf.get("/chat/")
+    req.session = session
+    resp = chat_views.chat_view(req)
+    body = resp.content.decode("utf-8")
+    if "<h1>Plan 29</h1>" not in body or "<h1>Plan 27</h1>" in body or 'data-before="' not in body:
+        failures.append("chat view should render only the latest page and a load-earlier cursor")
+    _, cursor = conversations.history(conv)
+    req = rf.get(f"/api/conv/{conv.id}/messages/", {"before": cursor})
+    req.session = session
+    data = json.loads(chat_views.conv_messages_view(req, conv_id=conv.id).content)
+    if not data.get("ok") or "<h1>Plan 27</h1>" not in data["html"] or not data["before"]:
+        failures.append(f"older page response {str(data)[:200]}")
+    req = rf.get(f"/api/conv/{conv.id}/messages/")
+    req.session = _session()
+    if chat_views.conv_messages_view(req, conv_id=conv.id).status_code != 404:
+        failures.append("pager must 404 for a conversation the session does not own")
+
+    # 7. Lifetime: logout and pruning.
+    def _db_session():
+        db_session = DBSessionStore()
+        db_session["authenticated"] = True
+        db_session.save()
+        return db_session
+
+    leaving, staying, expired = _db_session(), _db_session(), _db_session()
+    gone = conversations.append_turn(leaving, "Plan to delete on logout", _answer(0))
+    kept = conversations.append_turn(staying, "Plan to keep", _answer(1))
+    stale = conversations.append_turn(expired, "Plan of an expired session", _answer(2))
+    if gone.session_key != leaving.session_key:
+        failures.append(f"conversation owner {gone.session_key!r}, expected the session key")
+    req = rf.get("/logout/")
+    req.session = leaving
+    chat_views.logout_view(req)
+    if Conversation.objects.filter(id=gone.id).exists() or Message.objects.filter(conversation_id=gone.id).exists():
+        failures.append("logout should delete the session's conversations and messages")
+    Session.objects.filter(session_key=expired.session_key).update(
+        expire_date=datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc))
+    out = StringIO()
+    call_command("prune_conversations", "--dry-run", stdout=out)
+    if not Conversation.objects.filter(id=stale.id).exists() or "would delete" not in out.getvalue():
+        failures.append(f"--dry-run should delete nothing: {out.getvalue()!r}")
+    call_command("prune_conversations", stdout=StringIO())
+    if Conversation.objects.filter(id=stale.id).exists():
+        failures.append("prune should delete conversations of expired sessions")
+    if list(Conversation.objects.values_list("id", flat=True)) != [kept.id]:
+        failures.append("prune should keep only conversations of live sessions")
+
+    os.environ.pop("CHAT_HISTORY_PAGE_SIZE")
+    print("conversation store test: 7 cases.")
+    if failures:
+        print(f"FAIL: {len(failures)} assertion(s) failed:")
+        for f in failures:
+            print(f"  - {f}")
+        return 1
+    print("PASS: all assertion groups OK.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
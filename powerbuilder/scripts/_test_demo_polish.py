@@ -123,9 +123,9 @@ assert_(
     "request.session.save()" in src,
     "_build_done_payload must call request.session.save() explicitly",
 )
-# Belt-and-braces: the modified flag is still set so callers that DO have a
-# normal (non-streaming) request flush correctly via SessionMiddleware.
-assert_("request.session.modified = True" in src, "session.modified still set")
+# The save is gated on the modified flag: only a turn that starts a new
+# conversation changes the session (message bodies live in the database).
+assert_("if request.session.modified:" in src, "session saved only when modified")
 # And the explicit save is wrapped in a try/except so a session-store hiccup
 # never crashes the SSE done frame after the bubble already rendered.
 assert_("except Exception" in src and "logger.exception" in src, "session.save wrapped in try/except")
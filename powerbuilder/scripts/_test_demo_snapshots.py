@@ -0,0 +1,205 @@
+"""
+Tests for pre-baked demo tile snapshots (chat/demo_snapshots.py and the
+bake_demo_tiles management command).
+
+Verifies:
+  1. bake() stores the final answer, the progress timeline (offsets from
+     the start of the run, no queued/terminal events) and copies of the
+     generated files.
+  2. find() serves a snapshot only in DEMO_MODE with DEMO_SNAPSHOTS set,
+     for the tile prompt (case/whitespace folded), the baked options, and
+     the org and attached file the bake ran with.
+  3. replay() re-emits the timeline into the run's progress log, paced like
+     the original run (gaps capped) or instantly, and restores the generated
+     files into the exports directory.
+  4. Invalidation: editing the tile text or a data dependency makes the
+     snapshot stale; find() then returns None so the query runs live.
+  5. manage.py bake_demo_tiles --check / --stale-only report and skip
+     current snapshots; unknown tiles are rejected.
+
+Usage:
+    python scripts/_test_demo_snapshots.py
+"""
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+import time
+from io import StringIO
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+PROJECT_DIR = SCRIPT_DIR.parent
+sys.path.insert(0, str(PROJECT_DIR))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "powerbuilder_app.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.core.management import CommandError, call_command  # noqa: E402
+
+import chat.agents.manager as mgr  # noqa: E402
+from chat import demo_snapshots as ds  # noqa: E402
+from chat import demo_tiles  # noqa: E402
+from chat import progress  # noqa: E402
+
+_TILES = [{"id": "win-ga07", "chip": "Win number", "chip_kind": "win", "headline": "GA-07",
+           "preview": "Quick lookup.", "prompt": "What is the win number for GA-07?"}]
+
+
+class _FakeApp:
+    """Stands in for the compiled LangGraph app: paced events plus a CSV."""
+
+    def __init__(self, exports: Path) -> None:
+        self.exports = exports
+        self.calls = 0
+
+    def invoke(self, state, config=None):
+        self.calls += 1
+        rid = state["run_id"]
+        progress.emit(rid, "queued", label="Queued — 1 ahead", position=2)
+        progress.emit(rid, "agent_start", agent="win_number", label="Computing the win number")
+        time.sleep(0.3)
+        progress.emit(rid, "agent_done", agent="win_number", label="Win number ready", votes=151_000)
+        csv = self.exports / "ga07_targets.csv"
+        csv.write_text("precinct,score\n101,0.8\n")
+        return {"final_answer": "You need 151,000 votes.", "active_agents": ["win_number"],
+                "errors": [], "research_results": [], "generated_files": [str(csv)],
+                "structured_data": [{"big": "not stored"}]}
+
+
+_DEMO_FILE = ""
+
+
+def _find(query: str, **kwargs):
+    """ds.find with the demo voter file attached, as the demo views do."""
+    kwargs.setdefault("uploaded_file_path", _DEMO_FILE)
+    return ds.find(query, **kwargs)
+
+
+def main() -> int:
+    failures: list[str] = []
+    tmp = Path(tempfile.mkdtemp(prefix="demo_snapshots_"))
+    (tmp / "exports").mkdir()
+    os.environ["DEMO_SNAPSHOT_DIR"] = str(tmp / "snapshots")
+    ds.EXPORTS_DIR = str(tmp / "served")
+    dep = tmp / "pvi.json"
+    dep.write_text('{"GA-07": "R+3"}')
+    ds.DATA_DEPENDENCIES = (str(dep),)
+    ds.get_demo_tiles = demo_tiles.get_demo_tiles = lambda: [dict(t) for t in _TILES]
+    global _DEMO_FILE
+    _DEMO_FILE = str(tmp / "demo_voters.csv")
+    Path(_DEMO_FILE).write_text("voter_id,age\n1,45\n2,61\n")
+    ds.DEMO_VOTERFILE = _DEMO_FILE
+    progress.set_bus(progress.InProcessBus())
+    app = mgr.manager_app = _FakeApp(tmp / "exports")
+    settings.DEMO_MODE = True
+
+    # 1. Bake.
+    snap = ds.bake("win-ga07")
+    types = [e["type"] for e in snap["events"]]
+    if types != ["agent_start", "agent_done"]:
+        failures.append(f"timeline events {types}")
+    elif not 0.25 <= snap["events"][1]["t"] - snap["events"][0]["t"] <= 1.0:
+        failures.append(f"timeline offsets {[e['t'] for e in snap['events']]}")
+    if snap["files"] != ["ga07_targets.csv"] or not (tmp / "snapshots" / "win-ga07.en.files" / "ga07_targets.csv").exists():
+        failures.append(f"generated file not stored: {snap['files']}")
+    if snap["result"]["final_answer"] != "You need 151,000 votes." or "structured_data" in snap["result"]:
+        failures.append(f"stored result fields: {sorted(snap['result'])}")
+    if progress.active_run_ids():
+        failures.append("bake left its progress run open")
+
+    # 2. Lookup.
+    if _find("what is the win number for  GA-07?"):
+        failures.append("snapshots should be off unless DEMO_SNAPSHOTS is set")
+    os.environ["DEMO_SNAPSHOTS"] = "replay"
+    if not _find("what is the win number for  GA-07?"):
+        failures.append("case/whitespace variant of the tile prompt should match")
+    if _find("What is the win number for GA-07?", ab_test=True) or _find("What about GA-06?"):
+        failures.append("different options or prompt should not match")
+    if not _find("What is the win number for GA-07?", plan_mode="auto"):
+        failures.append("plan_mode=auto is the baked default")
+    own = tmp / "my_voters.csv"
+    own.write_text("voter_id,age\n1,30\n")
+    if _find("What is the win number for GA-07?", uploaded_file_path=str(own)):
+        failures.append("a user's own upload must not get the canned answer")
+    if _find("What is the win number for GA-07?", org_namespace="acme"):
+        failures.append("another org must not get the snapshot baked for 'general'")
+    if snap["org_namespace"] != "general" or not snap["upload"]:
+        failures.append(f"bake should record its org and upload: {snap['org_namespace']}, {snap['upload']}")
+    settings.DEMO_MODE = False
+    if _find("What is the win number for GA-07?"):
+        failures.append("snapshots must not be served outside DEMO_MODE")
+    settings.DEMO_MODE = True
+
+    # 3. Replay, paced and instant.
+    snapshot = _find("What is the win number for GA-07?")
+    rid = progress.create(progress.new_run_id())
+    os.environ["DEMO_SNAPSHOT_MAX_GAP_SECS"] = "0.2"
+    start = time.monotonic()
+    result = ds.replay(snapshot, rid)
+    paced = time.monotonic() - start
+    if not 0.15 <= paced < 0.6:
+        failures.append(f"paced replay took {paced:.2f}s, expected the capped 0.2s gap")
+    replayed = [(e.type, e.label) for e in progress.read(rid)]
+    if replayed != [("agent_start", "Computing the win number"), ("agent_done", "Win number ready")]:
+        failures.append(f"replayed events {replayed}")
+    if progress.read(rid)[1].payload.get("votes") != 151_000:
+        failures.append("event payload not replayed")
+    served = tmp / "served" / "ga07_targets.csv"
+    if result["generated_files"] != [str(served)] or not served.exists():
+        failures.append(f"generated file not restored: {result['generated_files']}")
+    if result["final_answer"] != "You need 151,000 votes." or not isinstance(result["active_agents"], list):
+        failures.append(f"replayed result {result}")
+    start = time.monotonic()
+    ds.replay(snapshot, None, instant=True)
+    if time.monotonic() - start > 0.1:
+        failures.append("instant replay should not sleep")
+    progress.finish(rid)
+
+    # 4. Invalidation.
+    _TILES[0]["prompt"] = "What is the win number for GA-07 in a midterm?"
+    if ds.is_current(snapshot) or _find("What is the win number for GA-07?"):
+        failures.append("edited tile text should invalidate the snapshot")
+    _TILES[0]["prompt"] = "What is the win number for GA-07?"
+    if not ds.is_current(snapshot):
+        failures.append("restored tile text should make the snapshot current again")
+    dep.write_text('{"GA-07": "R+1"}')
+    os.utime(dep, ns=(0, dep.stat().st_mtime_ns + 10**9))
+    if _find("What is the win number for GA-07?"):
+        failures.append("changed data dependency should invalidate the snapshot")
+
+    # 5. Management command.
+    out = StringIO()
+    call_command("bake_demo_tiles", "--check", stdout=out)
+    if "win-ga07 [en]: stale" not in out.getvalue():
+        failures.append(f"--check output: {out.getvalue()!r}")
+    calls = app.calls
+    call_command("bake_demo_tiles", stdout=StringIO())
+    call_command("bake_demo_tiles", "--stale-only", stdout=(out := StringIO()))
+    if app.calls != calls + 1 or "current, skipped" not in out.getvalue():
+        failures.append("--stale-only should skip a freshly baked tile")
+    try:
+        call_command("bake_demo_tiles", "--tile", "nope", stdout=StringIO())
+        failures.append("unknown tile should raise CommandError")
+    except CommandError:
+        pass
+
+    os.environ.pop("DEMO_SNAPSHOTS")
+    os.environ.pop("DEMO_SNAPSHOT_MAX_GAP_SECS")
+    progress.set_bus(None)
+    print("demo snapshots test: 5 cases.")
+    if failures:
+        print(f"FAIL: {len(failures)} assertion(s) failed:")
+        for f in failures:
+            print(f"  - {f}")
+        return 1
+    print("PASS: all assertion groups OK.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
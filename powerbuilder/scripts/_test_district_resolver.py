@@ -0,0 +1,195 @@
+"""
+Tests for the shared district resolver (chat/agents/district_resolver.py)
+and the agents that consume its record.
+
+Verifies:
+  1. resolve_district_params builds congressional / state-legislative GEOIDs,
+     maps US Senate to "statewide", omits geography for an unknown state,
+     and parses budgets ("$50,000" -> 50000.0, NONE -> None).
+  2. district_resolver_node makes exactly one LLM call and always appends a
+     record, even when the call fails.
+  3. intent_router_node schedules the resolver once for district and plan
+     queries, never twice, and skips it when an earlier agent already
+     recorded the geography.
+  4. PrecinctsAgent.run reads the record instead of calling the LLM.
+  5. finance_node reuses the record's budget instead of calling the LLM.
+
+Usage:
+    python scripts/_test_district_resolver.py
+"""
+from __future__ import annotations
+
+import os
+import sys
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+PROJECT_DIR = SCRIPT_DIR.parent
+sys.path.insert(0, str(PROJECT_DIR))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "powerbuilder_app.settings")
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+import django  # noqa: E402
+
+django.setup()
+
+import chat.agents.district_resolver as resolver_mod  # noqa: E402
+import chat.agents.finance_agent as finance_mod  # noqa: E402
+import chat.agents.manager as mgr  # noqa: E402
+import chat.agents.precincts as precincts_mod  # noqa: E402
+from chat.agents.district_resolver import (  # noqa: E402
+    district_resolver_node,
+    get_district_record,
+    resolve_district_params,
+)
+from chat.agents.manager import intent_router_node  # noqa: E402
+
+
+class _FakeChat:
+    """Stand-in for the completion client: counts invokes and returns a fixed reply."""
+    calls = 0
+    reply = ""
+    raise_exc: Exception | None = None
+
+    def __init__(self, *args, **kwargs) -> None:
+        pass
+
+    def invoke(self, prompt):
+        type(self).calls += 1
+        if type(self).raise_exc is not None:
+            raise type(self).raise_exc
+
+        class _Resp:
+            content = type(self).reply
+        return _Resp()
+
+
+def _reset_fake(reply: str = "", raise_exc: Exception | None = None) -> None:
+    _FakeChat.calls = 0
+    _FakeChat.reply = reply
+    _FakeChat.raise_exc = raise_exc
+
+
+def main() -> int:
+    failures: list[str] = []
+
+    # 1. Pure parsing
+    rec = resolve_district_params({
+        "STATE": "Georgia", "DISTRICT_TYPE": "congressional",
+        "DISTRICT_NUM": "7", "BUDGET": "$50,000",
+    })
+    if rec.get("district_id") != "1307" or rec.get("state_fips") != "13":
+        failures.append(f"GA-07 resolved wrong: {rec}")
+    if rec.get("budget") != 50000.0:
+        failures.append(f"budget '$50,000' parsed as {rec.get('budget')!r}")
+    if rec.get("top_n") != 20 or rec.get("target_year") != 2026:
+        failures.append(f"defaults missing: {rec}")
+
+    rec = resolve_district_params({"STATE": "VA", "DISTRICT_TYPE": "state_senate", "DISTRICT_NUM": "7"})
+    if rec.get("district_id") != "51S007":
+        failures.append(f"VA SD-07 resolved wrong: {rec.get('district_id')!r}")
+
+    rec = resolve_district_params({"STATE": "Arizona", "DISTRICT_TYPE": "senate"})
+    if rec.get("district_id") != "statewide":
+        failures.append(f"US Senate should be statewide: {rec.get('district_id')!r}")
+
+    rec = resolve_district_params({"STATE": "NONE", "BUDGET": "NONE"})
+    if "state_fips" in rec or "district_id" in rec:
+        failures.append(f"unknown state should carry no geography: {rec}")
+    if rec.get("budget") is not None or "budget" not in rec:
+        failures.append(f"BUDGET: NONE should record budget=None: {rec}")
+
+    # 2. Node: one LLM call, always a record.
+    resolver_mod.get_completion_client = lambda **kwargs: _FakeChat()
+    _reset_fake("STATE: Georgia\nDISTRICT_TYPE: congressional\nDISTRICT_NUM: 7\n"
+                "TARGET_YEAR: 2026\nVICTORY_MARGIN: 0.52\nTOP_N: 15\nBUDGET: NONE")
+    out = district_resolver_node({"query": "GOTV plan for GA-07"})
+    record = get_district_record(out.get("structured_data"))
+    if _FakeChat.calls != 1:
+        failures.append(f"resolver made {_FakeChat.calls} LLM calls, expected 1")
+    if not record or record.get("district_id") != "1307" or record.get("top_n") != 15:
+        failures.append(f"resolver node record wrong: {record}")
+
+    _reset_fake(raise_exc=RuntimeError("boom"))
+    out = district_resolver_node({"query": "GOTV plan for GA-07"})
+    if get_district_record(out.get("structured_data")) is None:
+        failures.append("resolver must append a record even when the LLM fails")
+    if not out.get("errors"):
+        failures.append("resolver LLM failure should surface a non-fatal error")
+
+    # 3. Router scheduling
+    class _RouterLLM:
+        def invoke(self, prompt):
+            class _Resp:
+                content = "DECISION: WIN_NUMBER, FORMAT: MARKDOWN, PLAN: NO"
+            return _Resp()
+    mgr.get_model = lambda: _RouterLLM()
+
+    base = {
+        "query": "What is the win number for Georgia's 7th Congressional District?",
+        "active_agents": [], "research_results": [], "structured_data": [],
+    }
+    out = intent_router_node(base)
+    if out["router_decision"] != "district_resolver":
+        failures.append(f"district query routed to {out['router_decision']!r}, expected district_resolver")
+    out = intent_router_node({**base, "structured_data": [record]})
+    if out["router_decision"] != "win_number":
+        failures.append(f"resolver scheduled twice: {out['router_decision']!r}")
+    er_entry = {"agent": "election_results", "state_fips": "13",
+                "district_type": "congressional", "district_id": "1307"}
+    out = intent_router_node({**base, "structured_data": [er_entry]})
+    if out["router_decision"] == "district_resolver":
+        failures.append("resolver should be skipped when geography is already known")
+    out = intent_router_node({**base, "query": "Draft a text message about early voting"})
+    if out["router_decision"] == "district_resolver":
+        failures.append("resolver should not run for queries with no geography")
+
+    # 4. Precincts reads the record.
+    _reset_fake(raise_exc=AssertionError("precincts should not call the LLM"))
+    precincts_mod.get_completion_client = lambda **kwargs: _FakeChat()
+    captured: dict = {}
+
+    def _fake_top(state_fips, geoid, district_type, metrics, top_n, **kwargs):
+        captured.update(state_fips=state_fips, geoid=geoid,
+                        district_type=district_type, top_n=top_n)
+        return {"precincts": [], "precinct_count": 0, "data_quality_note": None}
+
+    precincts_mod.PrecinctsAgent.get_top_precincts = staticmethod(_fake_top)
+    out = precincts_mod.PrecinctsAgent.run({
+        "query": "Rank precincts in GA-07",
+        "structured_data": [record],
+        "demographic_intent": "default",
+    })
+    if _FakeChat.calls:
+        failures.append("precincts called the LLM despite a resolver record")
+    if captured.get("geoid") != "1307" or captured.get("top_n") != 15:
+        failures.append(f"precincts did not use the record: {captured}")
+    if out.get("errors"):
+        failures.append(f"precincts returned errors: {out['errors']}")
+
+    # 5. Finance reuses the budget (voter-file path, no geography).
+    _reset_fake("99999")
+    finance_mod.get_completion_client = lambda **kwargs: _FakeChat()
+    no_geo = resolve_district_params({"BUDGET": "50000"})
+    out = finance_mod.finance_node({
+        "query": "Segment my voter file and price it out with $50,000",
+        "structured_data": [no_geo, {"agent": "voter_file", "total_voters": 1200}],
+    })
+    fin = next((d for d in out.get("structured_data", []) if d.get("agent") == "finance"), {})
+    if _FakeChat.calls:
+        failures.append(f"finance made {_FakeChat.calls} budget LLM calls despite resolver record")
+    if fin.get("budget_available") != 50000.0:
+        failures.append(f"finance budget_available {fin.get('budget_available')!r}, expected 50000.0")
+
+    print("district resolver test: 5 cases.")
+    if failures:
+        print(f"FAIL: {len(failures)} assertion(s) failed:")
+        for f in failures:
+            print(f"  - {f}")
+        return 1
+    print("PASS: all assertion groups OK.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,170 @@
+"""
+Tests for the FEC client (chat/utils/fec_client.py) and the finance agent's
+comparables lookup (_fetch_fec_average) built on it.
+
+Verifies:
+  1. _fetch_fec_average issues every cycle and the statewide fallback as one
+     concurrent batch over the shared session, each request with a timeout,
+     and averages the statewide rows when the district has none.
+  2. Results are cached on disk by (office, state, district, cycle): a
+     repeat lookup, including from a fresh process-level client, makes no
+     HTTP calls.
+  3. Failed requests are reported and not cached.
+  4. Requests are spaced by the FEC_MAX_RPS rate limiter.
+  5. DataFetcher.get_district_finances goes through the client and keeps its
+     normalized schema; FEC_CACHE_ENABLED=0 bypasses the cache.
+
+Usage:
+    python scripts/_test_fec_client.py
+"""
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+PROJECT_DIR = SCRIPT_DIR.parent
+sys.path.insert(0, str(PROJECT_DIR))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "powerbuilder_app.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+import requests  # noqa: E402
+
+from chat.agents import finance_agent  # noqa: E402
+from chat.utils import fec_client  # noqa: E402
+from chat.utils.data_fetcher import DataFetcher  # noqa: E402
+
+_DELAY = 0.15
+
+
+class _Response:
+    def __init__(self, status_code: int, rows: list) -> None:
+        self.status_code = status_code
+        self._rows = rows
+
+    def json(self) -> dict:
+        return {"results": self._rows}
+
+
+class _FakeSession:
+    """Stands in for the pooled requests.Session."""
+
+    def __init__(self, fail_cycles=()) -> None:
+        self.calls: list[dict] = []
+        self.starts: list[float] = []
+        self.fail_cycles = set(fail_cycles)
+        self.active = self.peak = 0
+        self._lock = threading.Lock()
+
+    def get(self, url, params=None, timeout=None):
+        with self._lock:
+            self.calls.append({**params, "timeout": timeout})
+            self.starts.append(time.monotonic())
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(_DELAY)
+        with self._lock:
+            self.active -= 1
+        if params["cycle"] in self.fail_cycles:
+            raise requests.ConnectionError("reset by peer")
+        if params["district"] != "00":
+            return _Response(200, [])          # district has no filers
+        return _Response(200, [
+            {"name": f"A {params['cycle']}", "party_full": "DEM", "receipts": 1e6,
+             "disbursements": 900_000, "cash_on_hand_end_period": 5e4},
+            {"name": f"B {params['cycle']}", "party_full": "REP", "receipts": 5e5,
+             "disbursements": 300_000, "cash_on_hand_end_period": 1e4},
+        ])
+
+    def close(self) -> None:
+        pass
+
+
+def _fresh(session: _FakeSession) -> None:
+    fec_client.reset_client()
+    fec_client._session = session
+
+
+def main() -> int:
+    failures: list[str] = []
+    os.environ["FEC_CACHE_PATH"] = str(Path(tempfile.mkdtemp(prefix="fec_cache_")) / "fec.sqlite3")
+    os.environ["FEC_MAX_RPS"] = "0"
+    os.environ["FEC_TIMEOUT_SECS"] = "7"
+    cycles = [2018, 2020, 2022]
+
+    # 1. One concurrent batch, statewide fallback.
+    session = _FakeSession()
+    _fresh(session)
+    start = time.monotonic()
+    out = finance_agent._fetch_fec_average("VA", "07", "H", cycles)
+    elapsed = time.monotonic() - start
+    if len(session.calls) != 6:
+        failures.append(f"{len(session.calls)} requests, expected 3 cycles x (district + statewide)")
+    if session.peak < 2 or elapsed > _DELAY * 3:
+        failures.append(f"lookups not concurrent: peak {session.peak}, {elapsed:.2f}s")
+    if any(c["timeout"] != 7.0 for c in session.calls):
+        failures.append("request without the configured timeout")
+    if out["error"] or out["cycles_found"] != cycles or out["avg_disbursements"] != 600_000:
+        failures.append(f"statewide fallback result: {out}")
+
+    # 2. Disk cache, across client resets.
+    _fresh(session := _FakeSession())
+    again = finance_agent._fetch_fec_average("VA", "07", "H", cycles)
+    if session.calls or again != out:
+        failures.append(f"cached lookup made {len(session.calls)} requests")
+    if fec_client.client_stats()["hits"] != 6:
+        failures.append(f"stats after cached lookup: {fec_client.client_stats()}")
+
+    # 3. Failures reported and retried next time.
+    _fresh(session := _FakeSession(fail_cycles={2014}))
+    out = finance_agent._fetch_fec_average("VA", "02", "S", [2014])
+    if not out["error"] or "2014" not in out["error"]:
+        failures.append(f"failed cycle not reported: {out}")
+    session.fail_cycles.clear()
+    finance_agent._fetch_fec_average("VA", "02", "S", [2014])
+    if len(session.calls) != 2:
+        failures.append("a failed response was cached")
+
+    # 4. Rate limit.
+    os.environ["FEC_MAX_RPS"] = "20"
+    _fresh(session := _FakeSession())
+    fec_client.race_totals_many([("OH", "00", "S", c) for c in (2002, 2004, 2006, 2008)])
+    gaps = [b - a for a, b in zip(sorted(session.starts), sorted(session.starts)[1:])]
+    if len(gaps) != 3 or min(gaps) < 0.045:
+        failures.append(f"requests not spaced by the rate limiter: {[round(g, 3) for g in gaps]}")
+    os.environ["FEC_MAX_RPS"] = "0"
+
+    # 5. DataFetcher entry point; cache bypass.
+    _fresh(session := _FakeSession())
+    rows = DataFetcher.get_district_finances("TX", "00", "H", 2010)
+    if not isinstance(rows, list) or set(rows[0]) != {"name", "party", "total_receipts",
+                                                      "total_disbursements", "cash_on_hand"}:
+        failures.append(f"get_district_finances schema: {rows}")
+    elif rows[0]["total_disbursements"] != "$900,000.00":
+        failures.append(f"get_district_finances formatting: {rows[0]}")
+    os.environ["FEC_CACHE_ENABLED"] = "0"
+    DataFetcher.get_district_finances("TX", "00", "H", 2010)
+    os.environ.pop("FEC_CACHE_ENABLED")
+    if len(session.calls) != 2:
+        failures.append("FEC_CACHE_ENABLED=0 should bypass the cache")
+
+    fec_client.reset_client()
+    print("fec client test: 5 cases.")
+    if failures:
+        print(f"FAIL: {len(failures)} assertion(s) failed:")
+        for f in failures:
+            print(f"  - {f}")
+        return 1
+    print("PASS: all assertion groups OK.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -15,7 +15,9 @@ Covers:
   6. Backend views: rename / delete / reorder happy-paths + edge cases,
                         exercised through Django's RequestFactory and the
                         signed-cookie session backend so we don't need a
-                        running server.
+                        running server. Sessions are seeded in the legacy
+                        session-list shape, which also covers the one-time
+                        import into the Conversation table.
 
 A single failed assertion crashes with a clear AssertionError. Each section
 prints a PASS line with its assertion count so the bulk runner output is
@@ -38,6 +40,7 @@ from django.template.loader import render_to_string
 from django.test import RequestFactory
 from importlib import import_module
 
+from chat.models import Conversation
 from chat.render_helpers import extract_sources, relative_time
 from chat import views as chat_views
 
@@ -349,10 +352,11 @@ def test_backend_rename_delete_reorder():
     assert resp.status_code == 200, f"expected 200, got {resp.status_code}"
     data = json.loads(resp.content)
     assert data["ok"] is True and data["title"] == "Bravo Plus", data
-    # Side effect: title flipped in the session list
-    assert any(c["id"] == "id-B" and c["title"] == "Bravo Plus"
-               for c in req.session["conversations"])
-    assertions += 3
+    # Side effect: title flipped in the database; the session holds ids only
+    assert Conversation.objects.get(id="id-B").title == "Bravo Plus"
+    assert "conversations" not in req.session
+    assert req.session["conversation_ids"] == ["id-A", "id-B", "id-C"]
+    assertions += 5
 
     # ---- rename validation: empty title rejected ----
     req = _make_authed_request(rf, "/api/conv/id-B/rename/", {"title": "   "})
@@ -384,10 +388,11 @@ def test_backend_rename_delete_reorder():
     req.session["current_conv_id"] = "id-A"
     resp = chat_views.delete_conv_view(req, conv_id="id-B")
     assert resp.status_code == 200
-    assert [c["id"] for c in req.session["conversations"]] == ["id-A", "id-C"]
+    assert req.session["conversation_ids"] == ["id-A", "id-C"]
+    assert not Conversation.objects.filter(id="id-B").exists()
     # Active conv was id-A, should NOT have been cleared
     assert req.session["current_conv_id"] == "id-A"
-    assertions += 3
+    assertions += 4
 
     # ---- delete: clears current_conv_id when active row removed ----
     req = _make_authed_request(rf, "/api/conv/id-A/delete/", {})
@@ -411,7 +416,7 @@ def test_backend_rename_delete_reorder():
     req.session["conversations"] = [dict(c) for c in convs]
     resp = chat_views.reorder_conv_view(req)
     assert resp.status_code == 200
-    assert [c["id"] for c in req.session["conversations"]] == ["id-C", "id-A", "id-B"]
+    assert req.session["conversation_ids"] == ["id-C", "id-A", "id-B"]
     assertions += 2
 
     # ---- reorder: partial order keeps unmentioned items at the tail ----
@@ -419,7 +424,7 @@ def test_backend_rename_delete_reorder():
     req.session["conversations"] = [dict(c) for c in convs]
     resp = chat_views.reorder_conv_view(req)
     assert resp.status_code == 200
-    assert [c["id"] for c in req.session["conversations"]] == ["id-C", "id-A", "id-B"]
+    assert req.session["conversation_ids"] == ["id-C", "id-A", "id-B"]
     assertions += 2
 
     # ---- reorder: bogus body -> 400 ----
@@ -435,7 +440,7 @@ def test_backend_rename_delete_reorder():
     req.session["conversations"] = [dict(c) for c in convs]
     resp = chat_views.reorder_conv_view(req)
     assert resp.status_code == 200
-    new_ids = [c["id"] for c in req.session["conversations"]]
+    new_ids = req.session["conversation_ids"]
     assert new_ids == ["id-B", "id-A", "id-C"], new_ids
     assertions += 1
 
@@ -451,7 +456,8 @@ def test_url_routes_resolve():
     assert reverse("conv_rename", kwargs={"conv_id": "abc"}).endswith("/api/conv/abc/rename/")
     assert reverse("conv_delete", kwargs={"conv_id": "abc"}).endswith("/api/conv/abc/delete/")
     assert reverse("conv_reorder").endswith("/api/conv/reorder/")
-    assertions += 3
+    assert reverse("conv_messages", kwargs={"conv_id": "abc"}).endswith("/api/conv/abc/messages/")
+    assertions += 4
     print(f"  URL routes: {assertions} assertions passed")
 
 
@@ -460,6 +466,9 @@ def test_url_routes_resolve():
 # ---------------------------------------------------------------------------
 if __name__ == "__main__":
     print("Milestone F: source dedup + scroll anchor + conversation history")
+    # Conversations live in the database: run against a throwaway migrated copy.
+    from django.db import connection
+    connection.creation.create_test_db(verbosity=0)
     test_extract_sources_dedup()
     test_relative_time_buckets()
     test_partial_renders_dedup_badge()
@@ -0,0 +1,147 @@
+"""
+Tests for the persistent LLM response cache (chat/utils/llm_cache.py) and
+its wiring into get_completion_client().
+
+Verifies:
+  1. Cache keys ignore prompt indentation / trailing whitespace but change
+     with provider, model, parameters and message content.
+  2. LLMResponseCache round-trips, expires rows past the TTL, and evicts the
+     least recently used row once over max_entries.
+  3. A temperature-0 client from get_completion_client() calls the provider
+     once for a repeated prompt and serves the repeat from the cache, with
+     hit / miss counters to match.
+  4. Sampled (temperature > 0) clients are never cached.
+  5. provider_override gets its own cache entries.
+  6. LLM_CACHE_ENABLED=0 bypasses the cache.
+
+Usage:
+    python scripts/_test_llm_cache.py
+"""
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+PROJECT_DIR = SCRIPT_DIR.parent
+sys.path.insert(0, str(PROJECT_DIR))
+
+_TMP = tempfile.mkdtemp(prefix="llm_cache_test_")
+os.environ["LLM_CACHE_PATH"] = os.path.join(_TMP, "responses.sqlite3")
+os.environ["LLM_CACHE_ENABLED"] = "1"
+
+import chat.utils.llm_cache as cache_mod  # noqa: E402
+import chat.utils.llm_config as cfg  # noqa: E402
+from chat.utils.llm_cache import LLMResponseCache, make_cache_key  # noqa: E402
+
+
+class _FakeProvider:
+    """Stand-in for a LangChain chat model: counts invokes per provider."""
+    calls: dict = {}
+
+    def __init__(self, provider: str) -> None:
+        self.provider = provider
+
+    def invoke(self, prompt):
+        _FakeProvider.calls[self.provider] = _FakeProvider.calls.get(self.provider, 0) + 1
+
+        class _Resp:
+            content = f"STATE: Georgia ({self.provider})"
+        return _Resp()
+
+
+def main() -> int:
+    failures: list[str] = []
+
+    # 1. Key normalization
+    a = make_cache_key("openai", "gpt-4o", {"temperature": 0}, "\n    STATE: x\n    TOP_N: 5  \n")
+    b = make_cache_key("openai", "gpt-4o", {"temperature": 0}, "STATE: x\nTOP_N: 5")
+    if a != b:
+        failures.append("indentation / trailing whitespace should not change the key")
+    if make_cache_key("openai", "gpt-4o", {"temperature": 0}, [("user", "hi")]) != \
+            make_cache_key("openai", "gpt-4o", {"temperature": 0}, "hi"):
+        failures.append("('user', text) and a bare string should share a key")
+    variants = [
+        make_cache_key("anthropic", "gpt-4o", {"temperature": 0}, "STATE: x\nTOP_N: 5"),
+        make_cache_key("openai", "gpt-4o-mini", {"temperature": 0}, "STATE: x\nTOP_N: 5"),
+        make_cache_key("openai", "gpt-4o", {"temperature": 0.3}, "STATE: x\nTOP_N: 5"),
+        make_cache_key("openai", "gpt-4o", {"temperature": 0}, "STATE: y\nTOP_N: 5"),
+    ]
+    if a in variants or len(set(variants)) != len(variants):
+        failures.append("provider / model / params / content must all change the key")
+
+    # 2. Store: round trip, TTL, LRU eviction
+    store = LLMResponseCache(os.path.join(_TMP, "store.sqlite3"), ttl_secs=3600, max_entries=2)
+    store.put("k1", "one", source="openai/gpt-4o")
+    if store.get("k1") != "one":
+        failures.append("stored response did not round-trip")
+    if store.get("missing") is not None:
+        failures.append("unknown key should miss")
+    time.sleep(0.01)
+    store.put("k2", "two", source="openai/gpt-4o")
+    time.sleep(0.01)
+    store.get("k1")                      # k1 is now more recent than k2
+    time.sleep(0.01)
+    store.put("k3", "three", source="openai/gpt-4o")
+    if store.get("k2") is not None:
+        failures.append("least recently used row (k2) should have been evicted")
+    if store.get("k1") != "one" or store.get("k3") != "three":
+        failures.append("recently used rows should survive eviction")
+    stats = store.stats()
+    if stats["entries"] != 2 or stats["hits"] != 4 or stats["misses"] != 2:
+        failures.append(f"store stats wrong: {stats}")
+
+    expired = LLMResponseCache(os.path.join(_TMP, "ttl.sqlite3"), ttl_secs=-1)
+    expired.put("k", "stale", source="openai/gpt-4o")
+    if expired.get("k") is not None or expired.stats()["entries"] != 0:
+        failures.append("row past TTL should miss and be deleted")
+
+    # 3-6. Wiring through get_completion_client
+    os.environ["OPENAI_API_KEY"] = "test-key"
+    cfg._build_completion_client = lambda active, temperature: _FakeProvider(active)
+    cache_mod._cache = None
+    prompt = "Extract electoral district information from: GA-07"
+
+    first = cfg.get_completion_client(temperature=0, provider="openai").invoke(prompt)
+    second = cfg.get_completion_client(temperature=0, provider="openai").invoke(prompt)
+    if _FakeProvider.calls.get("openai") != 1:
+        failures.append(f"repeat temperature-0 prompt hit the provider {_FakeProvider.calls.get('openai')} times")
+    if second.content != first.content:
+        failures.append(f"cached reply differs: {second.content!r} vs {first.content!r}")
+    stats = cache_mod.cache_stats()
+    if stats["hits"] != 1 or stats["misses"] != 1:
+        failures.append(f"counters wrong after one miss + one hit: {stats}")
+
+    llm = cfg.get_completion_client(temperature=0.3, provider="openai")
+    llm.invoke(prompt)
+    llm.invoke(prompt)
+    if _FakeProvider.calls.get("openai") != 3:
+        failures.append("temperature 0.3 calls must not be cached")
+
+    with cfg.provider_override("anthropic"):
+        cfg.get_completion_client(temperature=0).invoke(prompt)
+        cfg.get_completion_client(temperature=0).invoke(prompt)
+    if _FakeProvider.calls.get("anthropic") != 1:
+        failures.append(f"override provider calls {_FakeProvider.calls.get('anthropic')}, expected 1")
+
+    os.environ["LLM_CACHE_ENABLED"] = "0"
+    cfg.get_completion_client(temperature=0, provider="openai").invoke(prompt)
+    os.environ["LLM_CACHE_ENABLED"] = "1"
+    if _FakeProvider.calls.get("openai") != 4:
+        failures.append("LLM_CACHE_ENABLED=0 should bypass the cache")
+
+    print("llm cache test: 6 cases.")
+    if failures:
+        print(f"FAIL: {len(failures)} assertion(s) failed:")
+        for f in failures:
+            print(f"  - {f}")
+        return 1
+    print("PASS: all assertion groups OK.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
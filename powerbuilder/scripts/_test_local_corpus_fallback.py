@@ -161,6 +161,18 @@ def main() -> int:
         if not hasattr(r, "page_content") or not hasattr(r, "metadata"):
             failures.append("local search result missing page_content/metadata attributes")
 
+    # 8. The BM25 index is built once per loaded corpus and rebuilt when the
+    #    corpus reloads.
+    index_a = researcher_mod._get_local_corpus_index()
+    _local_corpus_search("Gen Z voters", k=3)
+    if researcher_mod._get_local_corpus_index() is not index_a:
+        failures.append("BM25 index was rebuilt between queries on the same corpus")
+    researcher_mod._local_corpus_cache = None
+    if researcher_mod._get_local_corpus_index() is index_a:
+        failures.append("BM25 index was not rebuilt after the corpus reloaded")
+    if _local_corpus_search("zzqxv nonexistentterm", k=5):
+        failures.append("query with no indexed terms should return []")
+
     # Report.
     print(f"Local corpus fallback test: {len(chunks)} chunks across {len(sources)} files.")
     if failures:
@@ -169,7 +181,7 @@ def main() -> int:
             print(f"  - {f}")
         return 1
 
-    print("PASS: all 13 assertion groups OK.")
+    print("PASS: all 14 assertion groups OK.")
     return 0
 
 
@@ -0,0 +1,143 @@
+"""
+Tests for the per-state MEDSL Parquet store in chat/agents/election_results.py.
+
+Verifies:
+  1. The first lookup parses the raw CSV once and writes one Parquet
+     partition per state, projected to MEDSL_COLUMNS.
+  2. Later lookups for any state read only that state's partition; the raw
+     CSV is never parsed again while the store is fresh.
+  3. Repeat lookups for a hot state are served from the in-memory LRU, which
+     stays within MEDSL_PARTITION_LRU_SIZE.
+  4. _extract_party_margins computes the same two-party margins from the
+     partition as from the raw frame.
+  5. A state with no rows yields None rather than an error.
+
+Usage:
+    python scripts/_test_medsl_partitions.py
+"""
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+PROJECT_DIR = SCRIPT_DIR.parent
+sys.path.insert(0, str(PROJECT_DIR))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "powerbuilder_app.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+import pandas as pd  # noqa: E402
+
+import chat.agents.election_results as er  # noqa: E402
+
+
+def _raw_frame() -> pd.DataFrame:
+    rows = []
+    for fips, dist, dem, rep in ((13, 7, 180_000, 150_000), (13, 6, 120_000, 200_000), (51, 7, 200_000, 190_000)):
+        for year in (2020, 2022):
+            total = dem + rep + 5_000
+            rows += [
+                {"year": year, "state_fips": fips, "district": dist, "stage": "GEN",
+                 "party": "DEMOCRAT", "candidatevotes": dem, "totalvotes": total,
+                 "candidate": "D CANDIDATE", "writein": False},
+                {"year": year, "state_fips": fips, "district": dist, "stage": "GEN",
+                 "party": "REPUBLICAN", "candidatevotes": rep, "totalvotes": total,
+                 "candidate": "R CANDIDATE", "writein": False},
+                {"year": year, "state_fips": fips, "district": dist, "stage": "PRI",
+                 "party": "DEMOCRAT", "candidatevotes": 1, "totalvotes": 1,
+                 "candidate": "D CANDIDATE", "writein": False},
+            ]
+    return pd.DataFrame(rows)
+
+
+def main() -> int:
+    failures: list[str] = []
+
+    er.MEDSL_CACHE = tempfile.mkdtemp(prefix="medsl_test_")
+    er.MEDSL_PARTITION_LRU_SIZE = 2
+    er._medsl_partition_lru.clear()
+
+    raw = _raw_frame()
+    raw_loads = {"n": 0}
+
+    def _fake_raw(office_type):
+        raw_loads["n"] += 1
+        return raw
+
+    er._load_medsl_raw = _fake_raw
+
+    parquet_reads = {"n": 0, "columns": None}
+    real_read_parquet = pd.read_parquet
+
+    def _counting_read_parquet(path, columns=None, **kwargs):
+        parquet_reads["n"] += 1
+        parquet_reads["columns"] = columns
+        return real_read_parquet(path, columns=columns, **kwargs)
+
+    er.pd.read_parquet = _counting_read_parquet
+
+    # 1. First lookup materializes partitions.
+    ga = er._load_medsl_state("house", "13")
+    part_dir = Path(er._medsl_partition_dir("house"))
+    written = sorted(p.name for p in part_dir.glob("*.parquet"))
+    if raw_loads["n"] != 1:
+        failures.append(f"first lookup parsed the raw CSV {raw_loads['n']} times, expected 1")
+    if written != ["state_fips=13.parquet", "state_fips=51.parquet"]:
+        failures.append(f"unexpected partitions: {written}")
+    if ga is None or set(ga["state_fips"]) != {13}:
+        failures.append("first lookup did not return only Georgia rows")
+    on_disk = real_read_parquet(part_dir / "state_fips=13.parquet")
+    if list(on_disk.columns) != er.MEDSL_COLUMNS:
+        failures.append(f"partition not projected to MEDSL_COLUMNS: {list(on_disk.columns)}")
+
+    # 2. Other states read their own partition, never the raw CSV.
+    va = er._load_medsl_state("house", "51")
+    if raw_loads["n"] != 1:
+        failures.append("raw CSV re-parsed while the partition store is fresh")
+    if parquet_reads["n"] != 1 or parquet_reads["columns"] != er.MEDSL_COLUMNS:
+        failures.append(f"expected one projected partition read, got {parquet_reads}")
+    if va is None or set(va["state_fips"]) != {51}:
+        failures.append("Virginia lookup returned the wrong rows")
+
+    # 3. Hot partitions come from the LRU; the LRU stays bounded.
+    er._load_medsl_state("house", "51")
+    if parquet_reads["n"] != 1:
+        failures.append("hot partition re-read from disk instead of the LRU")
+    er._load_medsl_state("house", "06")   # empty state, still cached
+    if len(er._medsl_partition_lru) > er.MEDSL_PARTITION_LRU_SIZE:
+        failures.append(f"LRU grew to {len(er._medsl_partition_lru)} entries")
+
+    # 4. Margins match a direct computation.
+    margins = er._extract_party_margins("congressional", "13", "1307")
+    if margins is None or len(margins) != 2:
+        failures.append(f"GA-07 margins missing: {margins}")
+    else:
+        total = 180_000 + 150_000 + 5_000
+        expected = (180_000 - 150_000) / total
+        got = float(margins["margin"].iloc[0])
+        if abs(got - expected) > 1e-9:
+            failures.append(f"GA-07 margin {got}, expected {expected}")
+
+    # 5. Unknown state: no rows, no error.
+    if er._extract_party_margins("congressional", "06", "0612") is not None:
+        failures.append("state with no MEDSL rows should yield None")
+
+    er.pd.read_parquet = real_read_parquet
+
+    print("MEDSL partition test: 5 cases.")
+    if failures:
+        print(f"FAIL: {len(failures)} assertion(s) failed:")
+        for f in failures:
+            print(f"  - {f}")
+        return 1
+    print("PASS: all assertion groups OK.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,171 @@
+"""
+Tests for parallel per-group messaging generation (MESSAGING_PARALLEL=1 in
+chat/agents/messaging.py).
+
+Verifies:
+  1. The four FORMAT_GROUPS completions run concurrently, share one prompt
+     preamble, each ask only for their own section markers, and together
+     produce all eight formats in the usual order.
+  2. Every section is emitted to the run's progress queue as a
+     section_ready event as soon as it parses.
+  3. A section missing from its group's output is re-requested on its own;
+     sections that parsed are not regenerated.
+  4. A group whose LLM call keeps failing costs only its own sections; if
+     every call fails the node reports the LLM error.
+  5. Without the flag the node still makes one all-eight-sections call.
+
+Usage:
+    python scripts/_test_messaging_parallel.py
+"""
+from __future__ import annotations
+
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+PROJECT_DIR = SCRIPT_DIR.parent
+sys.path.insert(0, str(PROJECT_DIR))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "powerbuilder_app.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from chat import progress  # noqa: E402
+from chat.agents import messaging as msg_mod  # noqa: E402
+from chat.agents.messaging import FORMAT_GROUPS, FORMAT_LABELS, SECTION_MARKERS  # noqa: E402
+
+_DELAY = 0.2
+_SPLIT = "━━━ OUTPUT INSTRUCTIONS ━━━"
+
+
+class _Reply:
+    def __init__(self, content: str) -> None:
+        self.content = content
+
+
+class _FakeLLM:
+    """Answers every marker requested in the OUTPUT INSTRUCTIONS block."""
+
+    def __init__(self, drop_once=(), fail_for=(), delay: float = _DELAY) -> None:
+        self.prompts: list[str] = []
+        self.drop_once = set(drop_once)
+        self.fail_for = set(fail_for)
+        self.delay = delay
+        self._lock = threading.Lock()
+
+    def invoke(self, prompt: str) -> _Reply:
+        with self._lock:
+            self.prompts.append(prompt)
+        time.sleep(self.delay)
+        asked = [k for k, m in SECTION_MARKERS.items() if m in prompt.split(_SPLIT, 1)[-1]]
+        if self.fail_for & set(asked):
+            raise TimeoutError("provider timeout")
+        parts = []
+        for key in asked:
+            with self._lock:
+                if key in self.drop_once:
+                    self.drop_once.discard(key)
+                    continue
+            parts.append(f"{SECTION_MARKERS[key]}\nCopy for {key}.")
+        return _Reply("\n\n".join(parts))
+
+
+def _state(run_id=None) -> dict:
+    return {
+        "research_results": ["--- MEMO FROM SOURCE: study | DATE: 2024-05-01 ---\nTurnout finding."],
+        "structured_data":  [],
+        "run_id":           run_id,
+    }
+
+
+def _run(llm: _FakeLLM, run_id=None) -> dict:
+    msg_mod.get_completion_client = lambda temperature=0.4: llm
+    return msg_mod.messaging_node(_state(run_id))
+
+
+def main() -> int:
+    failures: list[str] = []
+    os.environ["MESSAGING_PARALLEL"] = "1"
+    os.environ["MESSAGING_SECTION_RETRIES"] = "1"
+
+    # 1 + 2. Concurrent groups, shared preamble, streamed sections.
+    run_id = progress.new_run_id()
+    progress.create(run_id)
+    llm = _FakeLLM()
+    start = time.monotonic()
+    out = _run(llm, run_id)
+    elapsed = time.monotonic() - start
+    if len(llm.prompts) != len(FORMAT_GROUPS):
+        failures.append(f"{len(llm.prompts)} completions, expected {len(FORMAT_GROUPS)}")
+    if elapsed > _DELAY * 2.5:
+        failures.append(f"groups took {elapsed:.2f}s; expected concurrent completions")
+    if len({p.split(_SPLIT)[0] for p in llm.prompts}) != 1:
+        failures.append("group prompts do not share one preamble")
+    asked = sorted(tuple(k for k, m in SECTION_MARKERS.items() if m in p) for p in llm.prompts)
+    if asked != sorted(FORMAT_GROUPS):
+        failures.append(f"groups asked for {asked}")
+    labels = [r.split("MESSAGING OUTPUT: ")[1].split(" | ")[0] for r in out.get("research_results", [])]
+    if labels != list(FORMAT_LABELS.values()):
+        failures.append(f"outputs {labels}")
+    pack = out["structured_data"][0]
+    if pack.get("tiktok") != "Copy for tiktok_script." or pack.get("canvass") != "Copy for canvassing_script.":
+        failures.append(f"script pack: {pack}")
+
+    events = progress.read(run_id)
+    progress.finish(run_id)
+    streamed = {e.payload.get("section"): e.payload.get("content") for e in events if e.type == "section_ready"}
+    if set(streamed) != set(SECTION_MARKERS) or streamed["mail_narrative"] != "Copy for mail_narrative.":
+        failures.append(f"section_ready events: {sorted(k for k in streamed if k)}")
+    if any(e.agent != "messaging" or not e.label for e in events):
+        failures.append("section_ready events should carry agent and label")
+
+    # 3. Retry only the missing section.
+    llm = _FakeLLM(drop_once={"tiktok_script"})
+    out = _run(llm)
+    retries = llm.prompts[len(FORMAT_GROUPS):]
+    if len(retries) != 1:
+        failures.append(f"{len(retries)} retry calls, expected 1")
+    elif [k for k, m in SECTION_MARKERS.items() if m in retries[0].split(_SPLIT)[1]] != ["tiktok_script"]:
+        failures.append("retry should ask for the missing section only")
+    if out["structured_data"][0].get("tiktok") != "Copy for tiktok_script.":
+        failures.append("retried section missing from the output")
+    if out["structured_data"][0].get("youtube") != "Copy for youtube_script.":
+        failures.append("section parsed on the first attempt was lost")
+
+    # 4. Failing group, then everything failing.
+    llm = _FakeLLM(fail_for={"mail_narrative"}, delay=0)
+    out = _run(llm)
+    pack = out.get("structured_data", [{}])[0]
+    if pack.get("text") or pack.get("mail") or not pack.get("digital") or out.get("errors"):
+        failures.append(f"one failing group: pack={pack} errors={out.get('errors')}")
+    if len(llm.prompts) != len(FORMAT_GROUPS) + 1:
+        failures.append(f"failing group tried {len(llm.prompts) - len(FORMAT_GROUPS) + 1} times, expected 2")
+    out = _run(_FakeLLM(fail_for=set(SECTION_MARKERS), delay=0))
+    if not any("LLM call failed" in e for e in out.get("errors", [])):
+        failures.append(f"all calls failing: {out}")
+
+    # 5. Default single call.
+    os.environ.pop("MESSAGING_PARALLEL")
+    llm = _FakeLLM(delay=0)
+    out = _run(llm)
+    if len(llm.prompts) != 1 or "Generate all eight sections below." not in llm.prompts[0]:
+        failures.append(f"default path made {len(llm.prompts)} calls")
+    if len(out.get("research_results", [])) != 8:
+        failures.append("default path did not produce all eight formats")
+
+    print("messaging parallel test: 5 cases.")
+    if failures:
+        print(f"FAIL: {len(failures)} assertion(s) failed:")
+        for f in failures:
+            print(f"  - {f}")
+        return 1
+    print("PASS: all assertion groups OK.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -234,7 +234,7 @@ assert_(out_opp2["plan_mode"] == "persuasion",
 
 # Path 4: voter_file sequence after voterfile already ran (no district).
 out_seq = intent_router_node({
-    "query": "Use my voter file (no district reference)",
+    "query": "Use my voter file (no geographic reference)",
     "active_agents": ["voter_file"],
     "research_results": [],
     "structured_data": [],
@@ -0,0 +1,138 @@
+"""
+Tests for the paid-media spend-response sweep (sweep_paid_media and
+sweep_curve in chat/agents/paid_media.py).
+
+Verifies:
+  1. Every point of a budgets x flight weeks x universes grid (English and
+     in-language pricing) matches estimate_paid_media(): summed reach,
+     saturation, per-channel impressions and points lift.
+  2. Frequency is impressions per reached person; non-positive budgets
+     produce zero rows.
+  3. Marginal reach and the knee: a small universe saturates, so returns
+     diminish past the knee; a single-tier uncapped sweep is linear and has
+     no knee.
+  4. sweep_curve returns plain rows in budget order for one slice.
+
+Also reports (without asserting) the time for one sweep against calling the
+estimator per point; wall-clock ratios are too noisy on shared CI to gate on.
+
+Usage:
+    python scripts/_test_paid_media_sweep.py
+"""
+from __future__ import annotations
+
+import os
+import sys
+import time
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+PROJECT_DIR = SCRIPT_DIR.parent
+sys.path.insert(0, str(PROJECT_DIR))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "powerbuilder_app.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+import numpy as np  # noqa: E402
+
+from chat.agents import paid_media as pm  # noqa: E402
+
+_WEEKS = (1, 2, 6, 10)
+_UNIVERSES = (None, 20_000, 200_000)
+
+
+def main() -> int:
+    failures: list[str] = []
+    budgets = np.concatenate([np.linspace(1_000, 400_000, 160), [25_000, 75_000, 200_000, 0, -5]])
+
+    # 1. Parity with the scalar estimator.
+    checked = 0
+    for language in (None, "es"):
+        sweep = pm.sweep_paid_media(budgets, _WEEKS, _UNIVERSES, language_intent=language)
+        if sweep["reach"].shape != (len(budgets), len(_WEEKS), len(_UNIVERSES)):
+            failures.append(f"reach shape {sweep['reach'].shape}")
+            break
+        for i, b in enumerate(budgets):
+            for j, w in enumerate(_WEEKS):
+                for k, u in enumerate(_UNIVERSES):
+                    est = pm.estimate_paid_media(float(b), language_intent=language,
+                                                 target_universe=u, flight_weeks=w)
+                    checked += 1
+                    if est is None:
+                        if sweep["reach"][i, j, k] or sweep["points_lift_high"][i, j, k]:
+                            failures.append(f"budget {b}: expected an empty row")
+                        continue
+                    got = (int(sweep["reach"][i, j, k]), bool(sweep["saturated"][i, j, k]),
+                           float(sweep["points_lift_low"][i, j, k]),
+                           float(sweep["points_lift_high"][i, j, k]))
+                    want = (sum(c["reach"] for c in est["channels"]),
+                            any(c["saturated"] for c in est["channels"]),
+                            est["total_points_lift_low"], est["total_points_lift_high"])
+                    imps = {c["channel"]: c["impressions"]["mid"] for c in est["channels"]}
+                    got_imps = {ch: int(v) for ch, v in zip(sweep["channels"], sweep["impressions"][i]) if v}
+                    if got != want or got_imps != imps:
+                        failures.append(f"{language} budget {b} weeks {w} universe {u}: {got} != {want}")
+                        break
+
+    # 2. Frequency and empty rows.
+    sweep = pm.sweep_paid_media(budgets, _WEEKS, _UNIVERSES)
+    total = sweep["impressions"].sum(axis=1)
+    i = 40
+    if abs(sweep["frequency"][i, 2, 1] - total[i] / sweep["reach"][i, 2, 1]) > 1e-9:
+        failures.append("frequency is not impressions per reached person")
+    if sweep["frequency"][-1].any() or sweep["spend"][-2:].any():
+        failures.append("non-positive budgets should produce zero rows")
+
+    # 3. Marginal returns and the knee.
+    grid = np.linspace(1_000, 20_000, 60)
+    small = pm.sweep_paid_media(grid, (6,), (None, 15_000))
+    knee = small["knee_budget"][0, 1]
+    if np.isnan(knee):
+        failures.append("saturating universe should have a knee")
+    else:
+        before = small["marginal_reach"][grid < knee, 0, 1][1:].mean()
+        after = small["marginal_reach"][grid > knee, 0, 1].mean()
+        if not after < before / 2:
+            failures.append(f"returns did not diminish past the knee ({before:.1f} -> {after:.1f})")
+    if not np.isnan(small["knee_budget"][0, 0]):
+        failures.append(f"linear uncapped curve reported a knee at {small['knee_budget'][0, 0]}")
+    flat = small["marginal_reach"][1:, 0, 0]
+    if flat.max() - flat.min() > 0.01 * flat.mean():
+        failures.append("uncapped single-tier marginal reach should be flat")
+
+    # 4. One curve as rows.
+    rows = pm.sweep_curve(small, flight_weeks=6, target_universe=15_000)
+    if len(rows) != len(grid) or [r["budget"] for r in rows] != sorted(r["budget"] for r in rows):
+        failures.append("sweep_curve rows not in budget order")
+    if rows[-1]["reach"] != int(small["reach"][-1, 0, 1]) or not rows[-1]["saturated"]:
+        failures.append(f"sweep_curve last row: {rows[-1]}")
+    if not all(isinstance(r["reach"], int) and isinstance(r["budget"], float) for r in rows):
+        failures.append("sweep_curve rows should hold plain Python numbers")
+
+    # Timing, reported only.
+    big = np.linspace(1_000, 500_000, 500)
+    start = time.perf_counter()
+    pm.sweep_paid_media(big, _WEEKS, _UNIVERSES)
+    vectorised = time.perf_counter() - start
+    start = time.perf_counter()
+    for b in big:
+        for w in _WEEKS:
+            for u in _UNIVERSES:
+                pm.estimate_paid_media(float(b), target_universe=u, flight_weeks=w)
+    looped = time.perf_counter() - start
+
+    print(f"paid media sweep test: 4 cases ({checked} grid points).")
+    print(f"  timing: sweep {vectorised * 1000:.1f} ms vs per-point loop {looped * 1000:.1f} ms")
+    if failures:
+        print(f"FAIL: {len(failures)} assertion(s) failed:")
+        for f in failures[:10]:
+            print(f"  - {f}")
+        return 1
+    print("PASS: all assertion groups OK.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
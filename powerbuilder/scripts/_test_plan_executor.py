@@ -0,0 +1,173 @@
+"""
+Tests for the deterministic plan executor in chat/agents/manager.py.
+
+Verifies:
+  1. _is_plan_request catches explicit plan phrasing and ignores focused
+     single-topic questions.
+  2. A keyword-classified plan walks PLAN_SEQUENCE hop by hop and finishes
+     without a single LLM routing call.
+  3. An LLM-classified plan (PLAN: YES on the first hop) costs exactly one
+     routing call; every later hop is served from execution_plan.
+  4. Non-plan queries still go through the LLM router on every hop.
+  5. The executor threads language / plan_mode / ab_test like every other
+     router return path.
+
+Usage:
+    python scripts/_test_plan_executor.py
+"""
+from __future__ import annotations
+
+import os
+import sys
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+PROJECT_DIR = SCRIPT_DIR.parent
+sys.path.insert(0, str(PROJECT_DIR))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "powerbuilder_app.settings")
+# The serial walk is what's under test here; the parallel first wave is
+# covered by scripts/_test_plan_fanout.py.
+os.environ["PLAN_FANOUT"] = "0"
+
+import django  # noqa: E402
+
+django.setup()
+
+import chat.agents.manager as mgr  # noqa: E402
+from chat.agents.manager import (  # noqa: E402
+    PLAN_SEQUENCE,
+    _is_plan_request,
+    intent_router_node,
+)
+
+
+class _CountingLLM:
+    """Fake LLM that records every routing call and returns a fixed reply."""
+
+    def __init__(self, reply: str) -> None:
+        self.reply = reply
+        self.calls = 0
+
+    def invoke(self, prompt):
+        self.calls += 1
+
+        class _Resp:
+            content = self.reply
+        return _Resp()
+
+
+_RESOLVED = {"agent": "district_resolver", "state_fips": "13",
+             "district_type": "congressional", "district_id": "1307"}
+
+
+def _walk(query: str, llm: _CountingLLM, max_hops: int = 20) -> list[str]:
+    """Drive intent_router_node the way the graph does, merging each return."""
+    mgr.get_model = lambda: llm
+    state: dict = {
+        "query": query,
+        "active_agents": [],
+        "research_results": ["--- MEMO ---\nfindings\n"],
+        "structured_data": [],
+    }
+    decisions: list[str] = []
+    for _ in range(max_hops):
+        out = intent_router_node(state)
+        state.update({k: v for k, v in out.items()})
+        decision = out["router_decision"]
+        decisions.append(decision)
+        if decision == "finish":
+            break
+        if decision == "district_resolver":
+            # The resolver records itself in structured_data, not active_agents.
+            state["structured_data"] = state["structured_data"] + [_RESOLVED]
+            continue
+        state["active_agents"] = state["active_agents"] + [decision]
+    return decisions
+
+
+def main() -> int:
+    failures: list[str] = []
+
+    # 1. Keyword classification
+    plan_yes = [
+        "Build a Gwinnett County GOTV plan targeting Latinx voters age 18 to 35.",
+        "Build a complete program plan for young voter outreach in VA-07.",
+        "I need a political plan for State Senate District 41",
+        "Draft a campaign strategy for HD-101",
+    ]
+    plan_no = [
+        "What is the win number for Georgia's 7th Congressional District?",
+        "Draft a Vietnamese-language text message to AAPI voters in Gwinnett.",
+        "How many doors can I knock with $10,000?",
+    ]
+    for q in plan_yes:
+        if not _is_plan_request(q):
+            failures.append(f"_is_plan_request should match: {q!r}")
+    for q in plan_no:
+        if _is_plan_request(q):
+            failures.append(f"_is_plan_request should NOT match: {q!r}")
+
+    # 2. Keyword-classified plan: zero routing calls, canonical order (after
+    #    the one-time district resolver).
+    llm = _CountingLLM("DECISION: FINISH, FORMAT: TEXT")
+    decisions = _walk("Build a GOTV plan for Gwinnett", llm)
+    expected = ["district_resolver"] + list(PLAN_SEQUENCE) + ["finish"]
+    if decisions != expected:
+        failures.append(f"keyword plan walked {decisions}, expected {expected}")
+    if llm.calls != 0:
+        failures.append(f"keyword plan made {llm.calls} LLM routing calls, expected 0")
+
+    # 3. LLM-classified plan: exactly one routing call.
+    llm = _CountingLLM("DECISION: RESEARCHER, FORMAT: MARKDOWN, PLAN: YES")
+    decisions = _walk("Help me win the state house seat in HD-101", llm)
+    if decisions != expected:
+        failures.append(f"LLM plan walked {decisions}, expected {expected}")
+    if llm.calls != 1:
+        failures.append(f"LLM plan made {llm.calls} routing calls, expected 1")
+
+    # 4. Non-plan query: LLM consulted on every hop.
+    llm = _CountingLLM("DECISION: WIN_NUMBER, FORMAT: MARKDOWN, PLAN: NO")
+    mgr.get_model = lambda: llm
+    out = intent_router_node({
+        "query": "What is the win number for GA-07?",
+        "active_agents": [],
+        "research_results": [],
+        "structured_data": [],
+    })
+    if out["router_decision"] != "win_number":
+        failures.append(f"non-plan decision {out['router_decision']!r}, expected win_number")
+    if out.get("execution_plan"):
+        failures.append("non-plan query should not pin an execution_plan")
+    if llm.calls != 1:
+        failures.append(f"non-plan query made {llm.calls} routing calls, expected 1")
+
+    # 5. Executor threads the per-run flags.
+    out = intent_router_node({
+        "query": "Build a GOTV plan in Spanish for Latinx voters",
+        "active_agents": ["researcher"],
+        "research_results": [],
+        "structured_data": [_RESOLVED],
+        "ab_test": True,
+        "plan_mode": "persuasion",
+    })
+    if out.get("language_intent") != "es":
+        failures.append(f"executor lost language_intent: {out.get('language_intent')!r}")
+    if out.get("plan_mode") != "persuasion":
+        failures.append(f"executor lost plan_mode override: {out.get('plan_mode')!r}")
+    if out.get("ab_test") is not True:
+        failures.append("executor lost ab_test flag")
+    if out.get("router_decision") != "election_results":
+        failures.append(f"executor skipped ahead: {out.get('router_decision')!r}")
+
+    print("plan executor test: 5 cases.")
+    if failures:
+        print(f"FAIL: {len(failures)} assertion(s) failed:")
+        for f in failures:
+            print(f"  - {f}")
+        return 1
+    print("PASS: all assertion groups OK.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+"""
+Tests for the parallel fan-out wave in chat/agents/manager.py.
+
+Verifies:
+  1. FANOUT_BRANCHES covers each head-of-plan agent exactly once, keeps
+     election_results ahead of opposition_research, and only uses agents
+     from PLAN_SEQUENCE.
+  2. With PLAN_FANOUT on (default), the first plan hop routes to
+     plan_fanout and, once the wave has merged, the walk resumes serially
+     at precincts.
+  3. An LLM-classified plan fans out on its first hop too.
+  4. When a fast path already ran part of the wave, the router stays
+     serial instead of fanning out again.
+  5. PLAN_FANOUT=0 restores the serial walk.
+  6. The compiled graph exposes the fan-out nodes and the join.
+
+Usage:
+    python scripts/_test_plan_fanout.py
+"""
+from __future__ import annotations
+
+import os
+import sys
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+PROJECT_DIR = SCRIPT_DIR.parent
+sys.path.insert(0, str(PROJECT_DIR))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "powerbuilder_app.settings")
+os.environ.pop("PLAN_FANOUT", None)
+
+import django  # noqa: E402
+
+django.setup()
+
+import chat.agents.manager as mgr  # noqa: E402
+from chat.agents.manager import (  # noqa: E402
+    FANOUT_BRANCHES,
+    PLAN_SEQUENCE,
+    intent_router_node,
+    manager_app,
+)
+
+
+class _FakeLLM:
+    def __init__(self, reply: str) -> None:
+        self.reply = reply
+
+    def invoke(self, prompt):
+        class _Resp:
+            content = self.reply
+        return _Resp()
+
+
+_RESOLVED = {"agent": "district_resolver", "state_fips": "13",
+             "district_type": "congressional", "district_id": "1307"}
+
+
+def _state(query: str, active: list[str]) -> dict:
+    # Seed the resolver record so the fan-out hop is the one under test.
+    return {
+        "query": query,
+        "active_agents": active,
+        "research_results": [],
+        "structured_data": [_RESOLVED],
+    }
+
+
+def main() -> int:
+    failures: list[str] = []
+
+    # 1. Branch shape
+    flat = [a for branch in FANOUT_BRANCHES for a in branch]
+    if len(flat) != len(set(flat)):
+        failures.append(f"FANOUT_BRANCHES repeats an agent: {flat}")
+    if not set(flat) <= set(PLAN_SEQUENCE):
+        failures.append(f"FANOUT_BRANCHES uses non-plan agents: {flat}")
+    opp_branch = next((b for b in FANOUT_BRANCHES if "opposition_research" in b), ())
+    if "election_results" not in opp_branch or (
+        opp_branch.index("election_results") > opp_branch.index("opposition_research")
+    ):
+        failures.append("opposition_research must follow election_results in one branch")
+
+    # 2. Keyword plan fans out, then resumes serially.
+    query = "Build a GOTV plan for Gwinnett"
+    out = intent_router_node(_state(query, []))
+    if out["router_decision"] != "plan_fanout":
+        failures.append(f"first plan hop routed to {out['router_decision']!r}, expected plan_fanout")
+    out = intent_router_node({**_state(query, flat), "execution_plan": out["execution_plan"]})
+    if out["router_decision"] != "precincts":
+        failures.append(f"post-wave hop routed to {out['router_decision']!r}, expected precincts")
+
+    # 3. LLM-classified plan fans out on its first hop.
+    mgr.get_model = lambda: _FakeLLM("DECISION: RESEARCHER, FORMAT: MARKDOWN, PLAN: YES")
+    out = intent_router_node(_state("Help me win HD-101 this fall", []))
+    if out["router_decision"] != "plan_fanout":
+        failures.append(f"LLM plan routed to {out['router_decision']!r}, expected plan_fanout")
+
+    # 4. Partially-run wave stays serial.
+    out = intent_router_node(_state(query, ["election_results"]))
+    if out["router_decision"] != "researcher":
+        failures.append(f"partial wave routed to {out['router_decision']!r}, expected researcher")
+
+    # 5. PLAN_FANOUT=0 disables the wave.
+    os.environ["PLAN_FANOUT"] = "0"
+    try:
+        out = intent_router_node(_state(query, []))
+        if out["router_decision"] != "researcher":
+            failures.append(f"PLAN_FANOUT=0 routed to {out['router_decision']!r}, expected researcher")
+    finally:
+        os.environ.pop("PLAN_FANOUT", None)
+
+    # 6. Graph wiring
+    nodes = set(manager_app.get_graph().nodes)
+    for name in ["plan_fanout", "fanout_join"] + [f"fanout_{a}" for a in flat]:
+        if name not in nodes:
+            failures.append(f"compiled graph missing node {name!r}")
+
+    print("plan fan-out test: 6 cases.")
+    if failures:
+        print(f"FAIL: {len(failures)} assertion(s) failed:")
+        for f in failures:
+            print(f"  - {f}")
+        return 1
+    print("PASS: all assertion groups OK.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
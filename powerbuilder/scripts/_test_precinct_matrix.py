@@ -0,0 +1,219 @@
+"""
+Tests for the cached sparse crosswalk matrices behind
+PrecinctsAgent.get_top_precincts (chat/agents/precincts.py).
+
+Verifies, against the original merge → weight → groupby → sort pipeline
+re-implemented here as a reference:
+  1. Weighted totals, precinct order, approximate_boundary flags and
+     precinct_count match for a single-metric query, including duplicate
+     (BG, precinct) rows, zero-weight links, block groups outside the
+     district filter, and the crosswalk-native bg_vap column.
+  2. Combined multi-demographic targeting ranks the same way.
+  3. The crosswalk CSV is parsed once; a second request reuses the cached
+     matrices and a newer mtime forces a reload.
+  4. STORAGE_BACKEND=s3: a changed ETag forces a reload, and a crosswalk
+     missing from S3 and disk raises FileNotFoundError (the coverage_note
+     path) instead of a botocore error.
+
+Usage:
+    python scripts/_test_precinct_matrix.py
+"""
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+PROJECT_DIR = SCRIPT_DIR.parent
+sys.path.insert(0, str(PROJECT_DIR))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "powerbuilder_app.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+import pandas as pd  # noqa: E402
+
+import chat.agents.precincts as precincts_mod  # noqa: E402
+from chat.utils import storage  # noqa: E402
+from chat.agents.precincts import PrecinctsAgent  # noqa: E402
+
+HISP  = "B03003_003E"
+BLACK = "B02001_003E"
+
+# (bg_geoid, hispanic, black) — BG ...9 lies outside the district filter.
+_BLOCK_GROUPS = [
+    ("131350501001", 400, 50),
+    ("131350501002", 120, 300),
+    ("131350502001", 0,   800),
+    ("131350502002", 900, 10),
+    ("131350503001", 60,  60),
+    ("131350509999", 5000, 5000),
+]
+_DISTRICT_BGS = {bg for bg, _, _ in _BLOCK_GROUPS if not bg.endswith("9999")}
+
+# (bg_geoid, precinct_geoid, weight, official_boundary, bg_vap)
+_CROSSWALK = [
+    ("131350501001", "13135-001 ALPHA", 0.7, "True",  1000),
+    ("131350501001", "13135-002 BRAVO", 0.3, "True",  1000),
+    ("131350501002", "13135-002 BRAVO", 0.5, "False", 800),
+    ("131350501002", "13135-002 BRAVO", 0.5, "False", 800),   # duplicate row
+    ("131350502001", "13135-003 CHARLIE", 1.0, "True", 1500),
+    ("131350502002", "13135-004 DELTA", 0.6, "True",  1700),
+    ("131350502002", "13135-005 ECHO",  0.4, "True",  1700),
+    ("131350503001", "13135-006 FOXTROT", 0.0, "False", 300), # zero-weight link
+    ("131350509999", "13135-007 GOLF",  1.0, "True",  9000),  # outside district
+]
+
+
+def _census_rows(state_fips, metrics, geo_level="precinct"):
+    return [
+        {"state": bg[:2], "county": bg[2:5], "tract": bg[5:11], "block group": bg[11:],
+         HISP: str(h), BLACK: str(b)}
+        for bg, h, b in _BLOCK_GROUPS
+    ]
+
+
+def _reference(metrics: list[str], combined: list[str] | None, top_n: int) -> list[tuple]:
+    """The pre-matrix pipeline: merge, weight, groupby sum, sort."""
+    codes = {"hispanic_pop": HISP, "black_pop": BLACK, "total_vap": "bg_vap"}
+    bg_df = pd.DataFrame(_census_rows("13", []))
+    bg_df["bg_geoid"] = bg_df["state"] + bg_df["county"] + bg_df["tract"] + bg_df["block group"]
+    bg_df = bg_df[bg_df["bg_geoid"].isin(_DISTRICT_BGS)]
+    cw = pd.DataFrame(_CROSSWALK, columns=["bg_geoid", "precinct_geoid", "weight", "official_boundary", "bg_vap"])
+    cw["official_boundary"] = cw["official_boundary"].str.lower() == "true"
+    merged = bg_df.merge(cw, on="bg_geoid")
+    for m in metrics:
+        merged[f"weighted_{m}"] = pd.to_numeric(merged[codes[m]]).fillna(0) * merged["weight"]
+    totals = merged.groupby("precinct_geoid")[[f"weighted_{m}" for m in metrics]].sum()
+    totals["approximate_boundary"] = ~merged.groupby("precinct_geoid")["official_boundary"].all()
+    if combined:
+        totals["weighted_combined_target"] = totals[[f"weighted_{m}" for m in combined]].max(axis=1)
+        sort_col = "weighted_combined_target"
+    else:
+        sort_col = f"weighted_{metrics[0]}"
+    totals = totals.sort_values(sort_col, ascending=False, kind="stable").head(top_n)
+    return [
+        (geoid, round(float(row["weighted_total_vap"]), 2), round(float(row[sort_col]), 2),
+         bool(row["approximate_boundary"]))
+        for geoid, row in totals.iterrows()
+    ]
+
+
+def _actual(result: dict) -> list[tuple]:
+    return [
+        (p["precinct_geoid"], p["total_vap"], p["target_demographic_vap"], p["approximate_boundary"])
+        for p in result["precincts"]
+    ]
+
+
+def main() -> int:
+    failures: list[str] = []
+
+    tmp = Path(tempfile.mkdtemp(prefix="xwalk_test_"))
+    cw_file = tmp / "13_1307_bg_to_precinct.csv"
+    pd.DataFrame(
+        _CROSSWALK, columns=["bg_geoid", "precinct_geoid", "weight", "official_boundary", "bg_vap"],
+    ).to_csv(cw_file, index=False)
+
+    precincts_mod.file_exists = lambda path: path.endswith("13_1307_bg_to_precinct.csv")
+    _local = lambda path: str(tmp / os.path.basename(path))  # noqa: E731
+    precincts_mod.file_version = lambda path: storage.file_version(_local(path))
+    precincts_mod.DataFetcher.get_census_data = staticmethod(_census_rows)
+    PrecinctsAgent._get_district_bg_geoids = staticmethod(lambda *a: _DISTRICT_BGS)
+
+    reads = {"n": 0}
+    real_read = precincts_mod.read_dataframe
+
+    def _counting_read(path, **kwargs):
+        reads["n"] += 1
+        return real_read(_local(path), **kwargs)
+
+    precincts_mod.read_dataframe = _counting_read
+    precincts_mod._crosswalk_cache.clear()
+
+    # 1. Single metric, full ranking and truncated ranking.
+    for top_n in (20, 3):
+        result = PrecinctsAgent.get_top_precincts("13", "1307", metrics=["hispanic_pop"], top_n=top_n)
+        want = _reference(["hispanic_pop", "total_vap"], None, top_n)
+        got = _actual(result)
+        if got != want:
+            failures.append(f"top_n={top_n} mismatch:\n    got  {got}\n    want {want}")
+    if result.get("precinct_count") != 6:
+        failures.append(f"precinct_count {result.get('precinct_count')}, expected 6 (GOLF filtered out)")
+
+    # 2. Combined targeting.
+    result = PrecinctsAgent.get_top_precincts(
+        "13", "1307", metrics=["hispanic_pop", "black_pop"], top_n=4,
+        combined_primary_metrics=["hispanic_pop", "black_pop"],
+    )
+    want = _reference(["hispanic_pop", "black_pop", "total_vap"], ["hispanic_pop", "black_pop"], 4)
+    if _actual(result) != want:
+        failures.append(f"combined mismatch:\n    got  {_actual(result)}\n    want {want}")
+
+    # 3. Parsed once; reloaded on a newer mtime.
+    if reads["n"] != 1:
+        failures.append(f"crosswalk parsed {reads['n']} times across 3 requests, expected 1")
+    later = time.time() + 10
+    os.utime(cw_file, (later, later))
+    PrecinctsAgent.get_top_precincts("13", "1307", metrics=["hispanic_pop"], top_n=3)
+    if reads["n"] != 2:
+        failures.append("crosswalk was not reloaded after its mtime changed")
+    if len(precincts_mod._crosswalk_cache) != 1:
+        failures.append(f"stale crosswalk entry kept: {len(precincts_mod._crosswalk_cache)} entries")
+
+    # 4. S3 backend: ETag-keyed cache, misses surface as FileNotFoundError.
+    class _FakeS3:
+        def __init__(self):
+            self.etag = '"v1"'
+            self.gets = 0
+
+        def head_object(self, Bucket, Key):
+            if not Key.endswith("13_1307_bg_to_precinct.csv"):
+                raise RuntimeError("An error occurred (404) when calling the HeadObject operation")
+            return {"ETag": self.etag}
+
+        def get_object(self, Bucket, Key):
+            if not Key.endswith("13_1307_bg_to_precinct.csv"):
+                raise RuntimeError("An error occurred (NoSuchKey) when calling the GetObject operation")
+            self.gets += 1
+            return {"Body": open(cw_file, "rb")}
+
+    fake = _FakeS3()
+    saved = (storage.STORAGE_BACKEND, storage._get_s3_client)
+    storage.STORAGE_BACKEND = "s3"
+    storage._get_s3_client = lambda: fake
+    precincts_mod.file_version = storage.file_version
+    precincts_mod.read_dataframe = real_read
+    precincts_mod._crosswalk_cache.clear()
+    try:
+        s3_path = "data/crosswalks/13_1307_bg_to_precinct.csv"
+        precincts_mod._load_crosswalk_matrix(s3_path)
+        precincts_mod._load_crosswalk_matrix(s3_path)
+        fake.etag = '"v2"'
+        precincts_mod._load_crosswalk_matrix(s3_path)
+        if fake.gets != 2:
+            failures.append(f"S3 crosswalk read {fake.gets} times, expected 2 (initial + new ETag)")
+        try:
+            precincts_mod._load_crosswalk_matrix("data/crosswalks/99_bg_to_precinct.csv")
+            failures.append("missing S3 crosswalk should raise FileNotFoundError")
+        except FileNotFoundError:
+            pass
+    finally:
+        storage.STORAGE_BACKEND, storage._get_s3_client = saved
+
+    print("precinct matrix test: 4 cases.")
+    if failures:
+        print(f"FAIL: {len(failures)} assertion(s) failed:")
+        for f in failures:
+            print(f"  - {f}")
+        return 1
+    print("PASS: all assertion groups OK.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
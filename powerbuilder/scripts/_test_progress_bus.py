@@ -0,0 +1,181 @@
+"""
+Tests for the progress bus backends in chat.progress and the resumable SSE
+stream built on them.
+
+Verifies:
+  1. InProcessBus and SQLiteBus honour the same contract: 1-based offsets,
+     read(after) returns only later events, drain stops at done/error,
+     unknown runs are a no-op, finish() releases the log.
+  2. Cross-process: a child process emitting into the shared SQLite file is
+     drained live by this process, in order with no gaps.
+  3. Resume: draining from the last seen offset neither replays nor loses
+     events; resume tokens round-trip and malformed ones are rejected.
+  4. Abandoned runs are swept on the next create().
+  5. stream_query_view with a Last-Event-ID does not start a new run; the
+     resumed SSE stream carries ids and frames after the offset only,
+     releases the log after the terminal frame, keeps it when the client
+     drops mid-run, and reports a run that no longer exists.
+
+Usage:
+    python scripts/_test_progress_bus.py
+"""
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+import tempfile
+import textwrap
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+PROJECT_DIR = SCRIPT_DIR.parent
+sys.path.insert(0, str(PROJECT_DIR))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "powerbuilder_app.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from chat import progress, views  # noqa: E402
+
+_CHILD = textwrap.dedent("""
+    import sys, time
+    sys.path.insert(0, {project!r})
+    from chat import progress
+    progress.set_bus(progress.SQLiteBus({db!r}, poll_secs=0.01))
+    for i in range(20):
+        progress.emit({run_id!r}, "agent_done", agent="child", label=f"step {{i}}")
+        time.sleep(0.01)
+    progress.emit({run_id!r}, "done", label="ok")
+""")
+
+
+def _contract(name: str, bus: progress.ProgressBus, failures: list[str]) -> None:
+    progress.set_bus(bus)
+    rid = progress.create(progress.new_run_id())
+    progress.emit(rid, "agent_start", agent="researcher", label="Searching")
+    progress.emit(rid, "agent_done", agent="researcher", label="Found 4", sources=4)
+    progress.emit(rid, "trace", agent="messaging", dropped_tokens=120)
+    progress.emit("does-not-exist", "agent_start", agent="x")
+    events = progress.read(rid)
+    if [e.offset for e in events] != [1, 2, 3]:
+        failures.append(f"{name}: offsets {[e.offset for e in events]}")
+    if events[1].to_dict().get("sources") != 4 or "offset" in events[1].to_dict():
+        failures.append(f"{name}: payload round-trip {events[1].to_dict()}")
+    if [e.type for e in progress.read(rid, after=2)] != ["trace"]:
+        failures.append(f"{name}: read(after=2) wrong")
+    progress.emit(rid, "done", label="ok")
+    progress.emit(rid, "agent_start", agent="late")
+    drained = [e.type for e in progress.drain(rid, timeout=2.0, poll_interval=0.05)]
+    if drained != ["agent_start", "agent_done", "trace", "done"]:
+        failures.append(f"{name}: drain {drained}")
+    idle = progress.create(progress.new_run_id())
+    first = next(progress.drain(idle, timeout=2.0, poll_interval=0.05))
+    if first.type != "ping":
+        failures.append(f"{name}: idle drain should ping, got {first.type}")
+    for r in (rid, idle):
+        progress.finish(r)
+        progress.finish(r)
+    if rid in progress.active_run_ids() or progress.is_active(rid) or progress.read(rid):
+        failures.append(f"{name}: finish() did not release the run")
+    if list(progress.drain("does-not-exist", timeout=1.0, poll_interval=0.05)):
+        failures.append(f"{name}: draining an unknown run should yield nothing")
+
+
+def main() -> int:
+    failures: list[str] = []
+    tmp = Path(tempfile.mkdtemp(prefix="progress_bus_"))
+    db = str(tmp / "progress.sqlite3")
+
+    # 1. Same contract on both backends.
+    _contract("memory", progress.InProcessBus(), failures)
+    _contract("sqlite", progress.SQLiteBus(db, poll_secs=0.01), failures)
+
+    # 2. Another process writes, this one drains.
+    progress.set_bus(progress.SQLiteBus(db, poll_secs=0.01))
+    rid = progress.create(progress.new_run_id())
+    child = subprocess.Popen([sys.executable, "-c", _CHILD.format(
+        project=str(PROJECT_DIR), db=db, run_id=rid)])
+    got = list(progress.drain(rid, timeout=20.0, poll_interval=0.05))
+    child.wait(timeout=20)
+    offsets = [e.offset for e in got if e.type != "ping"]
+    if offsets != list(range(1, 22)) or got[-1].type != "done":
+        failures.append(f"cross-process drain offsets {offsets}")
+    if [e.label for e in got if e.type == "agent_done"] != [f"step {i}" for i in range(20)]:
+        failures.append("cross-process events out of order")
+
+    # 3. Resume from an offset.
+    seen = []
+    for evt in progress.drain(rid, timeout=2.0, poll_interval=0.05):
+        seen.append(evt.offset)
+        if len(seen) == 7:
+            break
+    token = progress.resume_token(rid, seen[-1])
+    run_id, after = progress.parse_resume_token(token)
+    rest = [e.offset for e in progress.drain(run_id, timeout=2.0, poll_interval=0.05, after=after)]
+    if seen + rest != list(range(1, 22)):
+        failures.append(f"resume replayed or lost events: {seen} + {rest}")
+    if any(progress.parse_resume_token(t) for t in (None, "", "abc", "abc:", ":5", "abc:x")):
+        failures.append("malformed resume tokens should parse to None")
+    progress.finish(rid)
+
+    # 4. Sweep of abandoned runs.
+    retention = progress.RUN_RETENTION_SECS
+    stale = progress.create(progress.new_run_id())
+    progress.RUN_RETENTION_SECS = 0
+    time.sleep(0.01)
+    fresh = progress.create(progress.new_run_id())
+    progress.RUN_RETENTION_SECS = retention
+    if progress.is_active(stale) or not progress.is_active(fresh):
+        failures.append("create() should sweep runs past retention and keep the new one")
+    progress.finish(fresh)
+
+    # 5. The streaming view resumes instead of re-running.
+    rid = progress.create(progress.new_run_id())
+    progress.emit(rid, "agent_start", agent="researcher", label="Searching")
+    progress.emit(rid, "agent_done", agent="researcher", label="Found 4")
+    progress.emit(rid, "done", html="<p>plan</p>")
+    request = SimpleNamespace(
+        GET={"query": "plan GA-07"},
+        headers={"Last-Event-ID": progress.resume_token(rid, 1)},
+        session={"authenticated": True},
+    )
+    before = set(progress.active_run_ids())
+    views.stream_query_view(request)
+    if set(progress.active_run_ids()) != before:
+        failures.append("a Last-Event-ID request started a new run")
+    body = "".join(views._drain_sse(rid, after=1))
+    if f"id: {rid}:1\n" in body or f"id: {rid}:2\n" not in body or f"id: {rid}:3\n" not in body:
+        failures.append(f"resumed stream ids wrong: {body!r}")
+    if '"html": "<p>plan</p>"' not in body:
+        failures.append("resumed stream should end with the done frame")
+    if progress.is_active(rid):
+        failures.append("run should be released after the terminal frame")
+    body = "".join(views._drain_sse(rid, after=3))
+    if "no longer available" not in body:
+        failures.append(f"resume of a finished run: {body!r}")
+    rid = progress.create(progress.new_run_id())
+    stream = views._drain_sse(rid)
+    progress.emit(rid, "agent_start", agent="x")
+    next(stream)
+    stream.close()
+    if not progress.is_active(rid):
+        failures.append("a dropped connection should keep the run for reconnects")
+    progress.finish(rid)
+
+    progress.set_bus(None)
+    print("progress bus test: 5 cases.")
+    if failures:
+        print(f"FAIL: {len(failures)} assertion(s) failed:")
+        for f in failures:
+            print(f"  - {f}")
+        return 1
+    print("PASS: all assertion groups OK.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,196 @@
+"""
+Tests for batched research (research_batch in chat/agents/researcher.py)
+and its use by the voter-file agent's _fetch_messaging.
+
+Verifies:
+  1. Six queries across two namespaces cost one embed_documents call and no
+     embed_query calls; the twelve searches run concurrently and results
+     come back one per query, in order, in research_node's shape.
+  2. With demographic context the focused queries are embedded in the same
+     call and handed to _two_pass_search as precomputed vectors.
+  3. A query whose search fails falls back to the local corpus without
+     affecting the others.
+  4. _fetch_messaging issues one research_batch call for all segments and
+     returns one memo per segment.
+
+Usage:
+    python scripts/_test_research_batch.py
+"""
+from __future__ import annotations
+
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+PROJECT_DIR = SCRIPT_DIR.parent
+sys.path.insert(0, str(PROJECT_DIR))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "powerbuilder_app.settings")
+os.environ["PINECONE_API_KEY"] = "test-key"
+os.environ.pop("USE_LOCAL_CORPUS", None)
+
+import django  # noqa: E402
+
+django.setup()
+
+import chat.agents.researcher as researcher  # noqa: E402
+import chat.agents.voterfile_agent as vf  # noqa: E402
+
+_DELAY = 0.15
+
+
+class _Doc:
+    def __init__(self, text: str) -> None:
+        self.page_content = text
+        self.metadata = {"source": f"{text}.md", "date": "2024-01-01"}
+
+
+class _FakeEmbeddings:
+    def __init__(self) -> None:
+        self.doc_calls: list[list[str]] = []
+        self.query_calls: list[str] = []
+
+    def embed_documents(self, texts):
+        self.doc_calls.append(list(texts))
+        return [[float(len(t)), 1.0, 0.0] for t in texts]
+
+    def embed_query(self, text):
+        self.query_calls.append(text)
+        return [float(len(text)), 1.0, 0.0]
+
+
+class _Cfg:
+    def __init__(self, client) -> None:
+        self.client = client
+        self.index_name = "test-index"
+        self.provider = "openai"
+        self.model = "fake"
+
+
+_active = {"now": 0, "peak": 0}
+_lock = threading.Lock()
+
+
+class _FakeStore:
+    fail_on: set = set()
+
+    def __init__(self, index_name, embedding, namespace, text_key) -> None:
+        self.namespace = namespace
+        self.queries: dict = {}
+
+    ks: list = []
+
+    def max_marginal_relevance_search_by_vector(self, vector, k, fetch_k):
+        _FakeStore.ks.append(k)
+        with _lock:
+            _active["now"] += 1
+            _active["peak"] = max(_active["peak"], _active["now"])
+        time.sleep(_DELAY)
+        with _lock:
+            _active["now"] -= 1
+        if int(vector[0]) in _FakeStore.fail_on:
+            raise ConnectionError("pinecone down")
+        return [_Doc(f"len{int(vector[0])}-{self.namespace}")]
+
+
+def main() -> int:
+    failures: list[str] = []
+
+    emb = _FakeEmbeddings()
+    researcher.get_embedding_client = lambda provider=None: _Cfg(emb)
+    researcher.PineconeVectorStore = _FakeStore
+    researcher.RESEARCH_BATCH_WORKERS = 12
+    local_ks: list = []
+
+    def _fake_local(query, k):
+        local_ks.append(k)
+        return [_Doc(f"local:{query}")]
+
+    researcher._local_corpus_search = _fake_local
+
+    queries = [f"q{'x' * i}" for i in range(6)]          # distinct lengths → distinct vectors
+    state = {"query": "unused", "org_namespace": "org-a"}
+
+    # 1. One embedding call, concurrent searches, ordered results.
+    start = time.monotonic()
+    results = researcher.research_batch(state, queries)
+    elapsed = time.monotonic() - start
+    if len(emb.doc_calls) != 1 or emb.doc_calls[0] != queries or emb.query_calls:
+        failures.append(f"embedding calls: documents={emb.doc_calls} query={emb.query_calls}")
+    if elapsed > 12 * _DELAY / 2:
+        failures.append(f"12 searches took {elapsed:.2f}s; expected concurrent execution")
+    if _active["peak"] < 2:
+        failures.append(f"peak concurrency {_active['peak']}")
+    if len(results) != 6 or any(set(r) != {"research_results", "active_agents"} for r in results):
+        failures.append(f"result shape wrong: {results[:1]}")
+    else:
+        for q, r in zip(queries, results):
+            body = "".join(r["research_results"])
+            if f"len{len(q)}-__default__" not in body or f"len{len(q)}-org-a" not in body:
+                failures.append(f"results for {q!r} not in order / missing a namespace: {body!r}")
+                break
+
+    # 2. Focused queries ride along in the same embedding call.
+    emb.doc_calls.clear()
+    seen: list = []
+
+    def _fake_two_pass(store, query, focused_query, embeddings, k, namespace,
+                       query_vector=None, focused_vector=None):
+        seen.append((query, focused_query, query_vector is not None, focused_vector is not None))
+        return [_Doc(f"tp-{query}-{namespace}")]
+
+    real_two_pass = researcher._two_pass_search
+    researcher._two_pass_search = _fake_two_pass
+    researcher.research_batch({**state, "demographic_intent": "youth"}, queries[:3])
+    researcher._two_pass_search = real_two_pass
+    if len(emb.doc_calls) != 1 or len(emb.doc_calls[0]) != 6:
+        failures.append(f"focused queries not embedded in the same call: {emb.doc_calls}")
+    if len(seen) != 6 or not all(qv and fv for _, _, qv, fv in seen):
+        failures.append(f"two-pass did not receive precomputed vectors: {seen}")
+    if emb.query_calls:
+        failures.append(f"embed_query called during the batch: {emb.query_calls}")
+
+    # 3. Per-query fallback.
+    _FakeStore.fail_on = {len(queries[2])}
+    results = researcher.research_batch(state, queries)
+    _FakeStore.fail_on = set()
+    if "local:" + queries[2] not in "".join(results[2]["research_results"]):
+        failures.append("failed query did not fall back to the local corpus")
+    if "local:" in "".join(results[1]["research_results"]):
+        failures.append("a healthy query was sent to the local corpus")
+
+    # k reaches both the Pinecone search and the local fallback.
+    _FakeStore.ks.clear()
+    local_ks.clear()
+    _FakeStore.fail_on = {len(queries[0])}
+    researcher.research_batch(state, queries[:2], k=3)
+    _FakeStore.fail_on = set()
+    if set(_FakeStore.ks) != {3} or local_ks != [3]:
+        failures.append(f"k not passed through: store {_FakeStore.ks}, local {local_ks}")
+
+    # 4. Voter-file messaging: one batch call.
+    calls: list = []
+
+    def _fake_batch(st, qs, k=5):
+        calls.append(list(qs))
+        return [{"research_results": [f"memo {i}"], "active_agents": ["researcher"]} for i in range(len(qs))]
+
+    vf.research_batch = _fake_batch
+    memos = vf._fetch_messaging(["Gen Z (18-26) (age cohort)", "Female (gender)"], state)
+    if len(calls) != 1 or len(calls[0]) != 2 or memos != ["memo 0", "memo 1"]:
+        failures.append(f"_fetch_messaging: calls={calls} memos={memos}")
+
+    print("research batch test: 4 cases.")
+    if failures:
+        print(f"FAIL: {len(failures)} assertion(s) failed:")
+        for f in failures:
+            print(f"  - {f}")
+        return 1
+    print("PASS: all assertion groups OK.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,287 @@
+"""
+Tests for in-flight coalescing of identical streaming runs
+(chat/run_coalescer.py and run_query_streaming in chat/agents/manager.py).
+
+Verifies:
+  1. Keys fold case and whitespace in the query but separate namespaces,
+     providers, options and uploads by content.
+  2. Concurrent identical requests execute the pipeline once; followers get
+     their own copy of the leader's result and the leader's full progress
+     trace (including events emitted before they joined).
+  3. Requests with different keys are not merged, and a finished run is not
+     reused: the next identical request runs fresh.
+  4. A failing leader re-raises its exception in every follower and leaves
+     nothing behind in the in-flight table.
+  5. QUERY_COALESCING_ENABLED=0 turns coalescing off.
+  6. stream_query_view registers before queueing: identical requests take
+     one scheduler slot and every stream gets the answer; a leader turned
+     away with QueueFull clears its flight.
+  7. A follower whose leader never finishes gives up after the run timeout
+     with FollowTimeout, and its stream ends with a timeout error.
+
+Usage:
+    python scripts/_test_run_coalescer.py
+"""
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+PROJECT_DIR = SCRIPT_DIR.parent
+sys.path.insert(0, str(PROJECT_DIR))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "powerbuilder_app.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.sessions.backends.signed_cookies import SessionStore  # noqa: E402
+
+import chat.agents.manager as mgr  # noqa: E402
+from chat import progress, run_coalescer, run_scheduler, views  # noqa: E402
+
+
+class _FakeApp:
+    """Stands in for the compiled LangGraph app; blocks until released."""
+
+    def __init__(self, fail: bool = False) -> None:
+        self.calls = 0
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.fail = fail
+        self._lock = threading.Lock()
+
+    def invoke(self, state, config=None):
+        with self._lock:
+            self.calls += 1
+        rid = state["run_id"]
+        progress.emit(rid, "queued", label="Queued — 1 ahead", position=2)
+        progress.emit(rid, "agent_start", agent="researcher", label="Searching")
+        self.started.set()
+        self.release.wait(5)
+        progress.emit(rid, "agent_done", agent="researcher", label="Found 4")
+        if self.fail:
+            raise RuntimeError("provider timeout")
+        return {"final_answer": f"Plan for {state['query']}", "active_agents": ["researcher"]}
+
+
+def _run(query: str, org: str = "acme", **kwargs):
+    rid = progress.create(progress.new_run_id())
+    out: dict = {"run_id": rid}
+    try:
+        out["result"] = mgr.run_query_streaming(query=query, org_namespace=org, run_id=rid, **kwargs)
+    except Exception as exc:
+        out["error"] = exc
+    return out
+
+
+def _spawn(query: str, **kwargs):
+    box: dict = {}
+    t = threading.Thread(target=lambda: box.update(_run(query, **kwargs)))
+    t.start()
+    return t, box
+
+
+class _Scheduler:
+    """Holds submitted runs until the test starts them, or refuses them."""
+
+    def __init__(self, full: Exception | None = None) -> None:
+        self.jobs: list = []
+        self.full = full
+
+    def submit(self, org, run_id, fn, on_skip=None):
+        if self.full is not None:
+            raise self.full
+        self.jobs.append(fn)
+        return len(self.jobs) - 1
+
+
+def _stream(query: str):
+    session = SessionStore()
+    session["authenticated"] = True
+    request = SimpleNamespace(GET={"query": query}, headers={}, session=session)
+    return views.stream_query_view(request)
+
+
+def _wait_followers(n: int) -> None:
+    deadline = time.monotonic() + 2
+    while run_coalescer.coalescer_stats()["followed"] < n and time.monotonic() < deadline:
+        time.sleep(0.005)
+
+
+def main() -> int:
+    failures: list[str] = []
+    progress.set_bus(progress.InProcessBus())
+    run_coalescer.RELAY_INTERVAL_SECS = 0.02
+    tmp = Path(tempfile.mkdtemp(prefix="coalescer_"))
+
+    # 1. Keys.
+    key = run_coalescer.make_key
+    if key("Plan for GA-07 ", "acme") != key("plan  for ga-07", "acme"):
+        failures.append("case/whitespace variants should share a key")
+    if len({key("q", "acme"), key("q", "other"), key("q", "acme", llm_provider="anthropic"),
+            key("q", "acme", ab_test=True), key("q", "acme", plan_mode="mobilization")}) != 5:
+        failures.append("namespace, provider and options must separate keys")
+    upload = tmp / "voters.csv"
+    upload.write_text("id,score\n1,0.5\n")
+    first = key("q", "acme", uploaded_file_path=str(upload))
+    copy = tmp / "copy.csv"
+    copy.write_text("id,score\n1,0.5\n")
+    if key("q", "acme", uploaded_file_path=str(copy)) != first:
+        failures.append("identical uploads at different paths should share a key")
+    upload.write_text("id,score\n1,0.9\n")
+    os.utime(upload, ns=(0, upload.stat().st_mtime_ns + 10**9))
+    if key("q", "acme", uploaded_file_path=str(upload)) == first:
+        failures.append("changed upload content should change the key")
+
+    # 2. One execution for concurrent identical requests.
+    app = mgr.manager_app = _FakeApp()
+    leader, lbox = _spawn("Plan for GA-07")
+    app.started.wait(2)
+    followers = [_spawn("plan for  ga-07") for _ in range(2)]
+    _wait_followers(2)
+    app.release.set()
+    for t, _ in [(leader, lbox)] + followers:
+        t.join(5)
+    boxes = [lbox] + [b for _, b in followers]
+    if app.calls != 1:
+        failures.append(f"pipeline executed {app.calls} times for 3 identical requests")
+    answers = {b.get("result", {}).get("final_answer") for b in boxes}
+    if answers != {"Plan for Plan for GA-07"}:
+        failures.append(f"results differ: {answers}")
+    boxes[1]["result"]["final_answer"] = "mutated"
+    if boxes[2]["result"]["final_answer"] == "mutated" or lbox["result"]["final_answer"] == "mutated":
+        failures.append("followers should receive their own copy of the result")
+    trace = [(e.type, e.label) for e in progress.read(boxes[1]["run_id"])]
+    if ("agent_start", "Searching") not in trace or ("agent_done", "Found 4") not in trace:
+        failures.append(f"follower trace missing leader events: {trace}")
+    if any(t == "queued" for t, _ in trace) or not any("identical request" in (lb or "") for _, lb in trace):
+        failures.append(f"follower trace should relay run events only and say it joined: {trace}")
+    if run_coalescer.coalescer_stats()["in_flight"]:
+        failures.append("finished run left in the in-flight table")
+
+    # 3. Different keys run separately; finished runs are not reused.
+    app = mgr.manager_app = _FakeApp()
+    app.release.set()
+    threads = [_spawn("Plan for GA-07"), _spawn("Plan for GA-07", org="other")]
+    for t, _ in threads:
+        t.join(5)
+    _run("Plan for GA-07")
+    if app.calls != 3:
+        failures.append(f"{app.calls} executions, expected 3 (two keys + one fresh rerun)")
+
+    # 4. Leader failure reaches every follower.
+    app = mgr.manager_app = _FakeApp(fail=True)
+    before = run_coalescer.coalescer_stats()["followed"]
+    leader, lbox = _spawn("Doomed plan")
+    app.started.wait(2)
+    follower, fbox = _spawn("doomed plan")
+    _wait_followers(before + 1)
+    app.release.set()
+    leader.join(5)
+    follower.join(5)
+    if not isinstance(fbox.get("error"), RuntimeError) or str(fbox["error"]) != "provider timeout":
+        failures.append(f"follower should re-raise the leader's error: {fbox}")
+    if app.calls != 1 or run_coalescer.coalescer_stats()["in_flight"]:
+        failures.append("failed run should execute once and clear the table")
+
+    # 5. Kill switch.
+    os.environ["QUERY_COALESCING_ENABLED"] = "0"
+    app = mgr.manager_app = _FakeApp()
+    first, _ = _spawn("Plan for GA-07")
+    app.started.wait(2)
+    second, _ = _spawn("Plan for GA-07")
+    time.sleep(0.1)
+    app.release.set()
+    first.join(5)
+    second.join(5)
+    os.environ.pop("QUERY_COALESCING_ENABLED")
+    if app.calls != 2:
+        failures.append(f"coalescing disabled but {app.calls} execution(s)")
+
+    # 6. The view coalesces before the scheduler.
+    app = mgr.manager_app = _FakeApp()
+    app.release.set()
+    sched = _Scheduler()
+    real_get_scheduler, real_payload = run_scheduler.get_scheduler, views._build_done_payload
+    run_scheduler.get_scheduler = lambda: sched
+    views._build_done_payload = lambda request, query, result, llm_provider=None: {
+        "type": "done", "html": result.get("final_answer", ""),
+    }
+    before = set(progress.active_run_ids())
+    for _ in range(3):
+        _stream("Plan for GA-09")
+    streams = set(progress.active_run_ids()) - before
+    if len(sched.jobs) != 1:
+        failures.append(f"{len(sched.jobs)} scheduler slots taken by 3 identical requests")
+    worker = threading.Thread(target=sched.jobs[0])
+    worker.start()
+    worker.join(5)
+    deadline = time.monotonic() + 2
+    while time.monotonic() < deadline and not all(
+            any(e.type == "done" for e in progress.read(rid)) for rid in streams):
+        time.sleep(0.01)
+    done = [rid for rid in streams if any(e.type == "done" for e in progress.read(rid))]
+    if len(streams) != 3 or len(done) != 3 or app.calls != 1:
+        failures.append(f"{len(done)}/{len(streams)} streams answered by {app.calls} execution(s)")
+    run_scheduler.get_scheduler = lambda: _Scheduler(full=run_scheduler.QueueFull("busy", 30))
+    refused = _stream("Plan for GA-10")
+    if refused["Retry-After"] != "30" or run_coalescer.coalescer_stats()["in_flight"]:
+        failures.append("a leader refused by the scheduler should clear its flight")
+    run_scheduler.get_scheduler, views._build_done_payload = real_get_scheduler, real_payload
+    for rid in streams:
+        progress.finish(rid)
+
+    # 7. Followers stop waiting at the run timeout.
+    stuck = run_coalescer.Flight("stuck", progress.create(progress.new_run_id()))
+    progress.emit(stuck.run_id, "agent_start", agent="researcher", label="Searching")
+    follower = progress.create(progress.new_run_id())
+    started = time.monotonic()
+    try:
+        run_coalescer.follow(stuck, follower, timeout=0.1)
+        failures.append("follow() should raise FollowTimeout when the leader never finishes")
+    except run_coalescer.FollowTimeout:
+        if time.monotonic() - started > 1:
+            failures.append("follow() overran its timeout")
+    if not any(e.label == "Searching" for e in progress.read(follower)):
+        failures.append("a timed-out follower lost the leader's progress")
+    sched = _Scheduler()
+    run_scheduler.get_scheduler = lambda: sched
+    real_timeout, progress.DEFAULT_RUN_TIMEOUT_SECS = progress.DEFAULT_RUN_TIMEOUT_SECS, 0.1
+    before = set(progress.active_run_ids())
+    _stream("Plan for GA-11")
+    _stream("Plan for GA-11")
+    streams = set(progress.active_run_ids()) - before
+    deadline = time.monotonic() + 2
+    while time.monotonic() < deadline and not any(
+            e.type == "error" for rid in streams for e in progress.read(rid)):
+        time.sleep(0.01)
+    errors = [e.label for rid in streams for e in progress.read(rid) if e.type == "error"]
+    if errors != ["Run timed out"]:
+        failures.append(f"follower stream after the timeout: {errors}")
+    progress.DEFAULT_RUN_TIMEOUT_SECS = real_timeout
+    run_scheduler.get_scheduler = real_get_scheduler
+    for flight in list(run_coalescer._flights.values()):
+        run_coalescer.complete(flight, error=RuntimeError("test over"))
+    for rid in streams | {follower, stuck.run_id}:
+        progress.finish(rid)
+
+    progress.set_bus(None)
+    print("run coalescer test: 7 cases.")
+    if failures:
+        print(f"FAIL: {len(failures)} assertion(s) failed:")
+        for f in failures:
+            print(f"  - {f}")
+        return 1
+    print("PASS: all assertion groups OK.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
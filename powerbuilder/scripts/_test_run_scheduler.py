@@ -0,0 +1,240 @@
+"""
+Tests for the bounded run scheduler (chat/run_scheduler.py) used by the
+streaming endpoint.
+
+Verifies:
+  1. No more than ``workers`` runs execute at once; every accepted run
+     eventually executes.
+  2. Admission control: past RUN_QUEUE_MAX waiting runs, submit() raises
+     QueueFull with a retry hint, and accepts again once the queue drains.
+  3. Per-organization cap: one org cannot queue more than its share while
+     another org is still admitted.
+  4. Fair share: waiting runs are dispatched round-robin across
+     organizations rather than first-come-first-served.
+  5. Queue positions are published as "queued" progress events and count
+     down as the queue moves.
+  6. A queued run whose progress log is gone, or that waited past the run
+     timeout, is dropped unstarted and its on_skip callback runs; runs
+     without a log are unaffected.
+  7. submit() refuses a run whose estimated wait exceeds the run timeout.
+
+Usage:
+    python scripts/_test_run_scheduler.py
+"""
+from __future__ import annotations
+
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+PROJECT_DIR = SCRIPT_DIR.parent
+sys.path.insert(0, str(PROJECT_DIR))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "powerbuilder_app.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from chat import progress, run_scheduler  # noqa: E402
+from chat.run_scheduler import QueueFull, RunScheduler  # noqa: E402
+
+
+class _Gate:
+    """Jobs that block until released, recording concurrency and order."""
+
+    def __init__(self) -> None:
+        self.release = threading.Event()
+        self.lock = threading.Lock()
+        self.active = self.peak = 0
+        self.order: list[str] = []
+        self.done = threading.Semaphore(0)
+
+    def job(self, name: str):
+        def _run():
+            with self.lock:
+                self.order.append(name)
+                self.active += 1
+                self.peak = max(self.peak, self.active)
+            self.release.wait(5)
+            with self.lock:
+                self.active -= 1
+            self.done.release()
+        return _run
+
+    def wait_done(self, n: int) -> bool:
+        return all(self.done.acquire(timeout=5) for _ in range(n))
+
+
+def _wait_for(predicate, timeout: float = 2.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.005)
+    return False
+
+
+def main() -> int:
+    failures: list[str] = []
+    progress.set_bus(progress.InProcessBus())
+
+    # 1. Bounded concurrency.
+    sched = RunScheduler(workers=2, max_queued=10, max_queued_per_org=10)
+    gate = _Gate()
+    for i in range(6):
+        sched.submit("org", f"r{i}", gate.job(f"r{i}"))
+    _wait_for(lambda: gate.active == 2)
+    if sched.stats()["running"] != 2 or sched.stats()["queued"] != 4:
+        failures.append(f"stats while saturated: {sched.stats()}")
+    gate.release.set()
+    if not gate.wait_done(6) or gate.peak != 2:
+        failures.append(f"peak concurrency {gate.peak}, ran {len(gate.order)} of 6")
+    sched.shutdown()
+
+    # 2. Global queue limit with a retry hint.
+    sched = RunScheduler(workers=1, max_queued=2, max_queued_per_org=5)
+    gate = _Gate()
+    sched.submit("org0", "g0", gate.job("g0"))
+    _wait_for(lambda: gate.active == 1)
+    for i in (1, 2):
+        sched.submit(f"org{i}", f"g{i}", gate.job(f"g{i}"))
+    try:
+        sched.submit("late", "g3", gate.job("g3"))
+        failures.append("submit past RUN_QUEUE_MAX should raise QueueFull")
+    except QueueFull as full:
+        if full.retry_after < 5:
+            failures.append(f"retry hint too small: {full.retry_after}")
+    gate.release.set()
+    gate.wait_done(3)
+    _wait_for(lambda: sched.stats()["running"] == 0)
+    try:
+        sched.submit("late", "g4", gate.job("g4"))
+    except QueueFull:
+        failures.append("queue should accept again once drained")
+    gate.wait_done(1)
+    sched.shutdown()
+
+    # 3. Per-organization cap.
+    sched = RunScheduler(workers=1, max_queued=10, max_queued_per_org=2)
+    gate = _Gate()
+    sched.submit("busy", "b0", gate.job("b0"))
+    _wait_for(lambda: gate.active == 1)
+    sched.submit("busy", "b1", gate.job("b1"))
+    sched.submit("busy", "b2", gate.job("b2"))
+    try:
+        sched.submit("busy", "b3", gate.job("b3"))
+        failures.append("an org past RUN_QUEUE_PER_ORG_MAX should be rejected")
+    except QueueFull:
+        pass
+    try:
+        sched.submit("quiet", "q0", gate.job("q0"))
+    except QueueFull:
+        failures.append("another org should still be admitted")
+    gate.release.set()
+    gate.wait_done(4)
+    sched.shutdown()
+
+    # 4. Round-robin across organizations.
+    sched = RunScheduler(workers=1, max_queued=10, max_queued_per_org=10)
+    gate = _Gate()
+    sched._durations.append(1.0)  # short runs keep five waiting under the run timeout
+    sched.submit("a", "blocker", gate.job("blocker"))
+    _wait_for(lambda: gate.active == 1)
+    for name, org in (("a1", "a"), ("a2", "a"), ("a3", "a"), ("b1", "b"), ("c1", "c")):
+        sched.submit(org, name, gate.job(name))
+    gate.release.set()
+    gate.wait_done(6)
+    if gate.order != ["blocker", "a1", "b1", "c1", "a2", "a3"]:
+        failures.append(f"dispatch order {gate.order}")
+    sched.shutdown()
+
+    # 5. Queue positions on the progress bus.
+    sched = RunScheduler(workers=1, max_queued=10, max_queued_per_org=10)
+    gate = _Gate()
+    runs = [progress.create(progress.new_run_id()) for _ in range(4)]
+    ahead = [sched.submit("org", rid, gate.job(rid)) for rid in runs]
+    if ahead != [0, 0, 1, 2]:
+        failures.append(f"submit() returned {ahead} runs ahead")
+    _wait_for(lambda: gate.active == 1)
+    gate.release.set()
+    gate.wait_done(4)
+    if progress.read(runs[0]):
+        failures.append("a run that starts immediately should not be announced as queued")
+    last = [e.payload["position"] for e in progress.read(runs[-1]) if e.type == "queued"]
+    if not last or last[0] != 3 or last[-1] != 1 or last != sorted(last, reverse=True):
+        failures.append(f"queued positions for the last run: {last}")
+    if not all(e.label for rid in runs for e in progress.read(rid)):
+        failures.append("queued events should carry a label")
+    for rid in runs:
+        progress.finish(rid)
+    sched.shutdown()
+
+    # 6. Abandoned runs are dropped, not executed.
+    sched = RunScheduler(workers=1, max_queued=10, max_queued_per_org=10)
+    gate = _Gate()
+    skipped: list[str] = []
+    live, gone, stale = (progress.create(progress.new_run_id()) for _ in range(3))
+    sched.submit("org", "blocker", gate.job("blocker"))
+    _wait_for(lambda: gate.active == 1)
+    for rid in (gone, stale, live):
+        sched.submit("org", rid, gate.job(rid), on_skip=lambda rid=rid: skipped.append(rid))
+    sched.submit("org", "no-log", gate.job("no-log"))
+    progress.finish(gone)
+    with sched._cond:
+        next(j for j in sched._queues["org"] if j.run_id == stale).submitted -= \
+            progress.DEFAULT_RUN_TIMEOUT_SECS
+    gate.release.set()
+    gate.wait_done(3)
+    _wait_for(lambda: sched.stats()["running"] == 0 and sched.stats()["queued"] == 0)
+    if gate.order != ["blocker", live, "no-log"] or skipped != [gone, stale]:
+        failures.append(f"abandoned runs: executed {gate.order}, skipped {skipped}")
+    if sched.stats()["running"] != 0:
+        failures.append(f"skipped runs leaked a slot: {sched.stats()}")
+    for rid in (live, stale):
+        progress.finish(rid)
+    sched.shutdown()
+
+    # 7. No admission for a wait longer than the run timeout.
+    sched = RunScheduler(workers=1, max_queued=10, max_queued_per_org=10)
+    gate = _Gate()
+    sched.submit("org", "w0", gate.job("w0"))
+    _wait_for(lambda: gate.active == 1)
+    accepted = 0
+    try:
+        for i in range(1, 10):
+            sched.submit(f"org{i}", f"w{i}", gate.job(f"w{i}"))
+            accepted += 1
+        failures.append("submit() should refuse a wait past the run timeout")
+    except QueueFull as full:
+        if full.retry_after <= progress.DEFAULT_RUN_TIMEOUT_SECS:
+            failures.append(f"refused with a {full.retry_after}s wait")
+    if accepted * run_scheduler.DEFAULT_RUN_SECS > progress.DEFAULT_RUN_TIMEOUT_SECS:
+        failures.append(f"accepted {accepted} waiting runs behind a {progress.DEFAULT_RUN_TIMEOUT_SECS}s timeout")
+    gate.release.set()
+    gate.wait_done(accepted + 1)
+    sched.shutdown()
+
+    # Module-level scheduler reads the environment.
+    os.environ["RUN_WORKERS"] = "3"
+    run_scheduler.reset_scheduler()
+    if run_scheduler.get_scheduler().workers != 3:
+        failures.append("RUN_WORKERS not honoured")
+    run_scheduler.reset_scheduler()
+    os.environ.pop("RUN_WORKERS")
+    progress.set_bus(None)
+
+    print("run scheduler test: 7 cases.")
+    if failures:
+        print(f"FAIL: {len(failures)} assertion(s) failed:")
+        for f in failures:
+            print(f"  - {f}")
+        return 1
+    print("PASS: all assertion groups OK.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
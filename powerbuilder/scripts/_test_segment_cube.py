@@ -0,0 +1,201 @@
+"""
+Tests for the segment cube (SegmentCube in chat/agents/voterfile_agent.py).
+
+Verifies, against pandas groupby over the same rows:
+  1. Every one-, two- and three-way roll-up over the cube dimensions, and
+     party or vote history by any one of them, matches counts and average
+     scores, missing labels included.
+  2. Filtered drilldowns ("young Latina low-turnout Democrats by precinct",
+     party by precinct) match a boolean-mask groupby; a value absent from
+     the file selects nothing; an unknown dimension, or labels no grain
+     tallies together, raise ValueError.
+  3. Cubes built from chunks with different categorical encodings merge to
+     the whole-file cube, whatever order the chunks arrive in.
+  4. The agent reads the precinct column into the cube, and
+     segment_drilldown answers follow-up slices from the cached cube
+     without reading the file again.
+  5. The cube grain is the six requested dimensions; party, vote history
+     and the new-registrant flag only reach the small side grains.
+
+Usage:
+    python scripts/_test_segment_cube.py
+"""
+from __future__ import annotations
+
+import itertools
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+PROJECT_DIR = SCRIPT_DIR.parent
+sys.path.insert(0, str(PROJECT_DIR))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "powerbuilder_app.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+import chat.agents.voterfile_agent as vf  # noqa: E402
+
+_NAMES = dict(vf.CUBE_DIMENSIONS + vf.TALLY_DIMENSIONS)
+
+
+def _raw(n: int = 3000, seed: int = 7) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "age":               rng.choice([19, 24, 35, 50, 66, 85, np.nan], n),
+        "gender":            rng.choice(["F", "M", "U", None], n),
+        "race":              rng.choice(["Latina", "Black", "White", "Asian", None], n),
+        "party_registration": rng.choice(["DEM", "REP", "NPA", None], n),
+        "partisan_score":    rng.choice([10.0, 33.0, 45.0, 60.0, 85.0, np.nan], n),
+        "turnout_score":     rng.choice([5.0, 25.0, 65.0, 90.0, np.nan], n),
+        "precinct":          rng.choice(["P01", "P02", "P03", "P04", None], n),
+        "registration_date": rng.choice(["2010-05-01", "2025-12-01", None], n),
+        "vote_history_2022": rng.choice(["Y", "N"], n),
+        "vote_history_2024": rng.choice(["Y", "N"], n),
+    })
+
+
+def _frame(raw: pd.DataFrame) -> pd.DataFrame:
+    return vf._add_derived_columns(vf._coerce_columns(raw.copy()))
+
+
+def _reference(df: pd.DataFrame, by: list[str]) -> dict:
+    cols = [_NAMES[b] for b in by]
+    out = {}
+    for key, group in df.groupby(cols, dropna=False, observed=True):
+        key = key if isinstance(key, tuple) else (key,)
+        row = {"count": len(group)}
+        for c in ("partisan_score", "turnout_score"):
+            if group[c].notna().any():
+                row[f"avg_{c}"] = round(float(group[c].mean()), 2)
+        out[tuple(None if pd.isna(k) else k for k in key)] = row
+    return out
+
+
+def _as_map(rows: list[dict], by: list[str]) -> dict:
+    return {
+        tuple(r[b] for b in by): {k: v for k, v in r.items() if k not in by and k != "pct_of_file"}
+        for r in rows
+    }
+
+
+def main() -> int:
+    failures: list[str] = []
+    raw = _raw()
+    df = _frame(raw)
+    cube = vf.SegmentCube().add(df)
+
+    # 1. Roll-ups vs groupby.
+    names = ["age_cohort", "race", "gender", "partisan_tier", "turnout_tier", "precinct"]
+    combos = [list(by) for width in (1, 2, 3) for by in itertools.combinations(names, width)]
+    combos += [["party", name] for name in names]
+    combos += [["vote_history"], ["vote_history", "gender"], ["vote_history", "party"]]
+    checked = 0
+    for by in combos:
+        got, want = _as_map(cube.rollup(by), by), _reference(df, by)
+        checked += 1
+        if got != want:
+            diff = [(k, got.get(k), want.get(k)) for k in set(got) | set(want) if got.get(k) != want.get(k)]
+            failures.append(f"rollup {by}: {diff[:2]}")
+            break
+    rows = cube.rollup(["party"])
+    if [r["count"] for r in rows] != sorted((r["count"] for r in rows), reverse=True):
+        failures.append("rollup rows are not largest first")
+    if sum(r["count"] for r in rows) != len(df):
+        failures.append("party roll-up does not cover every voter")
+
+    # 2. Filtered drilldown.
+    where = {"age_cohort": "Gen Z (18-26)", "race": "Hispanic/Latino", "gender": "Female",
+             "turnout_tier": ["Low (0-19)", "Med-Low (20-59)"], "partisan_tier": "Persuadable Dem (55-69)"}
+    mask = (
+        (df["_age_cohort"] == "Gen Z (18-26)") & (df["_race_norm"] == "Hispanic/Latino")
+        & (df["_gender_norm"] == "Female")
+        & df["_turnout_tier"].isin(["Low (0-19)", "Med-Low (20-59)"])
+        & (df["_partisan_tier"] == "Persuadable Dem (55-69)")
+    )
+    got = _as_map(cube.rollup(["precinct"], where), ["precinct"])
+    want = _reference(df[mask], ["precinct"])
+    if not want or got != want:
+        failures.append(f"drilldown by precinct:\n    got  {got}\n    want {want}")
+    got = _as_map(cube.rollup(["precinct"], {"party": "DEM"}), ["precinct"])
+    if got != _reference(df[df["party_registration"] == "DEM"], ["precinct"]):
+        failures.append(f"party drilldown by precinct: {got}")
+    if cube.rollup(["precinct"], {"party": "GRN"}):
+        failures.append("a party absent from the file should select nothing")
+    missing = cube.rollup(["gender"], {"precinct": None})
+    if sum(r["count"] for r in missing) != int(df["precinct"].isna().sum()):
+        failures.append("where=None should select voters with no precinct")
+    for by, bad in ((["zodiac"], None), (["precinct"], {"party": "DEM", "gender": "Female"})):
+        try:
+            cube.rollup(by, bad)
+            failures.append(f"rollup({by}, {bad}) should raise ValueError")
+        except ValueError:
+            pass
+
+    # 3. Merge of differently encoded chunks, in any order.
+    parts = [df.iloc[i:i + 700].copy() for i in range(0, len(df), 700)]
+    for p in parts:
+        p["party_registration"] = p["party_registration"].astype("category")
+    for order in (parts, parts[::-1]):
+        merged = vf.SegmentCube()
+        for p in order:
+            merged.merge(vf.SegmentCube().add(p))
+        if _as_map(merged.rollup(["party", "precinct"]), ["party", "precinct"]) != \
+                _as_map(cube.rollup(["party", "precinct"]), ["party", "precinct"]) \
+                or merged.segments() != cube.segments():
+            failures.append("merged chunk cubes differ from the whole-file cube")
+            break
+        if merged.summary() != cube.summary():
+            failures.append("merged summary differs from the whole-file summary")
+            break
+
+    # 4. Agent: precinct loaded, drilldowns from the cache.
+    tmp = Path(tempfile.mkdtemp(prefix="segment_cube_"))
+    csv = tmp / "file.csv"
+    raw.rename(columns={"party_registration": "party", "precinct": "precinct_name"}).to_csv(csv, index=False)
+    vf._fetch_messaging = lambda descs, state: ["memo"] * len(descs)
+    vf.VOTERFILE_CACHE_TTL_SECS = 600
+    vf.VoterFileAgent.run({"uploaded_file_path": str(csv), "query": "x"})
+    reads = {"n": 0}
+    real_iter = vf._iter_chunks
+
+    def _counting(*args):
+        reads["n"] += 1
+        yield from real_iter(*args)
+
+    vf._iter_chunks = _counting
+    got = _as_map(vf.segment_drilldown(str(csv), ["precinct"], where), ["precinct"])
+    if reads["n"]:
+        failures.append("segment_drilldown re-read a file that was already analysed")
+    if got != want:
+        failures.append(f"segment_drilldown on the upload:\n    got  {got}\n    want {want}")
+
+    # 5. Cube grain and side grain sizes.
+    six = [col for _, col in vf.CUBE_DIMENSIONS]
+    if list(cube.grains[0]) != six:
+        failures.append(f"cube grain {cube.grains[0]}")
+    if len(cube._cells(0)[1]) != df.groupby(six, dropna=False, observed=True).ngroups:
+        failures.append("cube grain cells differ from the six-way groupby")
+    labels = {col: df[col].nunique(dropna=False) for _, col in vf.CUBE_DIMENSIONS + vf.TALLY_DIMENSIONS}
+    for g, grain in enumerate(cube.grains[1:], 1):
+        if set(grain) <= set(six) or len(cube._cells(g)[1]) > np.prod([labels[c] for c in grain]):
+            failures.append(f"side grain {grain} holds {len(cube._cells(g)[1])} cells")
+
+    print(f"segment cube test: 5 cases ({checked} roll-ups).")
+    if failures:
+        print(f"FAIL: {len(failures)} assertion(s) failed:")
+        for f in failures:
+            print(f"  - {f}")
+        return 1
+    print("PASS: all assertion groups OK.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+"""
+Tests for the template registry (chat/utils/template_registry.py) and the
+messaging / finance / export loaders built on it.
+
+Verifies:
+  1. A file is parsed once and served from memory until its mtime changes;
+     a changed file is reparsed, a deleted file returns the default.
+  2. JSON entries are frozen; a parser error is raised and not cached.
+  3. messaging._load_costs / _load_template and finance _load_unit_costs
+     read through the registry: repeated calls do not reopen the files and
+     edits are picked up. Finance callers get private copies.
+  4. blank_document (when python-docx is installed) returns independent
+     documents with the template's body cleared.
+
+Usage:
+    python scripts/_test_template_registry.py
+"""
+from __future__ import annotations
+
+import builtins
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+PROJECT_DIR = SCRIPT_DIR.parent
+sys.path.insert(0, str(PROJECT_DIR))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "powerbuilder_app.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from chat.agents import finance_agent, messaging  # noqa: E402
+from chat.utils import template_registry as reg  # noqa: E402
+
+_opens: list[str] = []
+_real_open = builtins.open
+
+
+def _counting_open(file, *args, **kwargs):
+    _opens.append(str(file))
+    return _real_open(file, *args, **kwargs)
+
+
+def _touch(path: Path, text: str, bump: int) -> None:
+    """Rewrite ``path`` and move its mtime forward by ``bump`` seconds."""
+    path.write_text(text)
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + bump * 1_000_000_000))
+
+
+def main() -> int:
+    failures: list[str] = []
+    tmp = Path(tempfile.mkdtemp(prefix="template_registry_"))
+    builtins.open = _counting_open
+
+    # 1. Parse once, reload on change, default when missing.
+    costs = tmp / "costs.json"
+    _touch(costs, json.dumps({"canvassing": {"cost_per_door": 7.0}, "tags": ["a"]}), 0)
+    first = reg.load_json(str(costs))
+    second = reg.load_json(str(costs))
+    reads = sum(p == str(costs) for p in _opens)
+    if first is not second or reads != 1:
+        failures.append(f"costs.json opened {reads} times for two loads")
+    _touch(costs, json.dumps({"canvassing": {"cost_per_door": 9.5}}), 5)
+    if reg.load_json(str(costs))["canvassing"]["cost_per_door"] != 9.5:
+        failures.append("edited file was not reloaded")
+    if reg.load_json(str(tmp / "absent.json"), default={}) != {}:
+        failures.append("missing file should return the default")
+
+    # 2. Frozen values; parse errors not cached.
+    _touch(costs, json.dumps({"canvassing": {"cost_per_door": 7.0}, "tags": ["a"]}), 10)
+    frozen = reg.load_json(str(costs))
+    try:
+        frozen["canvassing"]["cost_per_door"] = 0
+        failures.append("cached JSON is mutable")
+    except TypeError:
+        pass
+    if not isinstance(frozen["tags"], tuple):
+        failures.append("JSON lists should be frozen to tuples")
+    bad = tmp / "bad.json"
+    _touch(bad, "{not json", 0)
+    for _ in range(2):
+        try:
+            reg.load_json(str(bad))
+            failures.append("bad JSON should raise")
+        except json.JSONDecodeError:
+            pass
+    if sum(p == str(bad) for p in _opens) != 2:
+        failures.append("a parse error was cached")
+
+    # 3. Agent loaders.
+    messaging.TEMPLATES_DIR = str(tmp)
+    finance_agent.TEMPLATES_DIR = str(tmp)
+    canvass = tmp / messaging.TEMPLATE_FILES["canvassing_script"]
+    _touch(canvass, "  Hi, I'm a volunteer.\n", 0)
+    _opens.clear()
+    for _ in range(3):
+        messaging._load_costs()
+        messaging._load_template("canvassing_script")
+        finance_agent._load_unit_costs()
+    if len(_opens) > 3:
+        failures.append(f"three rounds of agent loads opened {len(_opens)} files: {_opens}")
+    if messaging._load_template("canvassing_script") != "Hi, I'm a volunteer.":
+        failures.append("template text not stripped as before")
+    if messaging._load_template("mail_narrative") is not None:
+        failures.append("format without a template file should return None")
+    _touch(canvass, "Hello neighbour.", 5)
+    if messaging._load_template("canvassing_script") != "Hello neighbour.":
+        failures.append("edited template not picked up")
+    if "$7.00" not in messaging._format_costs_context(messaging._load_costs()):
+        failures.append("messaging cost context wrong")
+    unit = finance_agent._load_unit_costs()
+    unit["door_knock"] = 999
+    if finance_agent._load_unit_costs()["door_knock"] != 7.0:
+        failures.append("mutating finance unit costs leaked into the cache")
+    if finance_agent._load_unit_costs()["phone_call"] != finance_agent.DEFAULT_UNIT_COSTS["phone_call"]:
+        failures.append("missing keys should fall back to DEFAULT_UNIT_COSTS")
+    _touch(costs, "{broken", 20)
+    if finance_agent._load_unit_costs() != finance_agent.DEFAULT_UNIT_COSTS or messaging._load_costs() != {}:
+        failures.append("broken costs.json should fall back to defaults")
+    builtins.open = _real_open
+
+    # 4. Word template clones.
+    try:
+        from docx import Document
+    except ImportError:
+        Document = None
+    if Document is not None:
+        template = tmp / "plan.docx"
+        src = Document()
+        src.add_paragraph("PLACEHOLDER")
+        src.save(template)
+        a = reg.blank_document(str(template))
+        b = reg.blank_document(str(template))
+        a.add_paragraph("only in a")
+        if any(p.text for p in b.paragraphs):
+            failures.append("template clones share or keep body content")
+        if not reg.blank_document(str(tmp / "missing.docx")):
+            failures.append("missing template should give a blank document")
+
+    print(f"template registry test: 4 cases{'' if Document else ' (docx clone skipped: python-docx missing)'}.")
+    if failures:
+        print(f"FAIL: {len(failures)} assertion(s) failed:")
+        for f in failures:
+            print(f"  - {f}")
+        return 1
+    print("PASS: all assertion groups OK.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
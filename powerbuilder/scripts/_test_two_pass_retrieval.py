@@ -0,0 +1,161 @@
+"""
+Tests for the researcher's two-pass retrieval (_two_pass_search in
+chat/agents/researcher.py).
+
+Verifies:
+  1. The re-rank uses the vectors Pinecone returns with the matches: only
+     the two queries are embedded, never the candidate documents.
+  2. Matches that come back without values are embedded once, in one batch,
+     and served from the local vector cache on the next query.
+  3. The focused-query re-rank keeps the candidates closest to the focused
+     query, and MMR drops a near-duplicate in favour of a diverse document.
+  4. _mmr matches a straightforward reference implementation.
+
+Usage:
+    python scripts/_test_two_pass_retrieval.py
+"""
+from __future__ import annotations
+
+import os
+import sys
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+PROJECT_DIR = SCRIPT_DIR.parent
+sys.path.insert(0, str(PROJECT_DIR))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "powerbuilder_app.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+import numpy as np  # noqa: E402
+
+import chat.agents.researcher as researcher  # noqa: E402
+from chat.agents.researcher import _mmr, _two_pass_search  # noqa: E402
+
+# 3-d toy embedding space: axis 0 = "query", axis 1 = "focused", axis 2 = other.
+_QUERY_VEC   = [1.0, 0.0, 0.0]
+_FOCUSED_VEC = [0.0, 1.0, 0.0]
+
+_CORPUS = {
+    "gotv-a":  [0.6, 0.8, 0.0],    # on focus
+    "gotv-a2": [0.6, 0.8, 0.001],  # near-duplicate of gotv-a
+    "gotv-b":  [0.9, 0.3, 0.3],    # on query, partly on focus
+    "off-1":   [0.7, 0.0, 0.7],
+    "off-2":   [0.1, 0.0, 1.0],
+}
+
+
+class _FakeEmbeddings:
+    def __init__(self) -> None:
+        self.query_calls: list[str] = []
+        self.doc_calls: list[list[str]] = []
+
+    def embed_query(self, text: str) -> list[float]:
+        self.query_calls.append(text)
+        return _FOCUSED_VEC if text == "focused" else _QUERY_VEC
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        self.doc_calls.append(list(texts))
+        return [_CORPUS[t] for t in texts]
+
+
+class _FakeIndex:
+    def __init__(self, drop_values: set[str]) -> None:
+        self.drop_values = drop_values
+        self.kwargs: dict = {}
+
+    def query(self, **kwargs):
+        self.kwargs = kwargs
+        return {"matches": [
+            {
+                "id": doc_id,
+                "score": 0.0,
+                "values": [] if doc_id in self.drop_values else vec,
+                "metadata": {"text": doc_id, "source": f"{doc_id}.md"},
+            }
+            for doc_id, vec in _CORPUS.items()
+        ]}
+
+
+class _FakeStore:
+    def __init__(self, drop_values: set[str] | None = None) -> None:
+        self.index = _FakeIndex(drop_values or set())
+
+
+def _reference_mmr(query, cands, k, lambda_mult):
+    q = np.asarray(query) / np.linalg.norm(query)
+    c = [np.asarray(v) / np.linalg.norm(v) for v in cands]
+    picked: list[int] = []
+    while len(picked) < min(k, len(c)):
+        best, best_score = None, -np.inf
+        for i, v in enumerate(c):
+            if i in picked:
+                continue
+            redundancy = max((float(v @ c[j]) for j in picked), default=0.0)
+            score = lambda_mult * float(v @ q) - (1 - lambda_mult) * redundancy
+            if score > best_score:
+                best, best_score = i, score
+        picked.append(best)
+    return picked
+
+
+def main() -> int:
+    failures: list[str] = []
+
+    # 1. Stored vectors: no candidate re-embedding.
+    emb = _FakeEmbeddings()
+    store = _FakeStore()
+    docs = _two_pass_search(store, "query", "focused", emb, k=3, namespace="__default__")
+    if emb.doc_calls:
+        failures.append(f"embed_documents called with stored vectors present: {emb.doc_calls}")
+    if len(emb.query_calls) != 2:
+        failures.append(f"expected 2 embed_query calls, got {emb.query_calls}")
+    if not store.index.kwargs.get("include_values") or store.index.kwargs.get("top_k") != 50:
+        failures.append(f"index query kwargs wrong: {store.index.kwargs}")
+    if store.index.kwargs.get("namespace") != "__default__":
+        failures.append("namespace not passed through to the index query")
+    if docs and docs[0].metadata.get("text") is not None:
+        failures.append("text key should be popped from metadata")
+
+    # 3. Re-rank + MMR on the toy space.
+    ids = [d.page_content for d in docs]
+    if len(ids) != 3 or ids[0] != "gotv-b":
+        failures.append(f"unexpected final order: {ids}")
+    if "gotv-a" in ids and "gotv-a2" in ids:
+        failures.append(f"MMR kept both near-duplicates: {ids}")
+
+    # 2. Missing values: embedded once, then cached.
+    researcher._doc_vector_cache.clear()
+    emb = _FakeEmbeddings()
+    store = _FakeStore(drop_values={"off-1", "off-2"})
+    _two_pass_search(store, "query", "focused", emb, k=3, namespace="org-x")
+    if emb.doc_calls != [["off-1", "off-2"]]:
+        failures.append(f"expected one batched embed of the 2 missing docs, got {emb.doc_calls}")
+    _two_pass_search(store, "query", "focused", emb, k=3, namespace="org-x")
+    if len(emb.doc_calls) != 1:
+        failures.append("second query re-embedded docs already in the vector cache")
+
+    # 4. _mmr vs reference.
+    rng = np.random.default_rng(7)
+    cands = rng.normal(size=(20, 8)).astype(np.float32)
+    query = rng.normal(size=8).astype(np.float32)
+    unit = cands / np.linalg.norm(cands, axis=1, keepdims=True)
+    got = _mmr(query / np.linalg.norm(query), unit, k=6, lambda_mult=0.5)
+    want = _reference_mmr(query, cands, k=6, lambda_mult=0.5)
+    if got != want:
+        failures.append(f"_mmr {got} != reference {want}")
+
+    print("two-pass retrieval test: 4 cases.")
+    if failures:
+        print(f"FAIL: {len(failures)} assertion(s) failed:")
+        for f in failures:
+            print(f"  - {f}")
+        return 1
+    print("PASS: all assertion groups OK.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,167 @@
+"""
+Tests for the content-hash analysis cache in
+chat/agents/voterfile_agent.py (_load_analysis / purge_analysis_cache).
+
+Verifies:
+  1. A second run on the same file reads no chunks and returns the same
+     summary and segments.
+  2. Identical bytes uploaded under a new path hit the cache; a changed file
+     at the old path misses.
+  3. Entries past VOTERFILE_CACHE_TTL_SECS are recomputed, and the cache
+     holds at most VOTERFILE_CACHE_MAX_ENTRIES files.
+  4. purge_analysis_cache() empties the cache; purge_analysis_cache(key),
+     which logout calls, drops only entries no other session holds.
+  5. Callers get private copies: mutating a returned summary does not leak
+     into the next hit.
+  6. VOTERFILE_CACHE_TTL_SECS=0 disables caching.
+
+Usage:
+    python scripts/_test_voterfile_cache.py
+"""
+from __future__ import annotations
+
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+PROJECT_DIR = SCRIPT_DIR.parent
+sys.path.insert(0, str(PROJECT_DIR))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "powerbuilder_app.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+import pandas as pd  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test import RequestFactory  # noqa: E402
+from django.contrib.sessions.backends.signed_cookies import SessionStore  # noqa: E402
+
+import chat.agents.voterfile_agent as vf  # noqa: E402
+from chat.views import logout_view  # noqa: E402
+
+_reads = {"n": 0}
+_real_iter_chunks = vf._iter_chunks
+
+
+def _counting_iter_chunks(file_path, plan):
+    _reads["n"] += 1
+    yield from _real_iter_chunks(file_path, plan)
+
+
+def _write(path: Path, n: int, party: str = "DEM") -> None:
+    pd.DataFrame({
+        "voter_id":       range(n),
+        "age":            [25, 40, 65, 80] * (n // 4),
+        "gender":         ["F", "M"] * (n // 2),
+        "party":          [party, "REP"] * (n // 2),
+        "partisan_score": [80.0, 20.0, 50.0, 60.0] * (n // 4),
+    }).to_csv(path, index=False)
+
+
+def _run(path: Path, session_key: str | None = None) -> dict:
+    state = {"uploaded_file_path": str(path), "query": "x", "session_key": session_key}
+    out = vf.VoterFileAgent.run(state)
+    return out["structured_data"][0]
+
+
+def main() -> int:
+    failures: list[str] = []
+    # logout_view also deletes the session's saved conversations.
+    connection.creation.create_test_db(verbosity=0)
+    tmp = Path(tempfile.mkdtemp(prefix="voterfile_cache_"))
+    vf._fetch_messaging = lambda descs, state: ["memo"] * len(descs)
+    vf._iter_chunks = _counting_iter_chunks
+    vf.VOTERFILE_CACHE_TTL_SECS = 600
+    vf.purge_analysis_cache()
+
+    a = tmp / "a.csv"
+    _write(a, 400)
+
+    # 1. Second run skips all reading.
+    first = _run(a)
+    second = _run(a)
+    if _reads["n"] != 1:
+        failures.append(f"two runs read the file {_reads['n']} times, expected 1")
+    if first != second:
+        failures.append("cached run returned a different result")
+
+    # 2. Keyed on content, not path.
+    copy = tmp / "1700000000_a.csv"
+    shutil.copy(a, copy)
+    _run(copy)
+    if _reads["n"] != 1:
+        failures.append("identical content under a new path missed the cache")
+    _write(a, 400, party="NPA")
+    changed = _run(a)
+    if _reads["n"] != 2:
+        failures.append("changed content at the same path was served from cache")
+    if "NPA" not in changed["summary"].get("party_breakdown", {}):
+        failures.append(f"changed file analysed stale: {changed['summary'].get('party_breakdown')}")
+
+    # 3. TTL and bound.
+    vf.VOTERFILE_CACHE_TTL_SECS = 1e-9
+    _run(copy)
+    if _reads["n"] != 3:
+        failures.append("entry past TTL was served")
+    vf.VOTERFILE_CACHE_TTL_SECS = 600
+    vf.VOTERFILE_CACHE_MAX_ENTRIES = 2
+    for i in range(4):
+        _write(tmp / f"b{i}.csv", 8 + 4 * i)
+        _run(tmp / f"b{i}.csv")
+    if len(vf._analysis_cache) != 2:
+        failures.append(f"cache holds {len(vf._analysis_cache)} entries (cap 2)")
+    vf.VOTERFILE_CACHE_MAX_ENTRIES = 8
+
+    # 4. Purge, and logout purges only the caller's entries.
+    if vf.purge_analysis_cache() != 2 or vf._analysis_cache:
+        failures.append("purge_analysis_cache did not empty the cache")
+    session = SessionStore()
+    session["authenticated"] = True
+    session.save()
+    _run(a, "other")
+    _run(a, session.session_key)
+    _run(tmp / "b0.csv", session.session_key)
+    _run(tmp / "b1.csv", "other")
+    if vf.purge_analysis_cache("nobody") != 0 or len(vf._analysis_cache) != 3:
+        failures.append("purging an unknown session removed entries")
+    request = RequestFactory().get("/logout/")
+    request.session = session
+    logout_view(request)
+    if len(vf._analysis_cache) != 2:
+        failures.append(f"logout left {len(vf._analysis_cache)} entries, expected the 2 'other' holds")
+    if vf.purge_analysis_cache("other") != 2 or vf._analysis_cache:
+        failures.append("entries shared with a logged-out session were not released")
+
+    # 5. Private copies.
+    got = _run(a)
+    got["summary"]["total_voters"] = -1
+    got["segments"].clear()
+    again = _run(a)
+    if again["summary"]["total_voters"] != 400 or not again["segments"]:
+        failures.append("mutating a returned analysis changed the cached entry")
+
+    # 6. Disabled.
+    vf.VOTERFILE_CACHE_TTL_SECS = 0
+    vf.purge_analysis_cache()
+    before = _reads["n"]
+    _run(a)
+    _run(a)
+    if _reads["n"] - before != 2 or vf._analysis_cache:
+        failures.append("VOTERFILE_CACHE_TTL_SECS=0 should bypass the cache")
+
+    print("voter file cache test: 6 cases.")
+    if failures:
+        print(f"FAIL: {len(failures)} assertion(s) failed:")
+        for f in failures:
+            print(f"  - {f}")
+        return 1
+    print("PASS: all assertion groups OK.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,214 @@
+"""
+Tests for the vectorized derived-column pipeline in
+chat/agents/voterfile_agent.py (_add_derived_columns).
+
+Verifies, against the original row-wise helpers re-implemented here as a
+reference:
+  1. Age cohorts, partisan / turnout tiers, vote-history class, gender and
+     race normalization and the new-registrant flag match row for row,
+     including fractional ages, boundary scores, junk strings and nulls.
+     (Deliberate difference: a missing score is "New/Unscored" / "Unscored";
+     the row-wise helpers fell through float(nan) to the bottom tier.)
+  2. Every derived label column is a Categorical and the frame is updated
+     in place.
+  3. Files without score columns get the constant unscored tiers, and a
+     registration date alone still drives the new-registrant flag.
+  4. The segment table and summary breakdowns carry no zero-count rows for
+     labels absent from the file.
+
+Usage:
+    python scripts/_test_voterfile_derived.py
+"""
+from __future__ import annotations
+
+import os
+import sys
+from datetime import date, timedelta
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+PROJECT_DIR = SCRIPT_DIR.parent
+sys.path.insert(0, str(PROJECT_DIR))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "powerbuilder_app.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from chat.agents.voterfile_agent import (  # noqa: E402
+    VOTE_HISTORY_COLS,
+    _add_derived_columns,
+    _build_segment_table,
+    SegmentCube,
+    _coerce_columns,
+)
+
+_CUTOFF = pd.Timestamp(date.today() - timedelta(days=548))
+_RECENT = (date.today() - timedelta(days=30)).isoformat()
+
+
+# --- reference: the pre-vectorization row-wise helpers -----------------------
+
+def _ref_age(age):
+    try:
+        age = int(age)
+    except (ValueError, TypeError):
+        return "Unknown"
+    for lo, hi, label in ((18, 26, "Gen Z (18-26)"), (27, 42, "Millennial (27-42)"),
+                          (43, 58, "Gen X (43-58)"), (59, 77, "Boomer (59-77)")):
+        if lo <= age <= hi:
+            return label
+    return "Silent/Greatest (78+)" if age >= 78 else "Unknown"
+
+
+def _ref_partisan(score):
+    if pd.isna(score):
+        return "New/Unscored"
+    s = float(score)
+    for cut, label in ((70, "Strong Dem (70-100)"), (55, "Persuadable Dem (55-69)"),
+                       (35, "True Persuadable (35-54)"), (31, "Persuadable Rep (31-34)")):
+        if s >= cut:
+            return label
+    return "Strong Rep (0-30)"
+
+
+def _ref_turnout(score):
+    if pd.isna(score):
+        return "Unscored"
+    s = float(score)
+    for cut, label in ((80, "High (80-100)"), (60, "Med-High (60-79)"), (20, "Med-Low (20-59)")):
+        if s >= cut:
+            return label
+    return "Low (0-19)"
+
+
+def _ref_history(row):
+    present = [c for c in VOTE_HISTORY_COLS if c in row.index]
+    voted = sum(1 for c in present if row[c])
+    total = len(present)
+    if voted >= 3:
+        return f"Consistent High ({voted}/{total} cycles)"
+    if voted >= 1:
+        return f"Occasional ({voted}/{total} cycles)"
+    return f"Non-Voter (0/{total} cycles)"
+
+
+def _ref_gender(val):
+    v = str(val).strip().upper()
+    if v in ("F", "FEMALE", "WOMAN", "W"):
+        return "Female"
+    if v in ("M", "MALE", "MAN"):
+        return "Male"
+    if v in ("NAN", "NONE", "", "UNKNOWN", "U"):
+        return "Unknown"
+    return "Gender Expansive"
+
+
+def _ref_race(val):
+    v = str(val).strip().upper()
+    for keys, label in ((("BLACK", "AFRICAN"), "Black/African American"),
+                        (("HISPANIC", "LATINO", "LATINA", "LATINX"), "Hispanic/Latino"),
+                        (("ASIAN", "AAPI", "PACIFIC"), "Asian/AAPI"),
+                        (("NATIVE", "INDIGENOUS", "INDIAN", "ALASKA"), "Native American/Indigenous"),
+                        (("WHITE", "CAUCASIAN"), "White")):
+        if any(k in v for k in keys):
+            return label
+    return "Unknown" if v in ("NAN", "NONE", "", "UNKNOWN", "U") else "Other"
+
+
+def _ref_new(row):
+    if pd.isna(row.get("partisan_score")) and pd.isna(row.get("turnout_score")):
+        return True
+    reg = row.get("registration_date")
+    return bool(pd.notna(reg) and reg >= _CUTOFF)
+
+
+def _raw_frame(n: int = 2000) -> pd.DataFrame:
+    rng = np.random.default_rng(11)
+    ages = rng.choice([17, 18, 26, 26.9, 27, 42, 43, 58, 59, 77, 78, 104, np.nan, 0, 35.5], n)
+    scores = rng.choice([0, 30.99, 31, 34.5, 35, 54.9, 55, 69.99, 70, 100, np.nan, -3, 19.5, 20, 59.9, 60, 79.9, 80], n)
+    turnout = rng.choice([0, 19.9, 20, 59, 60, 79.99, 80, 100, np.nan], n)
+    genders = rng.choice(["F", "female", " m ", "MAN", "U", "", "X", "nonbinary", None, "W"], n)
+    races = rng.choice(["Black", "African American", "Latina", "hispanic", "AAPI", "Pacific Islander",
+                        "Native", "American Indian", "white", "caucasian", "Middle Eastern",
+                        "UNKNOWN", None, ""], n)
+    regs = rng.choice(["2012-05-01", _RECENT, "not a date", None], n)
+    hist = {c: rng.choice(["TRUE", "FALSE", "1", "0", "Y"], n) for c in VOTE_HISTORY_COLS}
+    return pd.DataFrame({
+        "age": ages, "partisan_score": scores, "turnout_score": turnout,
+        "gender": genders, "race": races, "registration_date": regs, **hist,
+    })
+
+
+def main() -> int:
+    failures: list[str] = []
+
+    # 1. Row-for-row parity.
+    df = _coerce_columns(_raw_frame())
+    expected = {
+        "_age_cohort":         df["age"].map(_ref_age),
+        "_partisan_tier":      df["partisan_score"].map(_ref_partisan),
+        "_turnout_tier":       df["turnout_score"].map(_ref_turnout),
+        "_vote_history_class": df.apply(_ref_history, axis=1),
+        "_gender_norm":        df["gender"].map(_ref_gender),
+        "_race_norm":          df["race"].map(_ref_race),
+        "_new_registrant":     df.apply(_ref_new, axis=1),
+    }
+    out = _add_derived_columns(df)
+    for col, want in expected.items():
+        got = out[col].astype(object) if col != "_new_registrant" else out[col]
+        diff = (got != want.astype(got.dtype))
+        if diff.any():
+            i = diff.idxmax()
+            failures.append(f"{col} row {i}: got {got[i]!r}, want {want[i]!r}")
+
+    # 2. Categorical, in place.
+    if out is not df:
+        failures.append("_add_derived_columns should update the frame in place")
+    for col in ("_age_cohort", "_partisan_tier", "_turnout_tier", "_vote_history_class",
+                "_gender_norm", "_race_norm"):
+        if not isinstance(out[col].dtype, pd.CategoricalDtype):
+            failures.append(f"{col} is {out[col].dtype}, expected category")
+    if out["_new_registrant"].dtype != bool:
+        failures.append(f"_new_registrant is {out['_new_registrant'].dtype}, expected bool")
+
+    # 3. No score columns.
+    bare = _add_derived_columns(pd.DataFrame({
+        "registration_date": pd.to_datetime(["2010-01-01", _RECENT]),
+    }))
+    if set(bare["_partisan_tier"].astype(str)) != {"New/Unscored"} or \
+            set(bare["_turnout_tier"].astype(str)) != {"Unscored"}:
+        failures.append("missing score columns should yield the constant unscored tiers")
+    if bare["_new_registrant"].tolist() != [True, True]:
+        failures.append("with no scores at all every voter counts as a new registrant")
+
+    # 4. No zero-count rows from unused categories.
+    small = _add_derived_columns(_coerce_columns(pd.DataFrame({
+        "age": [30, 31, 32], "partisan_score": [80, 90, 75], "turnout_score": [85, 90, 10],
+        "gender": ["F", "F", "M"],
+    })))
+    segments = _build_segment_table(small)
+    if any(s["count"] == 0 for s in segments):
+        failures.append(f"segment table has empty segments: {[s['segment'] for s in segments if not s['count']]}")
+    cohorts = [s["segment"] for s in segments if s["dimension"] == "Age Cohort"]
+    if cohorts != ["Millennial (27-42)"]:
+        failures.append(f"age cohort segments {cohorts}")
+    gender = SegmentCube().add(small).summary().get("gender_breakdown")
+    if gender != {"Female": 2, "Male": 1}:
+        failures.append(f"breakdown carries unused labels: {gender}")
+
+    print("voter file derived-column test: 4 cases.")
+    if failures:
+        print(f"FAIL: {len(failures)} assertion(s) failed:")
+        for f in failures:
+            print(f"  - {f}")
+        return 1
+    print("PASS: all assertion groups OK.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,159 @@
+"""
+Tests for the schema-aware voter-file loader in
+chat/agents/voterfile_agent.py (_load_plan / _iter_chunks).
+
+Verifies:
+  1. The load plan keeps only the FIELD_SCHEMA columns the analysis reads,
+     resolved through vendor aliases (TargetSmart here); the 50 filler
+     columns are never parsed.
+  2. A clean CSV is read by the pyarrow streaming reader with label columns
+     as categoricals and scores as float64; the pandas parser is not used.
+  3. Text in a score column part-way through the file hands over to the
+     pandas parser from the failing row on: no row is dropped or counted
+     twice and the result matches a whole-file pandas read.
+  4. An .xlsx upload streams through openpyxl read-only mode in chunks and
+     produces the same summary as the equivalent CSV.
+  5. A file with none of the analysis columns still counts its rows.
+
+Usage:
+    python scripts/_test_voterfile_loader.py
+"""
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+PROJECT_DIR = SCRIPT_DIR.parent
+sys.path.insert(0, str(PROJECT_DIR))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "powerbuilder_app.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+import chat.agents.voterfile_agent as vf  # noqa: E402
+
+
+def _tsmart_frame(n: int = 600) -> pd.DataFrame:
+    rng = np.random.default_rng(5)
+    data = {
+        "tsmart_key":             [f"TS{i:06d}" for i in range(n)],
+        "voterbase_age":          rng.choice([22, 35, 50, 66, 81], n),
+        "tsmart_gender":          rng.choice(["F", "M", "U"], n),
+        "tsmart_race":            rng.choice(["Black", "Hispanic", "White", "Asian"], n),
+        "party":                  rng.choice(["DEM", "REP", "UNA"], n),
+        "tsmart_partisan_score":  rng.uniform(0, 100, n).round(1),
+        "tsmart_vote_propensity": rng.uniform(0, 100, n).round(1),
+        "reg_date":               rng.choice(["2008-10-01", "2025-11-15"], n),
+        "g2022":                  rng.choice(["Y", "N"], n),
+        "g2024":                  rng.choice(["Y", "N"], n),
+    }
+    for i in range(50):
+        data[f"filler_{i:02d}"] = "lorem ipsum"
+    return pd.DataFrame(data)
+
+
+def _summary(path: Path) -> dict:
+    out = vf.VoterFileAgent.run({"uploaded_file_path": str(path), "query": "x"})
+    return out["structured_data"][0]["summary"] if out.get("structured_data") else out
+
+
+def main() -> int:
+    failures: list[str] = []
+    tmp = Path(tempfile.mkdtemp(prefix="voterfile_loader_"))
+    vf._fetch_messaging = lambda descs, state: ["memo"] * len(descs)
+    vf.VOTERFILE_CHUNK_ROWS = 100
+
+    frame = _tsmart_frame()
+    csv = tmp / "tsmart.csv"
+    frame.to_csv(csv, index=False)
+
+    # 1. Plan.
+    header = vf._read_header(str(csv))
+    rename_map, vendor, _ = vf._resolve_schema(header)
+    plan = vf._load_plan(header, rename_map)
+    want = {
+        "voterbase_age": "age", "tsmart_gender": "gender", "tsmart_race": "race",
+        "party": "party_registration", "tsmart_partisan_score": "partisan_score",
+        "tsmart_vote_propensity": "turnout_score", "reg_date": "registration_date",
+        "g2022": "vote_history_2022", "g2024": "vote_history_2024",
+    }
+    if plan != want or vendor != "TargetSmart":
+        failures.append(f"plan {plan} / vendor {vendor}")
+
+    # 2. pyarrow path, dtypes.
+    pandas_calls = {"n": 0}
+    real_pandas = vf._iter_csv_pandas
+
+    def _counting_pandas(*args, **kwargs):
+        pandas_calls["n"] += 1
+        yield from real_pandas(*args, **kwargs)
+
+    vf._iter_csv_pandas = _counting_pandas
+    chunks = list(vf._iter_chunks(str(csv), plan))
+    if pandas_calls["n"]:
+        failures.append("clean CSV fell back to the pandas parser")
+    if len(chunks) != 6 or sum(map(len, chunks)) != 600:
+        failures.append(f"expected 6 chunks / 600 rows, got {len(chunks)} / {sum(map(len, chunks))}")
+    first = chunks[0]
+    if set(first.columns) != set(plan):
+        failures.append(f"unplanned columns parsed: {sorted(set(first.columns) - set(plan))}")
+    for col in ("tsmart_gender", "party", "g2024"):
+        if not isinstance(first[col].dtype, pd.CategoricalDtype):
+            failures.append(f"{col} parsed as {first[col].dtype}, expected category")
+    if first["tsmart_partisan_score"].dtype != np.float64:
+        failures.append(f"score parsed as {first['tsmart_partisan_score'].dtype}")
+    clean_summary = _summary(csv)
+
+    # 3. Mid-file text in a score column.
+    dirty = frame.copy()
+    dirty["tsmart_partisan_score"] = dirty["tsmart_partisan_score"].astype(object)
+    dirty.loc[450, "tsmart_partisan_score"] = "unscored"
+    dirty_csv = tmp / "dirty.csv"
+    dirty.to_csv(dirty_csv, index=False)
+    vf._ARROW_BLOCK_BYTES = 16 << 10
+    got = _summary(dirty_csv)
+    if pandas_calls["n"] != 1:
+        failures.append(f"pandas fallback ran {pandas_calls['n']} times, expected 1")
+    whole, _, _ = vf.standardize_columns(pd.read_csv(dirty_csv, dtype={"party": str}))
+    ref = vf.SegmentCube().add(vf._add_derived_columns(vf._coerce_columns(whole))).summary()
+    if got.get("total_voters") != 600:
+        failures.append(f"fallback read {got.get('total_voters')} rows, expected 600")
+    got = {k: v for k, v in got.items() if k in ref}
+    if got != ref:
+        failures.append(f"fallback summary differs:\n    got {got}\n    ref {ref}")
+
+    # 4. XLSX, read-only streaming.
+    xlsx = tmp / "tsmart.xlsx"
+    frame.to_excel(xlsx, index=False)
+    xchunks = list(vf._iter_chunks(str(xlsx), vf._load_plan(vf._read_header(str(xlsx)), rename_map)))
+    if len(xchunks) != 6 or set(xchunks[0].columns) != set(plan):
+        failures.append(f"xlsx chunks: {len(xchunks)}, columns {sorted(xchunks[0].columns)}")
+    if _summary(xlsx) != clean_summary:
+        failures.append(f"xlsx summary differs from csv:\n    xlsx {_summary(xlsx)}\n    csv  {clean_summary}")
+
+    # 5. No analysis columns.
+    names = tmp / "names.csv"
+    pd.DataFrame({"first_name": ["A", "B", "C"], "notes": ["x", "y", "z"]}).to_csv(names, index=False)
+    got = _summary(names)
+    if got.get("total_voters") != 3:
+        failures.append(f"file without analysis columns: {got}")
+
+    print("voter file loader test: 5 cases.")
+    if failures:
+        print(f"FAIL: {len(failures)} assertion(s) failed:")
+        for f in failures:
+            print(f"  - {f}")
+        return 1
+    print("PASS: all assertion groups OK.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,165 @@
+"""
+Tests for the chunked voter-file reader and SegmentCube in
+chat/agents/voterfile_agent.py.
+
+Verifies:
+  1. VoterFileAgent.run on a vendor-named CSV read in small chunks returns
+     the same summary and segment table as a single-chunk read, and
+     resolves the header schema exactly once.
+  2. The single-frame segment table matches the original groupby-based
+     _build_segment_table, re-implemented here as a reference.
+  3. Aggregates built from disjoint halves merge to the whole-file
+     aggregate.
+  4. Numeric-only party codes in one chunk key the same way as in the rest
+     of the file.
+  5. A header-only file reports "no rows".
+
+Usage:
+    python scripts/_test_voterfile_streaming.py
+"""
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+PROJECT_DIR = SCRIPT_DIR.parent
+sys.path.insert(0, str(PROJECT_DIR))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "powerbuilder_app.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+import chat.agents.voterfile_agent as vf  # noqa: E402
+
+
+def _l2_file(path: Path, n: int = 1000) -> None:
+    rng = np.random.default_rng(3)
+    pd.DataFrame({
+        "LALVOTERID":        [f"LAL{i:07d}" for i in range(n)],
+        "Age":               rng.choice([19, 25, 33, 47, 61, 80, np.nan], n),
+        "LGender":           rng.choice(["F", "M", "U", None], n),
+        "LRace":             rng.choice(["Black", "Latino", "White", "Asian", None], n),
+        "LParty":            rng.choice(["DEM", "REP", "NPA", None], n),
+        "LikelyDem":         rng.choice([10, 33, 40, 60, 88, np.nan], n),
+        "LGeneralVoteScore": rng.choice([5, 30, 65, 90, np.nan], n),
+        "reg_date":          rng.choice(["2010-03-01", "2025-12-01", None], n),
+        "g2020":             rng.choice(["Y", "N"], n),
+        "g2022":             rng.choice(["Y", "N"], n),
+        "g2024":             rng.choice(["Y", "N"], n),
+        "Unused1":           "x",
+        "Unused2":           rng.integers(0, 9, n),
+    }).to_csv(path, index=False)
+
+
+def _run(path: Path, chunk_rows: int) -> dict:
+    vf.VOTERFILE_CHUNK_ROWS = chunk_rows
+    out = vf.VoterFileAgent.run({"uploaded_file_path": str(path), "query": "x"})
+    return out
+
+
+def _reference_segments(df: pd.DataFrame) -> list[dict]:
+    """The pre-aggregate _build_segment_table (per-dimension rows only)."""
+    total = len(df)
+    segments = []
+    for dim_label, col in vf._SEGMENT_DIMENSIONS:
+        if col not in df.columns:
+            continue
+        for value, group in df.groupby(col, dropna=False, observed=True):
+            value_str = str(value) if pd.notna(value) else "Unknown"
+            seg = {"dimension": dim_label, "segment": value_str,
+                   "description": f"{value_str} ({dim_label.lower()})",
+                   "count": len(group), "pct_of_file": round(len(group) / total * 100, 1)}
+            for score_col in vf._SCORE_COLS:
+                if score_col in group.columns and group[score_col].notna().any():
+                    seg[f"avg_{score_col}"] = round(float(group[score_col].mean()), 2)
+            if "_gender_norm" in group.columns and col != "_gender_norm":
+                counts = group["_gender_norm"].value_counts()
+                seg["gender_breakdown"] = counts[counts > 0].to_dict()
+            if "party_registration" in group.columns and col != "party_registration":
+                seg["party_breakdown"] = group["party_registration"].value_counts().to_dict()
+            segments.append(seg)
+    return segments
+
+
+def main() -> int:
+    failures: list[str] = []
+    tmp = Path(tempfile.mkdtemp(prefix="voterfile_stream_"))
+    csv = tmp / "l2_export.csv"
+    _l2_file(csv)
+
+    vf._fetch_messaging = lambda descs, state: ["memo"] * len(descs)
+    vf.VOTERFILE_CACHE_TTL_SECS = 0          # every run must re-read the file
+    resolves = {"n": 0}
+    real_resolve = vf._resolve_schema
+
+    def _counting_resolve(columns):
+        resolves["n"] += 1
+        return real_resolve(columns)
+
+    vf._resolve_schema = _counting_resolve
+
+    # 1. Chunked == single chunk.
+    whole = _run(csv, 1_000_000)
+    chunked = _run(csv, 77)
+    if resolves["n"] != 2:
+        failures.append(f"schema resolved {resolves['n']} times for 2 runs, expected 2")
+    w, c = whole["structured_data"][0], chunked["structured_data"][0]
+    if w["vendor_detected"] != "L2":
+        failures.append(f"vendor {w['vendor_detected']!r}, expected L2")
+    if w["summary"] != c["summary"]:
+        failures.append(f"summary differs:\n    whole   {w['summary']}\n    chunked {c['summary']}")
+    if w["segments"] != c["segments"]:
+        diffs = [(a, b) for a, b in zip(w["segments"], c["segments"]) if a != b][:2]
+        failures.append(f"segments differ: {diffs}")
+    if w["summary"]["total_voters"] != 1000:
+        failures.append(f"total_voters {w['summary']['total_voters']}")
+
+    # 2. Matches the groupby reference on one frame.
+    raw = pd.read_csv(csv, dtype={"LParty": str})
+    df, _, _ = vf.standardize_columns(raw)
+    df = vf._add_derived_columns(vf._coerce_columns(df))
+    got = [s for s in vf._build_segment_table(df) if "priority" not in s]
+    want = _reference_segments(df)
+    if got != want:
+        diffs = [(a, b) for a, b in zip(got, want) if a != b][:2]
+        failures.append(f"segment table differs from reference: {diffs or (len(got), len(want))}")
+
+    # 3. merge() of halves == whole.
+    halves = vf.SegmentCube().add(df.iloc[:400]).merge(vf.SegmentCube().add(df.iloc[400:]))
+    single = vf.SegmentCube().add(df)
+    if halves.segments() != single.segments() or halves.summary() != single.summary():
+        failures.append("merged half-file aggregates differ from the whole-file aggregate")
+
+    # 4. Numeric-only party chunk.
+    party = tmp / "party.csv"
+    pd.DataFrame({"party": ["1"] * 5 + ["DEM"] * 5, "age": [30] * 10}).to_csv(party, index=False)
+    out = _run(party, 5)["structured_data"][0]["summary"]["party_breakdown"]
+    if out != {"1": 5, "DEM": 5}:
+        failures.append(f"party codes keyed inconsistently across chunks: {out}")
+
+    # 5. Header only.
+    empty = tmp / "empty.csv"
+    empty.write_text("voter_id,age\n")
+    errs = _run(empty, 5).get("errors", [])
+    if not any("no rows" in e for e in errs):
+        failures.append(f"header-only file: {errs}")
+
+    print("voter file streaming test: 5 cases.")
+    if failures:
+        print(f"FAIL: {len(failures)} assertion(s) failed:")
+        for f in failures:
+            print(f"  - {f}")
+        return 1
+    print("PASS: all assertion groups OK.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -472,7 +472,7 @@ def write_local_index(docs: list[dict]) -> None:
     """
     Persist chunks to a local JSON file the researcher can read when Pinecone
     is unavailable or USE_LOCAL_CORPUS=true. No embeddings, just the text and
-    metadata; the researcher does keyword scoring against this index.
+    metadata; the researcher builds a BM25 index over it when it loads.
     """
     payload = {
         "version": 1,